@@ -14,6 +14,8 @@ __license__ = "MIT"
 from .config import ConfigManager, DeploymentConfig, ManagerConfig
 from .validators import SystemValidator, ValidationResult, ValidationLevel
 from .services import ServiceManager, ServiceStatus, ServiceInfo
+from .metrics import MetricsCollector, MetricsServer, OperationJournal
+from .backupstore import BackupStore
 
 __all__ = [
     "ConfigManager",
@@ -25,4 +27,8 @@ __all__ = [
     "ServiceManager",
     "ServiceStatus",
     "ServiceInfo",
+    "MetricsCollector",
+    "MetricsServer",
+    "OperationJournal",
+    "BackupStore",
 ]
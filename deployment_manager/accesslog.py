@@ -0,0 +1,409 @@
+"""Nginx access-log latency analysis with incremental, bounded-memory state."""
+
+import json
+import os
+import re
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+try:
+    from .latency import LatencySketch
+    from .logrotation import cursor_state, open_log, resume_plan, skip_to
+except ImportError:
+    from latency import LatencySketch
+    from logrotation import cursor_state, open_log, resume_plan, skip_to
+
+STATE_VERSION = 1
+
+# nginx "combined" plus request and upstream timings. nginx.conf needs:
+#   log_format timed '<this format>';
+#   access_log logs/nginx/access.log timed;
+DEFAULT_LOG_FORMAT = (
+    '$remote_addr - $remote_user [$time_local] "$request" $status '
+    '$body_bytes_sent "$http_referer" "$http_user_agent" '
+    "$request_time $upstream_response_time"
+)
+
+VARIABLE = re.compile(r"\$(\w+)")
+
+MONTHS = {
+    name: number
+    for number, name in enumerate(
+        "Jan Feb Mar Apr May Jun Jul Aug Sep Oct Nov Dec".split(), start=1
+    )
+}
+
+# Path segments replaced by placeholders so ids do not create new routes
+SEGMENT = re.compile(
+    r"^(?:(?P<id>\d+)"
+    r"|(?P<uuid>[0-9a-fA-F]{8}-(?:[0-9a-fA-F]{4}-){3}[0-9a-fA-F]{12})"
+    r"|(?P<hash>[0-9a-fA-F]{16,})"
+    r"|(?P<token>(?=[\w-]*\d)[\w-]{20,}))$"
+)
+# Static files are grouped by type, e.g. /_nuxt/entry.3f9a1c2b.js -> /_nuxt/*.js,
+# so fingerprinted build assets do not each become a route
+STATIC_EXTENSIONS = {
+    ".js",
+    ".mjs",
+    ".css",
+    ".map",
+    ".json",
+    ".png",
+    ".jpg",
+    ".jpeg",
+    ".gif",
+    ".svg",
+    ".webp",
+    ".ico",
+    ".woff",
+    ".woff2",
+    ".ttf",
+    ".wasm",
+    ".webmanifest",
+}
+
+# Routes beyond this are counted under "(other)"
+MAX_ROUTES = 1000
+
+# Time buckets: 5 minutes for the last 6 hours, hourly for the last 7 days.
+# Each bucket holds one sketch per route, so a route costs at most
+# 72 + 168 sketches of at most ~1,000 buckets each.
+FINE_SECONDS = 300
+FINE_RETENTION = 6 * 3600
+COARSE_SECONDS = 3600
+COARSE_RETENTION = 7 * 86400
+
+
+def compile_log_format(log_format: str) -> Tuple["re.Pattern", List[str]]:
+    """Build a line regex from an nginx ``log_format`` string.
+
+    Each ``$variable`` becomes a named group matching up to the literal text
+    that follows it, which handles quoted fields and bracketed times without
+    knowing every variable. Returns (regex, variable names).
+    """
+    log_format = log_format.strip().strip("'\"")
+    parts = []
+    names = []
+    position = 0
+    for match in VARIABLE.finditer(log_format):
+        parts.append(re.escape(log_format[position : match.start()]))
+        name = match.group(1)
+        following = log_format[match.end() : match.end() + 1]
+        value = f"[^{re.escape(following)}]*" if following else ".*"
+        if name in names:
+            parts.append(value)
+        else:
+            parts.append(f"(?P<{name}>{value})")
+            names.append(name)
+        position = match.end()
+    parts.append(re.escape(log_format[position:]))
+    return re.compile("".join(parts) + "$"), names
+
+
+@lru_cache(maxsize=8192)
+def normalise_route(method: str, target: str) -> str:
+    """``GET /api/orders/123?x=1`` -> ``GET /api/orders/{id}``."""
+    segments = target.split("?", 1)[0].split("/")
+    for index, segment in enumerate(segments):
+        match = SEGMENT.match(segment)
+        if match:
+            segments[index] = "{" + match.lastgroup + "}"
+    last = segments[-1]
+    dot = last.rfind(".")
+    if dot > 0 and last[dot:].lower() in STATIC_EXTENSIONS:
+        segments[-1] = "*" + last[dot:].lower()
+    return f"{method} {'/'.join(segments) or '/'}"
+
+
+def parse_seconds(value: str) -> Optional[float]:
+    """Total of an nginx timing field in ms ("0.012", "0.010, 0.004", "-")."""
+    try:
+        return float(value) * 1000
+    except ValueError:
+        pass  # "-" or several upstreams
+    total = None
+    for part in re.split(r"[,:]\s*", value):
+        try:
+            seconds = float(part)
+        except ValueError:
+            continue
+        total = (total or 0.0) + seconds
+    return None if total is None else total * 1000
+
+
+@lru_cache(maxsize=4096)
+def _local_minute(stamp: str, zone: str) -> Optional[float]:
+    """Epoch of "15/Feb/2026:13:45" in the "+0800" zone (cached per minute)."""
+    try:
+        day, month, rest = stamp.split("/", 2)
+        year, hour, minute = rest.split(":")
+        offset = timedelta(hours=int(zone[1:3]), minutes=int(zone[3:5]))
+        tz = timezone(-offset if zone[0] == "-" else offset)
+        return datetime(
+            int(year), MONTHS[month], int(day), int(hour), int(minute), tzinfo=tz
+        ).timestamp()
+    except (ValueError, KeyError, IndexError):
+        return None
+
+
+def request_time(fields: Dict[str, str]) -> Optional[float]:
+    """Epoch time of a parsed request, from whichever time variable is logged."""
+    local = fields.get("time_local")
+    if local and len(local) >= 26:
+        # 15/Feb/2026:13:45:01 +0800
+        minute = _local_minute(local[:17], local[21:26])
+        if minute is not None:
+            return minute + int(local[18:20])
+    if fields.get("msec"):
+        try:
+            return float(fields["msec"])
+        except ValueError:
+            return None
+    if fields.get("time_iso8601"):
+        try:
+            return datetime.fromisoformat(fields["time_iso8601"]).timestamp()
+        except ValueError:
+            return None
+    return None
+
+
+@dataclass
+class RouteStats:
+    """Latency of one route and status class within a time bucket."""
+
+    latency: LatencySketch = field(default_factory=LatencySketch)
+    upstream: LatencySketch = field(default_factory=LatencySketch)
+
+    def merge(self, other: "RouteStats"):
+        """Add another bucket's values."""
+        self.latency.merge(other.latency)
+        self.upstream.merge(other.upstream)
+
+    def to_dict(self) -> dict:
+        """JSON-serialisable form."""
+        return {"latency": self.latency.to_dict(), "upstream": self.upstream.to_dict()}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "RouteStats":
+        """Inverse of to_dict()."""
+        return cls(
+            LatencySketch.from_dict(data["latency"]),
+            LatencySketch.from_dict(data["upstream"]),
+        )
+
+
+@dataclass
+class AnalysisReport:
+    """Work done by one AccessLogAnalyzer.update() call."""
+
+    files: int = 0
+    bytes_read: int = 0
+    requests: int = 0
+    unparsed: int = 0
+    elapsed: float = 0.0
+    errors: List[str] = field(default_factory=list)
+
+
+# (route, status class) -> stats
+BucketStats = Dict[Tuple[str, str], RouteStats]
+
+
+class AccessLogAnalyzer:
+    """Incrementally parses an nginx access log into per-route latency sketches.
+
+    Sketches are kept per time bucket so ``--since`` windows can be answered
+    by merging buckets; read offsets and buckets are persisted in a JSON state
+    file so each run only parses what was appended since the previous one.
+    """
+
+    def __init__(self, state_path: Path, log_format: str = DEFAULT_LOG_FORMAT):
+        """Initialize analyzer.
+
+        Args:
+            state_path: JSON file holding offsets and sketches
+            log_format: nginx log_format string the access log was written with
+        """
+        self.state_path = state_path
+        self.regex, self.fields = compile_log_format(log_format)
+        self.log_format = log_format
+        self.files: Dict[str, dict] = {}
+        self.fine: Dict[int, BucketStats] = {}
+        self.coarse: Dict[int, BucketStats] = {}
+        self.routes: set = set()
+        self._pending: Dict[int, BucketStats] = {}
+        self._load()
+
+    def _load(self):
+        """Read saved state (missing, unreadable or other-format state starts fresh)."""
+        try:
+            data = json.loads(self.state_path.read_text(encoding="utf-8"))
+            if (
+                data.get("version") != STATE_VERSION
+                or data.get("format") != self.log_format
+            ):
+                return
+            self.files = data.get("files", {})
+            self.fine = _load_buckets(data.get("fine", {}))
+            self.coarse = _load_buckets(data.get("coarse", {}))
+        except (OSError, ValueError, TypeError, KeyError):
+            self.files, self.fine, self.coarse = {}, {}, {}
+        self.routes = {route for bucket in self.coarse.values() for route, _ in bucket}
+
+    def save(self):
+        """Write state atomically."""
+        data = {
+            "version": STATE_VERSION,
+            "format": self.log_format,
+            "files": self.files,
+            "fine": _dump_buckets(self.fine),
+            "coarse": _dump_buckets(self.coarse),
+        }
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        temp = self.state_path.with_name(self.state_path.name + ".tmp")
+        temp.write_text(json.dumps(data, separators=(",", ":")), encoding="utf-8")
+        os.replace(temp, self.state_path)
+
+    def update(self, log_path: Path) -> AnalysisReport:
+        """Parse everything appended to the access log since the last update."""
+        report = AnalysisReport()
+        started = time.perf_counter()
+        key = str(log_path)
+        self._pending: Dict[int, BucketStats] = {}
+        try:
+            earlier, start = resume_plan(log_path, self.files.get(key))
+            for path, offset in earlier:
+                self._read(path, offset, report)
+            if log_path.exists():
+                end = self._read(log_path, start, report)
+                self.files[key] = cursor_state(log_path, end)
+            else:
+                self.files.pop(key, None)
+        except (OSError, EOFError, RuntimeError) as e:
+            report.errors.append(f"{log_path.name}: {e}")
+
+        # New requests were recorded into fresh 5-minute sketches; merging
+        # those into both tiers costs one add per request instead of two
+        for start, bucket in self._pending.items():
+            for tier, width in (
+                (self.fine, FINE_SECONDS),
+                (self.coarse, COARSE_SECONDS),
+            ):
+                target = tier.setdefault(start // width * width, {})
+                for route_key, stats in bucket.items():
+                    if route_key not in target:
+                        target[route_key] = RouteStats()
+                    target[route_key].merge(stats)
+        self._pending = {}
+
+        self._prune(time.time())
+        report.elapsed = time.perf_counter() - started
+        return report
+
+    def _read(self, path: Path, start: int, report: AnalysisReport) -> int:
+        """Parse complete lines from ``start``; return the offset after the last one."""
+        default_time = path.stat().st_mtime
+        offset = start
+        report.files += 1
+        with open_log(path) as f:
+            skip_to(f, start)
+            for raw in f:
+                if not raw.endswith(b"\n"):
+                    break  # Still being written; picked up next run
+                offset += len(raw)
+                line = raw.decode("utf-8", errors="replace").rstrip("\r\n")
+                if self._record(line, default_time):
+                    report.requests += 1
+                else:
+                    report.unparsed += 1
+        report.bytes_read += offset - start
+        return offset
+
+    def _record(self, line: str, default_time: float) -> bool:
+        """Add one access-log line to its buckets; False if it does not parse."""
+        match = self.regex.match(line)
+        if not match:
+            return False
+        fields = match.groupdict()
+
+        request = fields.get("request", "")
+        parts = request.split(" ")
+        if len(parts) >= 2:
+            method, target = parts[0], parts[1]
+        else:
+            method, target = fields.get("request_method", "-"), fields.get("uri", "-")
+        route = normalise_route(method, target)
+        if route not in self.routes:
+            if len(self.routes) >= MAX_ROUTES:
+                route = "(other)"
+            self.routes.add(route)
+
+        status = fields.get("status", "")
+        status_class = f"{status[0]}xx" if status[:1].isdigit() else "-"
+        latency = parse_seconds(fields.get("request_time", ""))
+        upstream = parse_seconds(fields.get("upstream_response_time", ""))
+        when = request_time(fields) or default_time
+
+        bucket = self._pending.setdefault(int(when // FINE_SECONDS) * FINE_SECONDS, {})
+        stats = bucket.get((route, status_class))
+        if stats is None:
+            stats = bucket[(route, status_class)] = RouteStats()
+        if latency is not None:
+            stats.latency.add(latency)
+        if upstream is not None:
+            stats.upstream.add(upstream)
+        return True
+
+    def _prune(self, now: float):
+        """Drop buckets older than their tier's retention."""
+        self.fine = {t: b for t, b in self.fine.items() if t >= now - FINE_RETENTION}
+        self.coarse = {
+            t: b for t, b in self.coarse.items() if t >= now - COARSE_RETENTION
+        }
+
+    def summary(self, since: Optional[float] = None) -> BucketStats:
+        """Merged stats per (route, status class) since ``since`` (all kept if None).
+
+        Windows within the last 6 hours use 5-minute buckets, longer ones
+        hourly buckets; the bucket containing ``since`` is included whole.
+        """
+        if since is not None and since >= time.time() - FINE_RETENTION:
+            buckets, width = self.fine, FINE_SECONDS
+        else:
+            buckets, width = self.coarse, COARSE_SECONDS
+        first = None if since is None else int(since // width) * width
+
+        merged: BucketStats = {}
+        for start, bucket in buckets.items():
+            if first is not None and start < first:
+                continue
+            for key, stats in bucket.items():
+                if key not in merged:
+                    merged[key] = RouteStats()
+                merged[key].merge(stats)
+        return merged
+
+
+def _dump_buckets(buckets: Dict[int, BucketStats]) -> dict:
+    """Buckets as JSON: {start: {"route\\tclass": stats}}."""
+    return {
+        str(start): {
+            f"{route}\t{status}": stats.to_dict()
+            for (route, status), stats in bucket.items()
+        }
+        for start, bucket in buckets.items()
+    }
+
+
+def _load_buckets(data: dict) -> Dict[int, BucketStats]:
+    """Inverse of _dump_buckets()."""
+    buckets = {}
+    for start, bucket in data.items():
+        buckets[int(start)] = {
+            tuple(key.split("\t", 1)): RouteStats.from_dict(stats)
+            for key, stats in bucket.items()
+        }
+    return buckets
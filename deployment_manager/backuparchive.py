@@ -0,0 +1,287 @@
+"""Single-file backup archives streamed from the file walk."""
+
+import gzip
+import hashlib
+import io
+import json
+import os
+import random
+import tarfile
+import tempfile
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import BinaryIO, Callable, Deque, List, Optional, Tuple
+
+try:
+    import zstandard
+except ImportError:  # Optional: archives fall back to gzip
+    zstandard = None
+
+try:
+    from .backupstore import walk_files
+except ImportError:
+    from backupstore import walk_files
+
+# Files up to this size are read and hashed ahead on the thread pool; larger
+# ones are streamed into the archive and hashed as they pass through
+READ_AHEAD_FILE = 1024 * 1024
+
+# Files read ahead at most; with READ_AHEAD_FILE this bounds buffered data
+# to 64 MB however large the tree is
+READ_AHEAD_WINDOW = 64
+
+# Block size for streaming large files
+STREAM_BLOCK = 1024 * 1024
+
+CHECKSUMS_NAME = "checksums.sha256"
+METADATA_NAME = "metadata.json"
+
+
+@dataclass
+class ArchiveReport:
+    """Result of writing an archive."""
+
+    path: Optional[Path] = None
+    files: int = 0
+    bytes_in: int = 0
+    bytes_out: int = 0
+    elapsed: float = 0.0
+    errors: List[str] = field(default_factory=list)
+
+    @property
+    def mb_per_second(self) -> float:
+        """Input throughput."""
+        return self.bytes_in / 1024**2 / self.elapsed if self.elapsed else 0.0
+
+
+def archive_suffix(compression: str) -> str:
+    """File suffix for an archive compression ("zstd" needs zstandard)."""
+    return ".tar.zst" if compression == "zstd" and zstandard else ".tar.gz"
+
+
+def _open_compressor(raw: BinaryIO, compression: str, level: int) -> BinaryIO:
+    """Writable stream compressing into ``raw``."""
+    if compression == "zstd" and zstandard is not None:
+        # threads=-1: compress on every core while the walk keeps feeding
+        compressor = zstandard.ZstdCompressor(level=level, threads=-1)
+        return compressor.stream_writer(raw, closefd=False)
+    return gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=min(level, 9))
+
+
+class _HashingReader:
+    """File wrapper that hashes what tarfile reads from it.
+
+    Always yields exactly ``size`` bytes (the size recorded in the tar
+    header): a file that shrank while being read is padded with zeros and
+    flagged, so the archive itself stays well-formed.
+    """
+
+    def __init__(self, f: BinaryIO, size: int):
+        self.f = f
+        self.remaining = size
+        self.hasher = hashlib.sha256()
+        self.changed = False
+
+    def read(self, n: int = -1) -> bytes:
+        if n < 0 or n > self.remaining:
+            n = self.remaining
+        data = self.f.read(n)
+        self.hasher.update(data)
+        if len(data) < n:
+            self.changed = True
+            data += b"\0" * (n - len(data))
+        self.remaining -= n
+        return data
+
+
+def _read_small(path: Path) -> Tuple[bytes, str]:
+    """Read and hash a small file (runs on the pool)."""
+    with open(path, "rb") as f:
+        data = f.read()
+    return data, hashlib.sha256(data).hexdigest()
+
+
+def create_archive(
+    project_root: Path,
+    roots: List[str],
+    excludes: List[str],
+    output: Path,
+    metadata: Optional[dict] = None,
+    compression: str = "zstd",
+    level: int = 3,
+    workers: Optional[int] = None,
+    progress: Optional[Callable[[int, int], None]] = None,
+) -> ArchiveReport:
+    """Write roots under project_root to a compressed tar archive.
+
+    Tar entries are written straight into the compressor as the tree is
+    walked; nothing is staged on disk. ``checksums.sha256`` (sha256sum
+    format) is computed in the same pass and added after the files, followed
+    by ``metadata.json``. Memory is bounded by the read-ahead window, not by
+    the size of the tree.
+
+    Args:
+        project_root: Base directory; archive paths are relative to it
+        roots: Files or directories (relative) to include
+        excludes: Patterns to skip (see backupstore.exclude_matcher())
+        output: Archive file to create (written via a temp file)
+        metadata: Fields for metadata.json
+        compression: "zstd" (falls back to gzip when unavailable) or "gzip"
+        level: Compression level
+        workers: Read/hash threads for small files
+        progress: Called with (files written, bytes written) as files are added
+    """
+    started = time.perf_counter()
+    report = ArchiveReport(path=output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    temp = output.with_name(output.name + ".tmp")
+    workers = workers or min(16, (os.cpu_count() or 1) * 2)
+
+    # Checksums grow with the number of files, so they are spooled to disk
+    checksums = tempfile.SpooledTemporaryFile(max_size=1024 * 1024, mode="w+b")
+
+    try:
+        with open(temp, "wb") as raw:
+            compressed = _open_compressor(raw, compression, level)
+            with tarfile.open(
+                fileobj=compressed, mode="w|", copybufsize=STREAM_BLOCK
+            ) as tar:
+                pending: Deque[Tuple[str, os.stat_result, Optional[Future]]] = deque()
+                with ThreadPoolExecutor(max_workers=workers) as pool:
+                    for relative, stat in walk_files(project_root, roots, excludes):
+                        future = None
+                        if stat.st_size <= READ_AHEAD_FILE:
+                            future = pool.submit(_read_small, project_root / relative)
+                        pending.append((relative, stat, future))
+                        while len(pending) >= READ_AHEAD_WINDOW:
+                            _add_file(
+                                tar, project_root, pending.popleft(), checksums, report
+                            )
+                            if progress:
+                                progress(report.files, report.bytes_in)
+                    while pending:
+                        _add_file(
+                            tar, project_root, pending.popleft(), checksums, report
+                        )
+                        if progress:
+                            progress(report.files, report.bytes_in)
+
+                checksums.seek(0, os.SEEK_END)
+                info = tarfile.TarInfo(CHECKSUMS_NAME)
+                info.size = checksums.tell()
+                info.mtime = int(time.time())
+                checksums.seek(0)
+                tar.addfile(info, checksums)
+
+                meta = {
+                    "created_at": datetime.now()
+                    .astimezone()
+                    .isoformat(timespec="seconds"),
+                    "file_count": report.files,
+                    "size_bytes": report.bytes_in,
+                    "roots": roots,
+                    "compression": (
+                        "zstd" if archive_suffix(compression) == ".tar.zst" else "gzip"
+                    ),
+                    **(metadata or {}),
+                }
+                data = json.dumps(meta, indent=2).encode("utf-8")
+                info = tarfile.TarInfo(METADATA_NAME)
+                info.size = len(data)
+                info.mtime = int(time.time())
+                tar.addfile(info, io.BytesIO(data))
+            compressed.close()
+        os.replace(temp, output)
+    except BaseException:
+        try:
+            temp.unlink()
+        except OSError:
+            pass
+        raise
+    finally:
+        checksums.close()
+
+    report.bytes_out = output.stat().st_size
+    report.elapsed = time.perf_counter() - started
+    return report
+
+
+def _add_file(
+    tar: tarfile.TarFile,
+    project_root: Path,
+    item: Tuple[str, os.stat_result, Optional[Future]],
+    checksums: BinaryIO,
+    report: ArchiveReport,
+):
+    """Append one walked file to the archive and its checksum to the list."""
+    relative, stat, future = item
+    info = tarfile.TarInfo(relative)
+    info.mtime = int(stat.st_mtime)
+    info.mode = 0o644
+
+    try:
+        if future is not None:
+            data, digest = future.result()
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+        else:
+            with open(project_root / relative, "rb") as f:
+                info.size = stat.st_size
+                reader = _HashingReader(f, stat.st_size)
+                tar.addfile(info, reader)
+                digest = reader.hasher.hexdigest()
+                if reader.changed:
+                    report.errors.append(f"{relative}: changed while being archived")
+    except OSError as e:
+        report.errors.append(f"{relative}: {e}")
+        return
+
+    checksums.write(f"{digest}  {relative}\n".encode("utf-8"))
+    report.files += 1
+    report.bytes_in += info.size
+
+
+def synthetic_tree(root: Path, files: int = 3000, seed: int = 1) -> int:
+    """Generate an ``apps/`` tree resembling the real ones, for benchmarks.
+
+    Mostly small, compressible source files with a long tail of larger ones
+    and a few incompressible build assets. Returns the total bytes written.
+    """
+    rng = random.Random(seed)
+    words = [
+        b"function",
+        b"return",
+        b"$this->",
+        b"public",
+        b"class",
+        b"const",
+        b"import",
+        b"export",
+        b"=>",
+        b"{",
+        b"}",
+        b"\n",
+        b"    ",
+        b"await",
+    ]
+    total = 0
+    apps = ["woosoo-nexus", "tablet-ordering-pwa", "relay-device-v2"]
+    for index in range(files):
+        app = apps[index % len(apps)]
+        directory = root / "apps" / app / "src" / f"module{index % 40}"
+        directory.mkdir(parents=True, exist_ok=True)
+        size = min(int(rng.paretovariate(1.2) * 2000), 4 * 1024 * 1024)
+        data = b" ".join(rng.choice(words) for _ in range(size // 6))
+        (directory / f"file{index}.php").write_bytes(data)
+        total += len(data)
+    for app in apps:
+        assets = root / "apps" / app / "public" / "build"
+        assets.mkdir(parents=True, exist_ok=True)
+        data = rng.randbytes(8 * 1024 * 1024)
+        (assets / "app.bundle.wasm").write_bytes(data)
+        total += len(data)
+    return total
@@ -0,0 +1,188 @@
+"""SQLite index of backup snapshots and the chunks they reference."""
+
+import json
+import sqlite3
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Iterable, List, Optional, Set
+
+CATALOG_VERSION = 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    key INTEGER PRIMARY KEY,
+    id TEXT NOT NULL UNIQUE,
+    created_at TEXT NOT NULL,
+    created_ts REAL NOT NULL,
+    description TEXT NOT NULL DEFAULT '',
+    file_count INTEGER NOT NULL DEFAULT 0,
+    size_bytes INTEGER NOT NULL DEFAULT 0,
+    stored_bytes INTEGER NOT NULL DEFAULT 0,
+    database_bytes INTEGER NOT NULL DEFAULT 0,
+    includes TEXT NOT NULL DEFAULT '{}'
+);
+CREATE INDEX IF NOT EXISTS snapshots_created ON snapshots (created_ts);
+CREATE TABLE IF NOT EXISTS chunk_refs (
+    snapshot INTEGER NOT NULL REFERENCES snapshots (key) ON DELETE CASCADE,
+    digest BLOB NOT NULL,
+    PRIMARY KEY (snapshot, digest)
+) WITHOUT ROWID;
+"""
+
+
+def created_timestamp(created_at: str) -> float:
+    """POSIX time of an ISO ``created_at`` (naive values are local time).
+
+    The ISO strings carry the UTC offset in effect when each snapshot was
+    taken, so they do not sort or compare as text across a DST change or
+    a time zone move; the catalog orders and filters on this instead.
+    """
+    try:
+        return datetime.fromisoformat(created_at).timestamp()
+    except ValueError:
+        return 0.0
+
+
+@dataclass
+class CatalogEntry:
+    """A snapshot as recorded in the catalog."""
+
+    snapshot_id: str
+    created_at: str
+    description: str = ""
+    file_count: int = 0
+    size_bytes: int = 0
+    stored_bytes: int = 0
+    database_bytes: int = 0
+    includes: dict = field(default_factory=dict)
+
+
+class BackupCatalog:
+    """Index of snapshots (``catalog.db`` under the backup directory).
+
+    Listing backups is one indexed query instead of reading every
+    snapshot's metadata.json, and the set of referenced chunks needed for
+    garbage collection comes from the ``chunk_refs`` table instead of every
+    manifest. The snapshot directories stay the source of truth: the
+    catalog can always be rebuilt from them.
+    """
+
+    def __init__(self, path: Path):
+        """Initialize catalog.
+
+        Args:
+            path: SQLite database file (created if missing)
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            db = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA foreign_keys=ON")
+            db.executescript(SCHEMA)
+            db.execute(f"PRAGMA user_version={CATALOG_VERSION}")
+            self._db = db
+        return self._db
+
+    def close(self):
+        """Close the database connection."""
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def add(self, metadata: dict, digests: Iterable[str]):
+        """Record a snapshot from its metadata.json and its chunk digests."""
+        with self._lock:
+            db = self._connect()
+            with db:
+                db.execute(
+                    "DELETE FROM snapshots WHERE id = ?", (metadata["backup_id"],)
+                )
+                cursor = db.execute(
+                    "INSERT INTO snapshots (id, created_at, created_ts, description,"
+                    " file_count, size_bytes, stored_bytes, database_bytes, includes)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        metadata["backup_id"],
+                        metadata.get("created_at", ""),
+                        created_timestamp(metadata.get("created_at", "")),
+                        metadata.get("description", ""),
+                        metadata.get("file_count", 0),
+                        metadata.get("size_bytes", 0),
+                        metadata.get("stored_bytes", 0)
+                        + metadata.get("database_stored_bytes", 0),
+                        metadata.get("database_bytes", 0),
+                        json.dumps(metadata.get("includes", {})),
+                    ),
+                )
+                key = cursor.lastrowid
+                db.executemany(
+                    "INSERT OR IGNORE INTO chunk_refs (snapshot, digest) VALUES (?, ?)",
+                    ((key, bytes.fromhex(digest)) for digest in digests),
+                )
+
+    def remove(self, snapshot_id: str):
+        """Forget a snapshot and its chunk references."""
+        with self._lock:
+            db = self._connect()
+            with db:
+                db.execute("DELETE FROM snapshots WHERE id = ?", (snapshot_id,))
+
+    def clear(self):
+        """Forget every snapshot (before a rebuild)."""
+        with self._lock:
+            db = self._connect()
+            with db:
+                db.execute("DELETE FROM snapshots")
+
+    def entries(
+        self, limit: Optional[int] = None, before: Optional[float] = None
+    ) -> List[CatalogEntry]:
+        """Snapshots, newest first.
+
+        Args:
+            limit: At most this many
+            before: Only snapshots created before this POSIX time
+        """
+        query = (
+            "SELECT id, created_at, description, file_count, size_bytes,"
+            " stored_bytes, database_bytes, includes FROM snapshots"
+        )
+        params: list = []
+        if before is not None:
+            query += " WHERE created_ts < ?"
+            params.append(before)
+        query += " ORDER BY created_ts DESC, id DESC"
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+        with self._lock:
+            rows = self._connect().execute(query, params).fetchall()
+        return [
+            CatalogEntry(*row[:7], includes=json.loads(row[7] or "{}")) for row in rows
+        ]
+
+    def count(self) -> int:
+        """Number of snapshots."""
+        with self._lock:
+            return (
+                self._connect().execute("SELECT COUNT(*) FROM snapshots").fetchone()[0]
+            )
+
+    def referenced_chunks(self, excluding: Iterable[str] = ()) -> Set[str]:
+        """Digests referenced by any snapshot (other than those excluded)."""
+        excluding = list(excluding)
+        marks = ",".join("?" * len(excluding))
+        query = (
+            "SELECT DISTINCT digest FROM chunk_refs WHERE snapshot NOT IN"
+            f" (SELECT key FROM snapshots WHERE id IN ({marks}))"
+        )
+        with self._lock:
+            rows = self._connect().execute(query, excluding)
+            return {digest.hex() for (digest,) in rows}
@@ -0,0 +1,291 @@
+"""Streaming MySQL dumps into (and restores out of) the backup store."""
+
+import hashlib
+import os
+import subprocess
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Tuple
+
+try:
+    from .backupstore import CHUNK_SIZE, ChunkStore, FileEntry
+except ImportError:
+    from backupstore import CHUNK_SIZE, ChunkStore, FileEntry
+
+# Consistent InnoDB snapshot without locking, rows streamed rather than buffered
+DUMP_OPTIONS = [
+    "--single-transaction",
+    "--quick",
+    "--routines",
+    "--triggers",
+    "--events",
+    "--hex-blob",
+    "--default-character-set=utf8mb4",
+]
+
+# Chunks of one dump being compressed and stored at once; memory per dump
+# stays around this many chunks
+STORE_AHEAD = 4
+
+# Keep this much of a tool's stderr for error messages
+STDERR_TAIL = 4096
+
+ProgressCallback = Callable[[str, int], None]
+
+
+@dataclass
+class DatabaseTarget:
+    """A database and the credentials to reach it."""
+
+    name: str
+    username: str
+    password: str = ""
+    host: str = "127.0.0.1"
+    port: int = 3306
+
+
+@dataclass
+class DatabaseResult:
+    """Outcome of dumping or restoring one database."""
+
+    database: str
+    entry: Optional[FileEntry] = None  # Dump: chunks of the SQL stream
+    bytes: int = 0  # Uncompressed SQL
+    new_chunks: int = 0
+    stored_bytes: int = 0
+    elapsed: float = 0.0
+    error: Optional[str] = None
+
+    @property
+    def mb_per_second(self) -> float:
+        """Uncompressed throughput."""
+        return self.bytes / 1024**2 / self.elapsed if self.elapsed else 0.0
+
+
+def database_targets(config) -> List[DatabaseTarget]:
+    """The app and POS databases of a DeploymentConfig."""
+    targets = [
+        DatabaseTarget(config.db_name, config.db_username, config.db_password),
+        DatabaseTarget(
+            config.db_pos_name, config.db_pos_username, config.db_pos_password
+        ),
+    ]
+    for target in targets:
+        target.port = config.mysql_port
+    return [target for target in targets if target.name]
+
+
+def _connection_args(target: DatabaseTarget) -> List[str]:
+    return [
+        f"--host={target.host}",
+        f"--port={target.port}",
+        f"--user={target.username}",
+    ]
+
+
+def _environment(target: DatabaseTarget) -> dict:
+    """Process environment passing the password without exposing it in argv."""
+    env = dict(os.environ)
+    env["MYSQL_PWD"] = target.password
+    return env
+
+
+def _drain(stream, tail: deque):
+    """Read a pipe to EOF (so the tool never blocks on it), keeping the end."""
+    for block in iter(lambda: stream.read(1024), b""):
+        tail.append(block)
+
+
+def _stderr_text(tail: deque) -> str:
+    return b"".join(tail)[-STDERR_TAIL:].decode("utf-8", "replace").strip()
+
+
+def dump_database(
+    chunks: ChunkStore,
+    tool: str,
+    target: DatabaseTarget,
+    progress: Optional[ProgressCallback] = None,
+) -> DatabaseResult:
+    """Stream ``mysqldump`` output into the chunk store.
+
+    The dump is read from the pipe one chunk at a time, hashed, compressed
+    and stored; nothing uncompressed touches the disk and memory stays at a
+    few chunks however large the database is.
+
+    Args:
+        chunks: Store receiving the dump's chunks
+        tool: mysqldump executable
+        target: Database to dump
+        progress: Called with (database, bytes read so far)
+    """
+    started = time.perf_counter()
+    result = DatabaseResult(target.name)
+    command = [tool, *_connection_args(target), *DUMP_OPTIONS, target.name]
+    try:
+        process = subprocess.Popen(
+            command,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            env=_environment(target),
+        )
+    except OSError as e:
+        result.error = f"Cannot run {tool}: {e}"
+        return result
+
+    tail: deque = deque(maxlen=STDERR_TAIL // 1024 + 1)
+    stderr_reader = threading.Thread(target=_drain, args=(process.stderr, tail))
+    stderr_reader.start()
+
+    file_hash = hashlib.sha256()
+    digests = []
+    in_flight: deque = deque()
+
+    def collect(future):
+        written = future.result()
+        if written:
+            result.new_chunks += 1
+            result.stored_bytes += written
+
+    # Chunks are compressed and stored on the pool while the next one is
+    # read, so the dump never waits on compression
+    try:
+        with process.stdout, ThreadPoolExecutor(max_workers=STORE_AHEAD) as pool:
+            while True:
+                data = process.stdout.read(CHUNK_SIZE)
+                if not data:
+                    break
+                file_hash.update(data)
+                digest = hashlib.sha256(data).hexdigest()
+                digests.append(digest)
+                in_flight.append(pool.submit(chunks.put, digest, data))
+                while len(in_flight) >= STORE_AHEAD:
+                    collect(in_flight.popleft())
+                result.bytes += len(data)
+                if progress:
+                    progress(target.name, result.bytes)
+            while in_flight:
+                collect(in_flight.popleft())
+    except OSError as e:
+        process.kill()
+        result.error = f"Storing dump: {e}"
+
+    code = process.wait()
+    stderr_reader.join()
+    result.elapsed = time.perf_counter() - started
+    if result.error:
+        return result
+    if code != 0:
+        result.error = f"{tool} exited with {code}: {_stderr_text(tail)}"
+        return result
+
+    result.entry = FileEntry(
+        target.name, result.bytes, time.time_ns(), file_hash.hexdigest(), digests
+    )
+    return result
+
+
+def restore_database(
+    chunks: ChunkStore,
+    tool: str,
+    target: DatabaseTarget,
+    entry: FileEntry,
+    progress: Optional[ProgressCallback] = None,
+) -> DatabaseResult:
+    """Stream a stored dump into the ``mysql`` client.
+
+    Chunks are decompressed and verified one at a time and written to the
+    client's stdin. ``mysql`` runs each statement as it arrives, so a bad
+    chunk, though it kills the client, leaves the statements before it
+    applied: the database is partially restored. Check the chunks with
+    backuprestore.verify_chunks() before calling this, as ``backup
+    restore`` and the deploy rollback do.
+    """
+    started = time.perf_counter()
+    result = DatabaseResult(target.name)
+    command = [tool, *_connection_args(target), target.name]
+    try:
+        process = subprocess.Popen(
+            command,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            env=_environment(target),
+        )
+    except OSError as e:
+        result.error = f"Cannot run {tool}: {e}"
+        return result
+
+    tail: deque = deque(maxlen=STDERR_TAIL // 1024 + 1)
+    stderr_reader = threading.Thread(target=_drain, args=(process.stderr, tail))
+    stderr_reader.start()
+
+    file_hash = hashlib.sha256()
+    try:
+        for digest in entry.chunks:
+            data = chunks.get(digest, verify=True)
+            file_hash.update(data)
+            process.stdin.write(data)
+            result.bytes += len(data)
+            if progress:
+                progress(target.name, result.bytes)
+    except BrokenPipeError:
+        pass  # The client gave up; its exit code and stderr say why
+    except (OSError, ValueError, RuntimeError) as e:
+        # Kill before closing stdin so the client does not run the statement
+        # cut off by the bad chunk (earlier ones have already run)
+        process.kill()
+        result.error = f"Reading dump: {e}"
+    finally:
+        try:
+            process.stdin.close()
+        except OSError:
+            pass
+
+    code = process.wait()
+    stderr_reader.join()
+    result.elapsed = time.perf_counter() - started
+    if result.error:
+        return result
+    if code != 0:
+        result.error = f"{tool} exited with {code}: {_stderr_text(tail)}"
+    elif file_hash.hexdigest() != entry.sha256:
+        result.error = "Dump does not match its recorded SHA-256"
+    return result
+
+
+def dump_databases(
+    chunks: ChunkStore,
+    tool: str,
+    targets: List[DatabaseTarget],
+    progress: Optional[ProgressCallback] = None,
+) -> List[DatabaseResult]:
+    """Dump several databases concurrently (see dump_database())."""
+    if not targets:
+        return []
+    with ThreadPoolExecutor(max_workers=len(targets)) as pool:
+        return list(
+            pool.map(
+                lambda target: dump_database(chunks, tool, target, progress), targets
+            )
+        )
+
+
+def restore_databases(
+    chunks: ChunkStore,
+    tool: str,
+    pairs: List[Tuple[DatabaseTarget, FileEntry]],
+    progress: Optional[ProgressCallback] = None,
+) -> List[DatabaseResult]:
+    """Restore several (target, entry) pairs concurrently (see restore_database())."""
+    if not pairs:
+        return []
+    with ThreadPoolExecutor(max_workers=len(pairs)) as pool:
+        return list(
+            pool.map(
+                lambda pair: restore_database(chunks, tool, pair[0], pair[1], progress),
+                pairs,
+            )
+        )
@@ -0,0 +1,300 @@
+"""Verified, incremental restore of backup snapshots."""
+
+import fnmatch
+import hashlib
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+try:
+    from .backupstore import BackupStore, FileEntry, read_manifest, walk_files
+except ImportError:
+    from backupstore import BackupStore, FileEntry, read_manifest, walk_files
+
+# Restores should finish well inside this (seconds); reported against
+RESTORE_TARGET_SECONDS = 120
+
+HASH_BLOCK = 1024 * 1024
+
+# Live-only files under these directories or with these names are user data
+# (uploads, secrets) and are never deleted by a restore
+PROTECTED_DIRS = ("storage",)
+PROTECTED_NAMES = (".env*",)
+
+
+def is_protected(path: str) -> bool:
+    """Whether a live-only path is user data a restore must keep."""
+    parts = path.split("/")
+    return any(part in PROTECTED_DIRS for part in parts[:-1]) or any(
+        fnmatch.fnmatch(parts[-1], pattern) for pattern in PROTECTED_NAMES
+    )
+
+
+@dataclass
+class RestorePlan:
+    """Differences between a snapshot and the live tree."""
+
+    snapshot_id: str
+    create: List[FileEntry] = field(default_factory=list)  # Missing live
+    update: List[FileEntry] = field(default_factory=list)  # Content differs
+    touch: List[FileEntry] = field(default_factory=list)  # Same content, other mtime
+    delete: List[str] = field(default_factory=list)  # Live only, to remove
+    kept: List[str] = field(default_factory=list)  # Live only, left in place
+    unchanged: int = 0
+    hashed: int = 0  # Live files read to decide
+    elapsed: float = 0.0
+
+    @property
+    def writes(self) -> List[FileEntry]:
+        """Files whose content must be written."""
+        return self.create + self.update
+
+    @property
+    def changed_paths(self) -> List[str]:
+        """Every path whose content changes (written or deleted)."""
+        return [entry.path for entry in self.writes] + self.delete
+
+    @property
+    def restore_bytes(self) -> int:
+        """Bytes to be written."""
+        return sum(entry.size for entry in self.writes)
+
+
+@dataclass
+class RestoreReport:
+    """Result of applying a plan."""
+
+    written: int = 0
+    written_bytes: int = 0
+    touched: int = 0
+    deleted: int = 0
+    elapsed: float = 0.0
+    errors: List[str] = field(default_factory=list)
+
+
+def _hash_file(path: Path) -> str:
+    """SHA-256 of a file."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def plan_restore(
+    store: BackupStore,
+    snapshot_id: str,
+    project_root: Path,
+    excludes: List[str],
+    workers: Optional[int] = None,
+    delete: bool = False,
+) -> RestorePlan:
+    """Compare a snapshot with the live tree.
+
+    A live file with the snapshot's size and mtime is taken as unchanged
+    without being read; one with the same size but another mtime is hashed
+    (in parallel) to tell a real change from a touch. Files under the
+    snapshot's roots that it does not contain are kept, or with ``delete``
+    planned for deletion unless protected (see is_protected()); excluded
+    paths are never considered.
+
+    Args:
+        store: Backup store holding the snapshot
+        snapshot_id: Snapshot to restore
+        project_root: Live tree
+        excludes: Patterns to skip if the manifest does not record its own
+        workers: Hashing threads (default: the store's)
+        delete: Remove unprotected files the snapshot does not contain
+    """
+    started = time.perf_counter()
+    plan = RestorePlan(snapshot_id)
+    header, entries = read_manifest(store.manifest_path(snapshot_id))
+
+    # The snapshot's own excludes: anything it skipped must not be deleted
+    excludes = header.get("excludes", excludes)
+    live = dict(walk_files(project_root, header.get("roots", []), excludes))
+    to_hash: List[FileEntry] = []
+    for entry in entries:
+        stat = live.pop(entry.path, None)
+        if stat is None:
+            plan.create.append(entry)
+        elif stat.st_size != entry.size:
+            plan.update.append(entry)
+        elif stat.st_mtime_ns == entry.mtime_ns:
+            plan.unchanged += 1
+        else:
+            to_hash.append(entry)
+    for path in sorted(live):
+        if delete and not is_protected(path):
+            plan.delete.append(path)
+        else:
+            plan.kept.append(path)
+
+    def differs(entry: FileEntry) -> bool:
+        try:
+            return _hash_file(project_root / entry.path) != entry.sha256
+        except OSError:
+            return True
+
+    with ThreadPoolExecutor(max_workers=workers or store.workers) as pool:
+        for entry, changed in zip(to_hash, pool.map(differs, to_hash)):
+            (plan.update if changed else plan.touch).append(entry)
+    plan.hashed = len(to_hash)
+
+    plan.elapsed = time.perf_counter() - started
+    return plan
+
+
+def verify_chunks(
+    store: BackupStore,
+    entries: Iterable[FileEntry],
+    workers: Optional[int] = None,
+    progress: Optional[Callable[[int, int], None]] = None,
+) -> List[str]:
+    """Check that every chunk of the entries exists and matches its hash.
+
+    Each distinct chunk is read once, in parallel. Returns error messages
+    (empty when the snapshot data is intact).
+    """
+    digests: Set[str] = set()
+    for entry in entries:
+        digests.update(entry.chunks)
+
+    lock = threading.Lock()
+    done = 0
+
+    def check(digest: str) -> Optional[str]:
+        nonlocal done
+        try:
+            store.chunks.get(digest, verify=True)
+            error = None
+        except FileNotFoundError:
+            error = f"Chunk {digest[:12]} is missing"
+        except Exception as e:
+            error = str(e)
+        with lock:
+            done += 1
+            if progress:
+                progress(done, len(digests))
+        return error
+
+    with ThreadPoolExecutor(max_workers=workers or store.workers) as pool:
+        return [error for error in pool.map(check, sorted(digests)) if error]
+
+
+def services_for(
+    paths: Iterable[str], service_paths: Dict[str, List[str]]
+) -> List[str]:
+    """Services owning any of the changed paths.
+
+    Args:
+        paths: Changed paths, relative with forward slashes
+        service_paths: Service key -> relative directories or files it runs from
+    """
+    prefixes = {
+        key: [p.replace("\\", "/").strip("/") for p in owned]
+        for key, owned in service_paths.items()
+    }
+    affected = []
+    for key, owned in prefixes.items():
+        if any(
+            path == prefix or path.startswith(prefix + "/")
+            for path in paths
+            for prefix in owned
+        ):
+            affected.append(key)
+    return affected
+
+
+def apply_restore(
+    store: BackupStore,
+    plan: RestorePlan,
+    project_root: Path,
+    workers: Optional[int] = None,
+    progress: Optional[Callable[[int, int], None]] = None,
+) -> RestoreReport:
+    """Make the live tree match the snapshot.
+
+    Each file is assembled from its chunks into a temporary file next to
+    the target, checked against the snapshot's SHA-256, given the
+    snapshot's mtime and renamed over the target, so a file is never seen
+    half-written. Services using the files should be stopped first.
+    """
+    started = time.perf_counter()
+    report = RestoreReport()
+    lock = threading.Lock()
+    total = len(plan.writes)
+    done = 0
+
+    def write(entry: FileEntry) -> Optional[str]:
+        nonlocal done
+        target = project_root / entry.path
+        temp = target.with_name(f".{target.name}.restore-{threading.get_ident()}")
+        try:
+            target.parent.mkdir(parents=True, exist_ok=True)
+            digest = hashlib.sha256()
+            with open(temp, "wb") as f:
+                for chunk in entry.chunks:
+                    # Chunks were verified up front; the file hash covers the rest
+                    data = store.chunks.get(chunk)
+                    digest.update(data)
+                    f.write(data)
+            if digest.hexdigest() != entry.sha256:
+                raise ValueError("restored content does not match snapshot hash")
+            os.utime(temp, ns=(entry.mtime_ns, entry.mtime_ns))
+            os.replace(temp, target)
+            error = None
+        except (OSError, ValueError, RuntimeError) as e:
+            error = f"{entry.path}: {e}"
+            try:
+                temp.unlink()
+            except OSError:
+                pass
+        with lock:
+            done += 1
+            if progress:
+                progress(done, total)
+        return error
+
+    with ThreadPoolExecutor(max_workers=workers or store.workers) as pool:
+        for entry, error in zip(plan.writes, pool.map(write, plan.writes)):
+            if error:
+                report.errors.append(error)
+            else:
+                report.written += 1
+                report.written_bytes += entry.size
+
+    for entry in plan.touch:
+        try:
+            os.utime(project_root / entry.path, ns=(entry.mtime_ns, entry.mtime_ns))
+            report.touched += 1
+        except OSError as e:
+            report.errors.append(f"{entry.path}: {e}")
+
+    emptied: Set[Path] = set()
+    for relative in plan.delete:
+        path = project_root / relative
+        try:
+            path.unlink()
+            report.deleted += 1
+            emptied.add(path.parent)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            report.errors.append(f"{relative}: {e}")
+
+    # Remove directories the deletions left empty, deepest first
+    for directory in sorted(emptied, key=lambda p: len(p.parts), reverse=True):
+        while directory != project_root and project_root in directory.parents:
+            try:
+                directory.rmdir()
+            except OSError:
+                break
+            directory = directory.parent
+
+    report.elapsed = time.perf_counter() - started
+    return report
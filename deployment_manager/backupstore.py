@@ -0,0 +1,591 @@
+"""Content-addressed, deduplicated backup snapshots."""
+
+import fnmatch
+import getpass
+import hashlib
+import json
+import os
+import re
+import shutil
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+try:
+    import zstandard
+except ImportError:  # Optional: chunks fall back to zlib
+    zstandard = None
+
+try:
+    from .backupcatalog import BackupCatalog, CatalogEntry
+except ImportError:
+    from backupcatalog import BackupCatalog, CatalogEntry
+
+MANIFEST_VERSION = 1
+
+# Files are split into fixed-size chunks; a chunk is stored once however
+# many files or snapshots contain it
+CHUNK_SIZE = 1024 * 1024
+
+# First byte of a stored chunk says how the rest is encoded
+CODEC_RAW = b"\x00"
+CODEC_ZLIB = b"\x01"
+CODEC_ZSTD = b"\x02"
+
+# Unreferenced chunks younger than this are kept by garbage collection, in
+# case a backup running at the same time is about to reference them
+GC_GRACE_SECONDS = 6 * 3600
+
+# Paths (relative to the project root) included in a snapshot when present
+DEFAULT_ROOTS = ["deployment.config.env", "configs", "shared"]
+
+# Never backed up: dependencies restored by the build, caches and our own data
+DEFAULT_EXCLUDES = [
+    ".git",
+    "node_modules",
+    "vendor",
+    ".dart_tool",
+    ".nuxt",
+    "storage/logs",
+    "storage/framework/cache",
+    "storage/framework/sessions",
+    "storage/framework/views",
+    "*.log",
+]
+
+
+def default_roots(config) -> List[str]:
+    """Snapshot roots for a DeploymentConfig (or None): configs plus the apps."""
+    roots = list(DEFAULT_ROOTS)
+    if config is not None:
+        roots += [config.backend_dir, config.pwa_dir, config.relay_dir]
+    else:
+        roots += ["apps"]
+    return roots
+
+
+@dataclass
+class FileEntry:
+    """A file in a snapshot."""
+
+    path: str  # Relative to the project root, forward slashes
+    size: int
+    mtime_ns: int
+    sha256: str
+    chunks: List[str] = field(default_factory=list)
+
+
+@dataclass
+class CleanupReport:
+    """Result of applying retention and collecting garbage."""
+
+    removed: List[str] = field(default_factory=list)  # Snapshot IDs
+    kept: int = 0
+    chunks_deleted: int = 0
+    bytes_freed: int = 0
+    elapsed: float = 0.0
+
+
+@dataclass
+class SnapshotReport:
+    """Result of creating a snapshot."""
+
+    snapshot_id: str = ""
+    files: int = 0
+    unchanged: int = 0
+    hashed: int = 0
+    total_bytes: int = 0
+    hashed_bytes: int = 0
+    new_chunks: int = 0
+    stored_bytes: int = 0
+    elapsed: float = 0.0
+    errors: List[str] = field(default_factory=list)
+
+
+class ChunkStore:
+    """Chunks stored by SHA-256 under ``<root>/<2 hex>/<digest>``."""
+
+    def __init__(self, root: Path, level: int = 3):
+        """Initialize chunk store.
+
+        Args:
+            root: Directory holding the chunks
+            level: Compression level (zstd when installed, else zlib)
+        """
+        self.root = root
+        self.level = level
+        self._local = threading.local()
+
+    def path_for(self, digest: str) -> Path:
+        """Where a chunk is (or would be) stored."""
+        return self.root / digest[:2] / digest
+
+    def has(self, digest: str) -> bool:
+        """Whether a chunk is already stored."""
+        return self.path_for(digest).exists()
+
+    def put(self, digest: str, data: bytes) -> int:
+        """Store a chunk unless present; return bytes written (0 if deduplicated).
+
+        A deduplicated chunk has its mtime refreshed: until the snapshot
+        reusing it is catalogued, only that keeps garbage collection (which
+        spares chunks younger than its grace period) from deleting it.
+        """
+        path = self.path_for(digest)
+        try:
+            os.utime(path)
+            return 0
+        except FileNotFoundError:
+            pass
+        encoded = self._encode(data)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp = path.with_name(f"{digest}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(temp, "wb") as f:
+            f.write(encoded)
+        os.replace(temp, path)
+        return len(encoded)
+
+    def get(self, digest: str, verify: bool = False) -> bytes:
+        """Read a chunk's original bytes."""
+        with open(self.path_for(digest), "rb") as f:
+            encoded = f.read()
+        data = self._decode(encoded)
+        if verify and hashlib.sha256(data).hexdigest() != digest:
+            raise ValueError(f"Chunk {digest[:12]} is corrupt")
+        return data
+
+    def _encode(self, data: bytes) -> bytes:
+        """Compress a chunk, keeping it raw if that does not help."""
+        if zstandard is not None:
+            compressor = getattr(self._local, "compressor", None)
+            if compressor is None:
+                # Compressor objects are not thread-safe; one per thread
+                compressor = self._local.compressor = zstandard.ZstdCompressor(
+                    level=self.level
+                )
+            encoded, codec = compressor.compress(data), CODEC_ZSTD
+        else:
+            encoded, codec = zlib.compress(data, self.level), CODEC_ZLIB
+        if len(encoded) >= len(data):
+            return CODEC_RAW + data
+        return codec + encoded
+
+    @staticmethod
+    def _decode(encoded: bytes) -> bytes:
+        """Inverse of _encode()."""
+        codec, payload = encoded[:1], encoded[1:]
+        if codec == CODEC_RAW:
+            return payload
+        if codec == CODEC_ZLIB:
+            return zlib.decompress(payload)
+        if codec == CODEC_ZSTD:
+            if zstandard is None:
+                raise RuntimeError(
+                    "Reading this backup requires the 'zstandard' package"
+                )
+            return zstandard.ZstdDecompressor().decompress(payload)
+        raise ValueError(f"Unknown chunk encoding {codec!r}")
+
+
+def write_manifest(path: Path, header: dict, entries: List[FileEntry]):
+    """Write a snapshot manifest (JSON lines: header, then one file per line)."""
+    temp = path.with_name(path.name + ".tmp")
+    with open(temp, "w", encoding="utf-8") as f:
+        f.write(json.dumps({"version": MANIFEST_VERSION, **header}) + "\n")
+        for entry in entries:
+            f.write(json.dumps(asdict(entry), separators=(",", ":")) + "\n")
+    os.replace(temp, path)
+
+
+def read_manifest(path: Path) -> Tuple[dict, Iterator[FileEntry]]:
+    """Read a manifest's header and (lazily) its file entries."""
+    f = open(path, "r", encoding="utf-8")
+    header = json.loads(f.readline())
+
+    def entries():
+        with f:
+            for line in f:
+                if line.strip():
+                    yield FileEntry(**json.loads(line))
+
+    return header, entries()
+
+
+def exclude_matcher(excludes: List[str]) -> Callable[[str, str], bool]:
+    """Predicate (relative path, name) -> excluded, for glob patterns.
+
+    Patterns without a slash match any file or directory name (``vendor``,
+    ``*.log``); patterns with one match the end of the relative path
+    (``storage/logs``). All patterns are compiled into two regexes.
+    """
+    names = [p for p in excludes if "/" not in p]
+    paths = [p.strip("/") for p in excludes if "/" in p]
+    name_re = re.compile("|".join(fnmatch.translate(p) for p in names) or "(?!)")
+    path_re = re.compile(
+        "|".join(r"(?:.*/)?" + fnmatch.translate(p) for p in paths) or "(?!)"
+    )
+    return lambda relative, name: bool(name_re.match(name) or path_re.match(relative))
+
+
+def walk_files(
+    project_root: Path, roots: List[str], excludes: List[str]
+) -> Iterator[Tuple[str, os.stat_result]]:
+    """(relative path, stat) of every file under the roots, skipping excludes.
+
+    Excluded directories are not descended into (see exclude_matcher()).
+    """
+
+    excluded = exclude_matcher(excludes)
+
+    for root in roots:
+        start = project_root / root
+        relative_root = Path(root).as_posix().strip("/")
+        if start.is_file():
+            yield relative_root, start.stat()
+            continue
+        if not start.is_dir():
+            continue
+
+        stack = [(start, relative_root)]
+        while stack:
+            directory, relative_dir = stack.pop()
+            try:
+                entries = sorted(os.scandir(directory), key=lambda e: e.name)
+            except OSError:
+                continue
+            for entry in entries:
+                relative = f"{relative_dir}/{entry.name}"
+                if excluded(relative, entry.name):
+                    continue
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append((Path(entry.path), relative))
+                elif entry.is_file(follow_symlinks=False):
+                    yield relative, entry.stat()
+
+
+class BackupStore:
+    """Snapshots of the project tree in a deduplicating chunk store.
+
+    Layout under ``backup_dir``::
+
+        chunks/ab/abcdef...            compressed chunk, named by SHA-256
+        snapshots/<id>/manifest.jsonl  files with size, mtime, hash and chunks
+        snapshots/<id>/metadata.json   when, why and what was backed up
+        snapshots/<id>/databases.jsonl database dumps (chunks), if included
+        catalog.db                     index of snapshots and referenced chunks
+
+    A file whose size and mtime match the previous snapshot is reused from
+    its manifest without being read, so snapshots of an unchanged tree only
+    cost a directory walk.
+    """
+
+    def __init__(self, backup_dir: Path, workers: Optional[int] = None):
+        """Initialize store.
+
+        Args:
+            backup_dir: Root of the backup store
+            workers: Hashing threads (default: 2 per CPU, at most 16)
+        """
+        self.backup_dir = backup_dir
+        self.chunks = ChunkStore(backup_dir / "chunks")
+        self.snapshots_dir = backup_dir / "snapshots"
+        self.workers = workers or min(16, (os.cpu_count() or 1) * 2)
+        self._catalog: Optional[BackupCatalog] = None
+
+    @property
+    def catalog(self) -> BackupCatalog:
+        """The snapshot index, rebuilt from the snapshots if it was lost."""
+        if self._catalog is None:
+            path = self.backup_dir / "catalog.db"
+            missing = not path.exists()
+            self._catalog = BackupCatalog(path)
+            if missing and self.snapshot_ids():
+                self.rebuild_catalog()
+        return self._catalog
+
+    def rebuild_catalog(self) -> int:
+        """Re-index every snapshot directory; returns the number indexed."""
+        catalog = self.catalog
+        catalog.clear()
+        ids = self.snapshot_ids()
+        for snapshot_id in ids:
+            catalog.add(self.metadata(snapshot_id), self._referenced(snapshot_id))
+        return len(ids)
+
+    def _referenced(self, snapshot_id: str) -> Set[str]:
+        """Chunk digests used by a snapshot's files and database dumps."""
+        digests: Set[str] = set()
+        for entry in self.entries(snapshot_id):
+            digests.update(entry.chunks)
+        for entry in self.database_entries(snapshot_id):
+            digests.update(entry.chunks)
+        return digests
+
+    def list_snapshots(self, limit: Optional[int] = None) -> List[CatalogEntry]:
+        """Snapshots from the catalog, newest first."""
+        return self.catalog.entries(limit)
+
+    def delete_snapshot(self, snapshot_id: str):
+        """Remove a snapshot (its chunks stay until garbage collection)."""
+        snapshot_dir = self.snapshots_dir / snapshot_id
+        # Manifest first: once it is gone the snapshot no longer counts, and
+        # its chunks stay referenced in the catalog until the row is removed
+        try:
+            self.manifest_path(snapshot_id).unlink()
+        except FileNotFoundError:
+            pass
+        shutil.rmtree(snapshot_dir, ignore_errors=True)
+        self.catalog.remove(snapshot_id)
+
+    def cleanup(
+        self,
+        older_than: datetime,
+        keep_minimum: int = 5,
+        dry_run: bool = False,
+        grace_seconds: int = GC_GRACE_SECONDS,
+    ) -> CleanupReport:
+        """Apply retention, then delete chunks no snapshot references.
+
+        Args:
+            older_than: Snapshots created before this are removed...
+            keep_minimum: ...except that the newest this many are always kept
+            dry_run: Report what would be removed without removing it
+            grace_seconds: Keep unreferenced chunks younger than this
+        """
+        started = time.perf_counter()
+        report = CleanupReport()
+        cutoff = older_than.timestamp()
+        keep = {e.snapshot_id for e in self.catalog.entries(limit=keep_minimum)}
+        for entry in self.catalog.entries(before=cutoff):
+            if entry.snapshot_id not in keep:
+                report.removed.append(entry.snapshot_id)
+        report.kept = self.catalog.count() - len(report.removed)
+
+        if not dry_run:
+            for snapshot_id in report.removed:
+                self.delete_snapshot(snapshot_id)
+
+        # On a dry run the removed snapshots are still catalogued; leave them out
+        referenced = self.catalog.referenced_chunks(excluding=report.removed)
+
+        horizon = time.time() - grace_seconds
+        for path in self.chunks.root.glob("*/*"):
+            name = path.name
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            if stat.st_mtime > horizon:
+                continue
+            # Leftover temp files from interrupted writes are garbage too
+            if name.endswith(".tmp") or name not in referenced:
+                if not dry_run:
+                    try:
+                        # A snapshot may have reused it since the stat above
+                        if path.stat().st_mtime > horizon:
+                            continue
+                        path.unlink()
+                    except OSError:
+                        continue
+                report.chunks_deleted += 1
+                report.bytes_freed += stat.st_size
+
+        report.elapsed = time.perf_counter() - started
+        return report
+
+    def snapshot_ids(self) -> List[str]:
+        """IDs of complete snapshots, oldest first."""
+        if not self.snapshots_dir.is_dir():
+            return []
+        return sorted(
+            p.name
+            for p in self.snapshots_dir.iterdir()
+            if (p / "manifest.jsonl").exists()
+        )
+
+    def manifest_path(self, snapshot_id: str) -> Path:
+        """Manifest file of a snapshot."""
+        return self.snapshots_dir / snapshot_id / "manifest.jsonl"
+
+    def metadata(self, snapshot_id: str) -> dict:
+        """metadata.json of a snapshot."""
+        path = self.snapshots_dir / snapshot_id / "metadata.json"
+        return json.loads(path.read_text(encoding="utf-8"))
+
+    def entries(self, snapshot_id: str) -> Iterator[FileEntry]:
+        """File entries of a snapshot."""
+        _, entries = read_manifest(self.manifest_path(snapshot_id))
+        return entries
+
+    def database_entries(self, snapshot_id: str) -> List[FileEntry]:
+        """Database dumps of a snapshot (path is the database name)."""
+        path = self.snapshots_dir / snapshot_id / "databases.jsonl"
+        if not path.exists():
+            return []
+        _, entries = read_manifest(path)
+        return list(entries)
+
+    def _new_id(self) -> str:
+        """Timestamped snapshot ID, unique within the store."""
+        base = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+        snapshot_id, n = base, 1
+        while (self.snapshots_dir / snapshot_id).exists():
+            n += 1
+            snapshot_id = f"{base}-{n}"
+        return snapshot_id
+
+    def create_snapshot(
+        self,
+        project_root: Path,
+        roots: List[str],
+        excludes: Optional[List[str]] = None,
+        description: str = "",
+        metadata: Optional[dict] = None,
+        progress: Optional[Callable[[int, int], None]] = None,
+        databases: Optional[List[FileEntry]] = None,
+    ) -> SnapshotReport:
+        """Snapshot the roots under project_root.
+
+        Args:
+            project_root: Base directory; manifest paths are relative to it
+            roots: Files or directories (relative) to include
+            excludes: Patterns to skip (default: DEFAULT_EXCLUDES)
+            description: Free-text reason for the snapshot
+            metadata: Extra fields for metadata.json (environment, version...)
+            progress: Called with (files done, files total) while hashing
+            databases: Dumps already streamed into the chunk store (see backupdb)
+        """
+        started = time.perf_counter()
+        report = SnapshotReport()
+        excludes = DEFAULT_EXCLUDES if excludes is None else excludes
+
+        previous: Dict[str, FileEntry] = {}
+        ids = self.snapshot_ids()
+        if ids:
+            previous = {entry.path: entry for entry in self.entries(ids[-1])}
+
+        entries: List[Optional[FileEntry]] = []
+        to_hash: List[Tuple[int, str, os.stat_result]] = []
+        for relative, stat in walk_files(project_root, roots, excludes):
+            report.files += 1
+            report.total_bytes += stat.st_size
+            old = previous.get(relative)
+            if old and old.size == stat.st_size and old.mtime_ns == stat.st_mtime_ns:
+                entries.append(old)
+                report.unchanged += 1
+            else:
+                to_hash.append((len(entries), relative, stat))
+                entries.append(None)
+
+        lock = threading.Lock()
+        done = 0
+
+        def hash_one(item):
+            nonlocal done
+            index, relative, stat = item
+            result = self._store_file(project_root / relative, relative, stat)
+            with lock:
+                done += 1
+                if progress:
+                    progress(done, len(to_hash))
+            return index, relative, result
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            for index, relative, (entry, new_chunks, stored, error) in pool.map(
+                hash_one, to_hash
+            ):
+                if error:
+                    report.errors.append(f"{relative}: {error}")
+                    continue
+                entries[index] = entry
+                report.hashed += 1
+                report.hashed_bytes += entry.size
+                report.new_chunks += new_chunks
+                report.stored_bytes += stored
+
+        files = [entry for entry in entries if entry is not None]
+        snapshot_id = self._new_id()
+        snapshot_dir = self.snapshots_dir / snapshot_id
+        snapshot_dir.mkdir(parents=True)
+        created_at = datetime.now().astimezone().isoformat(timespec="seconds")
+        header = {
+            "id": snapshot_id,
+            "created_at": created_at,
+            "roots": roots,
+            "excludes": excludes,
+        }
+        info = {
+            "backup_id": snapshot_id,
+            "created_at": created_at,
+            "description": description,
+            "includes": {"configs": True, "files": True, "database": bool(databases)},
+            "file_count": len(files),
+            "size_bytes": sum(entry.size for entry in files),
+            "stored_bytes": report.stored_bytes,
+            "creator": _current_user(),
+            **(metadata or {}),
+        }
+        if databases:
+            info["databases"] = [entry.path for entry in databases]
+            info["database_bytes"] = sum(entry.size for entry in databases)
+        # Metadata first: a snapshot only counts once its manifest exists
+        (snapshot_dir / "metadata.json").write_text(
+            json.dumps(info, indent=2), encoding="utf-8"
+        )
+        if databases:
+            write_manifest(snapshot_dir / "databases.jsonl", header, databases)
+        write_manifest(snapshot_dir / "manifest.jsonl", header, files)
+
+        digests: Set[str] = set()
+        for entry in files + (databases or []):
+            digests.update(entry.chunks)
+        self.catalog.add(info, digests)
+
+        report.snapshot_id = snapshot_id
+        report.elapsed = time.perf_counter() - started
+        return report
+
+    def _store_file(self, path: Path, relative: str, stat: os.stat_result):
+        """Chunk, hash and store one file.
+
+        Returns (entry, new chunks, bytes stored, error message or None).
+        """
+        file_hash = hashlib.sha256()
+        chunks = []
+        new_chunks = 0
+        stored = 0
+        size = 0
+        try:
+            with open(path, "rb") as f:
+                while True:
+                    data = f.read(CHUNK_SIZE)
+                    if not data:
+                        break
+                    size += len(data)
+                    file_hash.update(data)
+                    digest = hashlib.sha256(data).hexdigest()
+                    chunks.append(digest)
+                    written = self.chunks.put(digest, data)
+                    if written:
+                        new_chunks += 1
+                        stored += written
+        except OSError as e:
+            return None, 0, 0, str(e)
+
+        entry = FileEntry(
+            relative, size, stat.st_mtime_ns, file_hash.hexdigest(), chunks
+        )
+        return entry, new_chunks, stored, None
+
+
+def _current_user() -> str:
+    """Login name for metadata (empty if unavailable)."""
+    try:
+        return getpass.getuser()
+    except Exception:
+        return ""
@@ -0,0 +1,255 @@
+"""Build cache: skip dependency installs and builds whose inputs did not change."""
+
+import hashlib
+import os
+import shutil
+import subprocess
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional
+
+try:
+    from .backupstore import walk_files
+except ImportError:
+    from backupstore import walk_files
+
+# Cached directories kept per app and kind besides the one in use
+BUILD_CACHE_KEEP = 3
+
+# Written into a cached directory once it is complete; holds its key
+MARKER = ".build-cache-key"
+
+# Not part of a source tree: dependencies, build output and VCS data
+SOURCE_EXCLUDES = [
+    ".git",
+    "node_modules",
+    ".nuxt",
+    ".output",
+    "dist",
+    ".cache",
+    "*.log",
+]
+
+HASH_BLOCK = 1024 * 1024
+
+
+@dataclass
+class CacheResult:
+    """How one cached directory was brought up to date."""
+
+    app: str  # App directory, relative to the project root
+    kind: str  # "dependencies" or "build"
+    outcome: str  # "hit" (already current), "restored" (from cache) or "miss"
+    key: str
+    elapsed: float = 0.0
+
+    @property
+    def hit(self) -> bool:
+        """Whether the install or build was skipped."""
+        return self.outcome != "miss"
+
+
+def _hash_file(digest, path: Path):
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK), b""):
+            digest.update(block)
+
+
+def input_key(parts: Iterable[str], files: Iterable[Path]) -> str:
+    """SHA-256 over strings (commands, tool versions) and file contents.
+
+    Missing files count as such, so creating one changes the key.
+    """
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode("utf-8") + b"\0")
+    for path in files:
+        digest.update(path.name.encode("utf-8") + b"\0")
+        if path.is_file():
+            _hash_file(digest, path)
+        else:
+            digest.update(b"<missing>")
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def source_key(directory: Path, excludes: List[str] = SOURCE_EXCLUDES) -> str:
+    """SHA-256 over every source file's path and content under a directory."""
+    digest = hashlib.sha256()
+    files = sorted(walk_files(directory.parent, [directory.name], excludes))
+    for relative, _ in files:
+        digest.update(relative.encode("utf-8") + b"\0")
+        _hash_file(digest, directory.parent / relative)
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def read_marker(directory: Path) -> Optional[str]:
+    """Key a cached directory was built for, or None if unknown/incomplete."""
+    try:
+        return (directory / MARKER).read_text(encoding="utf-8").strip() or None
+    except OSError:
+        return None
+
+
+class BuildCache:
+    """Directories produced by installs and builds, kept by input key.
+
+    The directory in use (``vendor/``, ``node_modules/``, ``.output/``...)
+    carries a marker with the key it was built for. When the key still
+    matches, the install or build is skipped. When it changed, the current
+    directory is copied into the cache under its own key, and the new key's
+    directory is renamed in beside it and swapped into place if it was seen
+    before; only an unknown key runs the install or build, over the live
+    directory. The directory in use is never removed first, so nginx and PHP
+    keep serving it until the replacement is complete.
+
+    Layout under ``root``: ``<app>/<kind>/<key>/<directory name>``.
+    """
+
+    def __init__(self, root: Path, keep: int = BUILD_CACHE_KEEP):
+        """Initialize cache.
+
+        Args:
+            root: Cache directory; keep it on the same volume as the apps
+            keep: Cached directories kept per app and kind
+        """
+        self.root = root
+        self.keep = keep
+        self._versions: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def tool_version(self, tool: str) -> str:
+        """``tool --version`` output (run once per tool and process)."""
+        with self._lock:
+            if tool in self._versions:
+                return self._versions[tool]
+        executable = shutil.which(tool) or tool
+        try:
+            result = subprocess.run(
+                [executable, "--version"],
+                capture_output=True,
+                text=True,
+                encoding="utf-8",
+                errors="replace",
+                timeout=120,
+                stdin=subprocess.DEVNULL,
+            )
+            version = result.stdout.strip() or result.stderr.strip()
+        except (OSError, subprocess.TimeoutExpired):
+            version = "unavailable"
+        with self._lock:
+            self._versions[tool] = version
+        return version
+
+    def _slot(self, app: str, kind: str) -> Path:
+        return self.root / app.replace("\\", "/").strip("/").replace("/", "_") / kind
+
+    def ensure(
+        self,
+        app: str,
+        kind: str,
+        directory: Path,
+        key: str,
+        build: Callable[[], None],
+    ) -> CacheResult:
+        """Make ``directory`` the one built for ``key``, building only if unseen.
+
+        Args:
+            app: App directory (relative), naming the cache slot
+            kind: What the directory holds, e.g. "dependencies" or "build"
+            directory: Directory the install or build produces
+            key: Input key (see input_key() and source_key())
+            build: Runs the install or build; raises on failure
+
+        Returns:
+            The outcome; the marker is written only after ``build`` succeeds,
+            so a failed build is never taken for a cached one.
+        """
+        started = time.perf_counter()
+        slot = self._slot(app, kind)
+        current = read_marker(directory) if directory.is_dir() else None
+        if current == key:
+            return CacheResult(app, kind, "hit", key, time.perf_counter() - started)
+
+        if current is not None:
+            self._stash(slot, current, directory)
+
+        cached = slot / key / directory.name
+        outcome = "miss"
+        if read_marker(cached) == key:
+            try:
+                self._swap_in(cached, directory)
+                shutil.rmtree(slot / key, ignore_errors=True)
+                outcome = "restored"
+            except OSError:
+                pass  # Locked or half-moved: rebuild instead
+
+        if outcome == "miss":
+            # Until the build succeeds the directory matches no key: a failed
+            # install must not pass for the old key's complete directory
+            try:
+                (directory / MARKER).unlink()
+            except FileNotFoundError:
+                pass
+            build()
+            directory.mkdir(parents=True, exist_ok=True)
+            (directory / MARKER).write_text(key, encoding="utf-8")
+        self._prune(slot)
+        return CacheResult(app, kind, outcome, key, time.perf_counter() - started)
+
+    def _stash(self, slot: Path, key: str, directory: Path):
+        """Copy the directory in use into the cache under its key.
+
+        Copying rather than moving leaves it serving requests while the
+        install or build replaces it.
+        """
+        target = slot / key
+        try:
+            if target.exists():
+                shutil.rmtree(target)
+            target.mkdir(parents=True)
+            shutil.copytree(directory, target / directory.name, symlinks=True)
+        except (OSError, shutil.Error):
+            # A file in use (Windows) can fail the copy; a partial copy has
+            # no marker, but drop it rather than keep a broken entry
+            shutil.rmtree(target, ignore_errors=True)
+
+    def _swap_in(self, cached: Path, directory: Path):
+        """Replace ``directory`` with ``cached`` by two renames.
+
+        The cached copy is first moved next to ``directory`` (a rename on
+        the same volume), so the live directory is only absent between the
+        final two renames, not for the length of a move or delete.
+        """
+        staging = directory.with_name(f".{directory.name}.incoming")
+        retired = directory.with_name(f".{directory.name}.retired")
+        for leftover in (staging, retired):
+            if leftover.exists():
+                shutil.rmtree(leftover)
+        shutil.move(str(cached), str(staging))
+        if directory.exists():
+            os.replace(directory, retired)
+        try:
+            os.replace(staging, directory)
+        except OSError:
+            if retired.exists() and not directory.exists():
+                os.replace(retired, directory)
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+        shutil.rmtree(retired, ignore_errors=True)
+
+    def _prune(self, slot: Path):
+        """Drop all but the most recently stashed ``keep`` directories."""
+        try:
+            entries = sorted(
+                (p for p in slot.iterdir() if p.is_dir()),
+                key=lambda p: p.stat().st_mtime,
+                reverse=True,
+            )
+        except OSError:
+            return
+        for stale in entries[self.keep :]:
+            shutil.rmtree(stale, ignore_errors=True)
@@ -3,7 +3,7 @@
 import os
 import platform
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Dict, List, Optional
 from dataclasses import dataclass, field
 import re
 
@@ -44,6 +44,7 @@ class DeploymentConfig:
     app_name: str = "Woosoo"
     app_key: str = ""
     app_debug: bool = False
+    app_version: str = ""
     log_level: str = "error"
 
     # Application Paths (configurable - NEW in standalone version)
@@ -52,6 +53,36 @@ class DeploymentConfig:
     relay_dir: str = "apps/relay-device-v2"
     nginx_exe: str = "bin/nginx/nginx.exe"
     nginx_config: str = "configs/nginx.conf"
+    nginx_access_log: str = "logs/nginx/access.log"
+    nginx_log_format: str = ""  # Empty: accesslog.DEFAULT_LOG_FORMAT
+
+    # Service log rotation (NSSM) and retention of rotated segments
+    log_rotate_bytes: int = 50 * 1024 * 1024
+    log_rotate_seconds: int = 86400
+    log_retention_days: int = 30
+    log_retention_count: int = 30
+    log_retention_bytes: int = 1024 * 1024 * 1024
+    log_compression: str = "gzip"
+
+    # Backups: extra exclude patterns on top of backupstore.DEFAULT_EXCLUDES
+    backup_exclude: List[str] = field(default_factory=list)
+    mysqldump_path: str = "mysqldump"
+    mysql_path: str = "mysql"
+
+    # Blue/green releases of the backend (see releases.py)
+    releases_keep: int = 5
+
+    # Service readiness after start (see readiness.py); empty disables HTTP
+    health_check_path: str = "/up"
+    service_ready_timeout: int = 60
+
+    # Queue worker autoscaling (see queuemonitor.py)
+    queue_min_workers: int = 1
+    queue_max_workers: int = 3
+    queue_jobs_per_worker: int = 20
+    queue_max_wait: float = 30.0
+    queue_scale_up_cooldown: float = 60.0
+    queue_scale_down_cooldown: float = 300.0
 
     # Raw config for reference
     raw_config: Dict[str, str] = field(default_factory=dict)
@@ -70,11 +101,14 @@ class ManagerConfig:
     # Paths
     backup_dir: Path = None
     logs_dir: Path = None
+    cache_dir: Path = None
 
     # Tools
     node_path: str = "node"
     php_path: str = "php"
     composer_path: str = "composer"
+    npm_path: str = "npm"
+    pnpm_path: str = "pnpm"
     flutter_path: str = "flutter"
     mkcert_path: str = "bin\\mkcert\\mkcert.exe"
     nssm_path: str = None  # Will be auto-detected based on architecture
@@ -96,6 +130,9 @@ class ManagerConfig:
         if self.logs_dir is None:
             self.logs_dir = self.project_root / "logs"
 
+        if self.cache_dir is None:
+            self.cache_dir = self.project_root / "cache"
+
         # Auto-detect NSSM path based on architecture
         if self.nssm_path is None:
             arch = "win64" if platform.machine().endswith("64") else "win32"
@@ -174,6 +211,7 @@ class ConfigManager:
             app_name=raw_config.get("APP_NAME", "Woosoo"),
             app_key=raw_config.get("APP_KEY", ""),
             app_debug=(raw_config.get("APP_DEBUG", "false").lower() == "true"),
+            app_version=raw_config.get("APP_VERSION", ""),
             log_level=raw_config.get("LOG_LEVEL", "error"),
             # NEW: Application paths
             backend_dir=raw_config.get("BACKEND_DIR", "apps/woosoo-nexus"),
@@ -181,6 +219,39 @@ class ConfigManager:
             relay_dir=raw_config.get("RELAY_DIR", "apps/relay-device-v2"),
             nginx_exe=raw_config.get("NGINX_EXE", "bin/nginx/nginx.exe"),
             nginx_config=raw_config.get("NGINX_CONFIG", "configs/nginx.conf"),
+            nginx_access_log=raw_config.get(
+                "NGINX_ACCESS_LOG", "logs/nginx/access.log"
+            ),
+            nginx_log_format=raw_config.get("NGINX_LOG_FORMAT", ""),
+            # Log rotation
+            log_rotate_bytes=int(raw_config.get("LOG_ROTATE_BYTES", 50 * 1024 * 1024)),
+            log_rotate_seconds=int(raw_config.get("LOG_ROTATE_SECONDS", 86400)),
+            log_retention_days=int(raw_config.get("LOG_RETENTION_DAYS", 30)),
+            log_retention_count=int(raw_config.get("LOG_RETENTION_COUNT", 30)),
+            log_retention_bytes=int(
+                raw_config.get("LOG_RETENTION_BYTES", 1024 * 1024 * 1024)
+            ),
+            log_compression=raw_config.get("LOG_COMPRESSION", "gzip").lower(),
+            backup_exclude=[
+                p.strip()
+                for p in raw_config.get("BACKUP_EXCLUDE", "").split(",")
+                if p.strip()
+            ],
+            mysqldump_path=raw_config.get("MYSQLDUMP_PATH", "mysqldump"),
+            mysql_path=raw_config.get("MYSQL_PATH", "mysql"),
+            releases_keep=int(raw_config.get("RELEASES_KEEP", 5)),
+            health_check_path=raw_config.get("HEALTH_CHECK_PATH", "/up"),
+            service_ready_timeout=int(raw_config.get("SERVICE_READY_TIMEOUT", 60)),
+            queue_min_workers=int(raw_config.get("QUEUE_MIN_WORKERS", 1)),
+            queue_max_workers=int(raw_config.get("QUEUE_MAX_WORKERS", 3)),
+            queue_jobs_per_worker=int(raw_config.get("QUEUE_JOBS_PER_WORKER", 20)),
+            queue_max_wait=float(raw_config.get("QUEUE_MAX_WAIT", 30)),
+            queue_scale_up_cooldown=float(
+                raw_config.get("QUEUE_SCALE_UP_COOLDOWN", 60)
+            ),
+            queue_scale_down_cooldown=float(
+                raw_config.get("QUEUE_SCALE_DOWN_COOLDOWN", 300)
+            ),
             raw_config=raw_config,
         )
 
@@ -212,6 +283,9 @@ class ConfigManager:
             if not (1024 <= port_value <= 65535):
                 errors.append(f"{port_name} must be between 1024-65535")
 
+        if self.deployment_config.log_compression not in ("gzip", "zstd", "none"):
+            errors.append("LOG_COMPRESSION must be gzip, zstd or none")
+
         # IP validation
         import re
 
@@ -221,6 +295,36 @@ class ConfigManager:
 
         return (len(errors) == 0, errors)
 
+    def backend_env_values(self) -> Dict[str, str]:
+        """Laravel .env keys managed from deployment.config.env."""
+        if not self.deployment_config:
+            self.load_config()
+        config = self.deployment_config
+
+        values = {
+            "APP_NAME": config.app_name,
+            "APP_ENV": config.deployment_env,
+            "APP_DEBUG": "true" if config.app_debug else "false",
+            "LOG_LEVEL": config.log_level,
+            "DB_PORT": str(config.mysql_port),
+            "DB_DATABASE": config.db_name,
+            "DB_USERNAME": config.db_username,
+            "DB_PASSWORD": config.db_password,
+            "REVERB_HOST": config.server_ip,
+            "REVERB_PORT": str(config.reverb_port),
+            "REVERB_SCHEME": "https" if config.use_tls else "http",
+        }
+        # Only overwrite secrets that are actually set here
+        for key, value in [
+            ("APP_KEY", config.app_key),
+            ("REVERB_APP_ID", config.reverb_app_id),
+            ("REVERB_APP_KEY", config.reverb_app_key),
+            ("REVERB_APP_SECRET", config.reverb_app_secret),
+        ]:
+            if value:
+                values[key] = value
+        return values
+
     def get_config_summary(self) -> Dict[str, str]:
         """Get human-readable configuration summary."""
         if not self.deployment_config:
@@ -236,3 +340,46 @@ class ConfigManager:
             "Database": self.deployment_config.db_name,
             "Project Root": str(self.project_root),
         }
+
+
+def _env_value(value: str) -> str:
+    """Quote a .env value when dotenv would otherwise misread it."""
+    if value and not re.search(r"[\s#\"'=$\\]", value):
+        return value
+    if "'" not in value:
+        return f"'{value}'"  # Literal: no escapes or ${VAR} expansion
+    escaped = value.replace("\\", "\\\\").replace('"', '\\"').replace("$", "\\$")
+    return f'"{escaped}"'
+
+
+def sync_env_file(path: Path, values: Dict[str, str]) -> List[str]:
+    """Set keys in a .env file, keeping every other line as it is.
+
+    Existing keys are updated in place and missing ones appended. The file
+    is rewritten atomically, and only if something changed.
+
+    Returns:
+        Keys whose value changed
+    """
+    lines = path.read_text(encoding="utf-8").splitlines() if path.exists() else []
+    remaining = dict(values)
+    changed = []
+    output = []
+    for line in lines:
+        match = re.match(r"^\s*(?:export\s+)?([A-Za-z_][A-Za-z0-9_]*)\s*=", line)
+        key = match.group(1) if match else None
+        if key in remaining:
+            new_line = f"{key}={_env_value(remaining.pop(key))}"
+            if new_line != line:
+                changed.append(key)
+            line = new_line
+        output.append(line)
+    for key, value in remaining.items():
+        output.append(f"{key}={_env_value(value)}")
+        changed.append(key)
+
+    if changed:
+        temp = path.with_name(path.name + ".tmp")
+        temp.write_text("\n".join(output) + "\n", encoding="utf-8")
+        os.replace(temp, path)
+    return changed
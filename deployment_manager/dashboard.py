@@ -0,0 +1,330 @@
+"""Live auto-refreshing dashboard with a background sampler."""
+
+import socket
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from rich import box
+from rich.console import Console, Group
+from rich.live import Live
+from rich.table import Table
+from rich.text import Text
+
+import psutil
+
+try:
+    from .metrics import ProcessSampler
+    from .timeseries import MetricsStore
+except ImportError:
+    from metrics import ProcessSampler
+    from timeseries import MetricsStore
+
+# Window for the "recent errors" column
+ERROR_WINDOW_SECONDS = 300
+
+
+@dataclass(frozen=True)
+class ServiceRow:
+    """One immutable dashboard sample for a service.
+
+    Values are rounded to display precision so that equality means
+    "renders identically" and unchanged rows can be skipped.
+    """
+
+    key: str
+    name: str
+    state: str
+    cpu: Optional[float] = None
+    rss_mb: Optional[float] = None
+    port: Optional[int] = None
+    port_open: Optional[bool] = None
+    recent_errors: int = 0
+
+
+class ErrorCounter:
+    """Counts lines appended to a service error log over a sliding window.
+
+    Only bytes written since the previous sample are read, so the cost of a
+    sample is independent of the log size.
+    """
+
+    def __init__(self, path: Path, window: float = ERROR_WINDOW_SECONDS):
+        """Initialize counter positioned at the current end of the log."""
+        self.path = path
+        self.window = window
+        self._events: deque = deque()  # (timestamp, line count)
+        self._offset = self._size()
+
+    def _size(self) -> int:
+        """Current log size (0 if missing)."""
+        try:
+            return self.path.stat().st_size
+        except OSError:
+            return 0
+
+    def sample(self) -> int:
+        """Count new error lines and return the total inside the window."""
+        now = time.time()
+        size = self._size()
+        if size < self._offset:
+            self._offset = 0  # Rotated or truncated
+
+        if size > self._offset:
+            new_lines = 0
+            with open(self.path, "rb") as f:
+                f.seek(self._offset)
+                remaining = size - self._offset
+                while remaining > 0:
+                    chunk = f.read(min(remaining, 1024 * 1024))
+                    if not chunk:
+                        break
+                    new_lines += chunk.count(b"\n")
+                    remaining -= len(chunk)
+            self._offset = size
+            if new_lines:
+                self._events.append((now, new_lines))
+
+        while self._events and self._events[0][0] < now - self.window:
+            self._events.popleft()
+        return sum(count for _, count in self._events)
+
+
+class DashboardSampler:
+    """Samples service rows on a background thread.
+
+    The renderer only reads the latest snapshot, so slow sampling never
+    blocks the display and rendering never triggers extra sampling.
+    """
+
+    def __init__(
+        self,
+        service_manager,
+        ports: Dict[str, int],
+        logs_dir: Path,
+        interval: float = 2.0,
+        store: Optional[MetricsStore] = None,
+    ):
+        """Initialize sampler.
+
+        Args:
+            service_manager: ServiceManager providing status and PIDs
+            ports: Service key -> port to probe for that service
+            logs_dir: Directory containing per-service log folders
+            interval: Seconds between samples
+            store: Also record every sample here (see ``history_series``)
+        """
+        self.service_manager = service_manager
+        self.ports = ports
+        self.interval = interval
+        self.store = store
+        self.changed = threading.Event()
+
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._processes = ProcessSampler()
+        self._errors = {
+            key: ErrorCounter(logs_dir / key / "error.log")
+            for key in service_manager.SERVICES
+        }
+        self._rows: List[ServiceRow] = []
+        self.changed_at = 0.0
+        self.sample_duration = 0.0
+
+    def start(self):
+        """Take a first sample and start the background thread."""
+        self.sample()
+        self._thread = threading.Thread(
+            target=self._run, name="dashboard-sampler", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        """Stop the background thread."""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    def _run(self):
+        """Sampling loop."""
+        while not self._stop.wait(self.interval):
+            try:
+                self.sample()
+            except Exception:
+                pass  # Keep the last good snapshot on screen
+
+    def rows(self) -> List[ServiceRow]:
+        """Latest snapshot."""
+        with self._lock:
+            return list(self._rows)
+
+    def sample(self):
+        """Collect one snapshot of every service."""
+        started = time.perf_counter()
+        services = self.service_manager.SERVICES
+        statuses = self.service_manager.get_services_status(
+            [config["name"] for config in services.values()]
+        )
+
+        rows = []
+        values = {}
+        for key, config in services.items():
+            status = statuses[config["name"]]
+            pid = None
+            if status.value == "running":
+                pid = self.service_manager.get_service_pid(config["name"])
+            cpu, rss = self._processes.sample(pid)
+            port = self.ports.get(key)
+            latency = _port_latency(port) if port else None
+            values[f"{key}.cpu"] = cpu
+            values[f"{key}.rss_mb"] = rss / (1024**2) if rss is not None else None
+            values[f"{key}.port_ms"] = latency
+            if status.value == "not_installed" and (
+                self.service_manager.is_extra_worker(key)
+            ):
+                continue  # Extra queue workers show up once installed
+            rows.append(
+                ServiceRow(
+                    key=key,
+                    name=config["name"],
+                    state=status.value,
+                    cpu=round(cpu, 1) if cpu is not None else None,
+                    rss_mb=round(rss / (1024**2), 1) if rss is not None else None,
+                    port=port,
+                    port_open=latency is not None if port else None,
+                    recent_errors=self._errors[key].sample(),
+                )
+            )
+        self._processes.prune()
+        if self.store is not None:
+            values["host.cpu"] = psutil.cpu_percent(interval=None)
+            values["host.memory"] = psutil.virtual_memory().percent
+            self.store.record(values)
+
+        with self._lock:
+            if rows != self._rows:
+                self._rows = rows
+                self.changed_at = time.time()
+                self.changed.set()
+            self.sample_duration = time.perf_counter() - started
+
+
+def _port_latency(port: int, timeout: float = 0.25) -> Optional[float]:
+    """Milliseconds to connect to the local port; None if nothing accepts."""
+    started = time.perf_counter()
+    try:
+        with socket.create_connection(("127.0.0.1", port), timeout=timeout):
+            return (time.perf_counter() - started) * 1000
+    except OSError:
+        return None
+
+
+def history_series(service_keys, ports: Dict[str, int]) -> List[str]:
+    """Names of the series the sampler records.
+
+    Host CPU and memory percent, then per service CPU percent, RSS in MB and
+    (for services with a port) connect latency in ms.
+    """
+    series = ["host.cpu", "host.memory"]
+    for key in service_keys:
+        series += [f"{key}.cpu", f"{key}.rss_mb"]
+        if key in ports:
+            series.append(f"{key}.port_ms")
+    return series
+
+
+class DashboardRenderer:
+    """Builds the dashboard table, re-rendering only rows that changed."""
+
+    def __init__(self):
+        """Initialize renderer with an empty row cache."""
+        self._cache: Dict[str, tuple] = {}  # key -> (row, rendered cells)
+        self.rows_rendered = 0
+
+    def render(self, rows: List[ServiceRow], footer: str = "") -> Group:
+        """Build the renderable for the given snapshot."""
+        table = Table(box=box.ROUNDED, show_header=True, header_style="bold magenta")
+        table.add_column("Service", style="cyan")
+        table.add_column("Status", justify="center")
+        table.add_column("CPU %", justify="right")
+        table.add_column("Memory", justify="right")
+        table.add_column("Port", justify="center")
+        table.add_column("Errors (5m)", justify="right")
+
+        for row in rows:
+            cached = self._cache.get(row.key)
+            if cached is None or cached[0] != row:
+                cached = (row, self._render_row(row))
+                self._cache[row.key] = cached
+                self.rows_rendered += 1
+            table.add_row(*cached[1])
+
+        return Group(table, Text(footer, style="dim"))
+
+    @staticmethod
+    def _render_row(row: ServiceRow) -> tuple:
+        """Render the cells for one row."""
+        if row.state == "running":
+            status = Text("● Running", style="green")
+        elif row.state == "stopped":
+            status = Text("○ Stopped", style="yellow")
+        elif row.state == "paused":
+            status = Text("⏸ Paused", style="yellow")
+        elif row.state == "not_installed":
+            status = Text("✕ Not Installed", style="dim")
+        else:
+            status = Text("? Unknown", style="dim")
+
+        cpu = Text(f"{row.cpu:.1f}" if row.cpu is not None else "-")
+        memory = Text(f"{row.rss_mb:.1f} MB" if row.rss_mb is not None else "-")
+
+        if row.port is None:
+            port = Text("-", style="dim")
+        elif row.port_open:
+            port = Text(f"{row.port} open", style="green")
+        else:
+            port = Text(f"{row.port} closed", style="red")
+
+        errors = Text(
+            str(row.recent_errors), style="red" if row.recent_errors else "green"
+        )
+        return (Text(row.name), status, cpu, memory, port, errors)
+
+
+def watch_dashboard(
+    sampler: DashboardSampler, console: Console, refresh_per_second: float = 4.0
+):
+    """Display the sampler's snapshots until interrupted.
+
+    The screen is only redrawn when a new snapshot differs from the
+    previous one; otherwise the loop just waits.
+    """
+    renderer = DashboardRenderer()
+    sampler.start()
+
+    def footer() -> str:
+        stamp = time.strftime("%H:%M:%S", time.localtime(sampler.changed_at))
+        return (
+            f"Last change {stamp} - sampling every {sampler.interval:g}s "
+            f"({sampler.sample_duration * 1000:.0f} ms per sample) - Ctrl+C to exit"
+        )
+
+    try:
+        with Live(
+            renderer.render(sampler.rows(), footer()),
+            console=console,
+            auto_refresh=False,
+            transient=False,
+        ) as live:
+            while True:
+                if sampler.changed.wait(timeout=1.0 / refresh_per_second):
+                    sampler.changed.clear()
+                    live.update(renderer.render(sampler.rows(), footer()), refresh=True)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sampler.stop()
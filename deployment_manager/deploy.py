@@ -0,0 +1,947 @@
+"""Deploy pipeline: a DAG of stages run concurrently within resource limits."""
+
+import os
+import queue
+import shutil
+import socket
+import subprocess
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from enum import Enum
+from pathlib import Path
+from typing import Callable, Dict, List, NamedTuple, Optional, Set
+
+import psutil
+
+try:
+    from .backupdb import database_targets, dump_databases, restore_databases
+    from .backuprestore import apply_restore, plan_restore, verify_chunks
+    from .backupstore import BackupStore
+    from .buildcache import BuildCache, CacheResult, input_key, source_key
+    from .config import sync_env_file
+    from .optimize import LaravelOptimizer
+    from .precompress import (
+        NGINX_SNIPPET,
+        manifest_path,
+        nginx_snippet,
+        precompress_assets,
+        public_dir,
+        write_if_changed,
+    )
+    from .releases import Releases
+    from .services import ServiceStatus
+except ImportError:
+    from backupdb import database_targets, dump_databases, restore_databases
+    from backuprestore import apply_restore, plan_restore, verify_chunks
+    from backupstore import BackupStore
+    from buildcache import BuildCache, CacheResult, input_key, source_key
+    from config import sync_env_file
+    from optimize import LaravelOptimizer
+    from precompress import (
+        NGINX_SNIPPET,
+        manifest_path,
+        nginx_snippet,
+        precompress_assets,
+        public_dir,
+        write_if_changed,
+    )
+    from releases import Releases
+    from services import ServiceStatus
+
+# Seconds the health gate waits for services to run and ports to accept
+HEALTH_TIMEOUT = 60
+
+# Directory `npm run build` writes the Nuxt PWA to
+PWA_OUTPUT = ".output"
+
+OutputCallback = Callable[[str, str], None]
+RunCallback = Callable[[List[str], Path], None]
+
+
+class InstallSpec(NamedTuple):
+    """How an app's dependencies are installed."""
+
+    directory: str  # Installed into, relative to the app
+    command: List[str]
+    tools: List[str]  # Whose versions the result depends on
+    inputs: List[str]  # Manifests and lockfiles, relative to the app
+
+
+class StageStatus(Enum):
+    """Stage states."""
+
+    PENDING = "pending"
+    RUNNING = "running"
+    OK = "ok"
+    FAILED = "failed"
+    SKIPPED = "skipped"
+    CANCELLED = "cancelled"
+
+
+class StageFailed(Exception):
+    """A stage could not complete."""
+
+
+class StageSkipped(Exception):
+    """A stage has nothing to do (e.g. an app directory that does not exist)."""
+
+
+@dataclass
+class Stage:
+    """A unit of deploy work.
+
+    ``cpus`` and ``memory_mb`` are what the stage is expected to use at its
+    peak; the scheduler only starts it while that much is free.
+    """
+
+    name: str
+    action: Callable[["StageContext"], None]
+    needs: List[str] = field(default_factory=list)
+    cpus: float = 1.0
+    memory_mb: int = 256
+    description: str = ""
+
+
+@dataclass
+class StageResult:
+    """Outcome of a stage."""
+
+    name: str
+    status: StageStatus = StageStatus.PENDING
+    elapsed: float = 0.0
+    error: str = ""
+    started: bool = False
+
+
+class StageContext:
+    """What a stage action gets: output, subprocesses and cancellation."""
+
+    def __init__(self, stage: Stage, pipeline: "Pipeline"):
+        self.stage = stage
+        self.pipeline = pipeline
+        self._processes: List[subprocess.Popen] = []
+        self._lock = threading.Lock()
+        self._log = None
+        if pipeline.log_dir is not None:
+            pipeline.log_dir.mkdir(parents=True, exist_ok=True)
+            path = pipeline.log_dir / f"{stage.name}.log"
+            self._log = open(path, "a", encoding="utf-8")
+
+    @property
+    def cancelled(self) -> bool:
+        """Whether the pipeline is stopping because another stage failed."""
+        return self.pipeline.cancel.is_set()
+
+    def log(self, line: str):
+        """Emit a line of stage output (streamed and written to the stage log)."""
+        self.pipeline.output(self.stage.name, line)
+        if self._log is not None:
+            self._log.write(line + "\n")
+            self._log.flush()
+
+    def run(self, command: List[str], cwd: Path, env: Optional[dict] = None):
+        """Run a command, streaming its output; raise StageFailed on failure.
+
+        The process runs at below-normal priority so builds do not starve
+        the live services of CPU.
+        """
+        if self.cancelled:
+            raise StageFailed("cancelled")
+        executable = shutil.which(command[0]) or command[0]
+        self.log(f"$ {' '.join(command)}")
+        try:
+            process = subprocess.Popen(
+                [executable, *command[1:]],
+                cwd=cwd,
+                env={**os.environ, **(env or {})},
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                text=True,
+                encoding="utf-8",
+                errors="replace",
+                bufsize=1,
+            )
+        except OSError as e:
+            raise StageFailed(f"Cannot run {command[0]}: {e}")
+        _lower_priority(process.pid)
+
+        with self._lock:
+            self._processes.append(process)
+        try:
+            for line in process.stdout:
+                self.log(line.rstrip())
+            code = process.wait()
+        finally:
+            with self._lock:
+                self._processes.remove(process)
+        if self.cancelled:
+            raise StageFailed("cancelled")
+        if code != 0:
+            raise StageFailed(f"{command[0]} exited with {code}")
+
+    def kill(self):
+        """Terminate the stage's running processes (and their children)."""
+        with self._lock:
+            processes = list(self._processes)
+        for process in processes:
+            try:
+                parent = psutil.Process(process.pid)
+                children = parent.children(recursive=True)
+            except psutil.Error:
+                continue
+            # Parent first, so it cannot react to its children dying
+            for victim in [parent, *children]:
+                try:
+                    victim.kill()
+                except psutil.Error:
+                    pass
+
+    def close(self):
+        if self._log is not None:
+            self._log.close()
+
+
+def _run_captured(command: List[str], cwd: Path):
+    """Run a command outside any stage; raise StageFailed on failure."""
+    executable = shutil.which(command[0]) or command[0]
+    try:
+        result = subprocess.run(
+            [executable, *command[1:]],
+            cwd=cwd,
+            stdin=subprocess.DEVNULL,
+            capture_output=True,
+            text=True,
+            encoding="utf-8",
+            errors="replace",
+        )
+    except OSError as e:
+        raise StageFailed(f"Cannot run {command[0]}: {e}")
+    if result.returncode != 0:
+        raise StageFailed(f"{command[0]} exited with {result.returncode}")
+
+
+def _lower_priority(pid: int):
+    """Run a build process below normal priority (best effort)."""
+    try:
+        process = psutil.Process(pid)
+        if sys.platform == "win32":
+            process.nice(psutil.BELOW_NORMAL_PRIORITY_CLASS)
+        else:
+            process.nice(10)
+    except (psutil.Error, AttributeError):
+        pass
+
+
+class Pipeline:
+    """Runs stages in dependency order, concurrently where possible.
+
+    A stage starts once everything it needs has succeeded (or was skipped)
+    and its declared CPU and memory fit: the CPUs of running stages may not
+    exceed ``cpu_limit``, and its memory must fit in what psutil reports as
+    available minus what running stages have reserved. A stage is always
+    allowed to start when nothing else is running, so an oversized stage
+    runs alone rather than never.
+
+    The first failure cancels the run: no new stages start, running stages'
+    processes are killed, and everything not finished is marked cancelled.
+    """
+
+    def __init__(
+        self,
+        stages: List[Stage],
+        output: OutputCallback,
+        log_dir: Optional[Path] = None,
+        cpu_limit: Optional[float] = None,
+    ):
+        """Initialize pipeline.
+
+        Args:
+            stages: Stages; names must be unique and dependencies acyclic
+            output: Called with (stage name, line) for all stage output
+            log_dir: Directory for per-stage log files
+            cpu_limit: CPUs running stages may use together (default: all)
+        """
+        self.stages = {stage.name: stage for stage in stages}
+        if len(self.stages) != len(stages):
+            raise ValueError("Stage names must be unique")
+        self.output = output
+        self.log_dir = log_dir
+        self.cpu_limit = cpu_limit or float(psutil.cpu_count() or 1)
+        self.cancel = threading.Event()
+        self.order = self._topological_order()
+
+    def _topological_order(self) -> List[str]:
+        """Stage names with every stage after its dependencies."""
+        order: List[str] = []
+        state: Dict[str, int] = {}  # 1 visiting, 2 done
+
+        def visit(name: str, path: List[str]):
+            if state.get(name) == 2:
+                return
+            if state.get(name) == 1:
+                raise ValueError(f"Stage cycle: {' -> '.join(path + [name])}")
+            if name not in self.stages:
+                raise ValueError(f"Unknown stage '{name}' needed by {path[-1]}")
+            state[name] = 1
+            for dependency in self.stages[name].needs:
+                visit(dependency, path + [name])
+            state[name] = 2
+            order.append(name)
+
+        for name in self.stages:
+            visit(name, [])
+        return order
+
+    def _fits(self, stage: Stage, running: Dict[str, Stage]) -> bool:
+        if not running:
+            return True
+        cpus = sum(s.cpus for s in running.values())
+        if cpus + stage.cpus > self.cpu_limit:
+            return False
+        available_mb = psutil.virtual_memory().available / 1024**2
+        reserved_mb = sum(s.memory_mb for s in running.values())
+        return available_mb - reserved_mb >= stage.memory_mb
+
+    def run(self, skip: Optional[Set[str]] = None) -> Dict[str, StageResult]:
+        """Run every stage not in ``skip``; returns results by stage name."""
+        skip = skip or set()
+        results = {name: StageResult(name) for name in self.order}
+        for name in skip:
+            if name in results:
+                results[name].status = StageStatus.SKIPPED
+
+        done: "queue.Queue[tuple]" = queue.Queue()
+        running: Dict[str, Stage] = {}
+        contexts: Dict[str, StageContext] = {}
+
+        def worker(stage: Stage, context: StageContext):
+            started = time.perf_counter()
+            try:
+                stage.action(context)
+                status, error = StageStatus.OK, ""
+            except StageSkipped as e:
+                status, error = StageStatus.SKIPPED, str(e)
+            except Exception as e:  # Any failure fails the stage, not the scheduler
+                status = (
+                    StageStatus.CANCELLED
+                    if self.cancel.is_set()
+                    else StageStatus.FAILED
+                )
+                error = str(e) or type(e).__name__
+            finally:
+                context.close()
+            done.put((stage.name, status, error, time.perf_counter() - started))
+
+        satisfied = (StageStatus.OK, StageStatus.SKIPPED)
+        while True:
+            if not self.cancel.is_set():
+                for name in self.order:
+                    result = results[name]
+                    stage = self.stages[name]
+                    if result.status != StageStatus.PENDING:
+                        continue
+                    if not all(results[d].status in satisfied for d in stage.needs):
+                        continue
+                    if not self._fits(stage, running):
+                        continue
+                    result.status = StageStatus.RUNNING
+                    result.started = True
+                    running[name] = stage
+                    contexts[name] = StageContext(stage, self)
+                    threading.Thread(
+                        target=worker, args=(stage, contexts[name]), daemon=True
+                    ).start()
+
+            if not running:
+                break
+            try:
+                # Time out now and then: memory may have freed up for a waiting stage
+                name, status, error, elapsed = done.get(timeout=1.0)
+            except queue.Empty:
+                continue
+            del running[name]
+            contexts.pop(name)
+            result = results[name]
+            result.status, result.error, result.elapsed = status, error, elapsed
+            if status == StageStatus.FAILED and not self.cancel.is_set():
+                self.cancel.set()
+                for context in contexts.values():
+                    context.kill()
+
+        for result in results.values():
+            if result.status == StageStatus.PENDING:
+                result.status = StageStatus.CANCELLED
+        return results
+
+
+class Deployer:
+    """The deploy stages for this project, and rollback when they fail."""
+
+    def __init__(
+        self,
+        project_root: Path,
+        config_manager,
+        service_manager,
+        store: BackupStore,
+        roots: List[str],
+        excludes: List[str],
+        service_ports: Dict[str, int],
+        backup_metadata: dict,
+        include_database: bool = True,
+        build_cache: Optional[BuildCache] = None,
+        releases: Optional[Releases] = None,
+        release_source: Optional[Path] = None,
+    ):
+        """Initialize deployer.
+
+        Args:
+            project_root: Project root
+            config_manager: Loaded ConfigManager
+            service_manager: ServiceManager for restarts and health
+            store: Backup store for the pre-deploy snapshot and rollback
+            roots: Snapshot roots (see backupstore.default_roots())
+            excludes: Snapshot exclude patterns
+            service_ports: Service key -> port the health gate waits for
+            backup_metadata: Environment and versions recorded with the backup
+            include_database: Dump the databases in the backup stage
+            build_cache: Skips installs and builds whose inputs are unchanged
+                (None: always run them)
+            releases: Build the backend as a new release and switch to it
+                (None: build it in place)
+            release_source: Tree the new release is copied from (default:
+                the active release)
+        """
+        self.project_root = project_root
+        self.config_manager = config_manager
+        self.config = config_manager.deployment_config
+        self.tools = config_manager.manager_config
+        self.service_manager = service_manager
+        self.store = store
+        self.roots = roots
+        self.excludes = excludes
+        self.service_ports = service_ports
+        self.backup_metadata = backup_metadata
+        self.include_database = include_database
+        self.build_cache = build_cache
+        self.cache_results: List[CacheResult] = []
+        self.boot_times = None  # (before, after) seconds, set by optimize
+        self.precompress_report = None  # Set by precompress
+        self.releases = releases
+        self.release_source = release_source
+        self.release_id: Optional[str] = None
+        self.release_path: Optional[Path] = None
+        self.previous_release: Optional[str] = None
+        self.switch_seconds: Optional[float] = None  # Switch + reload
+        self.deploy_id = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+        self.snapshot_id: Optional[str] = None
+
+    def app_path(self, relative: str) -> Path:
+        if self.release_path is not None and relative == self.config.backend_dir:
+            return self.release_path
+        return self.project_root / relative
+
+    def stages(self) -> List[Stage]:
+        """The deploy DAG (estimates are peak CPUs and MB per stage).
+
+        With releases enabled the backend is built in a new release
+        directory and the restart becomes a switch to it.
+        """
+        backend_base = "prepare-release" if self.releases else "backup"
+        go_live = "switch" if self.releases else "restart"
+        stages = [
+            Stage(
+                "backup",
+                self.backup,
+                cpus=1,
+                memory_mb=512,
+                description="Snapshot files and databases",
+            ),
+            Stage(
+                "sync-config",
+                self.sync_config,
+                [backend_base],
+                cpus=0.25,
+                memory_mb=64,
+                description="Write managed keys to the backend .env",
+            ),
+            Stage(
+                "build-backend",
+                self.build_backend,
+                [backend_base],
+                cpus=1,
+                memory_mb=768,
+                description="composer install",
+            ),
+            Stage(
+                "build-pwa",
+                self.build_pwa,
+                ["backup"],
+                cpus=2,
+                memory_mb=1536,
+                description="npm ci, npm run build",
+            ),
+            Stage(
+                "precompress",
+                self.precompress,
+                ["build-pwa"],
+                cpus=1,
+                memory_mb=256,
+                description="gzip/brotli PWA assets, nginx cache rules",
+            ),
+            Stage(
+                "build-relay",
+                self.build_relay,
+                ["backup"],
+                cpus=2,
+                memory_mb=2048,
+                description="flutter pub get, flutter build apk",
+            ),
+            Stage(
+                "migrate",
+                self.migrate,
+                ["build-backend", "sync-config"],
+                cpus=0.5,
+                memory_mb=256,
+                description="artisan migrate",
+            ),
+            Stage(
+                "optimize",
+                self.optimize,
+                ["build-backend", "sync-config"],
+                cpus=1,
+                memory_mb=256,
+                description="Classmap and config/route/view/event caches",
+            ),
+            Stage(
+                go_live,
+                self.switch if self.releases else self.restart,
+                ["migrate", "optimize", "precompress", "build-relay"],
+                cpus=0.5,
+                memory_mb=64,
+                description=(
+                    "Switch the backend link, reload services"
+                    if self.releases
+                    else "Restart installed services"
+                ),
+            ),
+            Stage(
+                "health",
+                self.health,
+                [go_live],
+                cpus=0.25,
+                memory_mb=64,
+                description="Wait for services to run and ports to accept",
+            ),
+        ]
+        if self.releases:
+            stages.insert(
+                1,
+                Stage(
+                    "prepare-release",
+                    self.prepare_release,
+                    ["backup"],
+                    cpus=1,
+                    memory_mb=128,
+                    description="Copy the backend into releases/<id>",
+                ),
+            )
+        return stages
+
+    # Stage actions
+
+    def backup(self, ctx: StageContext):
+        dumps = None
+        stored = 0
+        if self.include_database:
+            ctx.log("Dumping databases...")
+            results = dump_databases(
+                self.store.chunks,
+                self.config.mysqldump_path,
+                database_targets(self.config),
+            )
+            for result in results:
+                if result.error:
+                    raise StageFailed(f"{result.database}: {result.error}")
+                ctx.log(
+                    f"{result.database}: {result.bytes / 1024**2:.1f} MB "
+                    f"({result.mb_per_second:.0f} MB/s)"
+                )
+            dumps = [result.entry for result in results]
+            stored = sum(result.stored_bytes for result in results)
+
+        report = self.store.create_snapshot(
+            self.project_root,
+            self.roots,
+            self.excludes,
+            description=f"Before deploy {self.deploy_id}",
+            metadata={**self.backup_metadata, "database_stored_bytes": stored},
+            databases=dumps,
+        )
+        if report.errors:
+            raise StageFailed(
+                f"{len(report.errors)} files unreadable: {report.errors[0]}"
+            )
+        self.snapshot_id = report.snapshot_id
+        ctx.log(
+            f"Snapshot {report.snapshot_id}: {report.files} files, "
+            f"{report.hashed} changed, {report.elapsed:.1f}s"
+        )
+
+    def sync_config(self, ctx: StageContext):
+        env_path = self.app_path(self.config.backend_dir) / ".env"
+        if not env_path.parent.is_dir():
+            raise StageSkipped(f"{self.config.backend_dir} not found")
+        changed = sync_env_file(env_path, self.config_manager.backend_env_values())
+        ctx.log(f"{env_path}: {', '.join(changed) or 'no changes'}")
+
+    def build_backend(self, ctx: StageContext):
+        self._require_dir(self.config.backend_dir)
+        self.install_dependencies(self.config.backend_dir, ctx.run, ctx.log)
+
+    def build_pwa(self, ctx: StageContext):
+        pwa = self._require_dir(self.config.pwa_dir)
+        spec = self.install_spec(self.config.pwa_dir)
+        deps = self.install_dependencies(self.config.pwa_dir, ctx.run, ctx.log)
+        command = [spec.command[0], "run", "build"]
+        if self.build_cache is None:
+            ctx.run(command, pwa)
+            return
+        key = input_key([" ".join(command), deps.key, source_key(pwa)], [])
+        result = self.build_cache.ensure(
+            self.config.pwa_dir,
+            "build",
+            pwa / PWA_OUTPUT,
+            key,
+            lambda: ctx.run(command, pwa),
+        )
+        self._record(result, ctx.log)
+
+    def precompress(self, ctx: StageContext):
+        pwa = self._require_dir(self.config.pwa_dir)
+        public = public_dir(pwa)
+        if public is None:
+            raise StageSkipped(f"No build output in {self.config.pwa_dir}")
+        report = precompress_assets(
+            public, manifest_path(self.tools.cache_dir, self.config.pwa_dir)
+        )
+        self.precompress_report = report
+        if report.errors:
+            raise StageFailed(f"{len(report.errors)} assets failed: {report.errors[0]}")
+        ctx.log(
+            f"{report.compressed} compressed, {report.unchanged} unchanged, "
+            f"{report.saved_bytes / 1024:.0f} KB saved per full load "
+            f"({report.elapsed:.1f}s)"
+        )
+        snippet = (
+            self.project_root / Path(self.config.nginx_config).parent / NGINX_SNIPPET
+        )
+        text = nginx_snippet(public, report.hashed_dirs, report.brotli)
+        if write_if_changed(snippet, text):
+            ctx.log(f"Wrote {snippet}")
+
+    def build_relay(self, ctx: StageContext):
+        relay = self._require_dir(self.config.relay_dir)
+        self.install_dependencies(self.config.relay_dir, ctx.run, ctx.log)
+        ctx.run([self.tools.flutter_path, "build", "apk", "--release"], relay)
+
+    def migrate(self, ctx: StageContext):
+        backend = self._require_dir(self.config.backend_dir)
+        ctx.run([self.tools.php_path, "artisan", "migrate", "--force"], backend)
+
+    def optimize(self, ctx: StageContext):
+        backend = self._require_dir(self.config.backend_dir)
+        optimizer = LaravelOptimizer(
+            backend, self.tools.php_path, self.tools.composer_path
+        )
+        report = optimizer.optimize(ctx.run, ctx.log)
+        self.boot_times = (report.boot_before, report.boot_after)
+
+    def prepare_release(self, ctx: StageContext):
+        self.previous_release = self.releases.current()
+        self.release_id = self.releases.new_id()
+        source = self.release_source or self.releases.path(self.previous_release)
+        ctx.log(f"Preparing release {self.release_id} from {source}")
+        started = time.perf_counter()
+        self.release_path = self.releases.prepare(self.release_id, source)
+        ctx.log(f"Copied in {time.perf_counter() - started:.1f}s")
+
+    def switch(self, ctx: StageContext):
+        switched = self.releases.activate(
+            self.release_id, description=f"Deploy {self.deploy_id}"
+        )
+        started = time.perf_counter()
+        failures = self._reload_services(ctx.log)
+        reloaded = time.perf_counter() - started
+        self.switch_seconds = switched + reloaded
+        ctx.log(
+            f"Switched {self.previous_release} -> {self.release_id} in "
+            f"{switched * 1000:.0f} ms, reloaded in {reloaded:.1f}s"
+        )
+        if failures:
+            raise StageFailed("; ".join(failures))
+        self.releases.prune(ctx.log)
+
+    def restart(self, ctx: StageContext):
+        failures = self._restart_services(ctx.log)
+        if failures:
+            raise StageFailed("; ".join(failures))
+
+    def health(self, ctx: StageContext):
+        deadline = time.monotonic() + HEALTH_TIMEOUT
+        while True:
+            problems = self._health_problems()
+            if not problems:
+                ctx.log("All services running and listening")
+                return
+            if time.monotonic() > deadline or ctx.cancelled:
+                raise StageFailed("; ".join(problems))
+            time.sleep(1)
+
+    # Dependencies
+
+    def install_spec(self, app: str) -> Optional[InstallSpec]:
+        """How dependencies are installed for one of the app directories."""
+        path = self.app_path(app)
+        if app == self.config.backend_dir:
+            return InstallSpec(
+                "vendor",
+                [
+                    self.tools.composer_path,
+                    "install",
+                    "--no-dev",
+                    "--no-interaction",
+                    "--prefer-dist",
+                    "--optimize-autoloader",
+                ],
+                [self.tools.composer_path, self.tools.php_path],
+                ["composer.json", "composer.lock"],
+            )
+        if app == self.config.pwa_dir:
+            if (path / "pnpm-lock.yaml").is_file() and not (
+                path / "package-lock.json"
+            ).is_file():
+                return InstallSpec(
+                    "node_modules",
+                    [self.tools.pnpm_path, "install", "--frozen-lockfile"],
+                    [self.tools.pnpm_path, self.tools.node_path],
+                    ["package.json", "pnpm-lock.yaml"],
+                )
+            return InstallSpec(
+                "node_modules",
+                [self.tools.npm_path, "ci", "--no-audit", "--no-fund"],
+                [self.tools.npm_path, self.tools.node_path],
+                ["package.json", "package-lock.json"],
+            )
+        if app == self.config.relay_dir:
+            return InstallSpec(
+                ".dart_tool",
+                [self.tools.flutter_path, "pub", "get"],
+                [self.tools.flutter_path],
+                ["pubspec.yaml", "pubspec.lock"],
+            )
+        return None
+
+    def install_dependencies(
+        self, app: str, run: RunCallback, log: Callable[[str], None]
+    ) -> Optional[CacheResult]:
+        """Install an app's dependencies unless the build cache has them.
+
+        The cache key covers the manifests, lockfiles, install command and
+        tool versions. Returns the cache outcome (None without a cache).
+        """
+        spec = self.install_spec(app)
+        path = self.app_path(app)
+        if self.build_cache is None:
+            run(spec.command, path)
+            return None
+        key = input_key(
+            [" ".join(spec.command)]
+            + [self.build_cache.tool_version(tool) for tool in spec.tools],
+            [path / name for name in spec.inputs],
+        )
+        result = self.build_cache.ensure(
+            app,
+            "dependencies",
+            path / spec.directory,
+            key,
+            lambda: run(spec.command, path),
+        )
+        self._record(result, log)
+        return result
+
+    def _record(self, result: CacheResult, log: Callable[[str], None]):
+        self.cache_results.append(result)
+        verb = {"hit": "up to date", "restored": "restored from cache"}
+        log(
+            f"{result.kind} {verb.get(result.outcome, 'cache miss, built')} "
+            f"({result.key[:12]}) in {result.elapsed:.1f}s"
+        )
+
+    # Helpers
+
+    def _require_dir(self, relative: str) -> Path:
+        path = self.app_path(relative)
+        if not path.is_dir():
+            raise StageSkipped(f"{relative} not found")
+        return path
+
+    def _installed_services(self) -> List[str]:
+        names = {
+            key: info["name"] for key, info in self.service_manager.SERVICES.items()
+        }
+        statuses = self.service_manager.get_services_status(list(names.values()))
+        return [
+            key
+            for key, name in names.items()
+            if statuses.get(name, ServiceStatus.UNKNOWN) != ServiceStatus.NOT_INSTALLED
+        ]
+
+    def _restart_services(self, log: Callable[[str], None]) -> List[str]:
+        failures = []
+        manager = self.service_manager
+        installed = self._installed_services()
+        names = {key: manager.SERVICES[key]["name"] for key in installed}
+        statuses = manager.get_services_status(list(names.values()))
+        for key in installed:
+            # Extra queue workers the autoscaler has stopped stay stopped
+            if (
+                manager.is_extra_worker(key)
+                and statuses.get(names[key]) != ServiceStatus.RUNNING
+            ):
+                continue
+            success, msg = self.service_manager.restart_service(key)
+            log(("✓ " if success else "✗ ") + msg)
+            if not success:
+                failures.append(f"{key}: {msg}")
+        return failures
+
+    def _reload_services(self, log: Callable[[str], None]) -> List[str]:
+        failures = []
+        for key, (success, msg) in self.service_manager.reload_all().items():
+            log(("✓ " if success else "✗ ") + msg)
+            if not success:
+                failures.append(f"{key}: {msg}")
+        return failures
+
+    def _health_problems(self) -> List[str]:
+        problems = []
+        names = {
+            key: info["name"] for key, info in self.service_manager.SERVICES.items()
+        }
+        installed = self._installed_services()
+        statuses = self.service_manager.get_services_status(
+            [names[k] for k in installed]
+        )
+        for key in installed:
+            if self.service_manager.is_extra_worker(key):
+                continue  # Started and stopped by the autoscaler
+            status = statuses.get(names[key], ServiceStatus.UNKNOWN)
+            if status != ServiceStatus.RUNNING:
+                problems.append(f"{key} is {status.value}")
+        for key, port in self.service_ports.items():
+            if key not in installed:
+                continue
+            try:
+                socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            except OSError:
+                problems.append(f"{key} not accepting connections on port {port}")
+        return problems
+
+    # Rollback
+
+    def rollback(
+        self, results: Dict[str, StageResult], log: Callable[[str], None]
+    ) -> bool:
+        """Put the project back to the pre-deploy snapshot.
+
+        Files are restored incrementally; databases are restored only if the
+        migrate stage started. Dependencies are reinstalled (usually straight
+        from the build cache) for apps whose manifest or lockfile came back,
+        since vendor/ and node_modules/ are not in snapshots; then installed
+        services are restarted. With releases, the backend is switched back
+        to the previous release and the new one discarded; services are then
+        reloaded rather than restarted. Returns True on success.
+        """
+        if self.release_id is not None:
+            # The live backend was never touched: switch back and drop the new one
+            self.release_path = None
+            if self.releases.current() == self.release_id and self.previous_release:
+                switched = self.releases.activate(self.previous_release)
+                log(
+                    f"Switched back to release {self.previous_release} "
+                    f"({switched * 1000:.0f} ms)"
+                )
+            if self.releases.current() != self.release_id:
+                self.releases.discard(self.release_id)
+                log(f"Discarded release {self.release_id}")
+
+        if self.snapshot_id is None:
+            log("No pre-deploy snapshot; nothing to roll back to")
+            return False
+
+        log(f"Rolling back to snapshot {self.snapshot_id}")
+        # Files the failed deploy added go too; storage/ and .env* stay
+        plan = plan_restore(
+            self.store, self.snapshot_id, self.project_root, self.excludes, delete=True
+        )
+        dumps = []
+        if results.get("migrate") and results["migrate"].started:
+            dumps = self.store.database_entries(self.snapshot_id)
+        errors = verify_chunks(self.store, plan.writes + dumps)
+        if errors:
+            log(f"✗ Snapshot failed verification: {errors[0]}")
+            return False
+
+        report = apply_restore(self.store, plan, self.project_root)
+        log(
+            f"Restored {report.written} files, deleted {report.deleted} "
+            f"({report.elapsed:.1f}s)"
+        )
+        ok = not report.errors
+        for error in report.errors:
+            log(f"✗ {error}")
+
+        if dumps:
+            targets = {target.name: target for target in database_targets(self.config)}
+            for result in restore_databases(
+                self.store.chunks,
+                self.config.mysql_path,
+                [
+                    (targets[entry.path], entry)
+                    for entry in dumps
+                    if entry.path in targets
+                ],
+            ):
+                if result.error:
+                    ok = False
+                    log(f"✗ {result.database}: {result.error}")
+                else:
+                    log(f"Restored database {result.database} ({result.elapsed:.1f}s)")
+
+        # Reinstall dependencies where a restored manifest or lockfile differs
+        changed = set(plan.changed_paths)
+        for app in (
+            self.config.backend_dir,
+            self.config.pwa_dir,
+            self.config.relay_dir,
+        ):
+            spec = self.install_spec(app)
+            prefix = Path(app).as_posix().strip("/")
+            if not any(f"{prefix}/{name}" in changed for name in spec.inputs):
+                continue
+            log(f"Reinstalling dependencies in {app}")
+            try:
+                self.install_dependencies(app, _run_captured, log)
+            except StageFailed as e:
+                ok = False
+                log(f"✗ {e}")
+
+        if self.releases:
+            failures = self._reload_services(log)
+        else:
+            failures = self._restart_services(log)
+        return ok and not failures
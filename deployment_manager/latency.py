@@ -0,0 +1,108 @@
+"""Mergeable latency sketch with bounded relative error."""
+
+import math
+from typing import Dict, Optional
+
+# Every reported quantile is within this fraction of the true value
+DEFAULT_ACCURACY = 0.01
+
+# Latencies below this (ms) are counted as zero
+MIN_VALUE = 0.01
+
+
+class LatencySketch:
+    """Log-bucketed histogram of latencies in milliseconds (HDR/DDSketch style).
+
+    Bucket ``i`` covers ``(gamma^(i-1), gamma^i]`` with
+    ``gamma = (1 + a) / (1 - a)``, so quantiles are accurate to ``a`` relative
+    error whatever the distribution. Memory depends only on the range of
+    values seen: 10 us to 10 min is at most about 1,000 buckets at 1%
+    accuracy, however many values are added. Sketches with the same accuracy
+    merge exactly by adding bucket counts.
+    """
+
+    def __init__(self, relative_accuracy: float = DEFAULT_ACCURACY):
+        """Initialize an empty sketch.
+
+        Args:
+            relative_accuracy: Maximum relative error of reported quantiles
+        """
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.buckets: Dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+        self.total = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    def add(self, value: float, count: int = 1):
+        """Record a latency (ms) ``count`` times."""
+        if value < MIN_VALUE:
+            self.zero_count += count
+        else:
+            index = math.ceil(math.log(value) / self._log_gamma)
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        self.count += count
+        self.total += value * count
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def merge(self, other: "LatencySketch"):
+        """Add another sketch's values into this one."""
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Cannot merge sketches with different accuracy")
+        for index, count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.total += other.total
+        if other.min is not None:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = other.max if self.max is None else max(self.max, other.max)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimated value at quantile ``q`` (0..1), or None when empty."""
+        if self.count == 0:
+            return None
+        rank = q * (self.count - 1)
+        if rank < self.zero_count:
+            return 0.0
+        seen = self.zero_count
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen > rank:
+                # Midpoint (in relative terms) of the bucket, clamped to what was seen
+                estimate = 2 * self.gamma**index / (self.gamma + 1)
+                return min(max(estimate, self.min), self.max)
+        return self.max
+
+    @property
+    def mean(self) -> Optional[float]:
+        """Mean latency, or None when empty."""
+        return self.total / self.count if self.count else None
+
+    def to_dict(self) -> dict:
+        """JSON-serialisable form."""
+        return {
+            "accuracy": self.relative_accuracy,
+            "buckets": {str(k): v for k, v in self.buckets.items()},
+            "zero": self.zero_count,
+            "count": self.count,
+            "total": self.total,
+            "min": self.min,
+            "max": self.max,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "LatencySketch":
+        """Inverse of to_dict()."""
+        sketch = cls(data.get("accuracy", DEFAULT_ACCURACY))
+        sketch.buckets = {int(k): v for k, v in data.get("buckets", {}).items()}
+        sketch.zero_count = data.get("zero", 0)
+        sketch.count = data.get("count", 0)
+        sketch.total = data.get("total", 0.0)
+        sketch.min = data.get("min")
+        sketch.max = data.get("max")
+        return sketch
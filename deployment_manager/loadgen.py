@@ -0,0 +1,354 @@
+"""HTTP load generator (asyncio, keep-alive) for sizing the local stack."""
+
+import asyncio
+import ssl
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+try:
+    from .latency import LatencySketch
+    from .readiness import unverified_context
+except ImportError:
+    from latency import LatencySketch
+    from readiness import unverified_context
+
+# Seconds one request may take before it counts as a timeout error
+REQUEST_TIMEOUT = 10.0
+
+# Percentiles reported (and written to JSON)
+PERCENTILES = (0.5, 0.75, 0.9, 0.99, 0.999)
+
+
+class HTTPError(Exception):
+    """A malformed or unexpected response."""
+
+
+@dataclass
+class Target:
+    """Where requests go."""
+
+    scheme: str
+    host: str
+    port: int
+    paths: List[str]
+    host_header: str = ""
+
+    @classmethod
+    def from_url(cls, url: str) -> "Target":
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https") or not parts.hostname:
+            raise ValueError(f"Not an http(s) URL: {url}")
+        port = parts.port or (443 if parts.scheme == "https" else 80)
+        path = parts.path or "/"
+        if parts.query:
+            path += "?" + parts.query
+        return cls(
+            parts.scheme,
+            parts.hostname,
+            port,
+            [path],
+            parts.netloc,
+        )
+
+    @property
+    def url(self) -> str:
+        return f"{self.scheme}://{self.host}:{self.port}{self.paths[0]}"
+
+
+@dataclass
+class LoadResult:
+    """Outcome of a load run."""
+
+    target: str
+    concurrency: int
+    rate: Optional[float]  # Requests/s offered; None: as fast as possible
+    duration: float  # Seconds requested
+    elapsed: float = 0.0
+    requests: int = 0  # Completed with a response (any status)
+    errors: int = 0  # Connection failures, timeouts, status >= 500
+    statuses: Dict[int, int] = field(default_factory=dict)
+    error_kinds: Dict[str, int] = field(default_factory=dict)
+    bytes_received: int = 0
+    connections: int = 0  # Opened, including reconnects
+    latency: LatencySketch = field(default_factory=LatencySketch)  # ms
+
+    @property
+    def throughput(self) -> float:
+        """Successful responses per second."""
+        return (
+            (self.requests - self._server_errors) / self.elapsed
+            if self.elapsed
+            else 0.0
+        )
+
+    @property
+    def _server_errors(self) -> int:
+        return sum(n for status, n in self.statuses.items() if status >= 500)
+
+    @property
+    def error_rate(self) -> float:
+        attempts = self.requests + self.errors - self._server_errors
+        return self.errors / attempts if attempts else 0.0
+
+    def to_dict(self) -> dict:
+        """JSON form, for saving and comparing runs."""
+        return {
+            "target": self.target,
+            "concurrency": self.concurrency,
+            "rate": self.rate,
+            "duration": self.duration,
+            "elapsed": round(self.elapsed, 3),
+            "requests": self.requests,
+            "errors": self.errors,
+            "error_rate": round(self.error_rate, 6),
+            "throughput": round(self.throughput, 2),
+            "bytes_received": self.bytes_received,
+            "connections": self.connections,
+            "statuses": {str(k): v for k, v in sorted(self.statuses.items())},
+            "error_kinds": self.error_kinds,
+            "latency_ms": {
+                **{
+                    f"p{q * 100:g}": _round(self.latency.quantile(q))
+                    for q in PERCENTILES
+                },
+                "max": _round(self.latency.max),
+                "mean": _round(self.latency.mean),
+            },
+            "histogram": self.latency.to_dict(),
+        }
+
+
+def _round(value: Optional[float]) -> Optional[float]:
+    return round(value, 3) if value is not None else None
+
+
+class _Connection:
+    """One keep-alive HTTP/1.1 connection."""
+
+    def __init__(self, target: Target, context: Optional[ssl.SSLContext]):
+        self.target = target
+        self.context = context
+        self.reader: Optional[asyncio.StreamReader] = None
+        self.writer: Optional[asyncio.StreamWriter] = None
+
+    async def open(self):
+        self.reader, self.writer = await asyncio.open_connection(
+            self.target.host,
+            self.target.port,
+            ssl=self.context,
+            server_hostname=self.target.host if self.context else None,
+        )
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+    async def get(self, path: str) -> Tuple[int, int, bool]:
+        """Send a GET and read the whole response: (status, body bytes, keep-alive)."""
+        request = (
+            f"GET {path} HTTP/1.1\r\n"
+            f"Host: {self.target.host_header or self.target.host}\r\n"
+            "User-Agent: woosoo-bench\r\n"
+            "Accept: */*\r\n"
+            "\r\n"
+        )
+        self.writer.write(request.encode("ascii"))
+        # Headers over the reader's 64 KB limit raise LimitOverrunError
+        head = await self.reader.readuntil(b"\r\n\r\n")
+        lines = head.decode("latin-1").split("\r\n")
+        try:
+            version, status = lines[0].split(" ", 2)[:2]
+            status = int(status)
+        except ValueError:
+            raise HTTPError(f"Bad status line: {lines[0][:80]!r}")
+        headers = {}
+        for line in lines[1:]:
+            if ":" in line:
+                name, value = line.split(":", 1)
+                headers[name.strip().lower()] = value.strip()
+
+        keep_alive = headers.get("connection", "").lower() != "close" and (
+            version != "HTTP/1.0"
+            or headers.get("connection", "").lower() == "keep-alive"
+        )
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            size = await self._read_chunked()
+        elif "content-length" in headers:
+            size = int(headers["content-length"])
+            await self.reader.readexactly(size)
+        elif status in (204, 304) or 100 <= status < 200:
+            size = 0
+        else:
+            body = await self.reader.read()  # Delimited by close
+            size, keep_alive = len(body), False
+        return status, size, keep_alive
+
+    async def _read_chunked(self) -> int:
+        total = 0
+        while True:
+            line = await self.reader.readuntil(b"\r\n")
+            size = int(line.split(b";", 1)[0].strip(), 16)
+            if size == 0:
+                # Trailers end with an empty line
+                while (await self.reader.readuntil(b"\r\n")) != b"\r\n":
+                    pass
+                return total
+            await self.reader.readexactly(size + 2)
+            total += size
+
+
+async def run_load(
+    target: Target,
+    concurrency: int = 16,
+    duration: float = 10.0,
+    rate: Optional[float] = None,
+    timeout: float = REQUEST_TIMEOUT,
+    verify_tls: bool = False,
+) -> LoadResult:
+    """Drive keep-alive GET requests at a target for ``duration`` seconds.
+
+    Each of ``concurrency`` workers holds one connection and sends its next
+    request as soon as the previous response is read. With ``rate`` the
+    load is open-loop instead: request ``i`` is due at ``start + i / rate``
+    and its latency counts from then, so a stalled server is charged for
+    the requests it delayed (no coordinated omission). Paths are cycled.
+
+    Args:
+        target: Scheme, host, port and paths
+        concurrency: Connections (and requests in flight)
+        duration: Seconds to send requests for
+        rate: Requests per second across all workers (None: unlimited)
+        timeout: Seconds before a request counts as a timeout error
+        verify_tls: Check the server certificate (off: mkcert/self-signed)
+    """
+    result = LoadResult(target.url, concurrency, rate, duration)
+    context = None
+    if target.scheme == "https":
+        context = ssl.create_default_context() if verify_tls else unverified_context()
+    started = time.perf_counter()
+    end = started + duration
+    next_index = [0]
+
+    def error(kind: str):
+        result.errors += 1
+        result.error_kinds[kind] = result.error_kinds.get(kind, 0) + 1
+
+    async def worker():
+        connection = _Connection(target, context)
+        try:
+            while True:
+                index = next_index[0]
+                next_index[0] += 1
+                if rate:
+                    due = started + index / rate
+                    if due >= end:
+                        return
+                    delay = due - time.perf_counter()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                else:
+                    due = time.perf_counter()
+                    if due >= end:
+                        return
+                try:
+                    if connection.writer is None:
+                        await asyncio.wait_for(connection.open(), timeout)
+                        result.connections += 1
+                    path = target.paths[index % len(target.paths)]
+                    status, size, keep_alive = await asyncio.wait_for(
+                        connection.get(path), timeout
+                    )
+                except asyncio.TimeoutError:
+                    connection.close()
+                    error("timeout")
+                    continue
+                except (
+                    OSError,
+                    asyncio.IncompleteReadError,
+                    asyncio.LimitOverrunError,
+                    HTTPError,
+                    ValueError,
+                ) as e:
+                    connection.close()
+                    error(type(e).__name__)
+                    continue
+                result.latency.add((time.perf_counter() - due) * 1000)
+                result.requests += 1
+                result.bytes_received += size
+                result.statuses[status] = result.statuses.get(status, 0) + 1
+                if status >= 500:
+                    error(f"HTTP {status}")
+                if not keep_alive:
+                    connection.close()
+        finally:
+            connection.close()
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    result.elapsed = time.perf_counter() - started
+    return result
+
+
+class StubServer:
+    """In-process HTTP/1.1 keep-alive server answering every GET with a fixed body.
+
+    A stand-in for nginx when testing the generator, and a measure of the
+    generator's own ceiling on this machine.
+    """
+
+    def __init__(self, body: bytes = b'{"status":"up"}', status: int = 200):
+        self.body = body
+        self.status = status
+        self.requests = 0
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> int:
+        """Listen (port 0: any free one); returns the port."""
+        self._server = await asyncio.start_server(self._handle, host, port)
+        return self._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        response = (
+            f"HTTP/1.1 {self.status} OK\r\n"
+            "Content-Type: application/json\r\n"
+            f"Content-Length: {len(self.body)}\r\n"
+            "\r\n"
+        ).encode("ascii") + self.body
+        try:
+            while True:
+                await reader.readuntil(b"\r\n\r\n")
+                self.requests += 1
+                writer.write(response)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+
+def histogram_rows(
+    sketch: LatencySketch, rows: int = 12
+) -> List[Tuple[float, float, int]]:
+    """(low ms, high ms, count) ranges splitting the sketch's buckets evenly on a log scale."""
+    if not sketch.count:
+        return []
+    low = max(sketch.min or 0.0, 0.01)
+    high = max(sketch.max or low, low * 1.0001)
+    step = (high / low) ** (1 / rows)
+    edges = [low * step**i for i in range(rows + 1)]
+    counts = [0] * rows
+    counts[0] += sketch.zero_count
+    for index, count in sketch.buckets.items():
+        value = min(max(2 * sketch.gamma**index / (sketch.gamma + 1), low), high)
+        slot = 0
+        while slot < rows - 1 and value > edges[slot + 1]:
+            slot += 1
+        counts[slot] += count
+    return [(edges[i], edges[i + 1], counts[i]) for i in range(rows)]
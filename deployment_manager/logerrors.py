@@ -0,0 +1,466 @@
+"""Streaming fingerprinting and rate counters for Laravel errors."""
+
+import hashlib
+import json
+import os
+import re
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+try:
+    from .logrotation import cursor_state, open_log, resume_plan, skip_to
+    from .logtail import decode_line
+except ImportError:
+    from logrotation import cursor_state, open_log, resume_plan, skip_to
+    from logtail import decode_line
+
+STATE_VERSION = 1
+
+# Laravel channel line: "[2026-02-15 13:45:01] production.ERROR: message {context}"
+LARAVEL_HEADER = re.compile(
+    r"^\[(\d{4}-\d{2}-\d{2})[ T](\d{2}:\d{2}:\d{2})[^\]]*\]\s+[\w-]+\.(\w+):\s?(.*)$"
+)
+ERROR_LEVELS = {"ERROR", "CRITICAL", "ALERT", "EMERGENCY"}
+
+# NSSM AppTimestampLog prefix on every stderr line
+NSSM_PREFIX = re.compile(r"^(\d{4}-\d{2}-\d{2}) (\d{2}:\d{2}:\d{2})(?:\.\d+)?: ?")
+
+# Lines that continue the previous stderr event rather than starting a new one
+CONTINUATION = re.compile(
+    r"^(\s|#\d+ |Stack trace:|\[stacktrace\]|\[previous exception\]|Next |"
+    r"  thrown in|\"\}|\}|$)"
+)
+CLASS_LINE = re.compile(r"^\s*([A-Z]\w*(?:\\\w+)+)\s*$")
+
+EXCEPTION_PATTERNS = [
+    re.compile(r"\(([A-Za-z_\\][\w\\]*)\(code: "),  # Laravel exception context
+    re.compile(r"Uncaught ([A-Za-z_\\][\w\\]*)"),  # PHP fatal error
+    re.compile(r"^\s*([A-Z]\w*(?:\\\w+)+)\s*$", re.MULTILINE),  # Console renderer
+    re.compile(r"^([\w\\]*(?:Exception|Error))\b"),
+]
+FRAME_PATTERNS = [
+    re.compile(r"^#\d+\s+(.+)$"),  # PHP stack trace
+    re.compile(r"^\s*(?:at\s+|\d+\s+)(\S+\.php:\d+.*)$"),  # Console renderer
+]
+FILE_FRAME = re.compile(
+    r"^(?P<file>[^()]+?\.php)(?:\(\d+\)|:\d+)?(?::\s*(?P<call>.*))?$"
+)
+APP_ROOT = re.compile(r"^.*?[\\/](vendor|app|routes|database|bootstrap|config)[\\/]")
+
+# Placeholders used when a message (rather than a stack) identifies the error
+MESSAGE_NORMALISERS = [
+    (re.compile(r"'[^']*'|\"[^\"]*\""), "'?'"),
+    (
+        re.compile(r"\b[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}\b"),
+        "<uuid>",
+    ),
+    (re.compile(r"\b0x[0-9a-fA-F]+\b|\b[0-9a-f]{16,}\b"), "<hex>"),
+    (re.compile(r"\d+"), "N"),
+]
+
+TOP_FRAMES = 3
+
+# Events longer than this keep only their first lines (enough to fingerprint)
+MAX_EVENT_LINES = 200
+
+# A trailing event is only counted once its file has been idle this long;
+# until then its trace may still be being written
+SETTLE_SECONDS = 2.0
+
+# Counter tiers: per-minute for the last day, per-hour for the last 30 days.
+# A group costs at most 1440 + 720 buckets however many events it sees.
+MINUTE_RETENTION = 86400
+HOUR_RETENTION = 30 * 86400
+
+# Groups beyond this are evicted least-recently-seen first
+MAX_GROUPS = 500
+
+
+@dataclass(frozen=True)
+class ErrorSource:
+    """A log file to scan and how its events are delimited."""
+
+    label: str
+    path: Path
+    kind: str  # "laravel" or "stderr"
+
+
+@dataclass
+class ErrorEvent:
+    """One logged error, with its stack trace lines."""
+
+    when: float
+    source: str
+    lines: List[str]
+
+
+@dataclass
+class ErrorGroup:
+    """Counters for all events sharing a fingerprint."""
+
+    fingerprint: str
+    exception: str
+    message: str
+    frames: List[str]
+    first_seen: float
+    last_seen: float
+    total: int = 0
+    sources: List[str] = field(default_factory=list)
+    minutes: Dict[int, int] = field(default_factory=dict)
+    hours: Dict[int, int] = field(default_factory=dict)
+
+    def add(self, when: float, source: str):
+        """Count one event."""
+        self.total += 1
+        self.first_seen = min(self.first_seen, when)
+        self.last_seen = max(self.last_seen, when)
+        minute, hour = int(when // 60), int(when // 3600)
+        self.minutes[minute] = self.minutes.get(minute, 0) + 1
+        self.hours[hour] = self.hours.get(hour, 0) + 1
+        if source not in self.sources:
+            self.sources.append(source)
+
+    def count_since(self, since: Optional[float], now: float) -> int:
+        """Events at or after ``since`` (minute precision within the last day)."""
+        if since is None:
+            return self.total
+        if since >= now - MINUTE_RETENTION:
+            first = int(since // 60)
+            return sum(n for minute, n in self.minutes.items() if minute >= first)
+        first = int(since // 3600)
+        return sum(n for hour, n in self.hours.items() if hour >= first)
+
+    def prune(self, now: float):
+        """Drop buckets older than their tier's retention."""
+        oldest_minute = int((now - MINUTE_RETENTION) // 60)
+        oldest_hour = int((now - HOUR_RETENTION) // 3600)
+        self.minutes = {k: v for k, v in self.minutes.items() if k >= oldest_minute}
+        self.hours = {k: v for k, v in self.hours.items() if k >= oldest_hour}
+
+    def to_dict(self) -> dict:
+        """JSON-serialisable form."""
+        data = dict(self.__dict__)
+        data["minutes"] = {str(k): v for k, v in self.minutes.items()}
+        data["hours"] = {str(k): v for k, v in self.hours.items()}
+        return data
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "ErrorGroup":
+        """Inverse of to_dict()."""
+        data = dict(data)
+        data["minutes"] = {int(k): v for k, v in data.get("minutes", {}).items()}
+        data["hours"] = {int(k): v for k, v in data.get("hours", {}).items()}
+        return cls(**data)
+
+
+def _epoch(date: str, clock: str) -> Optional[float]:
+    """Local timestamp for a date and HH:MM:SS string."""
+    minute = _minute_epoch(date, clock[:5])
+    if minute is None:
+        return None
+    return minute + int(clock[6:8])
+
+
+@lru_cache(maxsize=4096)
+def _minute_epoch(date: str, clock: str) -> Optional[float]:
+    """Local timestamp of a minute (cached: consecutive events share minutes)."""
+    try:
+        return datetime.strptime(f"{date} {clock}", "%Y-%m-%d %H:%M").timestamp()
+    except ValueError:
+        return None
+
+
+@lru_cache(maxsize=4096)
+def normalise_frame(text: str) -> str:
+    """Stack frame without line numbers, arguments or install-specific paths."""
+    text = text.strip()
+    match = FILE_FRAME.match(text)
+    if match:
+        path = APP_ROOT.sub(r"\1/", match.group("file")).replace("\\", "/")
+        call = match.group("call") or ""
+    else:
+        path, call = "", text
+    call = re.sub(r"\(.*\)$", "()", call)
+    return f"{path} {call}".strip()
+
+
+def normalise_message(message: str) -> str:
+    """Message with ids, numbers and quoted values replaced by placeholders."""
+    for pattern, placeholder in MESSAGE_NORMALISERS:
+        message = pattern.sub(placeholder, message)
+    return message[:200]
+
+
+def fingerprint_event(lines: List[str]) -> Tuple[str, str, str, List[str]]:
+    """Group identity of an event.
+
+    Returns (fingerprint, exception class, message, top frames). The
+    fingerprint hashes the exception class plus the top normalised frames,
+    preferring application frames over vendor ones so errors thrown by the
+    same framework code from different call sites stay apart. Events
+    without a trace fall back to their normalised message.
+    """
+    # Laravel writes the trace inside a JSON string, doubling backslashes
+    lines = [line.replace("\\\\", "\\") for line in lines]
+    text = "\n".join(lines)
+    exception = ""
+    for pattern in EXCEPTION_PATTERNS:
+        match = pattern.search(text)
+        if match:
+            exception = match.group(1).lstrip("\\")
+            break
+
+    first = lines[0] if lines else ""
+    header = LARAVEL_HEADER.match(first)
+    message = header.group(4) if header else first.strip()
+    if CLASS_LINE.match(message):
+        message = next((line.strip() for line in lines[1:] if line.strip()), "")
+    message = re.split(r' \{"|\s\[\]', message, maxsplit=1)[0][:200]
+
+    frames, in_app = [], []
+    for line in lines[1:]:
+        for pattern in FRAME_PATTERNS:
+            match = pattern.match(line)
+            if match and "{main}" not in line:
+                frame = normalise_frame(match.group(1))
+                frames.append(frame)
+                if not frame.startswith("vendor/") and "[internal" not in frame:
+                    in_app.append(frame)
+                break
+        if len(in_app) >= TOP_FRAMES:
+            break
+    top = (in_app or frames)[:TOP_FRAMES]
+
+    identity = [exception] + (top or [normalise_message(message)])
+    digest = hashlib.sha1("\n".join(identity).encode("utf-8")).hexdigest()[:12]
+    return digest, exception, message, top
+
+
+class EventParser:
+    """Groups log lines into events (a header line plus its continuation lines)."""
+
+    def __init__(self, source: ErrorSource, default_time: float):
+        """Initialize parser.
+
+        Args:
+            source: Source being parsed (its kind decides event boundaries)
+            default_time: Time for events before the first timestamp seen
+        """
+        self.source = source
+        self.last_time = default_time
+        self.pending: Optional[ErrorEvent] = None
+        self.pending_offset = 0
+        self._pending_counted = True  # False for below-ERROR Laravel events
+
+    def feed(self, line: str, offset: int) -> Optional[ErrorEvent]:
+        """Add a line starting at ``offset``; return an event it completed, if any."""
+        if self.source.kind == "laravel":
+            header = LARAVEL_HEADER.match(line)
+            starts = header is not None
+            if header:
+                when = _epoch(header.group(1), header.group(2))
+                self.last_time = when or self.last_time
+                counted = header.group(3).upper() in ERROR_LEVELS
+        else:
+            prefix = NSSM_PREFIX.match(line)
+            if prefix:
+                when = _epoch(prefix.group(1), prefix.group(2))
+                self.last_time = when or self.last_time
+                line = line[prefix.end() :]
+            starts = not CONTINUATION.match(line) or bool(CLASS_LINE.match(line))
+            counted = True
+
+        if starts or self.pending is None:
+            completed = self.flush()
+            if not starts and not line.strip():
+                return completed  # Blank lines between events
+            self.pending = ErrorEvent(self.last_time, self.source.label, [line])
+            self.pending_offset = offset
+            # Laravel lines before any header are not an error event
+            self._pending_counted = counted if starts else self.source.kind != "laravel"
+            return completed
+
+        if len(self.pending.lines) < MAX_EVENT_LINES:
+            self.pending.lines.append(line)
+        return None
+
+    def flush(self) -> Optional[ErrorEvent]:
+        """Complete and return the pending event, if it counts as an error."""
+        event, self.pending = self.pending, None
+        if event is None or not self._pending_counted:
+            return None
+        return event
+
+
+def error_sources(backend_path: Path, logs_dir: Path) -> List[ErrorSource]:
+    """Laravel's storage/logs files plus the PHP services' stderr logs."""
+    sources = []
+    storage = backend_path / "storage" / "logs"
+    if storage.is_dir():
+        for path in sorted(storage.glob("*.log")):
+            sources.append(ErrorSource("laravel", path, "laravel"))
+    for key in ("queue", "reverb"):
+        sources.append(ErrorSource(key, logs_dir / key / "error.log", "stderr"))
+    return sources
+
+
+@dataclass
+class ScanReport:
+    """Work done by one ErrorTracker.update() call."""
+
+    files: int = 0
+    bytes_read: int = 0
+    events: int = 0
+    elapsed: float = 0.0
+    errors: List[str] = field(default_factory=list)
+
+
+class ErrorTracker:
+    """Incrementally fingerprints error events and keeps bounded counters.
+
+    Read offsets and counters are persisted in a JSON state file so each run
+    only parses what was appended since the previous one (see resume_plan()).
+    """
+
+    def __init__(self, state_path: Path, max_groups: int = MAX_GROUPS):
+        """Initialize tracker.
+
+        Args:
+            state_path: JSON file holding offsets and counters
+            max_groups: Fingerprints kept before evicting the least recently seen
+        """
+        self.state_path = state_path
+        self.max_groups = max_groups
+        self.files: Dict[str, dict] = {}
+        self.groups: Dict[str, ErrorGroup] = {}
+        self.evicted = 0
+        self._load()
+
+    def _load(self):
+        """Read saved state (a missing or unreadable file starts fresh)."""
+        try:
+            data = json.loads(self.state_path.read_text(encoding="utf-8"))
+            if data.get("version") != STATE_VERSION:
+                return
+            self.files = data.get("files", {})
+            self.groups = {
+                key: ErrorGroup.from_dict(group)
+                for key, group in data.get("groups", {}).items()
+            }
+            self.evicted = data.get("evicted", 0)
+        except (OSError, ValueError, TypeError):
+            self.files, self.groups, self.evicted = {}, {}, 0
+
+    def save(self):
+        """Write state atomically."""
+        data = {
+            "version": STATE_VERSION,
+            "files": self.files,
+            "groups": {key: group.to_dict() for key, group in self.groups.items()},
+            "evicted": self.evicted,
+        }
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        temp = self.state_path.with_name(self.state_path.name + ".tmp")
+        temp.write_text(json.dumps(data, separators=(",", ":")), encoding="utf-8")
+        os.replace(temp, self.state_path)
+
+    def update(self, sources: List[ErrorSource]) -> ScanReport:
+        """Parse everything appended to the sources since the last update."""
+        report = ScanReport()
+        started = time.perf_counter()
+        seen = set()
+        for source in sources:
+            seen.add(str(source.path))
+            try:
+                self._update_source(source, report)
+            except (OSError, EOFError, RuntimeError) as e:
+                report.errors.append(f"{source.path.name}: {e}")
+
+        # Forget offsets of files that no longer exist
+        for path in list(self.files):
+            if path not in seen and not Path(path).exists():
+                del self.files[path]
+
+        now = time.time()
+        for group in self.groups.values():
+            group.prune(now)
+        report.elapsed = time.perf_counter() - started
+        return report
+
+    def _update_source(self, source: ErrorSource, report: ScanReport):
+        """Process one source from its saved offset."""
+        path = source.path
+        key = str(path)
+        earlier, start = resume_plan(path, self.files.get(key))
+        for earlier_path, offset in earlier:
+            self._read(source, earlier_path, offset, True, report)
+
+        if not path.exists():
+            self.files.pop(key, None)
+            return
+
+        offset = start
+        if path.stat().st_size > start:
+            offset = self._read(source, path, start, False, report)
+        self.files[key] = cursor_state(path, offset)
+
+    def _read(
+        self, source: ErrorSource, path: Path, start: int, final: bool, report
+    ) -> int:
+        """Parse ``path`` from ``start``; return the offset to resume from.
+
+        Unless ``final`` (or the file has settled), a trailing event is left
+        for the next run since more of its trace may still be written.
+        """
+        mtime = path.stat().st_mtime
+        parser = EventParser(source, mtime)
+        offset = start
+        report.files += 1
+        with open_log(path) as f:
+            skip_to(f, start)
+            for raw in f:
+                event = parser.feed(decode_line(raw), offset)
+                offset += len(raw)
+                if event is not None:
+                    self._count(event)
+                    report.events += 1
+        report.bytes_read += offset - start
+
+        if final or time.time() - mtime >= SETTLE_SECONDS:
+            event = parser.flush()
+            if event is not None:
+                self._count(event)
+                report.events += 1
+            return offset
+        return parser.pending_offset if parser.pending is not None else offset
+
+    def _count(self, event: ErrorEvent):
+        """Add an event to its fingerprint's counters."""
+        digest, exception, message, frames = fingerprint_event(event.lines)
+        group = self.groups.get(digest)
+        if group is None:
+            if len(self.groups) >= self.max_groups:
+                oldest = min(self.groups.values(), key=lambda g: g.last_seen)
+                del self.groups[oldest.fingerprint]
+                self.evicted += 1
+            group = ErrorGroup(
+                digest, exception, message, frames, event.when, event.when
+            )
+            self.groups[digest] = group
+        group.add(event.when, event.source)
+
+    def top(
+        self, limit: int = 20, since: Optional[float] = None
+    ) -> List[Tuple[ErrorGroup, int]]:
+        """Groups with the most events since ``since`` (all time if None)."""
+        now = time.time()
+        counted = [
+            (group, group.count_since(since, now)) for group in self.groups.values()
+        ]
+        counted = [(group, count) for group, count in counted if count > 0]
+        counted.sort(key=lambda item: (item[1], item[0].last_seen), reverse=True)
+        return counted[:limit]
@@ -0,0 +1,198 @@
+"""Sparse timestamp index for fast time-range queries on large logs."""
+
+import bisect
+import hashlib
+import os
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+try:
+    from .logmerge import timestamp_key
+except ImportError:
+    from logmerge import timestamp_key
+
+INDEX_SUFFIX = ".idx"
+# v2: keys are always padded to milliseconds (v1 kept them as logged)
+INDEX_VERSION = "v2"
+
+# Distance between index entries. A range query seeks to an entry and scans
+# at most this many bytes before reaching the first matching line.
+DEFAULT_SPACING = 64 * 1024
+
+# How far past a boundary to look for the next timestamped line, and the
+# size of each read while looking
+READ_AHEAD = 64 * 1024
+READ_BLOCK = 4096
+
+# Leading bytes hashed to recognise the file the index was built for
+FINGERPRINT_BYTES = 512
+
+
+class LogIndex:
+    """Sidecar index mapping timestamps to byte offsets of a log file.
+
+    Entries are taken at the first timestamped line after every ``spacing``
+    bytes, stored as ``<timestamp>\\t<offset>`` lines in ``<log>.idx``. The
+    index is extended incrementally as the log grows, and rebuilt when the
+    log was rotated (different leading bytes) or truncated (shorter than the
+    indexed range).
+    """
+
+    def __init__(self, log_path: Path, spacing: int = DEFAULT_SPACING):
+        """Initialize index for a log file (nothing is read until used)."""
+        self.log_path = log_path
+        self.index_path = log_path.with_name(log_path.name + INDEX_SUFFIX)
+        self.spacing = spacing
+        self.keys: List[str] = []
+        self.offsets: List[int] = []
+        self._fingerprint: Optional[Tuple[int, str]] = None
+
+    def update(self) -> int:
+        """Bring the index up to date with the log; return entries added."""
+        size = self.log_path.stat().st_size
+
+        if not self._load() or not self._matches_log(size):
+            self._rebuild()
+
+        start = (
+            (self.offsets[-1] // self.spacing + 1) * self.spacing if self.offsets else 0
+        )
+        new_entries = self._scan(start, size)
+        if new_entries:
+            self._append(new_entries)
+        return len(new_entries)
+
+    def find_start(self, since: Optional[str]) -> int:
+        """Byte offset to start reading from to find lines at or after ``since``.
+
+        Every line before the returned offset is older than ``since``.
+        """
+        if since is None:
+            return 0
+        try:
+            self.update()
+        except OSError:
+            return 0  # Unindexable (e.g. read-only folder); scan from the start
+        position = bisect.bisect_left(self.keys, since)
+        return self.offsets[position - 1] if position > 0 else 0
+
+    def _fingerprint_of(self, length: int) -> str:
+        """Hash of the first ``length`` bytes of the log."""
+        with open(self.log_path, "rb") as f:
+            return hashlib.sha1(f.read(length)).hexdigest()
+
+    def _matches_log(self, size: int) -> bool:
+        """Whether the loaded index still describes the current log file."""
+        if self._fingerprint is None:
+            return False
+        length, digest = self._fingerprint
+        if size < length or (self.offsets and size <= self.offsets[-1]):
+            return False  # Truncated
+        if length < FINGERPRINT_BYTES and size > length:
+            return False  # Built while tiny; re-fingerprint now there is more data
+        return self._fingerprint_of(length) == digest  # Rotated if different
+
+    def _load(self) -> bool:
+        """Read the index file; return False if missing or unusable."""
+        self.keys, self.offsets, self._fingerprint = [], [], None
+        try:
+            with open(self.index_path, "r", encoding="ascii") as f:
+                header = f.readline().split()
+                fields = dict(part.split("=", 1) for part in header[2:] if "=" in part)
+                if header[:2] != ["#woosoo-logindex", INDEX_VERSION]:
+                    return False
+                if int(fields["spacing"]) != self.spacing:
+                    return False
+                self._fingerprint = (int(fields["fplen"]), fields["fp"])
+
+                for line in f:
+                    if not line.endswith("\n"):
+                        break  # Interrupted append
+                    key, offset = line.rstrip("\n").split("\t")
+                    offset = int(offset)
+                    if self.offsets and (
+                        offset <= self.offsets[-1] or key < self.keys[-1]
+                    ):
+                        continue  # Keep entries sorted for bisect
+                    self.keys.append(key)
+                    self.offsets.append(offset)
+        except (OSError, ValueError, KeyError, IndexError):
+            self.keys, self.offsets, self._fingerprint = [], [], None
+            return False
+        return True
+
+    def _rebuild(self):
+        """Start a fresh index for the current log (written atomically)."""
+        length = min(FINGERPRINT_BYTES, self.log_path.stat().st_size)
+        self._fingerprint = (length, self._fingerprint_of(length))
+        self.keys, self.offsets = [], []
+
+        header = (
+            f"#woosoo-logindex {INDEX_VERSION} spacing={self.spacing} "
+            f"fplen={length} fp={self._fingerprint[1]}\n"
+        )
+        temp_path = self.index_path.with_name(self.index_path.name + ".tmp")
+        with open(temp_path, "w", encoding="ascii") as f:
+            f.write(header)
+        os.replace(temp_path, self.index_path)
+
+    def _scan(self, start: int, size: int) -> List[Tuple[str, int]]:
+        """Find index entries for boundaries in [start, size)."""
+        entries = []
+        last_key = self.keys[-1] if self.keys else ""
+        with open(self.log_path, "rb") as f:
+            for boundary in range(start, size, self.spacing):
+                entry = self._entry_after(f, boundary, size)
+                if entry is None or entry[0] < last_key:
+                    continue
+                if entries and entry[1] <= entries[-1][1]:
+                    continue
+                entries.append(entry)
+                last_key = entry[0]
+        return entries
+
+    @staticmethod
+    def _entry_after(f, boundary: int, size: int) -> Optional[Tuple[str, int]]:
+        """First complete timestamped line starting at or after ``boundary``."""
+        # Step back one byte so a line starting exactly at the boundary is kept
+        position = max(boundary - 1, 0)
+        f.seek(position)
+        data = b""
+        skip_partial = boundary > 0
+        consumed = max(boundary - 1, 0)
+        end = min(size, consumed + READ_AHEAD)
+
+        while consumed < end:
+            block = f.read(min(READ_BLOCK, end - consumed))
+            if not block:
+                break
+            consumed += len(block)
+            data += block
+
+            if skip_partial:
+                newline = data.find(b"\n")
+                if newline < 0:
+                    continue
+                position += newline + 1
+                data = data[newline + 1 :]
+                skip_partial = False
+
+            while True:
+                newline = data.find(b"\n")
+                if newline < 0:
+                    break  # Incomplete line; read more
+                key = timestamp_key(data[:newline].decode("utf-8", errors="replace"))
+                if key is not None:
+                    return key, position
+                position += newline + 1
+                data = data[newline + 1 :]
+
+        return None
+
+    def _append(self, entries: List[Tuple[str, int]]):
+        """Append new entries to the index file."""
+        with open(self.index_path, "a", encoding="ascii") as f:
+            f.write("".join(f"{key}\t{offset}\n" for key, offset in entries))
+        for key, offset in entries:
+            self.keys.append(key)
+            self.offsets.append(offset)
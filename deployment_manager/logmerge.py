@@ -0,0 +1,226 @@
+"""Timestamp-ordered merge of several service logs."""
+
+import heapq
+import re
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+try:
+    from .logrotation import open_log, rotated_segments
+    from .logtail import LogFollower, decode_line, tail_log
+except ImportError:
+    from logrotation import open_log, rotated_segments
+    from logtail import LogFollower, decode_line, tail_log
+
+# NSSM AppTimestampLog prefix, e.g. "2026-02-15 13:45:01.123: "
+TIMESTAMP_RE = re.compile(r"^(\d{4}-\d{2}-\d{2})[ T](\d{2}:\d{2}:\d{2}(?:\.\d+)?)")
+
+RELATIVE_RE = re.compile(r"^(\d+)\s*([smhdw])$")
+RELATIVE_UNITS = {
+    "s": "seconds",
+    "m": "minutes",
+    "h": "hours",
+    "d": "days",
+    "w": "weeks",
+}
+
+# (timestamp key, source label, line)
+MergedLine = Tuple[str, str, str]
+
+
+def timestamp_key(line: str) -> Optional[str]:
+    """Extract a sortable timestamp string from a log line.
+
+    The fixed-width ISO layout sorts lexicographically in time order, so
+    lines are compared as strings without building datetime objects.
+    """
+    match = TIMESTAMP_RE.match(line)
+    if not match:
+        return None
+    return make_key(match.group(1), match.group(2))
+
+
+def make_key(date: str, clock: str) -> str:
+    """Build a timestamp key from a date and a time of day.
+
+    Fractional seconds are padded or cut to milliseconds, so a line logged
+    without them ("12:00:00") sorts with the rest of its second instead of
+    before "12:00:00.000" (what format_key() gives for a --since of 12:00).
+    """
+    seconds, _, fraction = clock.partition(".")
+    return f"{date} {seconds}.{fraction[:3]:0<3}"
+
+
+def format_key(moment: datetime) -> str:
+    """Format a datetime the way timestamp_key() returns it."""
+    return moment.strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
+
+
+def parse_time_spec(spec: str, now: Optional[datetime] = None) -> datetime:
+    """Parse ``--since``/``--until`` values.
+
+    Accepts relative durations ("90s", "15m", "1h", "2d", "1w") measured back
+    from now, or absolute local times ("2026-02-15 12:00", "2026-02-15T12:00:30",
+    "12:00" for today).
+    """
+    now = now or datetime.now()
+    spec = spec.strip()
+
+    match = RELATIVE_RE.match(spec.lower())
+    if match:
+        amount, unit = match.groups()
+        return now - timedelta(**{RELATIVE_UNITS[unit]: int(amount)})
+
+    if re.match(r"^\d{1,2}:\d{2}(:\d{2})?$", spec):
+        parts = [int(p) for p in spec.split(":")] + [0]
+        return now.replace(
+            hour=parts[0], minute=parts[1], second=parts[2], microsecond=0
+        )
+
+    try:
+        return datetime.fromisoformat(spec)
+    except ValueError:
+        raise ValueError(
+            f"Invalid time '{spec}' (use e.g. 15m, 2h, 1d, 12:00 or 2026-02-15 12:00)"
+        )
+
+
+def timestamped_lines(
+    lines: Iterator[str], since: Optional[str] = None, until: Optional[str] = None
+) -> Iterator[Tuple[str, str]]:
+    """Pair lines with timestamp keys and filter them to [since, until].
+
+    Lines without a timestamp (stack trace continuations, wrapped output)
+    inherit the timestamp of the line before them so they stay attached to it.
+    """
+    current = ""
+    for line in lines:
+        key = timestamp_key(line)
+        if key is not None:
+            current = key
+        if since is not None and current < since:
+            continue
+        if until is not None and current > until:
+            # Logs are written in time order; nothing later can match
+            break
+        yield current, line
+
+
+def read_lines(path: Path, start: int = 0) -> Iterator[str]:
+    """Stream decoded lines from a (possibly compressed) log from a byte offset."""
+    with open_log(path) as f:
+        if start:
+            f.seek(start)
+        for raw in f:
+            yield decode_line(raw)
+
+
+def merge_streams(
+    streams: Dict[str, Iterator[Tuple[str, str]]],
+) -> Iterator[MergedLine]:
+    """k-way merge of per-source (timestamp, line) streams.
+
+    heapq.merge keeps one pending line per source, so memory is bounded by
+    the number of sources, not their size. Ties keep per-source order.
+    """
+    tagged = [
+        _tag(stream, index, label)
+        for index, (label, stream) in enumerate(streams.items())
+    ]
+    for key, _, label, line in heapq.merge(*tagged):
+        yield key, label, line
+
+
+def _tag(stream: Iterator[Tuple[str, str]], index: int, label: str):
+    """Attach a source index (for stable ties) and label to a stream."""
+    for key, line in stream:
+        yield key, index, label, line
+
+
+def merge_logs(
+    sources: Dict[str, Path], since: Optional[str] = None, until: Optional[str] = None
+) -> Iterator[MergedLine]:
+    """Merge logs (optionally limited to a time range) in time order.
+
+    Each source includes its rotated segments, plain or compressed. With
+    ``since``, segments rotated before that time are skipped and seekable
+    files use their sparse index to start close to the first matching line.
+    """
+    streams = {
+        label: _source_lines(path, since, until) for label, path in sources.items()
+    }
+    return merge_streams(streams)
+
+
+def _source_lines(
+    path: Path, since: Optional[str], until: Optional[str]
+) -> Iterator[Tuple[str, str]]:
+    """(timestamp, line) pairs from a log's segments and live file, oldest first."""
+    # Imported here: logindex builds on this module's timestamp parsing
+    try:
+        from .logindex import LogIndex
+    except ImportError:
+        from logindex import LogIndex
+
+    files = []
+    previous_end = ""
+    for segment in rotated_segments(path):
+        # A segment holds lines from the previous rotation up to its own
+        if since is None or segment.rotated_key >= since:
+            files.append((segment.path, segment.compression is None, previous_end))
+        previous_end = segment.rotated_key
+    if path.exists():
+        files.append((path, True, previous_end))
+
+    for file_path, seekable, starts_after in files:
+        if until is not None and starts_after > until:
+            return
+        start = LogIndex(file_path).find_start(since) if seekable else 0
+        try:
+            yield from timestamped_lines(read_lines(file_path, start), since, until)
+        except (OSError, EOFError, RuntimeError):
+            continue  # Unreadable segment; keep going with the rest
+
+
+def merge_tails(sources: Dict[str, Path], lines: int) -> List[MergedLine]:
+    """Merge the last ``lines`` lines of every source and keep the newest ``lines``."""
+    streams = {
+        label: timestamped_lines(iter(tail_log(path, lines)))
+        for label, path in sources.items()
+    }
+    merged = list(merge_streams(streams))
+    return merged[-lines:] if lines > 0 else []
+
+
+def follow_merged(
+    sources: Dict[str, Path], poll_interval: float = 0.5
+) -> Iterator[MergedLine]:
+    """Follow several logs at once, yielding new lines in time order per poll."""
+    followers = {
+        label: LogFollower(path, from_end=True) for label, path in sources.items()
+    }
+    last_keys = {label: "" for label in sources}
+    try:
+        while True:
+            streams = {}
+            for label, follower in followers.items():
+                new_lines = follower.read_new()
+                if not new_lines:
+                    continue
+                pairs = []
+                for line in new_lines:
+                    key = timestamp_key(line)
+                    if key is not None:
+                        last_keys[label] = key
+                    pairs.append((last_keys[label], line))
+                streams[label] = iter(pairs)
+
+            if streams:
+                yield from merge_streams(streams)
+            else:
+                time.sleep(poll_interval)
+    finally:
+        for follower in followers.values():
+            follower.close()
@@ -0,0 +1,373 @@
+"""Service log rotation policies, segment compression and retention."""
+
+import gzip
+import hashlib
+import io
+import os
+import re
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterable, List, Optional, Tuple
+
+try:
+    import zstandard
+except ImportError:  # Optional: zstd compression falls back to gzip
+    zstandard = None
+
+COMPRESSED_SUFFIXES = {".gz": "gzip", ".zst": "zstd"}
+
+# Segments modified more recently than this may still be in NSSM's hands
+MIN_SEGMENT_AGE = 10
+
+# NSSM renames rotated logs to "<stem>-YYYYMMDDTHHMMSS.mmm<suffix>"
+ROTATED_STAMP = r"(\d{8}T\d{6}\.\d{3})"
+
+# Leading bytes hashed to recognise a log file across runs
+FINGERPRINT_BYTES = 512
+
+
+@dataclass
+class RotationPolicy:
+    """Rotation and retention settings for one service's logs."""
+
+    rotate_bytes: int = 50 * 1024 * 1024
+    rotate_seconds: int = 86400
+    retention_days: int = 30
+    retention_count: int = 30
+    retention_bytes: int = 1024 * 1024 * 1024
+    compression: str = "gzip"
+
+
+POLICY_KEYS = {
+    "rotate_bytes": "LOG_ROTATE_BYTES",
+    "rotate_seconds": "LOG_ROTATE_SECONDS",
+    "retention_days": "LOG_RETENTION_DAYS",
+    "retention_count": "LOG_RETENTION_COUNT",
+    "retention_bytes": "LOG_RETENTION_BYTES",
+    "compression": "LOG_COMPRESSION",
+}
+
+
+def policies_from_config(
+    config, service_keys: Iterable[str]
+) -> Dict[str, RotationPolicy]:
+    """Build per-service policies from DeploymentConfig.
+
+    Global ``LOG_*`` settings apply to every service and can be overridden
+    per service with a prefix, e.g. ``QUEUE_LOG_ROTATE_BYTES``.
+    """
+    policies = {}
+    for key in service_keys:
+        values = {}
+        for attr, setting in POLICY_KEYS.items():
+            value = getattr(config, f"log_{attr}")
+            override = config.raw_config.get(f"{key.upper()}_{setting}")
+            if override is not None:
+                value = override.lower() if attr == "compression" else int(override)
+            values[attr] = value
+        policies[key] = RotationPolicy(**values)
+    return policies
+
+
+@dataclass
+class Segment:
+    """A rotated (and possibly compressed) piece of a service log."""
+
+    path: Path
+    stamp: str  # Rotation time as YYYYMMDDTHHMMSS.mmm
+    compression: Optional[str] = None
+
+    @property
+    def rotated_key(self) -> str:
+        """Rotation time in the ``YYYY-MM-DD HH:MM:SS.mmm`` timestamp-key layout."""
+        s = self.stamp
+        return f"{s[0:4]}-{s[4:6]}-{s[6:8]} {s[9:11]}:{s[11:13]}:{s[13:]}"
+
+
+def rotated_segments(log_path: Path) -> List[Segment]:
+    """Rotated segments of a log, oldest first.
+
+    Includes NSSM-rotated plain segments and segments compressed by the
+    compactor (``.gz`` / ``.zst``).
+    """
+    pattern = re.compile(
+        rf"^{re.escape(log_path.stem)}-{ROTATED_STAMP}{re.escape(log_path.suffix)}"
+        r"(\.gz|\.zst)?$"
+    )
+    segments = {}
+    try:
+        entries = list(log_path.parent.iterdir())
+    except OSError:
+        return []
+
+    for entry in entries:
+        match = pattern.match(entry.name)
+        if not match:
+            continue
+        stamp, suffix = match.groups()
+        compression = COMPRESSED_SUFFIXES.get(suffix) if suffix else None
+        # Prefer the plain file if a compression run was interrupted midway
+        if stamp in segments and segments[stamp].compression is None:
+            continue
+        segments[stamp] = Segment(entry, stamp, compression)
+
+    return [segments[stamp] for stamp in sorted(segments)]
+
+
+def log_families(directory: Path) -> List[Path]:
+    """Live log paths in a directory, including ones only left as segments.
+
+    ``output-20260215T134501.123.log.gz`` belongs to ``output.log`` even if
+    that file does not exist (any more).
+    """
+    pattern = re.compile(rf"^(.+?)-{ROTATED_STAMP}(\.[^.]+)(\.gz|\.zst)?$")
+    families = set()
+    try:
+        entries = list(directory.iterdir())
+    except OSError:
+        return []
+
+    for entry in entries:
+        if not entry.is_file():
+            continue
+        match = pattern.match(entry.name)
+        if match:
+            families.add(directory / (match.group(1) + match.group(3)))
+        elif entry.suffix == ".log":
+            families.add(entry)
+    return sorted(families)
+
+
+def compression_for(path: Path) -> Optional[str]:
+    """Compression used for a log file, based on its suffix."""
+    return COMPRESSED_SUFFIXES.get(path.suffix)
+
+
+def open_log(path: Path) -> BinaryIO:
+    """Open a plain or compressed log segment for binary reading."""
+    compression = compression_for(path)
+    if compression == "gzip":
+        return gzip.open(path, "rb")
+    if compression == "zstd":
+        if zstandard is None:
+            raise RuntimeError(f"Reading {path.name} requires the 'zstandard' package")
+        # Buffered so callers can iterate lines like a regular file
+        return io.BufferedReader(
+            zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), closefd=True)
+        )
+    return open(path, "rb")
+
+
+def file_fingerprint(path: Path, length: int) -> str:
+    """Hash of the first ``length`` (decompressed) bytes of a log."""
+    with open_log(path) as f:
+        return hashlib.sha1(f.read(length)).hexdigest()
+
+
+def skip_to(f: BinaryIO, offset: int):
+    """Position a (possibly non-seekable) log stream at ``offset``."""
+    if not offset:
+        return
+    try:
+        f.seek(offset)
+    except (OSError, ValueError):
+        while offset > 0:
+            chunk = f.read(min(offset, 1024 * 1024))
+            if not chunk:
+                break
+            offset -= len(chunk)
+
+
+def cursor_state(path: Path, offset: int) -> dict:
+    """Saved read position in a log, recognisable after rotation."""
+    length = min(FINGERPRINT_BYTES, path.stat().st_size)
+    return {"offset": offset, "fplen": length, "fp": file_fingerprint(path, length)}
+
+
+def resume_plan(
+    path: Path, state: Optional[dict]
+) -> Tuple[List[Tuple[Path, int]], int]:
+    """Work needed to continue reading a log from a saved cursor.
+
+    Returns (earlier files to read to the end as (path, start offset), offset
+    to start the live file from). Without a cursor, already rotated segments
+    are read first. If the live file was rotated since, its rotated segment
+    (matched by leading bytes) is finished from the saved offset; if it was
+    truncated, the live file is read from the start.
+    """
+    if state is None:
+        return [(segment.path, 0) for segment in rotated_segments(path)], 0
+
+    try:
+        size = path.stat().st_size
+        if size >= max(state["offset"], state["fplen"]) and (
+            file_fingerprint(path, state["fplen"]) == state["fp"]
+        ):
+            return [], state["offset"]
+    except OSError:
+        pass
+
+    for segment in reversed(rotated_segments(path)):
+        try:
+            if file_fingerprint(segment.path, state["fplen"]) == state["fp"]:
+                return [(segment.path, state["offset"])], 0
+        except (OSError, EOFError, RuntimeError):
+            continue
+    return [], 0
+
+
+@dataclass
+class CompactionReport:
+    """Result of one compactor run."""
+
+    compressed: int = 0
+    bytes_before: int = 0
+    bytes_after: int = 0
+    deleted: int = 0
+    deleted_bytes: int = 0
+    errors: List[str] = field(default_factory=list)
+
+
+class LogCompactor:
+    """Compresses rotated segments in a worker pool and enforces retention."""
+
+    def __init__(
+        self,
+        logs_dir: Path,
+        policies: Dict[str, RotationPolicy],
+        workers: int = 2,
+    ):
+        """Initialize compactor.
+
+        Args:
+            logs_dir: Directory containing one folder per service
+            policies: Service key -> rotation policy
+            workers: Compression threads (zlib/zstd release the GIL)
+        """
+        self.logs_dir = logs_dir
+        self.policies = policies
+        self.workers = workers
+
+    def run_once(self) -> CompactionReport:
+        """Compress pending segments, then apply retention."""
+        report = CompactionReport()
+        jobs = []
+        now = time.time()
+        for key, policy in self.policies.items():
+            expired = now - policy.retention_days * 86400
+            for log_path in self._log_files(key):
+                for segment in rotated_segments(log_path):
+                    if segment.compression is not None or policy.compression == "none":
+                        continue
+                    mtime = _mtime(segment.path)
+                    if now - mtime < MIN_SEGMENT_AGE:
+                        continue  # Just rotated
+                    if policy.retention_days > 0 and mtime < expired:
+                        continue  # Retention deletes it anyway
+                    jobs.append((segment.path, policy.compression))
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            for path, before, after, error in pool.map(
+                lambda job: _compress(*job), jobs
+            ):
+                if error:
+                    report.errors.append(f"{path.name}: {error}")
+                    continue
+                report.compressed += 1
+                report.bytes_before += before
+                report.bytes_after += after
+
+        for key, policy in self.policies.items():
+            for log_path in self._log_files(key):
+                self._apply_retention(log_path, policy, report)
+
+        return report
+
+    def _log_files(self, service_key: str) -> List[Path]:
+        """Current log files of a service."""
+        service_dir = self.logs_dir / service_key
+        return [service_dir / "output.log", service_dir / "error.log"]
+
+    def _apply_retention(self, log_path: Path, policy: RotationPolicy, report):
+        """Delete the oldest segments beyond the age, count or size limits."""
+        cutoff = time.time() - policy.retention_days * 86400
+        kept = 0
+        kept_bytes = 0
+        for segment in reversed(rotated_segments(log_path)):  # Newest first
+            try:
+                size = segment.path.stat().st_size
+            except OSError:
+                continue
+            too_old = policy.retention_days > 0 and _mtime(segment.path) < cutoff
+            too_many = policy.retention_count > 0 and kept >= policy.retention_count
+            too_big = (
+                policy.retention_bytes > 0
+                and kept_bytes + size > policy.retention_bytes
+            )
+            if too_old or too_many or too_big:
+                try:
+                    segment.path.unlink()
+                    _remove_index(segment.path)
+                    report.deleted += 1
+                    report.deleted_bytes += size
+                except OSError as e:
+                    report.errors.append(f"{segment.path.name}: {e}")
+                continue
+            kept += 1
+            kept_bytes += size
+
+
+def _mtime(path: Path) -> float:
+    """Modification time (0 if the file vanished)."""
+    try:
+        return path.stat().st_mtime
+    except OSError:
+        return 0.0
+
+
+def _remove_index(path: Path):
+    """Remove the index file belonging to a segment."""
+    try:
+        path.with_name(path.name + ".idx").unlink()
+    except OSError:
+        pass
+
+
+def _compress(path: Path, compression: str):
+    """Compress one segment next to itself, atomically.
+
+    Returns (path, bytes before, bytes after, error message or None).
+    """
+    if compression == "zstd" and zstandard is None:
+        compression = "gzip"
+    suffix = ".zst" if compression == "zstd" else ".gz"
+    target = path.with_name(path.name + suffix)
+    temp = path.with_name(path.name + suffix + ".tmp")
+
+    try:
+        stat = path.stat()
+        with open(path, "rb") as src, open(temp, "wb") as raw:
+            if compression == "zstd":
+                compressor = zstandard.ZstdCompressor(level=3, threads=-1)
+                with compressor.stream_writer(raw, closefd=False) as dst:
+                    shutil.copyfileobj(src, dst, 1024 * 1024)
+            else:
+                with gzip.GzipFile(
+                    filename=path.name, mode="wb", fileobj=raw, compresslevel=6
+                ) as dst:
+                    shutil.copyfileobj(src, dst, 1024 * 1024)
+        # Keep the original mtime so age-based retention still works
+        os.utime(temp, (stat.st_atime, stat.st_mtime))
+        os.replace(temp, target)
+        path.unlink()
+        _remove_index(path)
+        return path, stat.st_size, target.stat().st_size, None
+    except Exception as e:
+        try:
+            temp.unlink()
+        except OSError:
+            pass
+        return path, 0, 0, str(e)
@@ -0,0 +1,367 @@
+"""Parallel regex search across live and rotated service logs."""
+
+import heapq
+import os
+import re
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+try:
+    import re._parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_parse
+
+try:
+    from .logmerge import make_key
+    from .logrotation import log_families, open_log, rotated_segments
+except ImportError:
+    from logmerge import make_key
+    from logrotation import log_families, open_log, rotated_segments
+
+# Plain files larger than this are split into several tasks so one busy log
+# does not serialise the whole search on a single core
+TASK_BYTES = 64 * 1024 * 1024
+
+# Bytes read per chunk inside a task
+CHUNK_BYTES = 4 * 1024 * 1024
+
+# How far before a range start to look for the timestamp its first lines inherit
+LOOKBACK_BYTES = 1024 * 1024
+
+TIMESTAMP_LINE = re.compile(
+    rb"^(\d{4}-\d{2}-\d{2})[ T](\d{2}:\d{2}:\d{2}(?:\.\d+)?)", re.MULTILINE
+)
+
+
+@dataclass(frozen=True)
+class SearchTask:
+    """A byte range of one log file (the whole file when compressed)."""
+
+    label: str
+    path: Path
+    start: int = 0
+    end: Optional[int] = None
+    # Nothing in this task is older than this timestamp key
+    starts_after: str = ""
+
+
+@dataclass
+class SearchStats:
+    """Work done by a search."""
+
+    files: int = 0
+    tasks: int = 0
+    bytes_scanned: int = 0
+    matches: int = 0
+    elapsed: float = 0.0
+    workers: int = 1
+    errors: List[str] = field(default_factory=list)
+
+    @property
+    def mb_per_second(self) -> float:
+        """Overall throughput."""
+        return self.bytes_scanned / 1024**2 / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def mb_per_second_per_core(self) -> float:
+        """Throughput divided by worker processes."""
+        return self.mb_per_second / max(self.workers, 1)
+
+
+def required_literal(pattern: str, flags: int = 0) -> Optional[str]:
+    """Longest literal every match of ``pattern`` must contain, if any.
+
+    Only top-level literal runs are considered (not alternations or optional
+    parts), which is enough for the usual "order id" or "exception class"
+    searches and never rejects a line the regex would match.
+    """
+    try:
+        parsed = sre_parse.parse(pattern, flags)
+    except Exception:
+        return None
+
+    if parsed.state.flags & re.IGNORECASE and not flags & re.IGNORECASE:
+        return None  # Inline (?i): the literal would need case folding
+
+    best = ""
+    run = []
+    for op, value in parsed:
+        if op == sre_parse.LITERAL:
+            run.append(chr(value))
+        else:
+            best = max(best, "".join(run), key=len)
+            run = []
+    best = max(best, "".join(run), key=len)
+    return best or None
+
+
+def build_tasks(
+    logs_dir: Path, services: Optional[List[str]] = None
+) -> List[SearchTask]:
+    """Split every log under ``logs_dir`` (live and rotated) into search tasks."""
+    tasks = []
+    for service_dir in sorted(p for p in logs_dir.iterdir() if p.is_dir()):
+        if services and service_dir.name not in services:
+            continue
+        for family in log_families(service_dir):
+            starts_after = ""
+            files = [
+                (s.path, s.compression is None, s.rotated_key)
+                for s in rotated_segments(family)
+            ]
+            if family.exists():
+                files.append((family, True, None))
+
+            for path, seekable, rotated_key in files:
+                try:
+                    size = path.stat().st_size
+                except OSError:
+                    continue
+                if seekable and size > TASK_BYTES:
+                    for start in range(0, size, TASK_BYTES):
+                        tasks.append(
+                            SearchTask(
+                                service_dir.name,
+                                path,
+                                start,
+                                min(start + TASK_BYTES, size),
+                                starts_after,
+                            )
+                        )
+                else:
+                    tasks.append(
+                        SearchTask(service_dir.name, path, 0, None, starts_after)
+                    )
+                if rotated_key:
+                    starts_after = rotated_key
+    return tasks
+
+
+def _line_bounds(data: bytes, position: int) -> Tuple[int, int]:
+    """Start and end (exclusive, without newline) of the line containing position."""
+    start = data.rfind(b"\n", 0, position) + 1
+    end = data.find(b"\n", position)
+    return start, (len(data) if end < 0 else end)
+
+
+def _search_chunk(
+    data: bytes,
+    regex: "re.Pattern",
+    literal: Optional[bytes],
+    fold_case: bool,
+    last_key: str,
+    limit: Optional[int],
+) -> Tuple[List[Tuple[str, bytes]], str]:
+    """Find matching lines in a chunk of whole lines.
+
+    Returns (matches as (timestamp key, line), last timestamp key seen).
+    """
+    matches = []
+    haystack = data.lower() if (literal and fold_case) else data
+    scanned_to = 0  # Timestamps before this position are accounted for in last_key
+    position = 0
+
+    while position < len(data):
+        if literal is not None:
+            hit = haystack.find(literal, position)
+            if hit < 0:
+                break
+            line_start, line_end = _line_bounds(data, hit)
+            line = data[line_start:line_end]
+            if not regex.search(line):
+                position = line_end + 1
+                continue
+        else:
+            found = regex.search(data, position)
+            if not found:
+                break
+            line_start, line_end = _line_bounds(data, found.start())
+            line = data[line_start:line_end]
+
+        # Attribute the line to the latest timestamp at or before it
+        last_key = _last_timestamp(data, scanned_to, line_end) or last_key
+        scanned_to = line_end
+
+        matches.append((last_key, line.rstrip(b"\r")))
+        if limit is not None and len(matches) >= limit:
+            return matches, last_key
+        position = line_end + 1
+
+    last_key = _last_timestamp(data, scanned_to, len(data)) or last_key
+    return matches, last_key
+
+
+def _last_timestamp(data: bytes, low: int, high: int) -> Optional[str]:
+    """Timestamp key of the last timestamped line starting in [low, high).
+
+    Walks backwards line by line, so the usual case (the line itself is
+    timestamped) costs a single match.
+    """
+    position = high
+    while True:
+        start = data.rfind(b"\n", 0, position) + 1
+        if start < low:
+            return None
+        found = TIMESTAMP_LINE.match(data, start)
+        if found:
+            return make_key(found.group(1).decode(), found.group(2).decode())
+        if start == 0:
+            return None
+        position = start - 1
+
+
+def _timestamp_before(f, offset: int) -> Optional[str]:
+    """Timestamp key of the last timestamped line starting before ``offset``."""
+    end = offset
+    while end > 0 and offset - end < LOOKBACK_BYTES:
+        start = max(end - CHUNK_BYTES // 16, 0)
+        f.seek(start)
+        data = f.read(offset - start)
+        # Only lines known to start inside the data (after its first newline)
+        low = 0 if start == 0 else data.find(b"\n") + 1
+        if low or start == 0:
+            key = _last_timestamp(data, low, len(data))
+            if key:
+                return key
+        end = start
+    return None
+
+
+def search_task(
+    task: SearchTask, pattern: str, ignore_case: bool, limit: Optional[int]
+) -> Tuple[SearchTask, List[Tuple[str, str]], int, Optional[str]]:
+    """Search one task; runs in a worker process.
+
+    Returns (task, matches as (timestamp key, line), bytes scanned, error).
+    """
+    flags = re.MULTILINE | (re.IGNORECASE if ignore_case else 0)
+    regex = re.compile(pattern.encode("utf-8"), flags)
+    literal = required_literal(pattern, re.IGNORECASE if ignore_case else 0)
+    literal_bytes = None
+    # bytes.lower() folds ASCII only, so a folded non-ASCII literal could
+    # miss lines the regex matches; search those with the regex alone
+    if literal and (literal.isascii() or not ignore_case):
+        literal_bytes = (
+            literal.lower().encode("utf-8") if ignore_case else literal.encode("utf-8")
+        )
+
+    matches: List[Tuple[str, str]] = []
+    scanned = 0
+    last_key = task.starts_after
+    try:
+        with open_log(task.path) as f:
+            if task.start:
+                # Lines starting before the range belong to the previous task;
+                # continuation lines after them inherit the last timestamp
+                # before the first whole line (the range start may cut
+                # through the timestamp of the line it lands in)
+                f.seek(task.start - 1)
+                f.readline()
+                first_line = f.tell()
+                last_key = _timestamp_before(f, first_line) or last_key
+                f.seek(first_line)
+            remaining = None if task.end is None else task.end - f.tell()
+            pending = b""
+
+            while True:
+                if remaining is None:
+                    chunk = f.read(CHUNK_BYTES)
+                else:
+                    chunk = (
+                        f.read(min(CHUNK_BYTES, remaining)) if remaining > 0 else b""
+                    )
+                    remaining -= len(chunk)
+
+                if chunk:
+                    data = pending + chunk
+                    cut = data.rfind(b"\n") + 1
+                    data, pending = data[:cut], data[cut:]
+                    if not data:
+                        continue  # No complete line yet
+                else:
+                    if pending and task.end is not None:
+                        pending += f.readline()  # Line crossing the range end
+                    if not pending:
+                        break
+                    data, pending = pending, b""
+
+                scanned += len(data)
+                left = None if limit is None else limit - len(matches)
+                found, last_key = _search_chunk(
+                    data, regex, literal_bytes, ignore_case, last_key, left
+                )
+                matches.extend(
+                    (key, line.decode("utf-8", errors="replace")) for key, line in found
+                )
+                if (limit is not None and len(matches) >= limit) or not chunk:
+                    break
+    except Exception as e:
+        return task, matches, scanned, str(e)
+
+    return task, matches, scanned, None
+
+
+def search_logs(
+    tasks: List[SearchTask],
+    pattern: str,
+    ignore_case: bool = False,
+    max_matches: Optional[int] = None,
+    workers: Optional[int] = None,
+    stats: Optional[SearchStats] = None,
+) -> Iterator[Tuple[str, str, str]]:
+    """Search tasks on a process pool, yielding (timestamp, label, line) in time order.
+
+    A match is released once every unfinished task starts after it, so
+    results stream while the search is still running. With ``max_matches``
+    the search stops (and cancels queued work) after that many matches.
+    """
+    re.compile(pattern)  # Fail fast on invalid patterns, before spawning workers
+    workers = workers or os.cpu_count() or 1
+    stats = stats if stats is not None else SearchStats()
+    stats.workers = workers
+    stats.tasks = len(tasks)
+    stats.files = len({task.path for task in tasks})
+    started = time.perf_counter()
+
+    # Oldest work first so early results can be released sooner
+    order = sorted(range(len(tasks)), key=lambda i: (tasks[i].starts_after, i))
+    pending: List[Tuple[str, int, int, str, str]] = []  # Heap of matches
+    sequence = 0
+    emitted = 0
+
+    pool = ProcessPoolExecutor(max_workers=workers)
+    try:
+        futures = {
+            pool.submit(search_task, tasks[i], pattern, ignore_case, max_matches): i
+            for i in order
+        }
+        unfinished = {i: tasks[i].starts_after for i in futures.values()}
+        running = set(futures)
+
+        while running:
+            done, running = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                index = futures[future]
+                del unfinished[index]
+                task, matches, scanned, error = future.result()
+                stats.bytes_scanned += scanned
+                if error:
+                    stats.errors.append(f"{task.path.name}: {error}")
+                for key, line in matches:
+                    heapq.heappush(pending, (key, index, sequence, task.label, line))
+                    sequence += 1
+
+            watermark = min(unfinished.values()) if unfinished else None
+            while pending and (watermark is None or pending[0][0] < watermark):
+                key, _, _, label, line = heapq.heappop(pending)
+                yield key, label, line
+                emitted += 1
+                if max_matches is not None and emitted >= max_matches:
+                    return
+    finally:
+        stats.matches = emitted
+        stats.elapsed = time.perf_counter() - started
+        pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,235 @@
+"""Fast tail and follow of service logs using reverse-seek reads."""
+
+import os
+import time
+from collections import deque
+from pathlib import Path
+from typing import Iterator, List, Optional
+
+try:
+    from .logrotation import open_log, rotated_segments
+except ImportError:
+    from logrotation import open_log, rotated_segments
+
+# Read size when scanning backwards from the end of a log
+BLOCK_SIZE = 64 * 1024
+
+# CreateFileW arguments for a read handle that lets others rename/delete
+GENERIC_READ = 0x80000000
+FILE_SHARE_ALL = 0x1 | 0x2 | 0x4  # FILE_SHARE_READ | _WRITE | _DELETE
+OPEN_EXISTING = 3
+FILE_ATTRIBUTE_NORMAL = 0x80
+
+
+def open_shared(path: Path):
+    """Open a log for binary reading without blocking its rotation.
+
+    On Windows, ``open()`` does not grant FILE_SHARE_DELETE, so while the
+    handle is held NSSM's online rotation cannot rename the log. The file is
+    opened through CreateFileW with read, write and delete sharing instead.
+    Elsewhere this is ``open(path, "rb")``.
+    """
+    if os.name != "nt":
+        return open(path, "rb")
+
+    import ctypes
+    import msvcrt
+    from ctypes import wintypes
+
+    kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+    create_file = kernel32.CreateFileW
+    create_file.restype = wintypes.HANDLE
+    create_file.argtypes = [
+        wintypes.LPCWSTR,
+        wintypes.DWORD,
+        wintypes.DWORD,
+        wintypes.LPVOID,
+        wintypes.DWORD,
+        wintypes.DWORD,
+        wintypes.HANDLE,
+    ]
+    handle = create_file(
+        str(path),
+        GENERIC_READ,
+        FILE_SHARE_ALL,
+        None,
+        OPEN_EXISTING,
+        FILE_ATTRIBUTE_NORMAL,
+        None,
+    )
+    if handle is None or handle == wintypes.HANDLE(-1).value:
+        error = ctypes.WinError(ctypes.get_last_error())
+        error.filename = str(path)
+        raise error
+    try:
+        fd = msvcrt.open_osfhandle(handle, os.O_RDONLY)
+    except OSError:
+        kernel32.CloseHandle(wintypes.HANDLE(handle))
+        raise
+    return os.fdopen(fd, "rb")
+
+
+def decode_line(raw: bytes) -> str:
+    """Decode a raw log line, tolerating invalid bytes and CRLF endings."""
+    return raw.decode("utf-8", errors="replace").rstrip("\r\n")
+
+
+def tail_lines(path: Path, lines: int = 50, block_size: int = BLOCK_SIZE) -> List[str]:
+    """Return the last ``lines`` lines of a file.
+
+    Blocks are read backwards from the end until enough newlines have been
+    seen, so the cost depends on the size of the requested lines, not on the
+    size of the file.
+    """
+    if lines <= 0:
+        return []
+
+    with open_shared(path) as f:
+        f.seek(0, os.SEEK_END)
+        position = f.tell()
+        blocks: List[bytes] = []
+        newlines = 0
+
+        # A trailing newline terminates the last line rather than starting a new one
+        if position > 0:
+            f.seek(position - 1)
+            if f.read(1) == b"\n":
+                newlines -= 1
+
+        while position > 0 and newlines < lines:
+            read_size = min(block_size, position)
+            position -= read_size
+            f.seek(position)
+            block = f.read(read_size)
+            blocks.append(block)
+            newlines += block.count(b"\n")
+
+    data = b"".join(reversed(blocks))
+    raw_lines = data.splitlines()
+    return [decode_line(raw) for raw in raw_lines[-lines:]]
+
+
+def tail_log(path: Path, lines: int = 50) -> List[str]:
+    """Last ``lines`` lines of a service log, continuing into rotated segments.
+
+    Plain segments are read backwards like the live file; compressed ones
+    cannot be seeked, so they are streamed through a bounded deque.
+    """
+    result = tail_lines(path, lines) if path.exists() else []
+    for segment in reversed(rotated_segments(path)):
+        needed = lines - len(result)
+        if needed <= 0:
+            break
+        try:
+            if segment.compression is None:
+                older = tail_lines(segment.path, needed)
+            else:
+                with open_log(segment.path) as f:
+                    older = [decode_line(raw) for raw in deque(f, maxlen=needed)]
+        except (OSError, EOFError, RuntimeError):
+            continue
+        result = older + result
+    return result
+
+
+def _file_id(stat_result: os.stat_result) -> tuple:
+    """Identity of a file across renames (inode / NTFS file index)."""
+    return (stat_result.st_dev, stat_result.st_ino)
+
+
+class LogFollower:
+    """Follows a growing log file, surviving rotation and truncation.
+
+    Rotation is detected when the path starts pointing at a different file
+    (the old handle is drained first so no lines are lost); truncation is
+    detected when the file shrinks below the current read position.
+    """
+
+    def __init__(self, path: Path, from_end: bool = True):
+        """Initialize follower.
+
+        Args:
+            path: Log file to follow
+            from_end: Start at the current end of the file instead of the start
+        """
+        self.path = path
+        self._file = None
+        self._id: Optional[tuple] = None
+        self._partial = b""
+        self._open(seek_end=from_end)
+
+    def _open(self, seek_end: bool):
+        """(Re)open the log file if it exists."""
+        self._close()
+        try:
+            self._file = open_shared(self.path)
+        except OSError:
+            return
+        self._id = _file_id(os.fstat(self._file.fileno()))
+        if seek_end:
+            self._file.seek(0, os.SEEK_END)
+
+    def _close(self):
+        """Close the current handle."""
+        if self._file:
+            self._file.close()
+        self._file = None
+        self._id = None
+        self._partial = b""
+
+    def close(self):
+        """Release the file handle."""
+        self._close()
+
+    def read_new(self) -> List[str]:
+        """Return complete lines written since the previous call."""
+        if self._file is None:
+            self._open(seek_end=False)
+            if self._file is None:
+                return []
+
+        lines = self._drain()
+
+        try:
+            current = os.stat(self.path)
+        except OSError:
+            return lines  # Rotated away and not yet recreated
+
+        if _file_id(current) != self._id:
+            # Rotated: drained the old file above, continue with the new one
+            self._open(seek_end=False)
+            lines.extend(self._drain())
+        elif current.st_size < self._file.tell():
+            # Truncated in place
+            self._file.seek(0)
+            self._partial = b""
+            lines.extend(self._drain())
+
+        return lines
+
+    def _drain(self) -> List[str]:
+        """Read everything available from the current handle."""
+        lines = []
+        while True:
+            chunk = self._file.read(BLOCK_SIZE)
+            if not chunk:
+                break
+            data = self._partial + chunk
+            parts = data.split(b"\n")
+            self._partial = parts.pop()
+            lines.extend(decode_line(raw) for raw in parts)
+        return lines
+
+
+def follow(path: Path, poll_interval: float = 0.5) -> Iterator[str]:
+    """Yield lines appended to a log until the consumer stops iterating."""
+    follower = LogFollower(path, from_end=True)
+    try:
+        while True:
+            lines = follower.read_new()
+            if lines:
+                yield from lines
+            else:
+                time.sleep(poll_interval)
+    finally:
+        follower.close()
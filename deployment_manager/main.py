@@ -5,8 +5,13 @@ Main application with TUI interface and CLI commands
 """
 
 import os
+import re
 import sys
+import time
 import click
+import multiprocessing
+from click_default_group import DefaultGroup
+from datetime import datetime
 from pathlib import Path
 from typing import Optional
 
@@ -19,6 +24,57 @@ __version__ = "2.0.0"
 from config import ConfigManager
 from validators import SystemValidator
 from services import ServiceManager, ServiceStatus
+from readiness import service_probes
+from loadgen import PERCENTILES, StubServer, Target, histogram_rows, run_load
+from wsbench import StubReverb, WsTarget, run_fanout
+from queuemonitor import (
+    MONITOR_INTERVAL,
+    Autoscaler,
+    ConnectionPool,
+    DecisionLog,
+    MySQLBackend,
+    QueueMonitor,
+    QueueMonitorError,
+    ScalingPolicy,
+    SQLiteBackend,
+)
+from metrics import MetricsCollector, MetricsServer, OperationJournal
+from timings import REGRESSION_THRESHOLD, TimingHistory
+from dashboard import DashboardSampler, history_series, watch_dashboard
+from timeseries import MetricsStore, numpy, sparkline
+from logtail import follow, tail_log
+from logrotation import (
+    LogCompactor,
+    RotationPolicy,
+    policies_from_config,
+    rotated_segments,
+)
+from backupstore import DEFAULT_EXCLUDES, BackupStore, default_roots
+from backuparchive import archive_suffix, create_archive, synthetic_tree
+from deploy import Deployer, Pipeline, StageStatus
+from buildcache import BuildCache
+from optimize import LaravelOptimizer, OptimizeError, format_boot, run_command
+from precompress import (
+    NGINX_SNIPPET,
+    manifest_path,
+    nginx_snippet,
+    precompress_assets,
+    public_dir,
+    write_if_changed,
+)
+from releases import Releases
+from backupdb import database_targets, dump_databases, restore_databases
+from backuprestore import (
+    RESTORE_TARGET_SECONDS,
+    apply_restore,
+    plan_restore,
+    services_for,
+    verify_chunks,
+)
+from accesslog import DEFAULT_LOG_FORMAT, AccessLogAnalyzer
+from logerrors import ErrorTracker, error_sources
+from logsearch import SearchStats, build_tasks, search_logs
+from logmerge import follow_merged, format_key, merge_logs, merge_tails, parse_time_spec
 from rich.console import Console
 from rich.table import Table
 from rich.panel import Panel
@@ -53,15 +109,102 @@ class DeploymentManager:
         # Initialize service manager with config (if config exists)
         try:
             config = self.config_manager.load_config()
+            self.validator.backend_dir = config.backend_dir
+            self.rotation_policies = policies_from_config(
+                config, ServiceManager.SERVICES_TEMPLATE
+            )
             self.service_manager = ServiceManager(
                 self.project_root,
                 backend_dir=config.backend_dir,
                 nginx_exe=config.nginx_exe,
                 nginx_config=config.nginx_config,
+                log_rotation={
+                    key: (policy.rotate_bytes, policy.rotate_seconds)
+                    for key, policy in self.rotation_policies.items()
+                },
+                probes=service_probes(config),
+                ready_timeout=config.service_ready_timeout,
+                queue_workers=config.queue_max_workers,
             )
+            # Extra queue workers share the queue's policy
+            for key in self.service_manager.queue_keys():
+                self.rotation_policies.setdefault(key, self.rotation_policies["queue"])
         except FileNotFoundError:
             # Config doesn't exist yet, use defaults
-            self.service_manager = ServiceManager(self.project_root)
+            self.rotation_policies = {
+                key: RotationPolicy() for key in ServiceManager.SERVICES_TEMPLATE
+            }
+            self.service_manager = ServiceManager(
+                self.project_root,
+                log_rotation={
+                    key: (policy.rotate_bytes, policy.rotate_seconds)
+                    for key, policy in self.rotation_policies.items()
+                },
+            )
+
+        # Journal service operations so the metrics exporter can see them
+        logs_dir = self.config_manager.manager_config.logs_dir
+        self.journal = OperationJournal(logs_dir / "operations.jsonl")
+        self.service_manager.add_operation_listener(self.journal.record)
+        # ...and keep their timings, with checks and deploy stages, for `stats`
+        self.history = TimingHistory(logs_dir / "timings.db")
+        self.service_manager.add_operation_listener(self.history.record)
+
+    def metrics_store(self) -> MetricsStore:
+        """Host and service metrics history (``logs/metrics.tsdb``)."""
+        return MetricsStore(
+            self.config_manager.manager_config.logs_dir / "metrics.tsdb",
+            history_series(self.service_manager.SERVICES, self.service_ports()),
+        )
+
+    def service_ports(self) -> dict:
+        """Map service keys to the local port each one should be listening on."""
+        config = self.config_manager.deployment_config
+        if config is None:
+            return {}
+        nginx_port = (
+            config.nginx_https_port if config.use_tls else config.nginx_http_port
+        )
+        return {"reverb": config.reverb_port, "nginx": nginx_port}
+
+    def backend_path(self) -> Path:
+        """Absolute path of the Laravel backend."""
+        config = self.config_manager.deployment_config
+        backend_dir = config.backend_dir if config else "apps/woosoo-nexus"
+        return self.project_root / backend_dir
+
+    def releases(self) -> Releases:
+        """Backend release directories (enabled once the backend is a link)."""
+        config = self.config_manager.deployment_config
+        return Releases(
+            self.project_root,
+            config.backend_dir if config else "apps/woosoo-nexus",
+            config.releases_keep if config else 5,
+        )
+
+    def backup_store(self, workers: Optional[int] = None) -> BackupStore:
+        """Backup store under the configured backup directory."""
+        return BackupStore(self.config_manager.manager_config.backup_dir, workers)
+
+    def service_paths(self) -> dict:
+        """Map service keys to the project paths (relative) each one runs from."""
+        config = self.config_manager.deployment_config
+        backend_dir = config.backend_dir if config else "apps/woosoo-nexus"
+        nginx_config = config.nginx_config if config else "configs/nginx.conf"
+        paths = {"reverb": [backend_dir]}
+        for key in self.service_manager.queue_keys():
+            paths[key] = [backend_dir]
+        paths["nginx"] = [Path(nginx_config).parent.as_posix()]
+        return paths
+
+    def backup_metadata(self) -> dict:
+        """Environment and version recorded with each backup."""
+        config = self.config_manager.deployment_config
+        return {
+            "environment": config.deployment_env if config else "",
+            "version": (config.app_version if config else "") or __version__,
+            "manager_version": __version__,
+        }
 
     def show_header(self):
         """Show application header."""
@@ -129,6 +272,8 @@ class DeploymentManager:
             )
 
         results = self.validator.run_all_checks()
+        for result in results:
+            self.history.record("check", result.name, result.duration, result.passed)
 
         if verbose:
             for result in results:
@@ -201,11 +346,35 @@ def cli(ctx, project_root):
 
 
 @cli.command()
+@click.option("--watch", "-w", is_flag=True, help="Keep refreshing until Ctrl+C")
+@click.option(
+    "--interval",
+    "-n",
+    default=2.0,
+    type=float,
+    help="Seconds between samples in watch mode",
+)
 @click.pass_context
-def dashboard(ctx):
+def dashboard(ctx, watch, interval):
     """Show system dashboard."""
     manager = DeploymentManager(ctx.obj["project_root"])
-    manager.show_dashboard()
+    if not watch:
+        manager.show_dashboard()
+        return
+
+    manager.show_header()
+    store = manager.metrics_store()
+    sampler = DashboardSampler(
+        manager.service_manager,
+        manager.service_ports(),
+        manager.config_manager.manager_config.logs_dir,
+        interval=interval,
+        store=store,
+    )
+    try:
+        watch_dashboard(sampler, console)
+    finally:
+        store.close()
 
 
 @cli.command()
@@ -306,42 +475,2151 @@ def uninstall(ctx, service, confirm):
         console.print(f"[{color}]{icon} {msg}[/{color}]")
 
 
-@cli.command()
+@cli.group(cls=DefaultGroup, default="tail", default_if_no_args=False)
+def logs():
+    """Read service logs."""
+
+
+@logs.command("tail")
+@click.argument("service", type=click.Choice(["reverb", "queue", "nginx", "all"]))
+@click.option("--lines", "-n", default=50, type=int, help="Number of lines to show")
+@click.option("--follow", "-f", "follow_", is_flag=True, help="Keep printing new lines")
+@click.option(
+    "--error", "-e", is_flag=True, help="Read error.log instead of output.log"
+)
+@click.option("--since", help="Only lines at or after this time (e.g. 15m, 2h, 12:00)")
+@click.option("--until", help="Only lines at or before this time")
 @click.pass_context
-def config(ctx):
-    """Show current configuration."""
+def logs_tail(ctx, service, lines, follow_, error, since, until):
+    """Show the last lines of a service log, or of all logs merged by time."""
     manager = DeploymentManager(ctx.obj["project_root"])
+    keys = list(manager.service_manager.SERVICES) if service == "all" else [service]
+    file_name = "error.log" if error else "output.log"
+    sources = {
+        key: manager.service_manager.get_log_dir(key) / file_name for key in keys
+    }
+    show_label = service == "all"
+
+    def emit(label, line):
+        if show_label:
+            console.print(Text.assemble((f"[{label}] ", "cyan"), line), highlight=False)
+        else:
+            console.print(line, markup=False, highlight=False)
+
+    has_logs = any(path.exists() or rotated_segments(path) for path in sources.values())
+    if not has_logs and not follow_:
+        for path in sources.values():
+            console.print(f"[yellow]⚠ Log not found: {path}[/yellow]")
+        return
 
     try:
-        config = manager.config_manager.load_config()
-        console.print("\n[bold cyan]Current Configuration:[/bold cyan]")
+        if since or until:
+            since_key = format_key(parse_time_spec(since)) if since else None
+            until_key = format_key(parse_time_spec(until)) if until else None
+            for _, label, line in merge_logs(sources, since_key, until_key):
+                emit(label, line)
+        elif show_label:
+            for _, label, line in merge_tails(sources, lines):
+                emit(label, line)
+        else:
+            for line in tail_log(sources[service], lines):
+                emit(service, line)
+    except ValueError as e:
+        console.print(f"[red]{e}[/red]")
+        return
 
-        table = Table(box=box.ROUNDED, show_header=True, header_style="bold magenta")
-        table.add_column("Setting", style="cyan")
-        table.add_column("Value", style="white")
+    if follow_:
+        console.print("[dim]Following - Ctrl+C to stop[/dim]")
+        try:
+            if show_label:
+                for _, label, line in follow_merged(sources):
+                    emit(label, line)
+            else:
+                for line in follow(sources[service]):
+                    emit(service, line)
+        except KeyboardInterrupt:
+            pass
 
-        summary = manager.config_manager.get_config_summary()
-        for key, value in summary.items():
-            table.add_row(key, value)
 
-        console.print(table)
+@logs.command("rotation")
+@click.option("--apply", is_flag=True, help="Apply the policies to installed services")
+@click.pass_context
+def logs_rotation(ctx, apply):
+    """Show (and optionally apply) log rotation policies."""
+    manager = DeploymentManager(ctx.obj["project_root"])
 
-        # Validate
-        valid, errors = manager.config_manager.validate_config()
-        if valid:
-            console.print("\n[green]✓ Configuration is valid[/green]")
-        else:
-            console.print("\n[red]✗ Configuration has errors:[/red]")
-            for error in errors:
-                console.print(f"  [red]• {error}[/red]")
+    table = Table(box=box.ROUNDED, show_header=True, header_style="bold magenta")
+    table.add_column("Service", style="cyan")
+    table.add_column("Rotate at", justify="right")
+    table.add_column("Rotate every", justify="right")
+    table.add_column("Keep", justify="right")
+    table.add_column("Compression", justify="center")
+    for key, policy in manager.rotation_policies.items():
+        table.add_row(
+            key,
+            f"{policy.rotate_bytes / 1024**2:.0f} MB",
+            f"{policy.rotate_seconds / 3600:g} h" if policy.rotate_seconds else "-",
+            f"{policy.retention_days} d / {policy.retention_count} files / "
+            f"{policy.retention_bytes / 1024**2:.0f} MB",
+            policy.compression,
+        )
+    console.print(table)
 
-    except FileNotFoundError as e:
-        console.print(f"[red]Configuration file not found: {e}[/red]")
+    if apply:
+        installed = manager.service_manager.managed_keys()
+        for key, policy in manager.rotation_policies.items():
+            if key not in installed:
+                continue
+            success, msg = manager.service_manager.configure_log_rotation(
+                key, policy.rotate_bytes, policy.rotate_seconds
+            )
+            icon = "✓" if success else "✗"
+            color = "green" if success else "red"
+            console.print(f"[{color}]{icon} {key}: {msg}[/{color}]")
         console.print(
-            f"[yellow]→ Copy deployment.config.env.template to deployment.config.env[/yellow]"
+            "[dim]Restart services for NSSM to pick up the new settings[/dim]"
         )
-    except Exception as e:
-        console.print(f"[red]Error loading configuration: {e}[/red]")
+
+
+@logs.command("compact")
+@click.option("--watch", is_flag=True, help="Keep running and compact periodically")
+@click.option(
+    "--interval", default=3600.0, type=float, help="Seconds between runs with --watch"
+)
+@click.option("--workers", default=2, type=int, help="Compression threads")
+@click.pass_context
+def logs_compact(ctx, watch, interval, workers):
+    """Compress rotated log segments and apply retention."""
+    manager = DeploymentManager(ctx.obj["project_root"])
+    compactor = LogCompactor(
+        manager.config_manager.manager_config.logs_dir,
+        manager.rotation_policies,
+        workers=workers,
+    )
+
+    while True:
+        started = time.perf_counter()
+        report = compactor.run_once()
+        saved = report.bytes_before - report.bytes_after
+        console.print(
+            f"[green]✓ Compressed {report.compressed} segment(s), "
+            f"saved {saved / 1024**2:.1f} MB; removed {report.deleted} old segment(s) "
+            f"({report.deleted_bytes / 1024**2:.1f} MB) "
+            f"in {time.perf_counter() - started:.1f}s[/green]"
+        )
+        for error in report.errors:
+            console.print(f"[red]✗ {error}[/red]")
+
+        if not watch:
+            return
+        try:
+            time.sleep(interval)
+        except KeyboardInterrupt:
+            return
+
+
+@logs.command("search")
+@click.argument("pattern")
+@click.option(
+    "--service",
+    "-s",
+    multiple=True,
+    type=click.Choice(["reverb", "queue", "nginx"]),
+    help="Limit to a service (repeatable)",
+)
+@click.option("--ignore-case", "-i", is_flag=True, help="Case-insensitive match")
+@click.option("--max-count", "-m", type=int, help="Stop after this many matches")
+@click.option("--first", is_flag=True, help="Stop at the first (oldest) match")
+@click.option("--workers", "-j", type=int, help="Worker processes (default: CPU count)")
+@click.option("--stats", is_flag=True, help="Report throughput when done")
+@click.pass_context
+def logs_search(ctx, pattern, service, ignore_case, max_count, first, workers, stats):
+    """Search live and rotated logs (plain or compressed) for a regex."""
+    manager = DeploymentManager(ctx.obj["project_root"])
+    logs_dir = manager.config_manager.manager_config.logs_dir
+    if not logs_dir.exists():
+        console.print(f"[yellow]⚠ No logs found in {logs_dir}[/yellow]")
+        return
+
+    tasks = build_tasks(logs_dir, list(service) or None)
+    search_stats = SearchStats()
+    try:
+        for _, label, line in search_logs(
+            tasks,
+            pattern,
+            ignore_case=ignore_case,
+            max_matches=1 if first else max_count,
+            workers=workers,
+            stats=search_stats,
+        ):
+            console.print(Text.assemble((f"[{label}] ", "cyan"), line), highlight=False)
+    except re.error as e:
+        console.print(f"[red]Invalid pattern: {e}[/red]")
+        return
+    except KeyboardInterrupt:
+        pass
+
+    for error in search_stats.errors:
+        console.print(f"[red]✗ {error}[/red]")
+    if stats:
+        console.print(
+            f"\n[dim]{search_stats.matches} match(es) in {search_stats.files} file(s), "
+            f"{search_stats.bytes_scanned / 1024**2:.1f} MB scanned in "
+            f"{search_stats.elapsed:.2f}s - {search_stats.mb_per_second:.0f} MB/s, "
+            f"{search_stats.mb_per_second_per_core:.0f} MB/s per core "
+            f"({search_stats.workers} workers)[/dim]"
+        )
+
+
+@logs.command("errors")
+@click.option("--top", "top_n", default=20, type=int, help="Number of error groups")
+@click.option("--since", help="Count events at or after this time (e.g. 1h, 2d)")
+@click.option("--reset", is_flag=True, help="Forget saved offsets and counters first")
+@click.pass_context
+def logs_errors(ctx, top_n, since, reset):
+    """Group Laravel errors by fingerprint and show the most frequent."""
+    manager = DeploymentManager(ctx.obj["project_root"])
+    logs_dir = manager.config_manager.manager_config.logs_dir
+    state_path = logs_dir / "error-fingerprints.json"
+    if reset and state_path.exists():
+        state_path.unlink()
+
+    try:
+        since_time = parse_time_spec(since).timestamp() if since else None
+    except ValueError as e:
+        console.print(f"[red]{e}[/red]")
+        return
+
+    tracker = ErrorTracker(state_path)
+    report = tracker.update(error_sources(manager.backend_path(), logs_dir))
+    tracker.save()
+
+    for error in report.errors:
+        console.print(f"[red]✗ {error}[/red]")
+    console.print(
+        f"[dim]Read {report.bytes_read / 1024**2:.1f} MB new log data "
+        f"({report.events} events) in {report.elapsed:.2f}s - "
+        f"{len(tracker.groups)} fingerprints tracked[/dim]"
+    )
+
+    groups = tracker.top(top_n, since_time)
+    if not groups:
+        console.print(
+            "[green]✓ No errors[/green]" + (f" since {since}" if since else "")
+        )
+        return
+
+    window = time.time() - since_time if since_time else None
+    table = Table(
+        title="Top Errors" + (f" (since {since})" if since else ""), box=box.ROUNDED
+    )
+    table.add_column("Fingerprint", style="dim", no_wrap=True)
+    table.add_column("Exception / Message", ratio=1)
+    table.add_column("Count", justify="right")
+    table.add_column("Rate", justify="right")
+    table.add_column("First Seen", no_wrap=True)
+    table.add_column("Last Seen", no_wrap=True)
+    table.add_column("Source")
+
+    for group, count in groups:
+        span = window or max(group.last_seen - group.first_seen, 60)
+        per_minute = count / (span / 60)
+        rate = (
+            f"{per_minute:.1f}/min" if per_minute >= 1 else f"{per_minute * 60:.1f}/h"
+        )
+        title = Text(group.exception or "(no exception)", style="bold")
+        title.append(f"\n{group.message[:80]}", style="white")
+        table.add_row(
+            group.fingerprint[:8],
+            title,
+            str(count),
+            rate,
+            datetime.fromtimestamp(group.first_seen).strftime("%m-%d %H:%M:%S"),
+            datetime.fromtimestamp(group.last_seen).strftime("%m-%d %H:%M:%S"),
+            ", ".join(group.sources),
+        )
+    console.print(table)
+    if tracker.evicted:
+        console.print(f"[dim]{tracker.evicted} rarely seen fingerprints evicted[/dim]")
+
+
+@cli.group()
+def analyze():
+    """Analyze service logs."""
+    pass
+
+
+@analyze.command("nginx")
+@click.option("--since", help="Only requests at or after this time (e.g. 1h, 2d)")
+@click.option("--top", "top_n", default=20, type=int, help="Number of routes to show")
+@click.option(
+    "--sort",
+    type=click.Choice(["count", "p50", "p95", "p99"]),
+    default="count",
+    help="Order routes by request count or a percentile",
+)
+@click.option("--reset", is_flag=True, help="Forget saved offsets and sketches first")
+@click.pass_context
+def analyze_nginx(ctx, since, top_n, sort, reset):
+    """Latency percentiles per route from the nginx access log."""
+    manager = DeploymentManager(ctx.obj["project_root"])
+    config = manager.config_manager.deployment_config
+    access_log = manager.project_root / (
+        config.nginx_access_log if config else "logs/nginx/access.log"
+    )
+    log_format = (config.nginx_log_format if config else "") or DEFAULT_LOG_FORMAT
+    logs_dir = manager.config_manager.manager_config.logs_dir
+    state_path = logs_dir / "nginx-latency.json"
+    if reset and state_path.exists():
+        state_path.unlink()
+
+    try:
+        since_time = parse_time_spec(since).timestamp() if since else None
+    except ValueError as e:
+        console.print(f"[red]{e}[/red]")
+        return
+    if not access_log.exists():
+        console.print(f"[yellow]⚠ Access log not found: {access_log}[/yellow]")
+
+    analyzer = AccessLogAnalyzer(state_path, log_format)
+    report = analyzer.update(access_log)
+    analyzer.save()
+
+    for error in report.errors:
+        console.print(f"[red]✗ {error}[/red]")
+    console.print(
+        f"[dim]Read {report.bytes_read / 1024**2:.1f} MB new log data "
+        f"({report.requests} requests) in {report.elapsed:.2f}s[/dim]"
+    )
+    if report.unparsed:
+        console.print(
+            f"[yellow]⚠ {report.unparsed} lines did not match the log format "
+            f"(NGINX_LOG_FORMAT)[/yellow]"
+        )
+
+    summary = analyzer.summary(since_time)
+    if not summary:
+        console.print(
+            "[yellow]No requests[/yellow]" + (f" since {since}" if since else "")
+        )
+        return
+
+    quantiles = {"p50": 0.5, "p95": 0.95, "p99": 0.99}
+
+    def sort_key(item):
+        stats = item[1]
+        if sort == "count":
+            return stats.latency.count
+        return stats.latency.quantile(quantiles[sort]) or 0.0
+
+    def ms(value):
+        return (
+            "-" if value is None else f"{value:.0f}" if value >= 10 else f"{value:.1f}"
+        )
+
+    table = Table(
+        title="Nginx Latency (ms)" + (f" since {since}" if since else ""),
+        box=box.ROUNDED,
+    )
+    table.add_column("Route", style="cyan")
+    table.add_column("Status")
+    table.add_column("Requests", justify="right")
+    table.add_column("p50", justify="right")
+    table.add_column("p95", justify="right")
+    table.add_column("p99", justify="right")
+    table.add_column("Max", justify="right")
+    table.add_column("Upstream p95", justify="right")
+
+    status_styles = {"2xx": "green", "3xx": "cyan", "4xx": "yellow", "5xx": "red"}
+    rows = sorted(summary.items(), key=sort_key, reverse=True)[:top_n]
+    for (route, status), stats in rows:
+        latency = stats.latency
+        table.add_row(
+            route,
+            f"[{status_styles.get(status, 'white')}]{status}[/]",
+            str(latency.count),
+            ms(latency.quantile(0.5)),
+            ms(latency.quantile(0.95)),
+            ms(latency.quantile(0.99)),
+            ms(latency.max),
+            ms(stats.upstream.quantile(0.95)),
+        )
+    console.print(table)
+
+
+@cli.group()
+def backup():
+    """Create and manage backups."""
+    pass
+
+
+def database_progress(status, verb: str):
+    """Progress callback showing per-database and combined throughput."""
+    started = time.perf_counter()
+    done = {}
+
+    def update(database, written):
+        done[database] = written
+        rate = sum(done.values()) / 1024**2 / max(time.perf_counter() - started, 1e-6)
+        parts = ", ".join(f"{name} {n / 1024**2:.0f} MB" for name, n in done.items())
+        status.update(f"{verb} databases... {parts} ({rate:.0f} MB/s)")
+
+    return update
+
+
+@backup.command("create")
+@click.option("--description", "-d", default="", help="Why this backup was made")
+@click.option("--workers", "-j", type=int, help="Hashing threads")
+@click.option(
+    "--archive",
+    is_flag=True,
+    help="Write a single compressed archive instead of a snapshot",
+)
+@click.option(
+    "--output", "-o", type=click.Path(path_type=Path), help="Archive file to write"
+)
+@click.option(
+    "--compression",
+    type=click.Choice(["zstd", "gzip"]),
+    default="zstd",
+    help="Archive compression",
+)
+@click.option(
+    "--include-database", is_flag=True, help="Also dump DB_NAME and DB_POS_NAME"
+)
+@click.pass_context
+def backup_create(
+    ctx, description, workers, archive, output, compression, include_database
+):
+    """Snapshot configs and app directories into the deduplicated store."""
+    manager = DeploymentManager(ctx.obj["project_root"])
+    config = manager.config_manager.deployment_config
+    store = manager.backup_store(workers)
+    excludes = DEFAULT_EXCLUDES + (config.backup_exclude if config else [])
+
+    if include_database and (archive or config is None):
+        reason = "with --archive" if archive else "without deployment.config.env"
+        console.print(f"[red]✗ --include-database is not available {reason}[/red]")
+        sys.exit(1)
+
+    if archive:
+        if output is None:
+            name = datetime.now().strftime("%Y-%m-%d_%H-%M-%S") + archive_suffix(
+                compression
+            )
+            output = (
+                manager.config_manager.manager_config.backup_dir / "archives" / name
+            )
+        metadata = {"description": description, **manager.backup_metadata()}
+
+        with console.status("Writing archive...") as status:
+
+            def archive_progress(files, written):
+                status.update(
+                    f"Writing archive... {files} files, {written / 1024**2:.0f} MB"
+                )
+
+            report = create_archive(
+                manager.project_root,
+                default_roots(config),
+                excludes,
+                output,
+                metadata=metadata,
+                compression=compression,
+                workers=workers,
+                progress=archive_progress,
+            )
+
+        for error in report.errors:
+            console.print(f"[red]✗ {error}[/red]")
+        console.print(f"[green]✓ Archive written to {report.path}[/green]")
+        console.print(
+            f"  {report.files} files, {report.bytes_in / 1024**2:.1f} MB → "
+            f"{report.bytes_out / 1024**2:.1f} MB in {report.elapsed:.2f}s "
+            f"({report.mb_per_second:.0f} MB/s)"
+        )
+        return
+
+    metadata = manager.backup_metadata()
+    dumps = None
+    if include_database:
+        with console.status("Dumping databases...") as status:
+            results = dump_databases(
+                store.chunks,
+                config.mysqldump_path,
+                database_targets(config),
+                progress=database_progress(status, "Dumping"),
+            )
+        for result in results:
+            if result.error:
+                console.print(f"[red]✗ {result.database}: {result.error}[/red]")
+            else:
+                console.print(
+                    f"[green]✓ {result.database}: "
+                    f"{result.bytes / 1024**2:.1f} MB dumped, "
+                    f"{result.stored_bytes / 1024**2:.1f} MB stored in "
+                    f"{result.elapsed:.1f}s ({result.mb_per_second:.0f} MB/s)[/green]"
+                )
+        if any(result.error for result in results):
+            console.print("[red]✗ Database dump failed; no snapshot created[/red]")
+            sys.exit(1)
+        dumps = [result.entry for result in results]
+        metadata["database_stored_bytes"] = sum(r.stored_bytes for r in results)
+
+    with console.status("Creating snapshot...") as status:
+
+        def progress(done, total):
+            status.update(f"Hashing changed files... {done}/{total}")
+
+        report = store.create_snapshot(
+            manager.project_root,
+            default_roots(config),
+            excludes,
+            description=description,
+            metadata=metadata,
+            progress=progress,
+            databases=dumps,
+        )
+
+    for error in report.errors:
+        console.print(f"[red]✗ {error}[/red]")
+    console.print(f"[green]✓ Snapshot {report.snapshot_id} created[/green]")
+    console.print(
+        f"  {report.files} files ({report.total_bytes / 1024**2:.1f} MB), "
+        f"{report.unchanged} unchanged, {report.hashed} hashed "
+        f"({report.hashed_bytes / 1024**2:.1f} MB)"
+    )
+    console.print(
+        f"  {report.new_chunks} new chunks, "
+        f"{report.stored_bytes / 1024**2:.1f} MB stored in {report.elapsed:.2f}s"
+    )
+
+
+@backup.command("list")
+@click.option("--limit", "-n", default=20, type=int, help="Number of backups to show")
+@click.pass_context
+def backup_list(ctx, limit):
+    """List snapshots, newest first."""
+    manager = DeploymentManager(ctx.obj["project_root"])
+    store = manager.backup_store()
+    entries = store.list_snapshots(limit)
+    if not entries:
+        console.print("[yellow]No backups yet[/yellow]")
+        return
+
+    table = Table(title="Backups", box=box.ROUNDED)
+    table.add_column("ID", style="cyan", no_wrap=True)
+    table.add_column("Created", no_wrap=True)
+    table.add_column("Files", justify="right")
+    table.add_column("Size", justify="right")
+    table.add_column("Database", justify="right")
+    table.add_column("New Data", justify="right")
+    table.add_column("Description")
+    for entry in entries:
+        database = entry.includes.get("database")
+        table.add_row(
+            entry.snapshot_id,
+            entry.created_at[:19].replace("T", " "),
+            str(entry.file_count),
+            f"{entry.size_bytes / 1024**2:.1f} MB",
+            f"{entry.database_bytes / 1024**2:.1f} MB" if database else "-",
+            f"{entry.stored_bytes / 1024**2:.1f} MB",
+            entry.description,
+        )
+    console.print(table)
+    total = store.catalog.count()
+    if total > len(entries):
+        console.print(f"[dim]Showing {len(entries)} of {total} (use --limit)[/dim]")
+
+
+@backup.command("cleanup")
+@click.option(
+    "--older-than",
+    default="30d",
+    help="Remove backups created before this (e.g. 30d, 2w, 2026-01-31)",
+)
+@click.option(
+    "--keep-minimum", default=5, type=int, help="Always keep this many newest backups"
+)
+@click.option("--dry-run", is_flag=True, help="Show what would be removed")
+@click.pass_context
+def backup_cleanup(ctx, older_than, keep_minimum, dry_run):
+    """Apply retention and delete chunks no backup references."""
+    try:
+        cutoff = parse_time_spec(older_than)
+    except ValueError as e:
+        console.print(f"[red]✗ {e}[/red]")
+        sys.exit(1)
+
+    manager = DeploymentManager(ctx.obj["project_root"])
+    store = manager.backup_store()
+    with console.status("Applying retention..."):
+        report = store.cleanup(cutoff, keep_minimum, dry_run=dry_run)
+
+    verb = "Would remove" if dry_run else "Removed"
+    for snapshot_id in report.removed:
+        console.print(f"  [red]-[/red] {snapshot_id}")
+    console.print(
+        f"[green]✓ {verb} {len(report.removed)} backups, kept {report.kept}[/green]"
+    )
+    console.print(
+        f"  {verb} {report.chunks_deleted} unreferenced chunks "
+        f"({report.bytes_freed / 1024**2:.1f} MB) in {report.elapsed:.2f}s"
+    )
+
+
+@backup.command("repair-catalog")
+@click.pass_context
+def backup_repair_catalog(ctx):
+    """Rebuild the backup catalog from the snapshot directories."""
+    manager = DeploymentManager(ctx.obj["project_root"])
+    store = manager.backup_store()
+    with console.status("Re-indexing snapshots..."):
+        count = store.rebuild_catalog()
+    console.print(f"[green]✓ Catalog rebuilt: {count} snapshots indexed[/green]")
+
+
+@backup.command("restore")
+@click.argument("snapshot_id")
+@click.option(
+    "--dry-run", is_flag=True, help="Show what would change without restoring"
+)
+@click.option("--workers", "-j", type=int, help="Hashing and restore threads")
+@click.option("--confirm", is_flag=True, help="Skip confirmation prompt")
+@click.option(
+    "--include-database", is_flag=True, help="Also load the snapshot's database dumps"
+)
+@click.option(
+    "--delete",
+    is_flag=True,
+    help="Remove files the snapshot lacks (never under storage/ or .env*)",
+)
+@click.pass_context
+def backup_restore(
+    ctx, snapshot_id, dry_run, workers, confirm, include_database, delete
+):
+    """Restore a snapshot, rewriting only the files that differ."""
+    started = time.perf_counter()
+    manager = DeploymentManager(ctx.obj["project_root"])
+    config = manager.config_manager.deployment_config
+    store = manager.backup_store(workers)
+    if snapshot_id not in store.snapshot_ids():
+        console.print(f"[red]✗ Unknown snapshot: {snapshot_id}[/red]")
+        sys.exit(1)
+    excludes = DEFAULT_EXCLUDES + (config.backup_exclude if config else [])
+
+    with console.status("Comparing snapshot with the live tree..."):
+        plan = plan_restore(
+            store, snapshot_id, manager.project_root, excludes, workers, delete
+        )
+    affected = services_for(plan.changed_paths, manager.service_paths())
+
+    dumps = store.database_entries(snapshot_id) if include_database else []
+    targets = {}
+    if include_database:
+        targets = {t.name: t for t in database_targets(config)} if config else {}
+        unknown = [entry.path for entry in dumps if entry.path not in targets]
+        if not dumps or unknown:
+            reason = f"unknown databases {', '.join(unknown)}" if dumps else "no dumps"
+            console.print(f"[red]✗ Cannot restore databases: {reason}[/red]")
+            sys.exit(1)
+        # The backend's services hold database connections
+        backend_services = ["reverb"] + manager.service_manager.queue_keys()
+        affected += [key for key in backend_services if key not in affected]
+
+    console.print(
+        f"\n[bold cyan]Restore plan for {snapshot_id}[/bold cyan] "
+        f"[dim]({plan.elapsed:.2f}s, {plan.hashed} files hashed)[/dim]"
+    )
+    console.print(
+        f"  {len(plan.create)} to create, {len(plan.update)} to update, "
+        f"{len(plan.delete)} to delete, {len(plan.touch)} mtime-only, "
+        f"{plan.unchanged} unchanged ({plan.restore_bytes / 1024**2:.1f} MB to write)"
+    )
+    if plan.kept:
+        hint = "protected" if delete else "use --delete to remove"
+        console.print(
+            f"  {len(plan.kept)} live-only files kept ({hint})", highlight=False
+        )
+    for entry in dumps:
+        console.print(f"  Database {entry.path}: {entry.size / 1024**2:.1f} MB to load")
+    console.print(f"  Services to restart: {', '.join(affected) or 'none'}")
+
+    if dry_run:
+        changes = [("[green]+[/green]", e.path) for e in plan.create] + [
+            ("[yellow]~[/yellow]", e.path) for e in plan.update
+        ]
+        for marker, path in changes[:200]:
+            console.print(f"  {marker} {path}", highlight=False)
+        if len(changes) > 200:
+            console.print(f"  [dim]... and {len(changes) - 200} more[/dim]")
+        if plan.delete:
+            console.print(f"\n[bold red]To delete ({len(plan.delete)})[/bold red]")
+            for path in plan.delete[:200]:
+                console.print(f"  [red]-[/red] {path}", highlight=False)
+            if len(plan.delete) > 200:
+                console.print(f"  [dim]... and {len(plan.delete) - 200} more[/dim]")
+        return
+
+    if not plan.writes and not plan.delete and not plan.touch and not dumps:
+        console.print("[green]✓ Live tree already matches the snapshot[/green]")
+        return
+
+    with console.status("Verifying snapshot checksums...") as status:
+
+        def verify_progress(done, total):
+            status.update(f"Verifying snapshot checksums... {done}/{total} chunks")
+
+        errors = verify_chunks(
+            store, plan.writes + dumps, workers, progress=verify_progress
+        )
+    if errors:
+        for error in errors[:20]:
+            console.print(f"[red]✗ {error}[/red]")
+        console.print("[red]✗ Snapshot failed verification; nothing was changed[/red]")
+        sys.exit(1)
+    console.print("[green]✓ Snapshot checksums verified[/green]")
+
+    # Time spent at the prompt is not part of the restore
+    prepared = time.perf_counter() - started
+    if not confirm:
+        if not click.confirm(f"Restore {snapshot_id} over the live tree?"):
+            return
+    applying = time.perf_counter()
+
+    # Only stop services that are running and use changed files
+    service_manager = manager.service_manager
+    names = {key: service_manager.SERVICES[key]["name"] for key in affected}
+    statuses = service_manager.get_services_status(list(names.values()))
+    to_restart = [
+        key for key in affected if statuses.get(names[key]) == ServiceStatus.RUNNING
+    ]
+    down_since = time.perf_counter()
+    for key in to_restart:
+        success, msg = service_manager.stop_service(key)
+        icon, color = ("✓", "green") if success else ("✗", "red")
+        console.print(f"[{color}]{icon} {msg}[/{color}]")
+
+    try:
+        with console.status("Restoring files...") as status:
+
+            def restore_progress(done, total):
+                status.update(f"Restoring files... {done}/{total}")
+
+            report = apply_restore(
+                store, plan, manager.project_root, workers, progress=restore_progress
+            )
+        if dumps:
+            with console.status("Loading databases...") as status:
+                results = restore_databases(
+                    store.chunks,
+                    config.mysql_path,
+                    [(targets[entry.path], entry) for entry in dumps],
+                    progress=database_progress(status, "Loading"),
+                )
+            for result in results:
+                if result.error:
+                    report.errors.append(f"{result.database}: {result.error}")
+                else:
+                    console.print(
+                        f"[green]✓ {result.database}: "
+                        f"{result.bytes / 1024**2:.1f} MB loaded in "
+                        f"{result.elapsed:.1f}s ({result.mb_per_second:.0f} MB/s)[/green]"
+                    )
+    finally:
+        for key in to_restart:
+            success, msg = service_manager.start_service(key)
+            icon, color = ("✓", "green") if success else ("✗", "red")
+            console.print(f"[{color}]{icon} {msg}[/{color}]")
+    downtime = time.perf_counter() - down_since
+
+    for error in report.errors:
+        console.print(f"[red]✗ {error}[/red]")
+    console.print(
+        f"[green]✓ Restored {report.written} files "
+        f"({report.written_bytes / 1024**2:.1f} MB), deleted {report.deleted}, "
+        f"reset mtime on {report.touched}[/green]"
+    )
+    applied = time.perf_counter() - applying
+    elapsed = prepared + applied
+    color = "green" if elapsed <= RESTORE_TARGET_SECONDS else "red"
+    console.print(
+        f"[{color}]  Elapsed {elapsed:.1f}s (target {RESTORE_TARGET_SECONDS}s): "
+        f"plan and verify {prepared:.1f}s, apply {applied:.1f}s, "
+        f"services down {downtime:.1f}s[/{color}]"
+    )
+    if report.errors:
+        sys.exit(1)
+
+
+@cli.command()
+@click.option(
+    "--plan", "show_plan", is_flag=True, help="Show the stages without running"
+)
+@click.option("--skip", multiple=True, help="Stage to skip (repeatable)")
+@click.option("--no-rollback", is_flag=True, help="Leave a failed deploy in place")
+@click.option(
+    "--skip-database-backup", is_flag=True, help="Back up files only before deploying"
+)
+@click.option("--jobs", "-j", type=float, help="CPUs concurrent stages may use")
+@click.option(
+    "--no-build-cache", is_flag=True, help="Always install dependencies and build"
+)
+@click.option(
+    "--source",
+    type=click.Path(exists=True, file_okay=False, path_type=Path),
+    help="Backend tree for the new release (releases only; default: active one)",
+)
+@click.pass_context
+def deploy(
+    ctx,
+    show_plan,
+    skip,
+    no_rollback,
+    skip_database_backup,
+    jobs,
+    no_build_cache,
+    source,
+):
+    """Back up, build, migrate and restart; roll back if anything fails."""
+    manager = DeploymentManager(ctx.obj["project_root"])
+    config = manager.config_manager.deployment_config
+    if config is None:
+        console.print("[red]✗ deploy needs deployment.config.env[/red]")
+        sys.exit(1)
+    releases = manager.releases()
+    if source and not releases.enabled:
+        console.print("[red]✗ --source needs releases: run 'release init' first[/red]")
+        sys.exit(1)
+
+    deployer = Deployer(
+        manager.project_root,
+        manager.config_manager,
+        manager.service_manager,
+        manager.backup_store(),
+        default_roots(config),
+        DEFAULT_EXCLUDES + config.backup_exclude,
+        manager.service_ports(),
+        manager.backup_metadata(),
+        include_database=not skip_database_backup,
+        build_cache=(
+            None
+            if no_build_cache
+            else BuildCache(manager.config_manager.manager_config.cache_dir / "build")
+        ),
+        releases=releases if releases.enabled else None,
+        release_source=source,
+    )
+    stages = deployer.stages()
+    unknown = set(skip) - {stage.name for stage in stages}
+    if unknown:
+        console.print(f"[red]✗ Unknown stage: {', '.join(sorted(unknown))}[/red]")
+        console.print(f"  Stages: {', '.join(stage.name for stage in stages)}")
+        sys.exit(1)
+
+    colors = ["cyan", "magenta", "blue", "green", "yellow"]
+    stage_colors = {
+        stage.name: colors[i % len(colors)] for i, stage in enumerate(stages)
+    }
+
+    def output(stage, line):
+        console.print(
+            Text.assemble((f"[{stage}] ", stage_colors.get(stage, "yellow")), line),
+            highlight=False,
+        )
+
+    logs_dir = manager.config_manager.manager_config.logs_dir
+    pipeline = Pipeline(
+        stages, output, logs_dir / "deploy" / deployer.deploy_id, cpu_limit=jobs
+    )
+
+    if show_plan:
+        table = Table(title="Deploy Stages", box=box.ROUNDED)
+        table.add_column("Stage", style="cyan", no_wrap=True)
+        table.add_column("Needs")
+        table.add_column("CPUs", justify="right")
+        table.add_column("Memory", justify="right")
+        table.add_column("Does")
+        for name in pipeline.order:
+            stage = pipeline.stages[name]
+            table.add_row(
+                f"[dim]{name} (skipped)[/dim]" if name in skip else name,
+                ", ".join(stage.needs) or "-",
+                f"{stage.cpus:g}",
+                f"{stage.memory_mb} MB",
+                stage.description,
+            )
+        console.print(table)
+        console.print(f"[dim]CPU budget: {pipeline.cpu_limit:g}[/dim]")
+        return
+
+    rollback_enabled = (
+        manager.config_manager.manager_config.auto_rollback_on_failure
+        and not no_rollback
+    )
+    if "backup" in skip and rollback_enabled:
+        console.print(
+            "[yellow]⚠ Backup skipped: a failure cannot be rolled back[/yellow]"
+        )
+
+    console.print(f"\n[bold cyan]Deploy {deployer.deploy_id}[/bold cyan]")
+    started = time.perf_counter()
+    results = pipeline.run(set(skip))
+    elapsed = time.perf_counter() - started
+    for name, result in results.items():
+        if result.started:
+            manager.history.record(
+                "deploy-stage", name, result.elapsed, result.status == StageStatus.OK
+            )
+    manager.history.record(
+        "deploy",
+        "",
+        elapsed,
+        not any(r.status == StageStatus.FAILED for r in results.values()),
+    )
+
+    styles = {
+        StageStatus.OK: "[green]✓ ok[/green]",
+        StageStatus.FAILED: "[red]✗ failed[/red]",
+        StageStatus.SKIPPED: "[yellow]○ skipped[/yellow]",
+        StageStatus.CANCELLED: "[dim]○ cancelled[/dim]",
+    }
+    table = Table(title="Deploy Summary", box=box.ROUNDED)
+    table.add_column("Stage", style="cyan", no_wrap=True)
+    table.add_column("Result", no_wrap=True)
+    table.add_column("Time", justify="right")
+    table.add_column("Details")
+    for name in pipeline.order:
+        result = results[name]
+        table.add_row(
+            name,
+            styles.get(result.status, result.status.value),
+            f"{result.elapsed:.1f}s" if result.started else "-",
+            result.error,
+        )
+    console.print(table)
+
+    if deployer.cache_results:
+        outcomes = {
+            "hit": "[green]✓ hit[/green]",
+            "restored": "[green]✓ restored[/green]",
+            "miss": "[yellow]○ miss[/yellow]",
+        }
+        cache_table = Table(title="Build Cache", box=box.ROUNDED)
+        cache_table.add_column("App", style="cyan", no_wrap=True)
+        cache_table.add_column("Kind")
+        cache_table.add_column("Result", no_wrap=True)
+        cache_table.add_column("Time", justify="right")
+        cache_table.add_column("Key", style="dim")
+        for result in deployer.cache_results:
+            cache_table.add_row(
+                result.app,
+                result.kind,
+                outcomes[result.outcome],
+                f"{result.elapsed:.1f}s",
+                result.key[:12],
+            )
+        console.print(cache_table)
+
+    if deployer.precompress_report and deployer.precompress_report.by_type:
+        console.print(precompress_table(deployer.precompress_report))
+
+    if deployer.switch_seconds is not None:
+        console.print(
+            f"[dim]Release {deployer.release_id} live; switch and reload took "
+            f"{deployer.switch_seconds:.1f}s[/dim]"
+        )
+    if deployer.boot_times:
+        console.print(
+            f"[dim]Backend cold boot: {format_boot(*deployer.boot_times)}[/dim]"
+        )
+
+    if not any(r.status == StageStatus.FAILED for r in results.values()):
+        console.print(f"[green]✓ Deployed in {elapsed:.1f}s[/green]")
+        return
+
+    console.print(f"[red]✗ Deploy failed after {elapsed:.1f}s[/red]")
+    changed_anything = any(r.started for name, r in results.items() if name != "backup")
+    if rollback_enabled and changed_anything:
+        console.print("\n[bold yellow]Rolling back...[/bold yellow]")
+        if deployer.rollback(results, lambda line: output("rollback", line)):
+            console.print("[green]✓ Rolled back to the pre-deploy snapshot[/green]")
+        else:
+            console.print("[red]✗ Rollback incomplete; check the output above[/red]")
+    elif deployer.snapshot_id:
+        console.print(
+            f"[yellow]→ Roll back with: backup restore {deployer.snapshot_id}[/yellow]"
+        )
+    sys.exit(1)
+
+
+@cli.command()
+@click.option(
+    "--status", "show_status", is_flag=True, help="Show cache state without rebuilding"
+)
+@click.pass_context
+def optimize(ctx, show_status):
+    """Build and verify the Laravel production caches."""
+    manager = DeploymentManager(ctx.obj["project_root"])
+    backend = manager.backend_path()
+    if not (backend / "artisan").exists():
+        console.print(f"[red]✗ No Laravel app at {backend}[/red]")
+        sys.exit(1)
+    tools = manager.config_manager.manager_config
+    optimizer = LaravelOptimizer(backend, tools.php_path, tools.composer_path)
+
+    report = None
+    failed = False
+    if not show_status:
+        console.print(f"\n[bold cyan]Optimizing {backend}[/bold cyan]")
+
+        def run(command, cwd):
+            started = time.perf_counter()
+            with console.status(f"{' '.join(command)}..."):
+                run_command(command, cwd)
+            console.print(
+                f"[green]✓[/green] {' '.join(command)} "
+                f"[dim]({time.perf_counter() - started:.1f}s)[/dim]"
+            )
+
+        try:
+            report = optimizer.optimize(run)
+        except OptimizeError as e:
+            console.print(f"[red]✗ {e}[/red]")
+            failed = True
+
+    table = Table(title="Laravel Caches", box=box.ROUNDED)
+    table.add_column("Cache", style="cyan", no_wrap=True)
+    table.add_column("File")
+    table.add_column("Built", no_wrap=True)
+    table.add_column("State")
+    for status in optimizer.status():
+        if not status.exists:
+            state = "[yellow]○ missing[/yellow]"
+        elif status.stale:
+            state = f"[red]✗ stale: {status.newest_source} is newer[/red]"
+        else:
+            state = "[green]✓ current[/green]"
+        table.add_row(
+            status.name,
+            status.output,
+            (
+                datetime.fromtimestamp(status.built_at).strftime("%Y-%m-%d %H:%M:%S")
+                if status.exists
+                else "-"
+            ),
+            state,
+        )
+    console.print(table)
+
+    if report is not None:
+        console.print(
+            f"[green]✓ Cold boot: {format_boot(report.boot_before, report.boot_after)}"
+            "[/green]"
+        )
+    if failed:
+        sys.exit(1)
+
+
+def precompress_table(report) -> Table:
+    """Bytes per asset type: original, each variant, and saved per full load."""
+
+    def kb(value: int) -> str:
+        return f"{value / 1024:,.0f} KB"
+
+    table = Table(title="PWA Assets", box=box.ROUNDED)
+    table.add_column("Type", style="cyan", no_wrap=True)
+    table.add_column("Files", justify="right")
+    table.add_column("Original", justify="right")
+    table.add_column("gzip", justify="right")
+    table.add_column("brotli", justify="right")
+    table.add_column("Saved", justify="right")
+    types = sorted(report.by_type.items(), key=lambda item: -item[1].saved_bytes)
+    for suffix, stats in types:
+        table.add_row(
+            suffix,
+            str(stats.files),
+            kb(stats.original_bytes),
+            kb(stats.gzip_bytes),
+            kb(stats.brotli_bytes) if report.brotli else "-",
+            (
+                f"{kb(stats.saved_bytes)} "
+                f"({stats.saved_bytes / stats.original_bytes:.0%})"
+            ),
+        )
+    return table
+
+
+@cli.command()
+@click.option("--no-brotli", is_flag=True, help="Write .gz files only")
+@click.option("--workers", type=int, help="Compression threads (default: CPU count)")
+@click.pass_context
+def precompress(ctx, no_brotli, workers):
+    """Precompress the PWA build for nginx gzip_static and write its cache rules."""
+    manager = DeploymentManager(ctx.obj["project_root"])
+    config = manager.config_manager.deployment_config
+    if config is None:
+        console.print("[red]✗ precompress needs deployment.config.env[/red]")
+        sys.exit(1)
+    public = public_dir(manager.project_root / config.pwa_dir)
+    if public is None:
+        console.print(f"[red]✗ No build output in {config.pwa_dir}[/red]")
+        sys.exit(1)
+
+    manifest = manifest_path(
+        manager.config_manager.manager_config.cache_dir, config.pwa_dir
+    )
+    with console.status("Compressing...") as status:
+
+        def progress(done, total):
+            status.update(f"Compressing... {done}/{total}")
+
+        report = precompress_assets(
+            public, manifest, workers, use_brotli=not no_brotli, progress=progress
+        )
+
+    for error in report.errors:
+        console.print(f"[red]✗ {error}[/red]")
+    if report.by_type:
+        console.print(precompress_table(report))
+    console.print(
+        f"[green]✓ {report.compressed} compressed, {report.unchanged} unchanged, "
+        f"{report.removed} stale removed in {report.elapsed:.1f}s[/green]"
+    )
+    if not report.brotli and not no_brotli:
+        console.print("[dim]Install brotli for .br files as well[/dim]")
+
+    snippet = manager.project_root / Path(config.nginx_config).parent / NGINX_SNIPPET
+    if write_if_changed(
+        snippet, nginx_snippet(public, report.hashed_dirs, report.brotli)
+    ):
+        console.print(f"[green]✓ Wrote {snippet}[/green]")
+        console.print(
+            f"[yellow]→ Include it from the PWA's server block: "
+            f"include {NGINX_SNIPPET};[/yellow]"
+        )
+    if report.errors:
+        sys.exit(1)
+
+
+@cli.group()
+def release():
+    """Blue/green backend releases (switch and roll back instantly)."""
+    pass
+
+
+def switch_release(manager: DeploymentManager, releases: Releases, release_id: str):
+    """Activate a release and gracefully reload the services."""
+    try:
+        switched = releases.activate(release_id)
+    except FileNotFoundError as e:
+        console.print(f"[red]✗ {e}[/red]")
+        sys.exit(1)
+    console.print(
+        f"[green]✓ Switched to {release_id} ({switched * 1000:.0f} ms)[/green]"
+    )
+    started = time.perf_counter()
+    failed = False
+    for key, (success, msg) in manager.service_manager.reload_all().items():
+        if success:
+            console.print(f"[green]✓[/green] {msg}")
+        else:
+            console.print(f"[red]✗[/red] {msg}")
+            failed = True
+    console.print(f"[dim]Reloaded in {time.perf_counter() - started:.1f}s[/dim]")
+    if failed:
+        sys.exit(1)
+
+
+@release.command("list")
+@click.pass_context
+def release_list(ctx):
+    """List backend releases."""
+    manager = DeploymentManager(ctx.obj["project_root"])
+    releases = manager.releases()
+    if not releases.enabled:
+        console.print("[yellow]Releases are not enabled; run 'release init'[/yellow]")
+        return
+
+    table = Table(title="Releases", box=box.ROUNDED)
+    table.add_column("", no_wrap=True)
+    table.add_column("Release", style="cyan", no_wrap=True)
+    table.add_column("Activated", no_wrap=True)
+    table.add_column("Description")
+    for info in releases.list():
+        table.add_row(
+            "[green]●[/green]" if info.active else "",
+            info.release_id,
+            info.created_at.replace("T", " ") if info.complete else "[dim]never[/dim]",
+            info.description,
+        )
+    console.print(table)
+    console.print(
+        f"[dim]{releases.link} -> {releases.path(releases.current() or '?')}[/dim]"
+    )
+
+
+@release.command("init")
+@click.pass_context
+def release_init(ctx):
+    """Move the in-place backend into releases/ and link to it."""
+    manager = DeploymentManager(ctx.obj["project_root"])
+    releases = manager.releases()
+    if releases.enabled:
+        console.print(
+            f"[yellow]Releases already enabled ({releases.current()})[/yellow]"
+        )
+        return
+
+    # Windows cannot move a directory whose files are open
+    stopped = []
+    for key in ["reverb"] + manager.service_manager.queue_keys():
+        name = manager.service_manager.SERVICES[key]["name"]
+        if manager.service_manager.get_service_status(name) == ServiceStatus.RUNNING:
+            success, msg = manager.service_manager.stop_service(key)
+            console.print(("[green]✓[/green] " if success else "[red]✗[/red] ") + msg)
+            if success:
+                stopped.append(key)
+
+    try:
+        release_id = releases.init()
+        console.print(
+            f"[green]✓ {releases.link} now links to releases/{release_id}; "
+            f"storage moved to shared/storage[/green]"
+        )
+    except (OSError, ValueError) as e:
+        console.print(f"[red]✗ {e}[/red]")
+
+    for key in stopped:
+        success, msg = manager.service_manager.start_service(key)
+        console.print(("[green]✓[/green] " if success else "[red]✗[/red] ") + msg)
+
+
+@release.command("switch")
+@click.argument("release_id")
+@click.pass_context
+def release_switch(ctx, release_id):
+    """Make RELEASE_ID the live backend."""
+    manager = DeploymentManager(ctx.obj["project_root"])
+    releases = manager.releases()
+    if not releases.enabled:
+        console.print("[red]✗ Releases are not enabled; run 'release init'[/red]")
+        sys.exit(1)
+    switch_release(manager, releases, release_id)
+
+
+@release.command("rollback")
+@click.pass_context
+def release_rollback(ctx):
+    """Switch back to the release before the active one."""
+    manager = DeploymentManager(ctx.obj["project_root"])
+    releases = manager.releases()
+    previous = releases.previous() if releases.enabled else None
+    if previous is None:
+        console.print("[red]✗ No previous release to roll back to[/red]")
+        sys.exit(1)
+    console.print(f"Rolling back {releases.current()} -> {previous}")
+    switch_release(manager, releases, previous)
+
+
+@cli.group()
+def bench():
+    """Benchmark deployment operations."""
+    pass
+
+
+@bench.command("archive")
+@click.option(
+    "--files", default=3000, type=int, help="Source files in the synthetic tree"
+)
+@click.option(
+    "--compression",
+    type=click.Choice(["zstd", "gzip"]),
+    default="zstd",
+    help="Archive compression",
+)
+@click.option("--workers", "-j", type=int, help="Read/hash threads")
+def bench_archive(files, compression, workers):
+    """Measure archive throughput against a synthetic apps/ tree."""
+    import tempfile
+    import threading
+
+    import psutil
+
+    with tempfile.TemporaryDirectory(prefix="woosoo-bench-") as temp:
+        root = Path(temp)
+        with console.status("Generating synthetic apps/ tree..."):
+            total = synthetic_tree(root, files)
+        console.print(
+            f"[cyan]Synthetic tree: {files} files, {total / 1024**2:.1f} MB[/cyan]"
+        )
+
+        process = psutil.Process()
+        baseline = process.memory_info().rss
+        peak = [baseline]
+        done = threading.Event()
+
+        def sample():
+            while not done.wait(0.02):
+                peak[0] = max(peak[0], process.memory_info().rss)
+
+        sampler = threading.Thread(target=sample, daemon=True)
+        sampler.start()
+        try:
+            report = create_archive(
+                root,
+                ["apps"],
+                DEFAULT_EXCLUDES,
+                root / ("bench" + archive_suffix(compression)),
+                compression=compression,
+                workers=workers,
+            )
+        finally:
+            done.set()
+            sampler.join()
+
+    console.print(
+        f"[green]✓ {report.mb_per_second:.1f} MB/s[/green] "
+        f"({report.bytes_in / 1024**2:.1f} MB in {report.elapsed:.2f}s, "
+        f"ratio {report.bytes_in / max(report.bytes_out, 1):.2f}x)"
+    )
+    console.print(f"  Peak memory growth: {(peak[0] - baseline) / 1024**2:.1f} MB")
+
+
+@bench.command("http")
+@click.option("--url", help="Target URL (default: nginx from deployment.config.env)")
+@click.option(
+    "--path", "paths", multiple=True, help="Path to request (repeatable, cycled)"
+)
+@click.option("--concurrency", "-c", default=16, type=int, help="Connections")
+@click.option("--duration", "-d", default=10.0, type=float, help="Seconds to run")
+@click.option(
+    "--rate",
+    "-r",
+    type=float,
+    help="Requests/s to offer (default: as fast as possible)",
+)
+@click.option("--timeout", default=10.0, type=float, help="Seconds per request")
+@click.option("--verify", is_flag=True, help="Verify the TLS certificate")
+@click.option("--stub", is_flag=True, help="Target an in-process stand-in server")
+@click.option("--json", "as_json", is_flag=True, help="Print the result as JSON")
+@click.option(
+    "--output",
+    "-o",
+    type=click.Path(dir_okay=False, path_type=Path),
+    help="Also save the JSON result here",
+)
+@click.option(
+    "--compare",
+    type=click.Path(exists=True, dir_okay=False, path_type=Path),
+    help="Earlier JSON result to compare with",
+)
+@click.pass_context
+def bench_http(
+    ctx,
+    url,
+    paths,
+    concurrency,
+    duration,
+    rate,
+    timeout,
+    verify,
+    stub,
+    as_json,
+    output,
+    compare,
+):
+    """Load-test the nginx endpoints with concurrent keep-alive requests."""
+    import asyncio
+    import json
+
+    if not url and not stub:
+        manager = DeploymentManager(ctx.obj["project_root"])
+        config = manager.config_manager.deployment_config
+        if config is None:
+            console.print(
+                "[red]✗ bench http needs --url or deployment.config.env[/red]"
+            )
+            sys.exit(1)
+        scheme, port = (
+            ("https", config.nginx_https_port)
+            if config.use_tls
+            else ("http", config.nginx_http_port)
+        )
+        url = f"{scheme}://{config.server_ip}:{port}/"
+    if concurrency < 1:
+        console.print("[red]✗ --concurrency must be at least 1[/red]")
+        sys.exit(1)
+
+    async def run():
+        server = None
+        target_url = url
+        if stub:
+            server = StubServer()
+            target_url = f"http://127.0.0.1:{await server.start()}/"
+        try:
+            target = Target.from_url(target_url)
+            if paths:
+                target.paths = list(paths)
+            return await run_load(target, concurrency, duration, rate, timeout, verify)
+        finally:
+            if server is not None:
+                await server.stop()
+
+    if not as_json:
+        console.print(
+            f"[cyan]{'Stand-in server' if stub else url}: {concurrency} connections, "
+            f"{duration:g}s, {f'{rate:g} req/s' if rate else 'unlimited rate'}[/cyan]"
+        )
+    try:
+        if as_json:
+            result = asyncio.run(run())
+        else:
+            with console.status("Sending requests..."):
+                result = asyncio.run(run())
+    except ValueError as e:
+        console.print(f"[red]✗ {e}[/red]")
+        sys.exit(1)
+
+    data = result.to_dict()
+    if output:
+        output.write_text(json.dumps(data, indent=2), encoding="utf-8")
+    if as_json:
+        click.echo(json.dumps(data, indent=2))
+        return
+
+    summary = Table(title="HTTP Load", box=box.ROUNDED, show_header=False)
+    summary.add_column("Metric", style="cyan")
+    summary.add_column("Value", justify="right")
+    summary.add_row("Requests", f"{result.requests:,}")
+    summary.add_row("Throughput", f"{result.throughput:,.1f} req/s")
+    summary.add_row(
+        "Errors",
+        (
+            f"[red]{result.errors:,} ({result.error_rate:.2%})[/red]"
+            if result.errors
+            else "0"
+        ),
+    )
+    summary.add_row(
+        "Statuses",
+        ", ".join(f"{k}: {v:,}" for k, v in sorted(result.statuses.items())) or "-",
+    )
+    summary.add_row("Connections opened", str(result.connections))
+    summary.add_row("Received", f"{result.bytes_received / 1024**2:.1f} MB")
+    console.print(summary)
+    for kind, count in result.error_kinds.items():
+        console.print(f"  [red]✗ {kind}: {count:,}[/red]")
+
+    if result.latency.count:
+        latency = Table(title="Latency", box=box.ROUNDED)
+        latency.add_column("Range (ms)", justify="right", no_wrap=True)
+        latency.add_column("Count", justify="right")
+        latency.add_column("Distribution")
+        rows = histogram_rows(result.latency)
+        most = max(count for _, _, count in rows) or 1
+        for low, high, count in rows:
+            latency.add_row(
+                f"{low:,.1f} - {high:,.1f}",
+                f"{count:,}",
+                "█" * round(30 * count / most),
+            )
+        console.print(latency)
+        console.print(
+            "  "
+            + "  ".join(
+                f"p{q * 100:g} {result.latency.quantile(q):,.1f} ms"
+                for q in PERCENTILES
+            )
+            + f"  max {result.latency.max:,.1f} ms"
+        )
+
+    if compare:
+        try:
+            before = json.loads(compare.read_text(encoding="utf-8"))
+        except (OSError, ValueError) as e:
+            console.print(f"[red]✗ Cannot read {compare}: {e}[/red]")
+            sys.exit(1)
+        table = Table(title=f"Compared with {compare.name}", box=box.ROUNDED)
+        table.add_column("Metric", style="cyan")
+        table.add_column("Before", justify="right")
+        table.add_column("Now", justify="right")
+        table.add_column("Change", justify="right")
+        metrics = [("throughput", "req/s", True), ("error_rate", "", False)]
+        metrics += [(f"p{q * 100:g}", "ms", False) for q in (0.5, 0.9, 0.99)] + [
+            ("max", "ms", False)
+        ]
+        for name, unit, higher_is_better in metrics:
+            old = before.get(name, before.get("latency_ms", {}).get(name))
+            new = data.get(name, data["latency_ms"].get(name))
+            if old is None or new is None:
+                continue
+            change = ""
+            if old:
+                delta = (new - old) / old
+                better = delta > 0 if higher_is_better else delta < 0
+                color = "green" if better else "red" if delta else "dim"
+                change = f"[{color}]{delta:+.1%}[/{color}]"
+            table.add_row(
+                f"{name} {unit}".strip(), f"{old:,.2f}", f"{new:,.2f}", change
+            )
+        console.print(table)
+
+
+@bench.command("ws")
+@click.option(
+    "--url",
+    help="Reverb ws(s):// URL (default: REVERB_PORT from deployment.config.env)",
+)
+@click.option(
+    "--connections", "-n", default=100, type=int, help="Subscriber connections"
+)
+@click.option("--channels", default=1, type=int, help="Channels to spread them over")
+@click.option(
+    "--messages", "-m", default=20, type=int, help="Broadcasts (to every channel)"
+)
+@click.option("--interval", default=0.5, type=float, help="Seconds between broadcasts")
+@click.option(
+    "--connect-concurrency",
+    default=50,
+    type=int,
+    help="Connection attempts in flight at once",
+)
+@click.option(
+    "--timeout",
+    default=10.0,
+    type=float,
+    help="Seconds per connect/subscribe and for the last deliveries",
+)
+@click.option("--stub", is_flag=True, help="Target an in-process stand-in Reverb")
+@click.option("--json", "as_json", is_flag=True, help="Print the result as JSON")
+@click.option(
+    "--output",
+    "-o",
+    type=click.Path(dir_okay=False, path_type=Path),
+    help="Also save the JSON result here",
+)
+@click.pass_context
+def bench_ws(
+    ctx,
+    url,
+    connections,
+    channels,
+    messages,
+    interval,
+    connect_concurrency,
+    timeout,
+    stub,
+    as_json,
+    output,
+):
+    """Measure Reverb broadcast fan-out across many WebSocket subscribers."""
+    import asyncio
+    import json
+
+    app_id = key = secret = ""
+    if not stub:
+        manager = DeploymentManager(ctx.obj["project_root"])
+        config = manager.config_manager.deployment_config
+        if config is None:
+            console.print("[red]✗ bench ws needs deployment.config.env[/red]")
+            sys.exit(1)
+        app_id, key, secret = (
+            config.reverb_app_id,
+            config.reverb_app_key,
+            config.reverb_app_secret,
+        )
+        if not (app_id and key and secret):
+            console.print(
+                "[red]✗ REVERB_APP_ID, REVERB_APP_KEY and REVERB_APP_SECRET "
+                "must be set[/red]"
+            )
+            sys.exit(1)
+        url = url or f"ws://127.0.0.1:{config.reverb_port}"
+    if min(connections, channels, messages, connect_concurrency) < 1:
+        console.print(
+            "[red]✗ --connections, --channels, --messages and "
+            "--connect-concurrency must be at least 1[/red]"
+        )
+        sys.exit(1)
+
+    async def run():
+        server = None
+        target_url = url
+        if stub:
+            server = StubReverb()
+            target_url = f"ws://127.0.0.1:{await server.start()}"
+            credentials = (server.app_id, server.key, server.secret)
+        else:
+            credentials = (app_id, key, secret)
+        try:
+            target = WsTarget.from_url(target_url, *credentials)
+            return await run_fanout(
+                target,
+                connections,
+                min(channels, connections),
+                messages,
+                interval,
+                connect_concurrency,
+                timeout,
+            )
+        finally:
+            if server is not None:
+                await server.stop()
+
+    if not as_json:
+        console.print(
+            f"[cyan]{'Stand-in Reverb' if stub else url}: {connections} connections "
+            f"on {min(channels, connections)} channel(s), {messages} broadcasts "
+            f"every {interval:g}s[/cyan]"
+        )
+    try:
+        if as_json:
+            result = asyncio.run(run())
+        else:
+            with console.status("Connecting and broadcasting..."):
+                result = asyncio.run(run())
+    except ValueError as e:
+        console.print(f"[red]✗ {e}[/red]")
+        sys.exit(1)
+
+    data = result.to_dict()
+    if output:
+        output.write_text(json.dumps(data, indent=2), encoding="utf-8")
+    if as_json:
+        click.echo(json.dumps(data, indent=2))
+        return
+
+    summary = Table(title="WebSocket Fan-out", box=box.ROUNDED, show_header=False)
+    summary.add_column("Metric", style="cyan")
+    summary.add_column("Value", justify="right")
+    summary.add_row("Connected", f"{result.connected:,} / {result.connections:,}")
+    summary.add_row("Subscribed", f"{result.subscribed:,}")
+    summary.add_row("Broadcasts sent", f"{result.sent:,} / {result.messages:,}")
+    color = "green" if result.delivered == result.expected else "red"
+    summary.add_row(
+        "Delivered",
+        f"[{color}]{result.delivered:,} / {result.expected:,} "
+        f"({result.delivery_rate:.2%})[/{color}]",
+    )
+    summary.add_row("Elapsed", f"{result.elapsed:.1f}s")
+    console.print(summary)
+    for kind, count in result.errors.items():
+        console.print(f"  [red]✗ {kind}: {count:,}[/red]")
+
+    latency = Table(title="Latency (ms)", box=box.ROUNDED)
+    latency.add_column("Phase", style="cyan")
+    for q in PERCENTILES:
+        latency.add_column(f"p{q * 100:g}", justify="right")
+    latency.add_column("max", justify="right")
+    for label, sketch in (
+        ("Connect", result.connect),
+        ("Subscribe", result.subscribe),
+        ("Delivery", result.delivery),
+    ):
+        if not sketch.count:
+            latency.add_row(label, *["-"] * (len(PERCENTILES) + 1))
+            continue
+        latency.add_row(
+            label,
+            *[f"{sketch.quantile(q):,.1f}" for q in PERCENTILES],
+            f"{sketch.max:,.1f}",
+        )
+    console.print(latency)
+    if result.delivered < result.expected or result.subscribed < result.connections:
+        sys.exit(1)
+
+
+@cli.command()
+@click.pass_context
+def config(ctx):
+    """Show current configuration."""
+    manager = DeploymentManager(ctx.obj["project_root"])
+
+    try:
+        config = manager.config_manager.load_config()
+        console.print("\n[bold cyan]Current Configuration:[/bold cyan]")
+
+        table = Table(box=box.ROUNDED, show_header=True, header_style="bold magenta")
+        table.add_column("Setting", style="cyan")
+        table.add_column("Value", style="white")
+
+        summary = manager.config_manager.get_config_summary()
+        for key, value in summary.items():
+            table.add_row(key, value)
+
+        console.print(table)
+
+        # Validate
+        valid, errors = manager.config_manager.validate_config()
+        if valid:
+            console.print("\n[green]✓ Configuration is valid[/green]")
+        else:
+            console.print("\n[red]✗ Configuration has errors:[/red]")
+            for error in errors:
+                console.print(f"  [red]• {error}[/red]")
+
+    except FileNotFoundError as e:
+        console.print(f"[red]Configuration file not found: {e}[/red]")
+        console.print(
+            f"[yellow]→ Copy deployment.config.env.template to deployment.config.env[/yellow]"
+        )
+    except Exception as e:
+        console.print(f"[red]Error loading configuration: {e}[/red]")
+
+
+@cli.command()
+@click.option("--host", default="0.0.0.0", help="Address to bind the exporter to")
+@click.option("--port", default=9550, type=int, help="Port to serve /metrics on")
+@click.option(
+    "--interval",
+    default=15.0,
+    type=float,
+    help="Seconds between background service refreshes",
+)
+@click.option(
+    "--check-interval",
+    default=300.0,
+    type=float,
+    help="Seconds between pre-flight check runs",
+)
+@click.pass_context
+def metrics(ctx, host, port, interval, check_interval):
+    """Serve Prometheus metrics at /metrics."""
+    manager = DeploymentManager(ctx.obj["project_root"])
+    collector = MetricsCollector(
+        manager.service_manager,
+        manager.validator,
+        journal=manager.journal,
+        interval=interval,
+        check_interval=check_interval,
+    )
+
+    console.print("\n[cyan]Collecting initial metrics...[/cyan]")
+    collector.start()
+    server = MetricsServer(collector, host=host, port=port)
+    bound_host, bound_port = server.address
+    console.print(
+        f"[green]✓ Serving metrics at http://{bound_host}:{bound_port}/metrics[/green]"
+    )
+    console.print("[dim]Press Ctrl+C to stop[/dim]")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+        collector.stop()
+
+
+@cli.group("queue")
+def queue_group():
+    """Monitor the Laravel queue and scale its workers."""
+    pass
+
+
+def queue_monitor(manager: DeploymentManager, sqlite: Optional[Path]) -> QueueMonitor:
+    """Monitor over the backend's MySQL database, or an SQLite file for testing."""
+    if sqlite is not None:
+        backend = SQLiteBackend(sqlite)
+    else:
+        config = manager.config_manager.deployment_config
+        if config is None:
+            console.print("[red]✗ deployment.config.env not found[/red]")
+            sys.exit(1)
+        backend = MySQLBackend(
+            config.db_name,
+            config.db_username,
+            config.db_password,
+            port=config.mysql_port,
+        )
+    return QueueMonitor(ConnectionPool(backend))
+
+
+def scaling_policy(manager: DeploymentManager, **overrides) -> ScalingPolicy:
+    """Policy from deployment.config.env, with command-line overrides."""
+    config = manager.config_manager.deployment_config
+    policy = ScalingPolicy.from_config(config) if config else ScalingPolicy()
+    for name, value in overrides.items():
+        if value is not None:
+            setattr(policy, name, value)
+    errors = policy.validate()
+    for error in errors:
+        console.print(f"[red]✗ {error}[/red]")
+    if errors:
+        sys.exit(1)
+    return policy
+
+
+sqlite_option = click.option(
+    "--sqlite",
+    type=click.Path(exists=True, dir_okay=False, path_type=Path),
+    help="Read the jobs tables from this SQLite file instead of MySQL",
+)
+
+
+@queue_group.command("status")
+@sqlite_option
+@click.pass_context
+def queue_status(ctx, sqlite):
+    """Show pending, reserved, delayed and failed jobs per queue."""
+    manager = DeploymentManager(ctx.obj["project_root"])
+    monitor = queue_monitor(manager, sqlite)
+    try:
+        snapshot = monitor.snapshot()
+    except QueueMonitorError as e:
+        console.print(f"[red]✗ {e}[/red]")
+        sys.exit(1)
+    finally:
+        monitor.pool.close()
+
+    table = Table(title="Queue Backlog", box=box.ROUNDED)
+    table.add_column("Queue", style="cyan")
+    table.add_column("Pending", justify="right")
+    table.add_column("Reserved", justify="right")
+    table.add_column("Delayed", justify="right")
+    table.add_column("Oldest wait", justify="right")
+    for counts in snapshot.queues:
+        table.add_row(
+            counts.queue,
+            str(counts.pending),
+            str(counts.reserved),
+            str(counts.delayed),
+            f"{counts.oldest_age:.0f}s" if counts.oldest_age is not None else "-",
+        )
+    console.print(table)
+    color = "red" if snapshot.failed else "dim"
+    console.print(f"[{color}]Failed jobs: {snapshot.failed}[/{color}]")
+
+    config = manager.config_manager.deployment_config
+    maximum = config.queue_max_workers if config else 1
+    try:
+        running = manager.service_manager.running_queue_workers(maximum)
+    except Exception:
+        return
+    console.print(f"Workers running: {len(running)} ({', '.join(running) or '-'})")
+
+
+@queue_group.command("scale")
+@click.argument("count", type=int)
+@click.pass_context
+def queue_scale(ctx, count):
+    """Run exactly COUNT queue workers (installing extra ones as needed)."""
+    manager = DeploymentManager(ctx.obj["project_root"])
+    policy = scaling_policy(manager)
+    if not 1 <= count <= policy.max_workers:
+        console.print(
+            f"[red]✗ COUNT must be between 1 and QUEUE_MAX_WORKERS "
+            f"({policy.max_workers})[/red]"
+        )
+        sys.exit(1)
+    results = manager.service_manager.scale_queue_workers(count, policy.max_workers)
+    for key, (success, msg) in results.items():
+        icon = "✓" if success else "✗"
+        color = "green" if success else "red"
+        console.print(f"[{color}]{icon} {key}: {msg}[/{color}]")
+    if not results:
+        console.print(f"[green]✓ {count} queue worker(s) already running[/green]")
+    if not all(success for success, _ in results.values()):
+        sys.exit(1)
+
+
+@queue_group.command("autoscale")
+@click.option(
+    "--interval",
+    default=MONITOR_INTERVAL,
+    type=float,
+    help="Seconds between samples",
+)
+@click.option("--min", "min_workers", type=int, help="Override QUEUE_MIN_WORKERS")
+@click.option("--max", "max_workers", type=int, help="Override QUEUE_MAX_WORKERS")
+@click.option("--once", is_flag=True, help="Evaluate one sample and exit")
+@click.option("--dry-run", is_flag=True, help="Log decisions without scaling")
+@sqlite_option
+@click.pass_context
+def queue_autoscale(ctx, interval, min_workers, max_workers, once, dry_run, sqlite):
+    """Scale queue workers with the backlog (hysteresis and cooldowns)."""
+    manager = DeploymentManager(ctx.obj["project_root"])
+    policy = scaling_policy(manager, min_workers=min_workers, max_workers=max_workers)
+    monitor = queue_monitor(manager, sqlite)
+    autoscaler = Autoscaler(policy)
+    log = DecisionLog(
+        manager.config_manager.manager_config.logs_dir / "autoscale.jsonl"
+    )
+    console.print(
+        f"[cyan]Autoscaling queue workers {policy.min_workers}-{policy.max_workers}: "
+        f"{policy.jobs_per_worker} pending/worker, max wait {policy.max_wait:g}s"
+        f"{' (dry run)' if dry_run else ''}[/cyan]"
+    )
+    if not once:
+        console.print("[dim]Press Ctrl+C to stop[/dim]")
+
+    workers = None
+    try:
+        while True:
+            try:
+                snapshot = monitor.snapshot()
+            except QueueMonitorError as e:
+                console.print(f"[red]✗ {e}[/red]")
+                if once:
+                    sys.exit(1)
+                time.sleep(interval)
+                continue
+            if workers is None or not dry_run:
+                workers = len(
+                    manager.service_manager.running_queue_workers(policy.max_workers)
+                )
+            decision = autoscaler.decide(snapshot, workers)
+            results = None
+            if decision.action != "hold" and not dry_run:
+                results = manager.service_manager.scale_queue_workers(
+                    decision.target, policy.max_workers
+                )
+            if dry_run:
+                # Nothing changes; act as if it had, to follow the policy
+                workers = decision.target
+            if log.record(decision, results) or once:
+                stamp = datetime.fromtimestamp(decision.ts).strftime("%H:%M:%S")
+                color = {"up": "yellow", "down": "cyan"}.get(decision.action, "dim")
+                console.print(
+                    f"[{color}]{stamp} {decision.action} "
+                    f"{decision.workers} -> {decision.target}: {decision.reason}"
+                    f"[/{color}]"
+                )
+                for key, (success, msg) in (results or {}).items():
+                    icon = "✓" if success else "✗"
+                    status_color = "green" if success else "red"
+                    console.print(
+                        f"  [{status_color}]{icon} {key}: {msg}[/{status_color}]"
+                    )
+            if once:
+                return
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        monitor.pool.close()
+
+
+@cli.command()
+@click.option("--since", default="30d", help="Oldest samples (e.g. 7d, 4w)")
+@click.option("--operation", "-o", help="Only this operation (start, check, deploy...)")
+@click.option(
+    "--by", "period", type=click.Choice(["day", "week", "month"]), help="Per period"
+)
+@click.option(
+    "--regressions",
+    "find_regressions",
+    is_flag=True,
+    help="Flag operations slower recently than before",
+)
+@click.option("--recent", default="7d", help="Recent window for --regressions")
+@click.option(
+    "--threshold",
+    default=REGRESSION_THRESHOLD,
+    type=float,
+    help="Slowdown flagged by --regressions (0.25 = 25%)",
+)
+@click.pass_context
+def stats(ctx, since, operation, period, find_regressions, recent, threshold):
+    """Timing history of checks, service operations and deploys."""
+    manager = DeploymentManager(ctx.obj["project_root"])
+    try:
+        since_ts = parse_time_spec(since).timestamp()
+        recent_ts = parse_time_spec(recent).timestamp()
+    except ValueError as e:
+        console.print(f"[red]✗ {e}[/red]")
+        sys.exit(1)
+
+    def seconds(value):
+        if value is None:
+            return "-"
+        return f"{value * 1000:.0f} ms" if value < 1 else f"{value:.1f}s"
+
+    if find_regressions:
+        if recent_ts <= since_ts:
+            console.print("[red]✗ --recent must be shorter than --since[/red]")
+            sys.exit(1)
+        regressions = manager.history.regressions(since_ts, recent_ts, threshold)
+        if not regressions:
+            console.print(
+                f"[green]✓ No operation's median is {threshold:.0%} slower over "
+                f"the last {recent} than the {since} before[/green]"
+            )
+            return
+        table = Table(title="Regressions", box=box.ROUNDED)
+        table.add_column("Operation", style="cyan", no_wrap=True)
+        table.add_column("Subject")
+        table.add_column("Baseline p50", justify="right")
+        table.add_column("Recent p50", justify="right")
+        table.add_column("Change", justify="right")
+        table.add_column("Runs", justify="right")
+        for regression in regressions:
+            table.add_row(
+                regression.operation,
+                regression.subject or "-",
+                seconds(regression.baseline_p50),
+                seconds(regression.recent_p50),
+                f"[red]{regression.change:+.0%}[/red]",
+                f"{regression.baseline_count} / {regression.recent_count}",
+            )
+        console.print(table)
+        console.print(f"[red]✗ {len(regressions)} operation(s) slower[/red]")
+        sys.exit(1)
+
+    rows = manager.history.stats(since_ts, operation, period)
+    if not rows:
+        console.print(f"[yellow]No timings recorded since {since}[/yellow]")
+        return
+    table = Table(title=f"Operation Timings (since {since})", box=box.ROUNDED)
+    table.add_column("Operation", style="cyan", no_wrap=True)
+    table.add_column("Subject")
+    if period:
+        table.add_column(period.capitalize(), no_wrap=True)
+    table.add_column("Runs", justify="right")
+    table.add_column("Failed", justify="right")
+    table.add_column("p50", justify="right")
+    table.add_column("p95", justify="right")
+    table.add_column("Max", justify="right")
+    for row in rows:
+        cells = [row.operation, row.subject or "-"]
+        if period:
+            cells.append(row.period)
+        cells += [
+            str(row.count),
+            f"[red]{row.failures}[/red]" if row.failures else "0",
+            seconds(row.p50),
+            seconds(row.p95),
+            seconds(row.max),
+        ]
+        table.add_row(*cells)
+    console.print(table)
+
+
+@cli.group()
+def history():
+    """Host and service metrics history (1 s, 1 min and 1 h tiers)."""
+    pass
+
+
+@history.command("record")
+@click.option("--interval", "-n", default=1.0, type=float, help="Seconds per sample")
+@click.pass_context
+def history_record(ctx, interval):
+    """Sample services and the host into the history until Ctrl+C."""
+    manager = DeploymentManager(ctx.obj["project_root"])
+    store = manager.metrics_store()
+    sampler = DashboardSampler(
+        manager.service_manager,
+        manager.service_ports(),
+        manager.config_manager.manager_config.logs_dir,
+        interval=interval,
+        store=store,
+    )
+    console.print(
+        f"[cyan]Recording {len(store.series)} series every {interval:g}s "
+        f"to {store.path} ({store.size / 1024**2:.1f} MB)[/cyan]"
+    )
+    console.print("[dim]Press Ctrl+C to stop[/dim]")
+    flushed = time.monotonic()
+    try:
+        while True:
+            started = time.monotonic()
+            try:
+                sampler.sample()
+            except Exception as e:
+                console.print(f"[red]✗ Sample failed: {e}[/red]")
+            if started - flushed >= 60:
+                store.flush()
+                flushed = started
+            time.sleep(max(0.0, interval - (time.monotonic() - started)))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        store.close()
+
+
+@history.command("show")
+@click.option("--since", default="1h", help="Window (e.g. 15m, 6h, 7d)")
+@click.option("--series", "patterns", multiple=True, help="Series glob, e.g. 'nginx.*'")
+@click.pass_context
+def history_show(ctx, since, patterns):
+    """Min/mean/max and a sparkline per series."""
+    from fnmatch import fnmatch
+
+    manager = DeploymentManager(ctx.obj["project_root"])
+    try:
+        start = parse_time_spec(since).timestamp()
+    except ValueError as e:
+        console.print(f"[red]✗ {e}[/red]")
+        sys.exit(1)
+
+    store = manager.metrics_store()
+    try:
+        tier = store.tier_for(start)
+        table = Table(
+            title=f"History since {since} ({tier.resolution}s resolution)",
+            box=box.ROUNDED,
+        )
+        table.add_column("Series", style="cyan", no_wrap=True)
+        table.add_column("Samples", justify="right")
+        table.add_column("Min", justify="right")
+        table.add_column("Mean", justify="right")
+        table.add_column("Max", justify="right")
+        table.add_column("Last", justify="right")
+        table.add_column("Trend")
+        for name in store.series:
+            if patterns and not any(fnmatch(name, p) for p in patterns):
+                continue
+            window = store.window(name, start, tier=tier)
+            summary = store.summary(name, start, tier=tier)
+            if not summary.samples:
+                table.add_row(name, "0", "-", "-", "-", "-", "")
+                continue
+            table.add_row(
+                name,
+                f"{summary.samples:,}",
+                f"{summary.minimum:,.1f}",
+                f"{summary.mean:,.1f}",
+                f"{summary.maximum:,.1f}",
+                f"{summary.last:,.1f}",
+                sparkline(list(window.mean)),
+            )
+        console.print(table)
+    finally:
+        store.close()
+
+
+@history.command("info")
+@click.pass_context
+def history_info(ctx):
+    """Tiers, series and the fixed memory/disk footprint of the history."""
+    manager = DeploymentManager(ctx.obj["project_root"])
+    store = manager.metrics_store()
+    try:
+        table = Table(title="History Tiers", box=box.ROUNDED)
+        table.add_column("Resolution", justify="right")
+        table.add_column("Slots", justify="right")
+        table.add_column("Covers", justify="right")
+        table.add_column("Bytes/series", justify="right")
+        for tier in store.tiers:
+            table.add_row(
+                f"{tier.resolution}s",
+                f"{tier.capacity:,}",
+                f"{tier.span / 3600:g}h",
+                f"{tier.nbytes:,}",
+            )
+        console.print(table)
+        console.print(
+            f"{len(store.series)} series x {store.series_bytes:,} bytes = "
+            f"{store.size / 1024**2:.2f} MB in {store.path}"
+        )
+        console.print(
+            f"[dim]Queries: {'NumPy' if numpy is not None else 'pure Python'}[/dim]"
+        )
+    finally:
+        store.close()
 
 
 @cli.command()
@@ -354,6 +2632,7 @@ def version():
 
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()  # Search workers in the PyInstaller build
     try:
         cli()
     except KeyboardInterrupt:
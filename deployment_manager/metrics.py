@@ -0,0 +1,618 @@
+"""Prometheus metrics exporter for services, checks and manager operations."""
+
+import bisect
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import psutil
+
+# Latency buckets (seconds) for start/stop/install operations. NSSM services
+# usually settle within a few seconds; the long tail covers net start timeouts.
+OPERATION_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# operations.jsonl moves to operations.jsonl.1 (replacing it) past this size
+JOURNAL_MAX_BYTES = 1024 * 1024
+
+SERVICE_STATES = ("running", "stopped", "paused", "not_installed", "unknown")
+
+
+class OperationJournal:
+    """Append-only JSON-lines record of manager operations.
+
+    CLI commands run in their own process, so operations are journaled to
+    ``logs/operations.jsonl`` and the exporter picks them up incrementally.
+    Past ``max_bytes`` the file is rotated to ``operations.jsonl.1``, so the
+    journal never holds more than twice that; a reader finishes the rotated
+    file before moving on to the new one.
+    """
+
+    def __init__(self, path: Path, max_bytes: int = JOURNAL_MAX_BYTES):
+        """Initialize journal at the given file path."""
+        self.path = path
+        self.max_bytes = max_bytes
+        self._offset = 0
+        self._id: Optional[tuple] = None  # File being read (dev, inode)
+        self._lock = threading.Lock()
+
+    @property
+    def rotated_path(self) -> Path:
+        return self.path.with_name(self.path.name + ".1")
+
+    def record(self, operation: str, service: str, duration: float, success: bool):
+        """Append one operation record (usable as a ServiceManager listener)."""
+        entry = {
+            "ts": time.time(),
+            "operation": operation,
+            "service": service,
+            "duration": round(duration, 6),
+            "success": success,
+        }
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry) + "\n")
+                size = f.tell()
+            if size > self.max_bytes:
+                try:
+                    os.replace(self.path, self.rotated_path)
+                except OSError:
+                    pass  # Open elsewhere (Windows); rotate on a later record
+
+    def skip_existing(self):
+        """Start reading at the current end, ignoring older records."""
+        try:
+            current = os.stat(self.path)
+        except OSError:
+            self._offset, self._id = 0, None
+            return
+        self._offset, self._id = current.st_size, _file_id(current)
+
+    def read_new(self) -> List[dict]:
+        """Return records appended since the previous call."""
+        entries = []
+        try:
+            current = os.stat(self.path)
+        except OSError:
+            current = None
+
+        if self._id is not None and (current is None or _file_id(current) != self._id):
+            # Rotated: finish the file we were reading, now the .1 generation
+            try:
+                if _file_id(os.stat(self.rotated_path)) == self._id:
+                    entries = self._read_from(self.rotated_path)
+            except OSError:
+                pass
+            self._offset, self._id = 0, None
+
+        if current is None:
+            return entries
+        if current.st_size < self._offset:
+            # Journal was truncated in place - start over
+            self._offset = 0
+        self._id = _file_id(current)
+        return entries + self._read_from(self.path)
+
+    def _read_from(self, path: Path) -> List[dict]:
+        """Complete records in ``path`` past the current offset."""
+        entries = []
+        with open(path, "rb") as f:
+            f.seek(self._offset)
+            for raw in f:
+                if not raw.endswith(b"\n"):
+                    break  # Partial write; pick it up next time
+                self._offset += len(raw)
+                try:
+                    entries.append(json.loads(raw))
+                except ValueError:
+                    continue
+        return entries
+
+
+def _file_id(stat_result: os.stat_result) -> tuple:
+    """Identity of a file across renames (inode / NTFS file index)."""
+    return (stat_result.st_dev, stat_result.st_ino)
+
+
+@dataclass
+class Histogram:
+    """Cumulative Prometheus-style histogram with fixed buckets."""
+
+    buckets: Tuple[float, ...] = OPERATION_BUCKETS
+    counts: List[int] = field(default_factory=list)
+    total: float = 0.0
+    count: int = 0
+
+    def __post_init__(self):
+        """Allocate one counter per bucket plus +Inf."""
+        if not self.counts:
+            self.counts = [0] * (len(self.buckets) + 1)
+
+    def observe(self, value: float):
+        """Record a single observation."""
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        """Return (le, cumulative count) pairs including +Inf."""
+        pairs = []
+        running = 0
+        for bound, n in zip(self.buckets, self.counts):
+            running += n
+            pairs.append((_format_value(bound), running))
+        pairs.append(("+Inf", self.count))
+        return pairs
+
+
+class ProcessSampler:
+    """Samples CPU and RSS of service processes, reusing process handles.
+
+    psutil computes CPU percent against the previous call on the same
+    ``Process`` object, so handles are cached across refresh cycles.
+    """
+
+    def __init__(self):
+        """Initialize sampler with an empty handle cache."""
+        self._processes: Dict[int, psutil.Process] = {}
+
+    def sample(self, pid: Optional[int]) -> Tuple[Optional[float], Optional[int]]:
+        """Return (cpu_percent, rss_bytes) for the process tree rooted at pid."""
+        if not pid:
+            return None, None
+
+        try:
+            root = self._handle(pid)
+            procs = [root] + [self._handle(c.pid) for c in root.children(True)]
+            cpu = 0.0
+            rss = 0
+            for proc in procs:
+                with proc.oneshot():
+                    cpu += proc.cpu_percent(interval=None)
+                    rss += proc.memory_info().rss
+            return cpu, rss
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            self._processes.pop(pid, None)
+            return None, None
+
+    def prune(self):
+        """Drop cached handles for processes that have exited."""
+        for pid in list(self._processes):
+            if not self._processes[pid].is_running():
+                del self._processes[pid]
+
+    def _handle(self, pid: int) -> psutil.Process:
+        """Get or create a cached process handle."""
+        proc = self._processes.get(pid)
+        if proc is None or not proc.is_running():
+            proc = psutil.Process(pid)
+            proc.cpu_percent(interval=None)  # Prime the CPU counter
+            self._processes[pid] = proc
+        return proc
+
+
+class MetricsCollector:
+    """Collects metrics in a background thread and caches them for scrapes.
+
+    Scrapes only render the cached state, so scrape frequency never changes
+    how many subprocesses are spawned: service status is refreshed once per
+    ``interval`` and validator checks once per ``check_interval``.
+    """
+
+    def __init__(
+        self,
+        service_manager,
+        validator,
+        journal: Optional[OperationJournal] = None,
+        interval: float = 15.0,
+        check_interval: float = 300.0,
+    ):
+        """Initialize collector.
+
+        Args:
+            service_manager: ServiceManager providing service status and PIDs
+            validator: SystemValidator whose checks are exported
+            journal: Operation journal to read start/stop/install timings from
+            interval: Seconds between service status refreshes
+            check_interval: Seconds between validator check runs
+        """
+        self.service_manager = service_manager
+        self.validator = validator
+        self.journal = journal
+        self.interval = interval
+        self.check_interval = check_interval
+
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._sampler = ProcessSampler()
+        self._last_check_run = 0.0
+
+        self._services: List[dict] = []
+        self._checks: List[dict] = []
+        self._op_counts: Dict[Tuple[str, str, str], int] = defaultdict(int)
+        self._op_latency: Dict[Tuple[str, str], Histogram] = {}
+        self._refresh_duration = 0.0
+        self._last_refresh = 0.0
+        self._refresh_errors = 0
+
+    def start(self):
+        """Run an initial refresh and start the background refresh thread.
+
+        Operation counters start at zero: journal records from before the
+        exporter started are skipped (Prometheus treats that as a reset).
+        """
+        if self.journal:
+            self.journal.skip_existing()
+        self.refresh()
+        self._thread = threading.Thread(
+            target=self._run, name="metrics-refresh", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        """Stop the background refresh thread."""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    def _run(self):
+        """Refresh loop."""
+        while not self._stop.wait(self.interval):
+            self.refresh()
+
+    def refresh(self):
+        """Refresh cached metrics (one cycle)."""
+        started = time.perf_counter()
+        try:
+            services = self._collect_services()
+            checks = None
+            if time.time() - self._last_check_run >= self.check_interval:
+                checks = self._collect_checks()
+                self._last_check_run = time.time()
+
+            entries = self.journal.read_new() if self.journal else []
+
+            with self._lock:
+                self._services = services
+                if checks is not None:
+                    self._checks = checks
+                for entry in entries:
+                    self._observe_locked(
+                        entry.get("operation", "unknown"),
+                        entry.get("service", "unknown"),
+                        float(entry.get("duration", 0.0)),
+                        bool(entry.get("success", False)),
+                    )
+        except Exception:
+            with self._lock:
+                self._refresh_errors += 1
+
+        with self._lock:
+            self._refresh_duration = time.perf_counter() - started
+            self._last_refresh = time.time()
+
+    def observe_operation(
+        self, operation: str, service: str, duration: float, success: bool
+    ):
+        """Record an operation directly (for collectors without a journal)."""
+        with self._lock:
+            self._observe_locked(operation, service, duration, success)
+
+    def _observe_locked(
+        self, operation: str, service: str, duration: float, success: bool
+    ):
+        """Update operation counters; caller holds the lock."""
+        result = "success" if success else "failure"
+        self._op_counts[(operation, service, result)] += 1
+        key = (operation, service)
+        if key not in self._op_latency:
+            self._op_latency[key] = Histogram()
+        self._op_latency[key].observe(duration)
+
+    def _collect_services(self) -> List[dict]:
+        """Collect state and resource usage for every managed service."""
+        services = []
+        statuses = self.service_manager.get_services_status(
+            [config["name"] for config in self.service_manager.SERVICES.values()]
+        )
+        for key, config in self.service_manager.SERVICES.items():
+            name = config["name"]
+            status = statuses[name]
+            pid = None
+            if status.value == "running":
+                pid = self.service_manager.get_service_pid(name)
+            cpu, rss = self._sampler.sample(pid)
+            services.append(
+                {
+                    "service": key,
+                    "name": name,
+                    "state": status.value,
+                    "cpu": cpu,
+                    "rss": rss,
+                }
+            )
+        self._sampler.prune()
+        return services
+
+    def _collect_checks(self) -> List[dict]:
+        """Run validator checks and capture pass/fail and duration."""
+        results = self.validator.run_all_checks()
+        return [
+            {
+                "check": r.name,
+                "level": r.level.value,
+                "passed": r.passed,
+                "duration": r.duration,
+            }
+            for r in results
+        ]
+
+    def render(self) -> str:
+        """Render cached metrics in the Prometheus text exposition format."""
+        lines: List[str] = []
+
+        with self._lock:
+            _header(
+                lines, "woosoo_service_state", "gauge", "Service state (1 = current)"
+            )
+            for svc in self._services:
+                for state in SERVICE_STATES:
+                    lines.append(
+                        _sample(
+                            "woosoo_service_state",
+                            {
+                                "service": svc["service"],
+                                "name": svc["name"],
+                                "state": state,
+                            },
+                            1 if svc["state"] == state else 0,
+                        )
+                    )
+
+            _header(
+                lines, "woosoo_service_up", "gauge", "Whether the service is running"
+            )
+            for svc in self._services:
+                lines.append(
+                    _sample(
+                        "woosoo_service_up",
+                        {"service": svc["service"]},
+                        1 if svc["state"] == "running" else 0,
+                    )
+                )
+
+            _header(
+                lines,
+                "woosoo_service_cpu_percent",
+                "gauge",
+                "CPU usage of the service process tree",
+            )
+            for svc in self._services:
+                if svc["cpu"] is not None:
+                    lines.append(
+                        _sample(
+                            "woosoo_service_cpu_percent",
+                            {"service": svc["service"]},
+                            svc["cpu"],
+                        )
+                    )
+
+            _header(
+                lines,
+                "woosoo_service_memory_rss_bytes",
+                "gauge",
+                "Resident memory of the service process tree",
+            )
+            for svc in self._services:
+                if svc["rss"] is not None:
+                    lines.append(
+                        _sample(
+                            "woosoo_service_memory_rss_bytes",
+                            {"service": svc["service"]},
+                            svc["rss"],
+                        )
+                    )
+
+            _header(
+                lines,
+                "woosoo_check_passed",
+                "gauge",
+                "Last result of a pre-flight check",
+            )
+            for chk in self._checks:
+                lines.append(
+                    _sample(
+                        "woosoo_check_passed",
+                        {"check": chk["check"], "level": chk["level"]},
+                        1 if chk["passed"] else 0,
+                    )
+                )
+
+            _header(
+                lines,
+                "woosoo_check_duration_seconds",
+                "gauge",
+                "Duration of the last pre-flight check run",
+            )
+            for chk in self._checks:
+                lines.append(
+                    _sample(
+                        "woosoo_check_duration_seconds",
+                        {"check": chk["check"]},
+                        chk["duration"],
+                    )
+                )
+
+            if self._last_check_run:
+                _header(
+                    lines,
+                    "woosoo_check_last_run_timestamp_seconds",
+                    "gauge",
+                    "Unix time of the last pre-flight check run",
+                )
+                lines.append(
+                    _sample(
+                        "woosoo_check_last_run_timestamp_seconds",
+                        {},
+                        self._last_check_run,
+                    )
+                )
+
+            _header(
+                lines,
+                "woosoo_operation_total",
+                "counter",
+                "Service operations by result",
+            )
+            for (op, svc, result), n in sorted(self._op_counts.items()):
+                lines.append(
+                    _sample(
+                        "woosoo_operation_total",
+                        {"operation": op, "service": svc, "result": result},
+                        n,
+                    )
+                )
+
+            _header(
+                lines,
+                "woosoo_operation_duration_seconds",
+                "histogram",
+                "Service operation latency",
+            )
+            for (op, svc), hist in sorted(self._op_latency.items()):
+                labels = {"operation": op, "service": svc}
+                for le, n in hist.cumulative():
+                    lines.append(
+                        _sample(
+                            "woosoo_operation_duration_seconds_bucket",
+                            dict(labels, le=le),
+                            n,
+                        )
+                    )
+                lines.append(
+                    _sample("woosoo_operation_duration_seconds_sum", labels, hist.total)
+                )
+                lines.append(
+                    _sample(
+                        "woosoo_operation_duration_seconds_count", labels, hist.count
+                    )
+                )
+
+            _header(
+                lines,
+                "woosoo_collector_refresh_duration_seconds",
+                "gauge",
+                "Duration of the last background refresh",
+            )
+            lines.append(
+                _sample(
+                    "woosoo_collector_refresh_duration_seconds",
+                    {},
+                    self._refresh_duration,
+                )
+            )
+            _header(
+                lines,
+                "woosoo_collector_last_refresh_timestamp_seconds",
+                "gauge",
+                "Unix time of the last background refresh",
+            )
+            lines.append(
+                _sample(
+                    "woosoo_collector_last_refresh_timestamp_seconds",
+                    {},
+                    self._last_refresh,
+                )
+            )
+            _header(
+                lines,
+                "woosoo_collector_refresh_errors_total",
+                "counter",
+                "Background refreshes that raised an error",
+            )
+            lines.append(
+                _sample(
+                    "woosoo_collector_refresh_errors_total", {}, self._refresh_errors
+                )
+            )
+
+        return "\n".join(lines) + "\n"
+
+
+def _header(lines: List[str], name: str, kind: str, help_text: str):
+    """Append HELP and TYPE lines for a metric family."""
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} {kind}")
+
+
+def _sample(name: str, labels: Dict[str, str], value) -> str:
+    """Format a single sample line."""
+    if labels:
+        rendered = ",".join(f'{k}="{_escape(str(v))}"' for k, v in labels.items())
+        return f"{name}{{{rendered}}} {_format_value(value)}"
+    return f"{name} {_format_value(value)}"
+
+
+def _escape(value: str) -> str:
+    """Escape a label value."""
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value) -> str:
+    """Format a sample value."""
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if isinstance(value, int):
+        return str(value)
+    return repr(float(value))
+
+
+class MetricsServer:
+    """HTTP server exposing a collector at ``/metrics``."""
+
+    def __init__(
+        self, collector: MetricsCollector, host: str = "0.0.0.0", port: int = 9550
+    ):
+        """Initialize server for the given collector and bind address."""
+        self.collector = collector
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(handler):
+                if handler.path.split("?", 1)[0] != "/metrics":
+                    handler.send_error(404, "Only /metrics is served")
+                    return
+                body = collector.render().encode("utf-8")
+                handler.send_response(200)
+                handler.send_header(
+                    "Content-Type", "text/plain; version=0.0.4; charset=utf-8"
+                )
+                handler.send_header("Content-Length", str(len(body)))
+                handler.end_headers()
+                handler.wfile.write(body)
+
+            def log_message(handler, format, *args):
+                pass  # Keep the console quiet on every scrape
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        """Bound (host, port)."""
+        return self.httpd.server_address[:2]
+
+    def serve_forever(self):
+        """Serve until shutdown() is called."""
+        self.httpd.serve_forever()
+
+    def shutdown(self):
+        """Stop serving and close the socket."""
+        self.httpd.shutdown()
+        self.httpd.server_close()
@@ -0,0 +1,279 @@
+"""Laravel production caches: build them, verify them, and spot stale ones."""
+
+import os
+import shutil
+import statistics
+import subprocess
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+# `php artisan --version` runs per cold-boot measurement (median reported)
+BOOT_SAMPLES = 3
+
+# Keep this much of a failed command's output for its error message
+OUTPUT_TAIL = 2000
+
+RunCallback = Callable[[List[str], Path], None]
+
+
+class OptimizeError(Exception):
+    """A cache command failed or did not produce a fresh artifact."""
+
+
+@dataclass
+class CacheArtifact:
+    """A cache file (or directory of files) built from some sources.
+
+    With ``structural`` set only directory mtimes and the listed files
+    count: the optimized classmap goes stale when classes are added, moved
+    or removed, not when a class body is edited.
+    """
+
+    name: str
+    command: List[str]  # After the tool: artisan or composer arguments
+    tool: str  # "php" or "composer"
+    output: str  # Relative to the backend
+    sources: List[str]  # Files and directories, relative to the backend
+    structural: bool = False
+
+
+# In run order: the classmap first, since every artisan call loads it
+ARTIFACTS = [
+    CacheArtifact(
+        "classmap",
+        ["dump-autoload", "--optimize", "--no-dev", "--no-interaction"],
+        "composer",
+        "vendor/composer/autoload_classmap.php",
+        ["composer.json", "composer.lock", "app", "database"],
+        structural=True,
+    ),
+    CacheArtifact(
+        "config",
+        ["artisan", "config:cache"],
+        "php",
+        "bootstrap/cache/config.php",
+        [".env", "config"],
+    ),
+    CacheArtifact(
+        "routes",
+        ["artisan", "route:cache"],
+        "php",
+        "bootstrap/cache/routes-v7.php",
+        ["routes"],
+    ),
+    CacheArtifact(
+        "views",
+        ["artisan", "view:cache"],
+        "php",
+        "storage/framework/views",
+        ["resources/views"],
+    ),
+    CacheArtifact(
+        "events",
+        ["artisan", "event:cache"],
+        "php",
+        "bootstrap/cache/events.php",
+        ["app/Events", "app/Listeners", "app/Providers"],
+    ),
+]
+
+
+@dataclass
+class ArtifactStatus:
+    """State of one cache artifact."""
+
+    name: str
+    output: str
+    built_at: Optional[float] = None  # mtime; None when missing
+    newest_source: Optional[str] = None  # Relative path
+    source_mtime: Optional[float] = None
+
+    @property
+    def exists(self) -> bool:
+        return self.built_at is not None
+
+    @property
+    def stale(self) -> bool:
+        """Built, but a source changed since."""
+        return (
+            self.built_at is not None
+            and self.source_mtime is not None
+            and self.source_mtime > self.built_at
+        )
+
+
+@dataclass
+class OptimizeReport:
+    """Result of building the caches."""
+
+    boot_before: Optional[float] = None  # Seconds; None if artisan failed
+    boot_after: Optional[float] = None
+    timings: Dict[str, float] = field(default_factory=dict)
+    statuses: List[ArtifactStatus] = field(default_factory=list)
+
+
+def _newest(
+    root: Path, relative: str, structural: bool = False
+) -> Optional[Tuple[float, str]]:
+    """(mtime, relative path) of the newest file (or directory) under a path."""
+    path = root / relative
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    if not path.is_dir():
+        return stat.st_mtime, relative
+    newest = (stat.st_mtime, relative) if structural else None
+    stack = [path]
+    while stack:
+        directory = stack.pop()
+        try:
+            entries = list(os.scandir(directory))
+        except OSError:
+            continue
+        for entry in entries:
+            if entry.name.startswith("."):
+                continue
+            if entry.is_dir(follow_symlinks=False):
+                stack.append(Path(entry.path))
+                if not structural:
+                    continue
+            elif structural:
+                continue
+            mtime = entry.stat(follow_symlinks=False).st_mtime
+            if newest is None or mtime > newest[0]:
+                newest = (mtime, Path(entry.path).relative_to(root).as_posix())
+    return newest
+
+
+def run_command(command: List[str], cwd: Path):
+    """Run a command quietly; raise OptimizeError with its output on failure."""
+    executable = shutil.which(command[0]) or command[0]
+    try:
+        result = subprocess.run(
+            [executable, *command[1:]],
+            cwd=cwd,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            encoding="utf-8",
+            errors="replace",
+        )
+    except OSError as e:
+        raise OptimizeError(f"Cannot run {command[0]}: {e}")
+    if result.returncode != 0:
+        output = result.stdout.strip()[-OUTPUT_TAIL:]
+        raise OptimizeError(
+            f"{' '.join(command[:3])} exited with {result.returncode}: {output}"
+        )
+
+
+class LaravelOptimizer:
+    """Builds and inspects the Laravel backend's production caches."""
+
+    def __init__(self, backend: Path, php: str = "php", composer: str = "composer"):
+        """Initialize optimizer.
+
+        Args:
+            backend: Laravel application directory
+            php: PHP executable
+            composer: Composer executable
+        """
+        self.backend = backend
+        self.tools = {"php": php, "composer": composer}
+
+    def command(self, artifact: CacheArtifact) -> List[str]:
+        return [self.tools[artifact.tool], *artifact.command]
+
+    def status(self) -> List[ArtifactStatus]:
+        """Every artifact's build time against its newest source."""
+        statuses = []
+        for artifact in ARTIFACTS:
+            status = ArtifactStatus(artifact.name, artifact.output)
+            # For compiled views: the newest file (none when nothing is cached)
+            built = _newest(self.backend, artifact.output)
+            if built is not None:
+                status.built_at = built[0]
+            for source in artifact.sources:
+                newest = _newest(self.backend, source, artifact.structural)
+                if newest and (
+                    status.source_mtime is None or newest[0] > status.source_mtime
+                ):
+                    status.source_mtime, status.newest_source = newest
+            statuses.append(status)
+        return statuses
+
+    def boot_time(self, samples: int = BOOT_SAMPLES) -> Optional[float]:
+        """Median seconds for ``php artisan --version`` (a full framework boot)."""
+        executable = shutil.which(self.tools["php"]) or self.tools["php"]
+        timings = []
+        for _ in range(samples):
+            started = time.perf_counter()
+            try:
+                result = subprocess.run(
+                    [executable, "artisan", "--version"],
+                    cwd=self.backend,
+                    stdin=subprocess.DEVNULL,
+                    capture_output=True,
+                )
+            except OSError:
+                return None
+            if result.returncode != 0:
+                return None
+            timings.append(time.perf_counter() - started)
+        return statistics.median(timings)
+
+    def optimize(
+        self,
+        run: RunCallback = run_command,
+        log: Callable[[str], None] = lambda line: None,
+    ) -> OptimizeReport:
+        """Build every cache, then check each one is present and fresh.
+
+        Args:
+            run: Runs (command, cwd) and raises on failure
+            log: Receives progress lines
+
+        Raises:
+            OptimizeError: An artifact is missing or older than its sources
+                after its command ran
+        """
+        report = OptimizeReport()
+        report.boot_before = self.boot_time()
+        for artifact in ARTIFACTS:
+            started = time.perf_counter()
+            run(self.command(artifact), self.backend)
+            report.timings[artifact.name] = time.perf_counter() - started
+
+        report.statuses = self.status()
+        problems = []
+        for status in report.statuses:
+            if not status.exists:
+                if status.source_mtime is not None or status.name != "views":
+                    problems.append(f"{status.name}: {status.output} was not written")
+            elif status.stale:
+                problems.append(
+                    f"{status.name}: {status.output} is older than "
+                    f"{status.newest_source}"
+                )
+        if problems:
+            raise OptimizeError("; ".join(problems))
+
+        report.boot_after = self.boot_time()
+        log(f"Cold boot {format_boot(report.boot_before, report.boot_after)}")
+        return report
+
+
+def format_boot(before: Optional[float], after: Optional[float]) -> str:
+    """e.g. "412 ms -> 138 ms (-67%)"."""
+
+    def ms(value: Optional[float]) -> str:
+        return f"{value * 1000:.0f} ms" if value is not None else "n/a"
+
+    text = f"{ms(before)} -> {ms(after)}"
+    if before and after is not None:
+        text += f" ({(after - before) / before:+.0%})"
+    return text
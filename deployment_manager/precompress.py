@@ -0,0 +1,339 @@
+"""Precompressed (.gz/.br) static assets for the PWA, and their nginx rules."""
+
+import gzip
+import hashlib
+import json
+import os
+import re
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+try:
+    import brotli
+except ImportError:  # Optional: without it only .gz files are written
+    brotli = None
+
+# Text-like assets worth compressing; images and fonts like woff2 already are
+COMPRESSIBLE = {
+    ".html",
+    ".js",
+    ".mjs",
+    ".css",
+    ".json",
+    ".webmanifest",
+    ".map",
+    ".svg",
+    ".xml",
+    ".txt",
+    ".wasm",
+    ".ico",
+    ".ttf",
+    ".otf",
+    ".eot",
+}
+
+# Smaller files gain nothing worth a second file (nginx's gzip_min_length)
+MIN_SIZE = 1024
+
+# A variant must be at least this much smaller than the original to be kept
+MIN_RATIO = 0.9
+
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 11
+
+# Build tools name assets "<name>.<hash>.<ext>" or "<name>-<hash>.<ext>"
+HASHED_NAME = re.compile(r"[.-][A-Za-z0-9_-]{8,}\.[A-Za-z0-9]+$")
+
+# Share of a directory's assets that must be hash-named for long caching
+HASHED_SHARE = 0.9
+
+HASH_BLOCK = 1024 * 1024
+
+# Where Nuxt (nitro) and a plain Vite build put the files nginx serves
+PUBLIC_DIRS = (".output/public", "dist")
+
+# Written beside NGINX_CONFIG; include it from the PWA's server block
+NGINX_SNIPPET = "pwa-static.conf"
+
+ProgressCallback = Callable[[int, int], None]
+
+
+@dataclass
+class TypeStats:
+    """Totals for one asset type (file extension)."""
+
+    files: int = 0
+    original_bytes: int = 0
+    gzip_bytes: int = 0
+    brotli_bytes: int = 0
+    saved_bytes: int = 0  # Original minus the smallest variant kept
+
+
+@dataclass
+class PrecompressReport:
+    """Result of a precompress run."""
+
+    compressed: int = 0  # Files (re)compressed this run
+    unchanged: int = 0  # Skipped: same hash and variants present
+    removed: int = 0  # Variants of assets deleted or now too small
+    brotli: bool = False
+    by_type: Dict[str, TypeStats] = field(default_factory=dict)
+    hashed_dirs: List[str] = field(default_factory=list)
+    elapsed: float = 0.0
+    errors: List[str] = field(default_factory=list)
+
+    @property
+    def saved_bytes(self) -> int:
+        return sum(stats.saved_bytes for stats in self.by_type.values())
+
+
+def public_dir(pwa: Path) -> Optional[Path]:
+    """The PWA's built static files, or None before the first build."""
+    for relative in PUBLIC_DIRS:
+        if (pwa / relative).is_dir():
+            return pwa / relative
+    return None
+
+
+def manifest_path(cache_dir: Path, app: str) -> Path:
+    """Where precompress_assets() keeps an app's manifest."""
+    slug = app.replace("\\", "/").strip("/").replace("/", "_")
+    return cache_dir / "precompress" / f"{slug}.json"
+
+
+def _sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _write_variant(path: Path, data: bytes, mtime_ns: int):
+    """Write atomically with the source's mtime (nginx serves it for Last-Modified)."""
+    temp = path.with_name(f".{path.name}.tmp-{os.getpid()}")
+    temp.write_bytes(data)
+    os.utime(temp, ns=(mtime_ns, mtime_ns))
+    os.replace(temp, path)
+
+
+def _unlink(path: Path) -> bool:
+    try:
+        path.unlink()
+        return True
+    except FileNotFoundError:
+        return False
+
+
+def _remove_variants(path: Path) -> int:
+    return sum(_unlink(path.with_name(path.name + s)) for s in (".gz", ".br"))
+
+
+def _compress(
+    path: Path, mtime_ns: int, use_brotli: bool
+) -> Tuple[Optional[int], Optional[int]]:
+    """Write the .gz (and .br) beside a file; returns their sizes (None: not kept)."""
+    data = path.read_bytes()
+    limit = len(data) * MIN_RATIO
+    sizes: List[Optional[int]] = []
+    variants = [(".gz", lambda d: gzip.compress(d, GZIP_LEVEL, mtime=0))]
+    if use_brotli:
+        variants.append((".br", lambda d: brotli.compress(d, quality=BROTLI_QUALITY)))
+    for suffix, compress in variants:
+        target = path.with_name(path.name + suffix)
+        packed = compress(data)
+        if len(packed) <= limit:
+            _write_variant(target, packed, mtime_ns)
+            sizes.append(len(packed))
+        else:
+            _unlink(target)
+            sizes.append(None)
+    if not use_brotli:
+        _unlink(path.with_name(path.name + ".br"))  # Would be stale
+        sizes.append(None)
+    return sizes[0], sizes[1]
+
+
+def hashed_directories(root: Path) -> List[str]:
+    """Directories (relative, "/"-separated) whose assets are content-hashed."""
+    counts: Dict[str, List[int]] = {}
+    for directory, _, names in os.walk(root):
+        relative = Path(directory).relative_to(root).as_posix()
+        if relative == ".":
+            continue
+        for name in names:
+            if name.endswith((".gz", ".br")):
+                continue
+            count = counts.setdefault(relative, [0, 0])
+            count[0] += 1
+            count[1] += bool(HASHED_NAME.search(name))
+    return sorted(
+        relative
+        for relative, (total, hashed) in counts.items()
+        if total and hashed / total >= HASHED_SHARE
+    )
+
+
+def precompress_assets(
+    root: Path,
+    manifest_path: Path,
+    workers: Optional[int] = None,
+    use_brotli: bool = True,
+    progress: Optional[ProgressCallback] = None,
+) -> PrecompressReport:
+    """Write .gz (and .br) variants of the compressible assets under ``root``.
+
+    A manifest of each asset's size, mtime and SHA-256 is kept so unchanged
+    assets are skipped: same size and mtime skips without reading, same hash
+    skips without compressing. Variants that would not save at least 10% are
+    not kept, and variants of assets deleted since are removed. Compression runs
+    on a thread pool (zlib and brotli release the GIL).
+
+    Args:
+        root: Directory nginx serves (e.g. the Nuxt build's .output/public)
+        manifest_path: JSON file remembering what was compressed
+        workers: Compression threads (default: CPU count)
+        use_brotli: Also write .br when the brotli package is installed
+        progress: Called with (done, total) as files are processed
+    """
+    started = time.perf_counter()
+    use_brotli = use_brotli and brotli is not None
+    report = PrecompressReport(brotli=use_brotli)
+    try:
+        manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        manifest = {}
+    previous: Dict[str, dict] = manifest.get("files", {})
+    # Switching brotli on or off redoes every asset
+    reuse = manifest.get("brotli") == use_brotli
+
+    assets: List[Tuple[str, Path, os.stat_result]] = []
+    for directory, _, names in os.walk(root):
+        for name in names:
+            path = Path(directory) / name
+            if path.suffix.lower() not in COMPRESSIBLE:
+                continue
+            relative = path.relative_to(root).as_posix()
+            stat = path.stat()
+            if stat.st_size < MIN_SIZE:
+                if relative in previous:
+                    report.removed += _remove_variants(path)
+                continue
+            assets.append((relative, path, stat))
+    # Only variants written here are removed; a shipped .gz asset stays
+    for relative in set(previous) - {asset[0] for asset in assets}:
+        path = root / relative
+        if not path.exists():
+            report.removed += _remove_variants(path)
+
+    def process(asset: Tuple[str, Path, os.stat_result]) -> Tuple[str, dict, bool]:
+        relative, path, stat = asset
+        entry = previous.get(relative) if reuse else None
+        present = entry is not None and all(
+            path.with_name(path.name + suffix).exists()
+            for suffix, key in ((".gz", "gzip"), (".br", "brotli"))
+            if entry.get(key)
+        )
+        if present and (entry["size"], entry["mtime_ns"]) == (
+            stat.st_size,
+            stat.st_mtime_ns,
+        ):
+            return relative, entry, False
+        sha256 = _sha256(path)
+        if present and entry["sha256"] == sha256:
+            return relative, {**entry, "mtime_ns": stat.st_mtime_ns}, False
+        gzip_size, brotli_size = _compress(path, stat.st_mtime_ns, use_brotli)
+        entry = {
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "sha256": sha256,
+            "gzip": gzip_size,
+            "brotli": brotli_size,
+        }
+        return relative, entry, True
+
+    files: Dict[str, dict] = {}
+    done = 0
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 1) as pool:
+        futures = [(asset, pool.submit(process, asset)) for asset in assets]
+        for asset, future in futures:
+            try:
+                relative, entry, compressed = future.result()
+            except (OSError, zlib.error) as e:
+                report.errors.append(f"{asset[0]}: {e}")
+                continue
+            files[relative] = entry
+            if compressed:
+                report.compressed += 1
+            else:
+                report.unchanged += 1
+            done += 1
+            if progress:
+                progress(done, len(assets))
+
+    for relative, entry in files.items():
+        stats = report.by_type.setdefault(Path(relative).suffix.lower(), TypeStats())
+        stats.files += 1
+        stats.original_bytes += entry["size"]
+        stats.gzip_bytes += entry["gzip"] or entry["size"]
+        stats.brotli_bytes += entry["brotli"] or entry["gzip"] or entry["size"]
+        smallest = min(v for v in (entry["size"], entry["gzip"], entry["brotli"]) if v)
+        stats.saved_bytes += entry["size"] - smallest
+
+    manifest_path.parent.mkdir(parents=True, exist_ok=True)
+    temp = manifest_path.with_suffix(".tmp")
+    temp.write_text(json.dumps({"brotli": use_brotli, "files": files}), "utf-8")
+    os.replace(temp, manifest_path)
+
+    report.hashed_dirs = hashed_directories(root)
+    report.elapsed = time.perf_counter() - started
+    return report
+
+
+def nginx_snippet(root: Path, hashed_dirs: List[str], use_brotli: bool) -> str:
+    """nginx directives serving the variants, to include in the PWA's server block.
+
+    Content-hashed directories get a year of immutable caching; everything
+    else (index.html, the service worker, the manifest) keeps nginx's
+    default ETag revalidation so tablets pick up a deploy.
+    """
+    lines = [
+        "# Generated by the deployment manager (precompress); do not edit.",
+        f"# Assets: {root}",
+        "# Include inside the server block that serves the PWA, after its",
+        "# server-level root (the location below inherits it).",
+        "",
+        "gzip_static on;",
+    ]
+    # The stock Windows nginx has no brotli module; an unknown directive
+    # would keep it from starting, so this stays opt-in
+    lines.append(
+        "# brotli_static on;  # Uncomment with an ngx_brotli build of nginx"
+        if use_brotli
+        else "# brotli_static on;  # Needs ngx_brotli and .br files (pip install brotli)"
+    )
+    for directory in hashed_dirs:
+        lines += [
+            "",
+            f"location ^~ /{directory}/ {{",
+            "    gzip_static on;",
+            '    add_header Cache-Control "public, max-age=31536000, immutable";',
+            "}",
+        ]
+    return "\n".join(lines) + "\n"
+
+
+def write_if_changed(path: Path, text: str) -> bool:
+    """Write a file only when its content differs; returns whether it did."""
+    try:
+        if path.read_text(encoding="utf-8") == text:
+            return False
+    except OSError:
+        pass
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text, encoding="utf-8")
+    return True
@@ -0,0 +1,402 @@
+"""Laravel queue backlog monitor and queue worker autoscaling policy."""
+
+import json
+import math
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+try:
+    import pymysql
+except ImportError:
+    pymysql = None
+
+# Laravel's database queue tables
+JOBS_TABLE = "jobs"
+FAILED_JOBS_TABLE = "failed_jobs"
+
+# Seconds between samples of `queue autoscale`
+MONITOR_INTERVAL = 5.0
+
+
+class QueueMonitorError(Exception):
+    """The queue tables could not be read."""
+
+
+class SQLiteBackend:
+    """Jobs tables in an SQLite file (tests, or a backend on the sqlite driver)."""
+
+    placeholder = "?"
+    errors = (sqlite3.Error,)
+
+    def __init__(self, path: Path):
+        self.path = path
+
+    def connect(self):
+        if not Path(self.path).exists():
+            raise QueueMonitorError(f"Database not found: {self.path}")
+        return sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+
+    def __str__(self) -> str:
+        return f"sqlite:{self.path}"
+
+
+class MySQLBackend:
+    """Jobs tables in the backend's MySQL database (needs PyMySQL)."""
+
+    placeholder = "%s"
+    errors = (pymysql.Error, OSError) if pymysql else (OSError,)
+
+    def __init__(
+        self,
+        database: str,
+        user: str = "root",
+        password: str = "",
+        host: str = "127.0.0.1",
+        port: int = 3306,
+        connect_timeout: float = 5.0,
+    ):
+        self.database = database
+        self.user = user
+        self.password = password
+        self.host = host
+        self.port = port
+        self.connect_timeout = connect_timeout
+
+    def connect(self):
+        if pymysql is None:
+            raise QueueMonitorError(
+                "PyMySQL is not installed (pip install PyMySQL) - "
+                "the queue monitor needs it to read MySQL"
+            )
+        # Autocommit: every sample sees the latest committed rows
+        return pymysql.connect(
+            host=self.host,
+            port=self.port,
+            user=self.user,
+            password=self.password,
+            database=self.database,
+            connect_timeout=self.connect_timeout,
+            read_timeout=self.connect_timeout,
+            autocommit=True,
+        )
+
+    def __str__(self) -> str:
+        return f"mysql://{self.user}@{self.host}:{self.port}/{self.database}"
+
+
+class ConnectionPool:
+    """Up to ``size`` reusable connections to one backend.
+
+    Connections are opened on demand and returned to the pool after use; a
+    connection that raised is closed instead, so a dropped MySQL session is
+    replaced on the next checkout.
+    """
+
+    def __init__(self, backend, size: int = 2):
+        self.backend = backend
+        self._idle: "queue.LifoQueue" = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+
+    @contextmanager
+    def connection(self) -> Iterator:
+        self._slots.acquire()
+        try:
+            try:
+                connection = self._idle.get_nowait()
+            except queue.Empty:
+                connection = self.backend.connect()
+            try:
+                yield connection
+            except BaseException:
+                _close_quietly(connection)
+                raise
+            self._idle.put(connection)
+        finally:
+            self._slots.release()
+
+    def close(self):
+        while True:
+            try:
+                _close_quietly(self._idle.get_nowait())
+            except queue.Empty:
+                return
+
+
+def _close_quietly(connection):
+    try:
+        connection.close()
+    except Exception:
+        pass
+
+
+@dataclass
+class QueueCounts:
+    """Jobs of one queue."""
+
+    queue: str
+    pending: int = 0  # Due and waiting for a worker
+    reserved: int = 0  # Being processed
+    delayed: int = 0  # Not due yet (delay or retry backoff)
+    oldest_age: Optional[float] = None  # Seconds the oldest due job has waited
+
+
+@dataclass
+class QueueSnapshot:
+    """The jobs tables at one moment."""
+
+    taken_at: float
+    queues: List[QueueCounts] = field(default_factory=list)
+    failed: int = 0
+
+    @property
+    def pending(self) -> int:
+        return sum(q.pending for q in self.queues)
+
+    @property
+    def reserved(self) -> int:
+        return sum(q.reserved for q in self.queues)
+
+    @property
+    def delayed(self) -> int:
+        return sum(q.delayed for q in self.queues)
+
+    @property
+    def oldest_age(self) -> Optional[float]:
+        ages = [q.oldest_age for q in self.queues if q.oldest_age is not None]
+        return max(ages) if ages else None
+
+
+class QueueMonitor:
+    """Reads pending/reserved/delayed counts and failures from Laravel's tables."""
+
+    def __init__(
+        self,
+        pool: ConnectionPool,
+        jobs_table: str = JOBS_TABLE,
+        failed_table: str = FAILED_JOBS_TABLE,
+    ):
+        """Initialize monitor.
+
+        Args:
+            pool: Connections to the backend database
+            jobs_table: Laravel's ``jobs`` table
+            failed_table: Laravel's ``failed_jobs`` table
+        """
+        self.pool = pool
+        self.jobs_table = jobs_table
+        self.failed_table = failed_table
+
+    def snapshot(self, now: Optional[float] = None) -> QueueSnapshot:
+        """Count jobs per queue (``available_at`` is compared with ``now``)."""
+        now = time.time() if now is None else now
+        p = self.pool.backend.placeholder
+        jobs_query = (
+            "SELECT queue,"
+            f" SUM(CASE WHEN reserved_at IS NULL AND available_at <= {p}"
+            " THEN 1 ELSE 0 END),"
+            " SUM(CASE WHEN reserved_at IS NOT NULL THEN 1 ELSE 0 END),"
+            f" SUM(CASE WHEN reserved_at IS NULL AND available_at > {p}"
+            " THEN 1 ELSE 0 END),"
+            f" MIN(CASE WHEN reserved_at IS NULL AND available_at <= {p}"
+            " THEN available_at END)"
+            f" FROM {self.jobs_table} GROUP BY queue ORDER BY queue"
+        )
+        stamp = int(now)
+        snapshot = QueueSnapshot(now)
+        try:
+            with self.pool.connection() as connection:
+                cursor = connection.cursor()
+                cursor.execute(jobs_query, (stamp, stamp, stamp))
+                for name, pending, reserved, delayed, oldest in cursor.fetchall():
+                    snapshot.queues.append(
+                        QueueCounts(
+                            name,
+                            int(pending or 0),
+                            int(reserved or 0),
+                            int(delayed or 0),
+                            max(now - int(oldest), 0.0) if oldest is not None else None,
+                        )
+                    )
+                cursor.execute(f"SELECT COUNT(*) FROM {self.failed_table}")
+                snapshot.failed = int(cursor.fetchone()[0])
+                cursor.close()
+        except self.pool.backend.errors as e:
+            raise QueueMonitorError(f"{self.pool.backend}: {e}") from e
+        return snapshot
+
+
+@dataclass
+class ScalingPolicy:
+    """When to add or remove queue workers.
+
+    Scale up when pending jobs exceed ``jobs_per_worker`` per running worker
+    or the oldest due job has waited longer than ``max_wait``. Scale down
+    only when one worker fewer would still sit well below both limits
+    (``scale_down_ratio`` of them). Between the two bands the count holds,
+    so a backlog hovering near one limit does not flap the workers. Either
+    condition must also hold for several samples in a row, and a cooldown
+    follows every change.
+    """
+
+    min_workers: int = 1
+    max_workers: int = 3
+    jobs_per_worker: int = 20
+    max_wait: float = 30.0  # Seconds
+    scale_down_ratio: float = 0.25
+    up_samples: int = 2  # Consecutive samples over the high band
+    down_samples: int = 6  # Consecutive samples under the low band
+    up_cooldown: float = 60.0  # Seconds after any change before adding
+    down_cooldown: float = 300.0  # Seconds after any change before removing
+
+    @classmethod
+    def from_config(cls, config) -> "ScalingPolicy":
+        return cls(
+            min_workers=config.queue_min_workers,
+            max_workers=config.queue_max_workers,
+            jobs_per_worker=config.queue_jobs_per_worker,
+            max_wait=config.queue_max_wait,
+            up_cooldown=config.queue_scale_up_cooldown,
+            down_cooldown=config.queue_scale_down_cooldown,
+        )
+
+    def validate(self) -> List[str]:
+        errors = []
+        if self.min_workers < 1:
+            errors.append("QUEUE_MIN_WORKERS must be at least 1")
+        if self.max_workers < self.min_workers:
+            errors.append("QUEUE_MAX_WORKERS must be at least QUEUE_MIN_WORKERS")
+        if self.jobs_per_worker < 1:
+            errors.append("QUEUE_JOBS_PER_WORKER must be at least 1")
+        if not 0 <= self.scale_down_ratio < 1:
+            errors.append("scale_down_ratio must be in [0, 1)")
+        return errors
+
+
+@dataclass
+class ScalingDecision:
+    """One evaluation of the policy."""
+
+    ts: float
+    workers: int  # Running when evaluated
+    target: int
+    state: str  # "high", "low" or "steady" band; "bounds": outside min/max
+    reason: str
+    pending: int
+    oldest_age: Optional[float]
+
+    @property
+    def action(self) -> str:
+        if self.target > self.workers:
+            return "up"
+        if self.target < self.workers:
+            return "down"
+        return "hold"
+
+
+class Autoscaler:
+    """Applies a ScalingPolicy to successive snapshots (keeps streaks and cooldowns)."""
+
+    def __init__(self, policy: ScalingPolicy):
+        self.policy = policy
+        self.last_change: Optional[float] = None
+        self._high = 0
+        self._low = 0
+
+    def decide(
+        self, snapshot: QueueSnapshot, workers: int, now: Optional[float] = None
+    ) -> ScalingDecision:
+        """Target worker count for this sample.
+
+        Args:
+            snapshot: Latest queue counts
+            workers: Queue workers running now
+            now: Clock for cooldowns (default: the snapshot's time)
+        """
+        policy = self.policy
+        now = snapshot.taken_at if now is None else now
+        pending, age = snapshot.pending, snapshot.oldest_age or 0.0
+
+        def decision(target: int, state: str, reason: str) -> ScalingDecision:
+            if target != workers and state != "bounds":
+                self.last_change = now
+                self._high = self._low = 0
+            return ScalingDecision(
+                now, workers, target, state, reason, pending, snapshot.oldest_age
+            )
+
+        if workers < policy.min_workers:
+            return decision(policy.min_workers, "bounds", "below QUEUE_MIN_WORKERS")
+        if workers > policy.max_workers:
+            return decision(policy.max_workers, "bounds", "above QUEUE_MAX_WORKERS")
+
+        capacity = policy.jobs_per_worker * workers
+        low_water = policy.jobs_per_worker * (workers - 1) * policy.scale_down_ratio
+        if pending > capacity or age > policy.max_wait:
+            state = "high"
+            reason = (
+                f"{pending} pending > {capacity}"
+                if pending > capacity
+                else f"oldest job waited {age:.0f}s > {policy.max_wait:g}s"
+            )
+        elif pending <= low_water and age <= policy.max_wait * policy.scale_down_ratio:
+            state = "low"
+            reason = f"{pending} pending <= {low_water:g}"
+        else:
+            state = "steady"
+            reason = f"{pending} pending within {low_water:g}-{capacity}"
+        self._high = self._high + 1 if state == "high" else 0
+        self._low = self._low + 1 if state == "low" else 0
+        since_change = (
+            now - self.last_change if self.last_change is not None else math.inf
+        )
+
+        if state == "high" and workers < policy.max_workers:
+            if self._high < policy.up_samples:
+                reason += f" ({self._high}/{policy.up_samples} samples)"
+            elif since_change < policy.up_cooldown:
+                reason += f" (cooldown {policy.up_cooldown - since_change:.0f}s)"
+            else:
+                needed = math.ceil(pending / policy.jobs_per_worker)
+                target = min(policy.max_workers, max(workers + 1, needed))
+                return decision(target, state, reason)
+        elif state == "low" and workers > policy.min_workers:
+            if self._low < policy.down_samples:
+                reason += f" ({self._low}/{policy.down_samples} samples)"
+            elif since_change < policy.down_cooldown:
+                reason += f" (cooldown {policy.down_cooldown - since_change:.0f}s)"
+            else:
+                return decision(workers - 1, state, reason)
+        elif state == "high":
+            reason += " (at QUEUE_MAX_WORKERS)"
+        return decision(workers, state, reason)
+
+
+class DecisionLog:
+    """``logs/autoscale.jsonl``: every scaling action and every change of band."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._last_state: Optional[str] = None
+
+    def record(self, decision: ScalingDecision, results: Optional[Dict] = None):
+        """Append the decision if it acts or enters a new band; returns whether it did."""
+        if decision.action == "hold" and decision.state == self._last_state:
+            return False
+        self._last_state = decision.state
+        entry = asdict(decision)
+        entry["action"] = decision.action
+        if results:
+            entry["results"] = {
+                key: {"success": success, "message": message}
+                for key, (success, message) in results.items()
+            }
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry) + "\n")
+        return True
@@ -0,0 +1,203 @@
+"""Readiness probes: wait until started services actually accept traffic."""
+
+import http.client
+import socket
+import ssl
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+# Seconds start/start_all wait for services to become ready
+READY_TIMEOUT = 60.0
+
+# Seconds between attempts of one probe, and the timeout of each attempt
+PROBE_INTERVAL = 0.25
+ATTEMPT_TIMEOUT = 2.0
+
+
+@dataclass
+class Probe:
+    """One readiness condition of a service.
+
+    ``kind`` is "tcp" (connection accepted), "tls" (handshake completes, so
+    nginx loaded its certificate) or "http" (a response below 500 from
+    ``path``; 502/503 mean nginx is up but the backend is not).
+    """
+
+    kind: str
+    port: int
+    host: str = "127.0.0.1"
+    path: str = "/"
+    tls: bool = False  # For "http": use https
+    host_header: str = ""  # For "http": default is host
+
+    @property
+    def label(self) -> str:
+        if self.kind == "http":
+            scheme = "https" if self.tls else "http"
+            return f"{scheme}://{self.host}:{self.port}{self.path}"
+        return f"{self.kind} :{self.port}"
+
+
+@dataclass
+class Readiness:
+    """How long one service took to become ready after its start was issued."""
+
+    service: str
+    process_up: Optional[float] = None  # Seconds until the service ran
+    accepting: Optional[float] = None  # Seconds until every probe passed
+    errors: Dict[str, str] = field(default_factory=dict)  # Probe -> last error
+
+    @property
+    def ready(self) -> bool:
+        return self.process_up is not None and not self.errors
+
+    def summary(self) -> str:
+        """e.g. "process up 1.2s, accepting 2.9s" or the failing probes."""
+
+        def seconds(value: Optional[float]) -> str:
+            return f"{value:.1f}s" if value is not None else "never"
+
+        text = f"process up {seconds(self.process_up)}"
+        if self.accepting is not None or self.errors:
+            text += f", accepting {seconds(self.accepting)}"
+        if self.errors:
+            text += " (" + "; ".join(f"{k}: {v}" for k, v in self.errors.items()) + ")"
+        return text
+
+
+def unverified_context() -> ssl.SSLContext:
+    """TLS without certificate checks (mkcert's CA is not in Python's store)."""
+    context = ssl.create_default_context()
+    context.check_hostname = False
+    context.verify_mode = ssl.CERT_NONE
+    return context
+
+
+def attempt(probe: Probe, timeout: float = ATTEMPT_TIMEOUT):
+    """Run a probe once; raises OSError (or ssl/http errors) when not ready."""
+    if probe.kind == "tcp":
+        socket.create_connection((probe.host, probe.port), timeout=timeout).close()
+    elif probe.kind == "tls":
+        with socket.create_connection((probe.host, probe.port), timeout=timeout) as s:
+            unverified_context().wrap_socket(s, server_hostname=probe.host).close()
+    elif probe.kind == "http":
+        if probe.tls:
+            connection = http.client.HTTPSConnection(
+                probe.host, probe.port, timeout=timeout, context=unverified_context()
+            )
+        else:
+            connection = http.client.HTTPConnection(
+                probe.host, probe.port, timeout=timeout
+            )
+        try:
+            connection.request(
+                "GET", probe.path, headers={"Host": probe.host_header or probe.host}
+            )
+            status = connection.getresponse().status
+        finally:
+            connection.close()
+        if status >= 500:
+            raise OSError(f"HTTP {status}")
+    else:
+        raise ValueError(f"Unknown probe kind: {probe.kind}")
+
+
+def wait_ready(
+    started: Dict[str, float],
+    probes: Dict[str, List[Probe]],
+    is_running: Callable[[str], bool],
+    timeout: float = READY_TIMEOUT,
+) -> Dict[str, Readiness]:
+    """Wait until every started service runs and passes all its probes.
+
+    Each service's state poll and each probe retry on their own thread, so
+    the slowest service bounds the wait rather than the sum of all. Every
+    thread stops at its first success or at the shared deadline.
+
+    Args:
+        started: Service key -> perf_counter() when its start was issued
+        probes: Service key -> probes (services without any only need to run)
+        is_running: Whether a service's process is up
+        timeout: Seconds from now until giving up
+
+    Returns:
+        Readiness per started service; latencies count from its start.
+    """
+    deadline = time.perf_counter() + timeout
+    reports = {key: Readiness(key) for key in started}
+    lock = threading.Lock()
+
+    def poll_process(key: str):
+        while True:
+            try:
+                running = is_running(key)
+            except Exception:
+                running = False
+            if running:
+                reports[key].process_up = time.perf_counter() - started[key]
+                return
+            if time.perf_counter() > deadline:
+                return
+            time.sleep(PROBE_INTERVAL)
+
+    def poll_probe(key: str, probe: Probe):
+        while True:
+            try:
+                attempt(
+                    probe,
+                    min(ATTEMPT_TIMEOUT, max(deadline - time.perf_counter(), 0.1)),
+                )
+            except (OSError, ssl.SSLError, http.client.HTTPException) as e:
+                error = str(e) or type(e).__name__
+                if time.perf_counter() > deadline:
+                    with lock:
+                        reports[key].errors[probe.label] = error
+                    return
+                time.sleep(PROBE_INTERVAL)
+                continue
+            elapsed = time.perf_counter() - started[key]
+            with lock:
+                report = reports[key]
+                report.accepting = max(report.accepting or 0.0, elapsed)
+            return
+
+    tasks = [(poll_process, (key,)) for key in started]
+    tasks += [
+        (poll_probe, (key, probe)) for key in started for probe in probes.get(key, [])
+    ]
+    with ThreadPoolExecutor(max_workers=max(len(tasks), 1)) as pool:
+        for future in [pool.submit(task, *args) for task, args in tasks]:
+            future.result()
+
+    for report in reports.values():
+        if report.errors:
+            report.accepting = None
+    return reports
+
+
+def service_probes(config) -> Dict[str, List[Probe]]:
+    """Probes for the configured services.
+
+    Reverb must accept connections on its port. Nginx must accept on its
+    port, complete a TLS handshake when TLS is on, and answer the health
+    path (``HEALTH_CHECK_PATH``, Laravel's ``/up`` by default) without a
+    server error. The queue worker only has to run.
+    """
+    nginx_port = config.nginx_https_port if config.use_tls else config.nginx_http_port
+    nginx = [Probe("tcp", nginx_port)]
+    if config.use_tls:
+        nginx.append(Probe("tls", nginx_port))
+    if config.health_check_path:
+        nginx.append(
+            Probe(
+                "http",
+                nginx_port,
+                path=config.health_check_path,
+                tls=config.use_tls,
+                host_header=config.server_ip,
+            )
+        )
+    return {"reverb": [Probe("tcp", config.reverb_port)], "nginx": nginx}
@@ -0,0 +1,273 @@
+"""Blue/green releases of the backend: prepared off to the side, switched by link."""
+
+import json
+import os
+import shutil
+import sys
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, List, Optional
+
+# Releases kept besides the active one, for rollback by switching back
+RELEASES_KEEP = 5
+
+# Written into a release once it has been activated at least once
+RELEASE_FILE = ".release.json"
+
+# Never copied from one release to the next: shared, rebuilt or not deployed
+COPY_IGNORE = {"storage", ".git", "node_modules", RELEASE_FILE}
+
+# Rebuilt per release by the optimize stage (paths in them are per release)
+CACHE_FILES = ("config.php", "routes-v7.php", "events.php")
+
+
+@dataclass
+class ReleaseInfo:
+    """A release directory."""
+
+    release_id: str
+    path: Path
+    created_at: str = ""
+    description: str = ""
+    active: bool = False
+    complete: bool = False  # Activated at least once
+
+
+def read_link(path: Path) -> Optional[Path]:
+    """Target of a symlink or junction, or None for anything else."""
+    try:
+        target = os.readlink(path)
+    except (OSError, ValueError):
+        return None
+    # Windows reports junction targets with the \\?\ prefix
+    if target.startswith("\\\\?\\"):
+        target = target[4:]
+    return Path(target)
+
+
+def _make_link(target: Path, link: Path):
+    """Directory link: a junction on Windows (no privilege needed), else a symlink."""
+    if sys.platform == "win32":
+        import _winapi
+
+        _winapi.CreateJunction(str(target), str(link))
+    else:
+        os.symlink(target, link, target_is_directory=True)
+
+
+def _remove_link(link: Path):
+    """Remove a link without touching what it points at."""
+    try:
+        os.unlink(link)
+    except (IsADirectoryError, PermissionError):
+        os.rmdir(link)  # Junctions and Windows directory symlinks
+
+
+def switch_link(link: Path, target: Path):
+    """Point ``link`` at ``target`` in one step.
+
+    The new link is created beside the old one and renamed over it, which
+    is atomic for symlinks. Windows cannot rename over a junction, so there
+    the old one is removed first and the rename follows immediately.
+    """
+    temp = link.with_name(f".{link.name}.switch-{os.getpid()}")
+    if read_link(temp) is not None:
+        _remove_link(temp)
+    _make_link(target, temp)
+    try:
+        os.replace(temp, link)
+    except OSError:
+        _remove_link(link)
+        os.rename(temp, link)
+
+
+class Releases:
+    """Release directories of the backend and the link selecting one.
+
+    Layout under the project root::
+
+        releases/<id>/           a complete backend (code, vendor, .env)
+        releases/<id>/storage -> shared/storage
+        shared/storage/          uploads, logs, sessions shared by releases
+        <backend_dir> -> releases/<id>
+
+    Services, nginx and backups keep using ``backend_dir``; switching
+    releases only repoints that link.
+    """
+
+    def __init__(self, project_root: Path, backend_dir: str, keep: int = RELEASES_KEEP):
+        """Initialize releases.
+
+        Args:
+            project_root: Project root
+            backend_dir: Backend directory (relative), the link once enabled
+            keep: Releases kept besides the active one
+        """
+        self.project_root = project_root
+        self.link = project_root / backend_dir
+        self.releases_dir = project_root / "releases"
+        self.shared_dir = project_root / "shared"
+        self.keep = keep
+
+    @property
+    def enabled(self) -> bool:
+        """Whether the backend directory is a link into releases/."""
+        return read_link(self.link) is not None
+
+    def path(self, release_id: str) -> Path:
+        return self.releases_dir / release_id
+
+    def current(self) -> Optional[str]:
+        """Id of the active release."""
+        target = read_link(self.link)
+        if target is None:
+            return None
+        if not target.is_absolute():
+            target = self.link.parent / target
+        return target.name if target.parent.name == "releases" else None
+
+    def new_id(self) -> str:
+        base = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+        release_id, n = base, 1
+        while self.path(release_id).exists():
+            n += 1
+            release_id = f"{base}-{n}"
+        return release_id
+
+    def list(self) -> List[ReleaseInfo]:
+        """Releases, newest first."""
+        current = self.current()
+        releases = []
+        if not self.releases_dir.is_dir():
+            return releases
+        for path in self.releases_dir.iterdir():
+            if not path.is_dir() or path.name.startswith("."):
+                continue
+            info = ReleaseInfo(path.name, path, active=path.name == current)
+            try:
+                meta = json.loads((path / RELEASE_FILE).read_text(encoding="utf-8"))
+                info.created_at = meta.get("created_at", "")
+                info.description = meta.get("description", "")
+                info.complete = True
+            except (OSError, ValueError):
+                pass
+            releases.append(info)
+        releases.sort(key=lambda r: r.release_id, reverse=True)
+        return releases
+
+    def previous(self) -> Optional[str]:
+        """Newest complete release older than the active one."""
+        current = self.current()
+        for release in self.list():
+            if release.complete and (current is None or release.release_id < current):
+                return release.release_id
+        return None
+
+    def _link_storage(self, release: Path):
+        storage = release / "storage"
+        if read_link(storage) is not None:
+            _remove_link(storage)
+        elif storage.exists():
+            shutil.rmtree(storage)
+        _make_link(self.shared_dir / "storage", storage)
+
+    def _write_meta(self, release_id: str, description: str):
+        meta = {
+            "release_id": release_id,
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "description": description,
+        }
+        (self.path(release_id) / RELEASE_FILE).write_text(
+            json.dumps(meta, indent=2), encoding="utf-8"
+        )
+
+    def init(self) -> str:
+        """Turn the in-place backend directory into the first release.
+
+        The backend directory moves to ``releases/<id>/``, its storage to
+        ``shared/storage``, and the backend directory becomes a link. Stop
+        the services running from it first: Windows cannot move a directory
+        with open files.
+        """
+        if self.enabled:
+            raise ValueError("Releases are already enabled")
+        if not self.link.is_dir():
+            raise FileNotFoundError(f"{self.link} not found")
+
+        release_id = self.new_id()
+        release = self.path(release_id)
+        self.releases_dir.mkdir(parents=True, exist_ok=True)
+        self.shared_dir.mkdir(parents=True, exist_ok=True)
+        storage = self.link / "storage"
+        if storage.is_dir() and not (self.shared_dir / "storage").exists():
+            shutil.move(str(storage), str(self.shared_dir / "storage"))
+        (self.shared_dir / "storage").mkdir(parents=True, exist_ok=True)
+        shutil.move(str(self.link), str(release))
+        self._link_storage(release)
+        self._write_meta(release_id, "Converted from in-place backend")
+        _make_link(release, self.link)
+        return release_id
+
+    def prepare(self, release_id: str, source: Optional[Path] = None) -> Path:
+        """Create ``releases/<id>/`` from a source tree (default: the active release).
+
+        Shared storage is linked in and the active release's ``.env`` carried
+        over when the source has none. Dependencies are copied too, so the
+        install that follows only has to apply changes. Cached config, route
+        and event files are left out; the optimize stage rebuilds them.
+        """
+        if source is None:
+            current = self.current()
+            if current is None:
+                raise ValueError("No active release to copy")
+            source = self.path(current)
+        release = self.path(release_id)
+
+        def ignore(directory: str, names: List[str]) -> List[str]:
+            if Path(directory) == source:
+                return [name for name in names if name in COPY_IGNORE]
+            if Path(directory) == source / "bootstrap" / "cache":
+                return [name for name in names if name in CACHE_FILES]
+            return []
+
+        shutil.copytree(source, release, symlinks=True, ignore=ignore)
+        self._link_storage(release)
+        env = release / ".env"
+        active = self.link / ".env"
+        if not env.exists() and active.exists():
+            shutil.copy2(active, env)
+        return release
+
+    def activate(self, release_id: str, description: str = "") -> float:
+        """Switch the backend link to a release; returns seconds taken."""
+        release = self.path(release_id)
+        if not release.is_dir():
+            raise FileNotFoundError(f"Release {release_id} not found")
+        if not (release / RELEASE_FILE).exists():
+            self._write_meta(release_id, description)
+        started = time.perf_counter()
+        switch_link(self.link, release)
+        return time.perf_counter() - started
+
+    def discard(self, release_id: str):
+        """Delete a release that is not active."""
+        if release_id == self.current():
+            raise ValueError(f"Release {release_id} is active")
+        release = self.path(release_id)
+        storage = release / "storage"
+        if read_link(storage) is not None:
+            _remove_link(storage)  # Never follow into shared storage
+        shutil.rmtree(release, ignore_errors=True)
+
+    def prune(self, log: Callable[[str], None] = lambda line: None) -> List[str]:
+        """Delete all but the newest ``keep`` inactive releases."""
+        current = self.current()
+        inactive = [r for r in self.list() if r.release_id != current]
+        removed = []
+        for release in inactive[self.keep :]:
+            self.discard(release.release_id)
+            removed.append(release.release_id)
+            log(f"Removed release {release.release_id}")
+        return removed
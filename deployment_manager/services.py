@@ -1,12 +1,22 @@
 """Windows service management using NSSM - Standalone Version."""
 
+import contextlib
 import subprocess
 import platform
+import functools
+import time
 from pathlib import Path
-from typing import List, Optional, Dict
+from typing import Callable, List, Optional, Dict, Tuple
 from dataclasses import dataclass
 from enum import Enum
 
+import psutil
+
+try:
+    from .readiness import READY_TIMEOUT, Probe, Readiness, wait_ready
+except ImportError:
+    from readiness import READY_TIMEOUT, Probe, Readiness, wait_ready
+
 
 class ServiceStatus(Enum):
     """Service status states."""
@@ -29,6 +39,28 @@ class ServiceInfo:
     description: str = ""
 
 
+# Called as listener(operation, service_key, duration_seconds, success)
+OperationListener = Callable[[str, str, float, bool], None]
+
+
+def _observed(operation: str):
+    """Time a service operation and report it to registered listeners."""
+
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, service_key, *args, **kwargs):
+            started = time.perf_counter()
+            success, msg = method(self, service_key, *args, **kwargs)
+            self._notify_listeners(
+                operation, service_key, time.perf_counter() - started, success
+            )
+            return success, msg
+
+        return wrapper
+
+    return decorator
+
+
 class ServiceManager:
     """Manages Windows services using NSSM - Standalone Version with configurable paths."""
 
@@ -60,6 +92,9 @@ class ServiceManager:
         },
     }
 
+    # Artisan commands that make a Laravel service exit once idle
+    RELOAD_COMMANDS = {"reverb": "reverb:restart", "queue": "queue:restart"}
+
     def __init__(
         self,
         project_root: Path,
@@ -67,6 +102,10 @@ class ServiceManager:
         backend_dir: str = "apps/woosoo-nexus",
         nginx_exe: str = "bin/nginx/nginx.exe",
         nginx_config: str = "configs/nginx.conf",
+        log_rotation: Optional[Dict[str, Tuple[int, int]]] = None,
+        probes: Optional[Dict[str, List[Probe]]] = None,
+        ready_timeout: float = READY_TIMEOUT,
+        queue_workers: int = 1,
     ):
         """Initialize service manager with configurable paths.
 
@@ -76,6 +115,13 @@ class ServiceManager:
             backend_dir: Laravel backend directory (relative to project_root)
             nginx_exe: Nginx executable path (relative to project_root)
             nginx_config: Nginx config path (relative to project_root)
+            log_rotation: Service key -> (rotate_bytes, rotate_seconds) applied
+                to output.log/error.log at install time
+            probes: Service key -> readiness probes checked after a start
+                (see readiness.service_probes(); None: only wait to run)
+            ready_timeout: Seconds a start waits for readiness
+            queue_workers: Queue workers to manage, "queue" plus queue-2..N
+                (QUEUE_MAX_WORKERS; see queue_worker_keys())
         """
         self.project_root = project_root
 
@@ -108,6 +154,150 @@ class ServiceManager:
         self.SERVICES["nginx"]["exe"] = nginx_exe_path
         self.SERVICES["nginx"]["args"] = f"-c {nginx_config_path}"
 
+        # Register the extra queue workers (listed after "queue") so every
+        # command manages them
+        nginx = self.SERVICES.pop("nginx")
+        self.queue_worker_keys(queue_workers)
+        self.SERVICES["nginx"] = nginx
+
+        self.log_rotation = log_rotation or {}
+        self.probes = probes or {}
+        self.ready_timeout = ready_timeout
+        self._listeners: List[OperationListener] = []
+        self._quiet = 0
+
+    @staticmethod
+    def template_key(service_key: str) -> str:
+        """The template a service was made from ("queue" for "queue-2")."""
+        return service_key.split("-", 1)[0]
+
+    def is_extra_worker(self, service_key: str) -> bool:
+        """Whether a key is an extra queue worker ("queue-2"...)."""
+        return service_key != self.template_key(service_key)
+
+    def queue_keys(self) -> List[str]:
+        """Keys of every registered queue worker, "queue" first."""
+        return [key for key in self.SERVICES if self.template_key(key) == "queue"]
+
+    def managed_keys(self) -> List[str]:
+        """Keys the ``*_all`` operations and status cover.
+
+        Every template service, plus the extra queue workers that are
+        installed (``queue scale`` installs them on demand).
+        """
+        extra = [key for key in self.SERVICES if self.is_extra_worker(key)]
+        statuses = (
+            self.get_services_status([self.SERVICES[key]["name"] for key in extra])
+            if extra
+            else {}
+        )
+        return [
+            key
+            for key in self.SERVICES
+            if not self.is_extra_worker(key)
+            or statuses[self.SERVICES[key]["name"]] != ServiceStatus.NOT_INSTALLED
+        ]
+
+    def queue_worker_keys(self, count: int) -> List[str]:
+        """Keys of the first ``count`` queue workers: "queue", "queue-2", ...
+
+        Extra workers run the same command as separate NSSM services
+        (``woosoo-queue-worker-2``...), logging under ``logs/queue-<n>``. They
+        are installed for manual start, so Windows does not start them at
+        boot; ``queue scale``, the autoscaler and ``start all`` do.
+        """
+        keys = ["queue"]
+        template = self.SERVICES["queue"]
+        for index in range(2, count + 1):
+            key = f"queue-{index}"
+            if key not in self.SERVICES:
+                self.SERVICES[key] = dict(
+                    template,
+                    name=f"{template['name']}-{index}",
+                    display=f"{template['display']} {index}",
+                    start="SERVICE_DEMAND_START",
+                )
+            keys.append(key)
+        return keys
+
+    def running_queue_workers(self, maximum: int) -> List[str]:
+        """Keys of the queue workers (up to ``maximum``) that are running."""
+        keys = self.queue_worker_keys(maximum)
+        statuses = self.get_services_status([self.SERVICES[k]["name"] for k in keys])
+        return [
+            key
+            for key in keys
+            if statuses[self.SERVICES[key]["name"]] == ServiceStatus.RUNNING
+        ]
+
+    def scale_queue_workers(
+        self, count: int, maximum: int
+    ) -> Dict[str, tuple[bool, str]]:
+        """Run exactly the first ``count`` of ``maximum`` queue workers.
+
+        Missing workers are installed and started (waiting until they run);
+        the highest-numbered running ones beyond ``count`` are stopped. A job
+        a stopped worker was processing is retried once its reservation
+        expires (Laravel's ``retry_after``).
+        """
+        keys = self.queue_worker_keys(maximum)
+        names = [self.SERVICES[key]["name"] for key in keys]
+        statuses = self.get_services_status(names)
+        results = {}
+        for key, name in zip(keys[:count], names[:count]):
+            if statuses[name] == ServiceStatus.RUNNING:
+                continue
+            if statuses[name] == ServiceStatus.NOT_INSTALLED:
+                success, message = self.install_service(key)
+                if not success:
+                    results[key] = (success, message)
+                    continue
+            results[key] = self.start_service(key)
+        for key, name in reversed(list(zip(keys[count:], names[count:]))):
+            if statuses[name] == ServiceStatus.RUNNING:
+                results[key] = self.stop_service(key)
+        return results
+
+    def add_operation_listener(self, listener: OperationListener):
+        """Register a callback invoked after every start/stop/install operation."""
+        self._listeners.append(listener)
+
+    def _notify_listeners(
+        self, operation: str, service_key: str, duration: float, success: bool
+    ):
+        """Report a finished operation; listener failures never break the operation."""
+        if self._quiet:
+            return
+        for listener in self._listeners:
+            try:
+                listener(operation, service_key, duration, success)
+            except Exception:
+                pass
+
+    @contextlib.contextmanager
+    def _unobserved(self):
+        """Keep the steps of a compound operation (restart) from the listeners."""
+        self._quiet += 1
+        try:
+            yield
+        finally:
+            self._quiet -= 1
+
+    def get_log_dir(self, service_key: str) -> Path:
+        """Directory NSSM redirects a service's output.log/error.log into."""
+        return self.project_root / "logs" / service_key
+
+    def get_service_pid(self, service_name: str) -> Optional[int]:
+        """Get the process ID of a running service (None if unavailable)."""
+        win_service_get = getattr(psutil, "win_service_get", None)
+        if win_service_get is None:
+            return None
+
+        try:
+            return win_service_get(service_name).pid()
+        except Exception:
+            return None
+
     def get_service_status(self, service_name: str) -> ServiceStatus:
         """Get the status of a service."""
         try:
@@ -126,25 +316,82 @@ class ServiceManager:
             if result.returncode != 0:
                 return ServiceStatus.NOT_INSTALLED
 
-            status = result.stdout.strip().lower()
-            if "running" in status:
-                return ServiceStatus.RUNNING
-            elif "stopped" in status:
-                return ServiceStatus.STOPPED
-            elif "paused" in status:
-                return ServiceStatus.PAUSED
-            else:
-                return ServiceStatus.UNKNOWN
+            return self._parse_status(result.stdout)
+
+        except Exception:
+            return ServiceStatus.UNKNOWN
 
+    def get_services_status(self, service_names: List[str]) -> Dict[str, ServiceStatus]:
+        """Get the status of several services with at most one subprocess.
+
+        Uses the Windows service API through psutil when available and falls
+        back to a single PowerShell call covering every name.
+        """
+        win_service_get = getattr(psutil, "win_service_get", None)
+        if win_service_get is not None:
+            statuses = {}
+            for name in service_names:
+                try:
+                    state = win_service_get(name).status()
+                except psutil.NoSuchProcess:
+                    statuses[name] = ServiceStatus.NOT_INSTALLED
+                    continue
+                except Exception:
+                    statuses[name] = ServiceStatus.UNKNOWN
+                    continue
+                statuses[name] = self._parse_status(state)
+            return statuses
+
+        statuses = {name: ServiceStatus.NOT_INSTALLED for name in service_names}
+        names = ",".join(f'"{name}"' for name in service_names)
+        try:
+            result = subprocess.run(
+                [
+                    "powershell",
+                    "-Command",
+                    f"Get-Service -Name {names} -ErrorAction SilentlyContinue | "
+                    'ForEach-Object { "$($_.Name)=$($_.Status)" }',
+                ],
+                capture_output=True,
+                text=True,
+                timeout=10,
+            )
         except Exception:
+            return {name: ServiceStatus.UNKNOWN for name in service_names}
+
+        for line in result.stdout.splitlines():
+            if "=" not in line:
+                continue
+            name, state = line.strip().split("=", 1)
+            for wanted in service_names:
+                if wanted.lower() == name.lower():
+                    statuses[wanted] = self._parse_status(state)
+        return statuses
+
+    @staticmethod
+    def _parse_status(state: str) -> ServiceStatus:
+        """Map a Windows service state string to ServiceStatus."""
+        state = state.strip().lower()
+        if "running" in state:
+            return ServiceStatus.RUNNING
+        elif "stopped" in state:
+            return ServiceStatus.STOPPED
+        elif "paused" in state:
+            return ServiceStatus.PAUSED
+        else:
             return ServiceStatus.UNKNOWN
 
     def get_all_services_status(self) -> List[ServiceInfo]:
-        """Get status of all Woosoo services."""
+        """Get status of all Woosoo services (extra queue workers once installed)."""
         services = []
+        statuses = self.get_services_status(
+            [config["name"] for config in self.SERVICES.values()]
+        )
 
         for key, config in self.SERVICES.items():
-            status = self.get_service_status(config["name"])
+            status = statuses[config["name"]]
+            if self.is_extra_worker(key) and status == ServiceStatus.NOT_INSTALLED:
+                continue
             services.append(
                 ServiceInfo(
                     name=config["name"],
@@ -156,6 +403,7 @@ class ServiceManager:
 
         return services
 
+    @_observed("install")
     def install_service(self, service_key: str) -> tuple[bool, str]:
         """Install a service using NSSM."""
         if service_key not in self.SERVICES:
@@ -205,10 +453,17 @@ class ServiceManager:
             self._run_nssm(["set", service_name, "AppDirectory", app_dir])
             self._run_nssm(["set", service_name, "DisplayName", config["display"]])
             self._run_nssm(["set", service_name, "Description", config["description"]])
-            self._run_nssm(["set", service_name, "Start", "SERVICE_AUTO_START"])
+            self._run_nssm(
+                [
+                    "set",
+                    service_name,
+                    "Start",
+                    config.get("start", "SERVICE_AUTO_START"),
+                ]
+            )
 
             # Set stdout/stderr redirection
-            logs_dir = self.project_root / "logs" / service_key
+            logs_dir = self.get_log_dir(service_key)
             logs_dir.mkdir(parents=True, exist_ok=True)
 
             self._run_nssm(
@@ -219,11 +474,18 @@ class ServiceManager:
             )
             self._run_nssm(["set", service_name, "AppTimestampLog", "1"])
 
+            template_key = self.template_key(service_key)
+            if template_key in self.log_rotation:
+                self.configure_log_rotation(
+                    service_key, *self.log_rotation[template_key]
+                )
+
             return True, f"Service {service_name} installed successfully"
 
         except Exception as e:
             return False, f"Installation error: {str(e)}"
 
+    @_observed("uninstall")
     def uninstall_service(
         self, service_key: str, stop_first: bool = True
     ) -> tuple[bool, str]:
@@ -254,8 +516,27 @@ class ServiceManager:
         except Exception as e:
             return False, f"Uninstallation error: {str(e)}"
 
-    def start_service(self, service_key: str) -> tuple[bool, str]:
-        """Start a service."""
+    def start_service(self, service_key: str, wait: bool = True) -> tuple[bool, str]:
+        """Start a service and wait until it is ready.
+
+        The ``net start`` call is reported as the "start" operation and the
+        wait as "ready" (see wait_until_ready()).
+
+        Args:
+            service_key: Service to start
+            wait: Wait for the service to run and pass its readiness probes;
+                without it success only means ``net start`` succeeded
+        """
+        started = time.perf_counter()
+        success, message = self._net_start(service_key)
+        if not success or not wait:
+            return success, message
+        readiness = self.wait_until_ready({service_key: started})[service_key]
+        return self._ready_result(readiness)
+
+    @_observed("start")
+    def _net_start(self, service_key: str) -> tuple[bool, str]:
+        """Issue ``net start`` for a service without waiting for readiness."""
         if service_key not in self.SERVICES:
             return False, f"Unknown service: {service_key}"
 
@@ -287,6 +568,39 @@ class ServiceManager:
         except Exception as e:
             return False, f"Start error: {str(e)}"
 
+    def wait_until_ready(self, started: Dict[str, float]) -> Dict[str, Readiness]:
+        """Wait for started services to run and pass their probes, concurrently.
+
+        Each service's readiness latency is reported to the operation
+        listeners as a "ready" operation.
+
+        Args:
+            started: Service key -> time.perf_counter() when its start was issued
+        """
+        names = {key: self.SERVICES[key]["name"] for key in started}
+
+        def is_running(key: str) -> bool:
+            statuses = self.get_services_status([names[key]])
+            return statuses.get(names[key]) == ServiceStatus.RUNNING
+
+        reports = wait_ready(started, self.probes, is_running, self.ready_timeout)
+        for key, readiness in reports.items():
+            latency = readiness.accepting or readiness.process_up
+            self._notify_listeners(
+                "ready",
+                key,
+                latency if latency is not None else self.ready_timeout,
+                readiness.ready,
+            )
+        return reports
+
+    def _ready_result(self, readiness: Readiness) -> tuple[bool, str]:
+        service_name = self.SERVICES[readiness.service]["name"]
+        if readiness.ready:
+            return True, f"Service {service_name} ready: {readiness.summary()}"
+        return False, f"Service {service_name} not ready: {readiness.summary()}"
+
+    @_observed("stop")
     def stop_service(self, service_key: str) -> tuple[bool, str]:
         """Stop a service."""
         if service_key not in self.SERVICES:
@@ -321,20 +635,69 @@ class ServiceManager:
         except Exception as e:
             return False, f"Stop error: {str(e)}"
 
+    @_observed("restart")
     def restart_service(self, service_key: str) -> tuple[bool, str]:
-        """Restart a service."""
-        success, msg = self.stop_service(service_key)
-        if not success:
-            return False, f"Failed to stop: {msg}"
+        """Restart a service (reported as one "restart" operation)."""
+        with self._unobserved():
+            success, msg = self.stop_service(service_key)
+            if not success:
+                return False, f"Failed to stop: {msg}"
+
+            time.sleep(2)  # Wait for service to fully stop
+
+            return self.start_service(service_key)
+
+    @_observed("reload")
+    def reload_service(self, service_key: str) -> tuple[bool, str]:
+        """Reload a service gracefully, e.g. after switching releases.
+
+        Reverb and the queue workers are told to finish their current work
+        and exit (``reverb:restart``, ``queue:restart``); NSSM starts them
+        again from the backend directory, now pointing at the new release.
+        Nginx re-reads its config and replaces its workers without dropping
+        connections.
+        """
+        if service_key not in self.SERVICES:
+            return False, f"Unknown service: {service_key}"
 
-        import time
+        config = self.SERVICES[service_key]
+        service_name = config["name"]
+        if self.get_service_status(service_name) != ServiceStatus.RUNNING:
+            return True, f"Service {service_name} not running; nothing to reload"
+
+        if service_key == "nginx":
+            command = [str(self.project_root / config["exe"])]
+            command += config["args"].split() + ["-s", "reload"]
+        else:
+            command = [
+                config["exe"],
+                "artisan",
+                self.RELOAD_COMMANDS[self.template_key(service_key)],
+            ]
+        cwd = self.project_root / config["dir"] if config["dir"] else self.project_root
+
+        try:
+            result = subprocess.run(
+                command, cwd=cwd, capture_output=True, text=True, timeout=30
+            )
+            if result.returncode == 0:
+                return True, f"Service {service_name} reloaded"
+            error_msg = (
+                result.stderr.strip() if result.stderr else result.stdout.strip()
+            )
+            return False, f"Failed to reload: {error_msg}"
 
-        time.sleep(2)  # Wait for service to fully stop
+        except Exception as e:
+            return False, f"Reload error: {str(e)}"
 
-        return self.start_service(service_key)
+    def resume_service(self, service_key: str, wait: bool = True) -> tuple[bool, str]:
+        """Resume a paused service.
 
-    def resume_service(self, service_key: str) -> tuple[bool, str]:
-        """Resume a paused service."""
+        Args:
+            service_key: Service to resume
+            wait: If resuming fails and the service is started instead, wait
+                for it to be ready (see start_service())
+        """
         if service_key not in self.SERVICES:
             return False, f"Unknown service: {service_key}"
 
@@ -356,45 +719,84 @@ class ServiceManager:
                     result.stderr.strip() if result.stderr else result.stdout.strip()
                 )
                 # If it fails, try to start it instead
-                return self.start_service(service_key)
+                return self.start_service(service_key, wait=wait)
 
         except Exception as e:
             # Fallback to start
-            return self.start_service(service_key)
+            return self.start_service(service_key, wait=wait)
 
     def start_all(self) -> Dict[str, tuple[bool, str]]:
-        """Start all services."""
+        """Start all services, then wait for all of them to be ready at once."""
         results = {}
-        for key in self.SERVICES.keys():
+        started = {}
+        for key in self.managed_keys():
+            started[key] = time.perf_counter()
             # Check if paused first, if so resume instead
             status = self.get_service_status(self.SERVICES[key]["name"])
             if status == ServiceStatus.PAUSED:
-                results[key] = self.resume_service(key)
+                results[key] = self.resume_service(key, wait=False)
             else:
-                results[key] = self.start_service(key)
+                results[key] = self.start_service(key, wait=False)
+
+        pending = {
+            key: started[key] for key, (success, _) in results.items() if success
+        }
+        for key, readiness in self.wait_until_ready(pending).items():
+            results[key] = self._ready_result(readiness)
         return results
 
     def stop_all(self) -> Dict[str, tuple[bool, str]]:
         """Stop all services."""
         results = {}
-        for key in self.SERVICES.keys():
+        for key in self.managed_keys():
             results[key] = self.stop_service(key)
         return results
 
+    def reload_all(self) -> Dict[str, tuple[bool, str]]:
+        """Gracefully reload all running services."""
+        results = {}
+        for key in self.managed_keys():
+            results[key] = self.reload_service(key)
+        return results
+
     def install_all(self) -> Dict[str, tuple[bool, str]]:
-        """Install all services."""
+        """Install all services (``queue scale`` installs extra queue workers)."""
         results = {}
-        for key in self.SERVICES.keys():
+        for key in self.SERVICES_TEMPLATE:
             results[key] = self.install_service(key)
         return results
 
     def uninstall_all(self) -> Dict[str, tuple[bool, str]]:
         """Uninstall all services."""
         results = {}
-        for key in self.SERVICES.keys():
+        for key in self.managed_keys():
             results[key] = self.uninstall_service(key)
         return results
 
+    def configure_log_rotation(
+        self, service_key: str, rotate_bytes: int, rotate_seconds: int
+    ) -> tuple[bool, str]:
+        """Enable NSSM online rotation of a service's stdout/stderr logs."""
+        if service_key not in self.SERVICES:
+            return False, f"Unknown service: {service_key}"
+
+        service_name = self.SERVICES[service_key]["name"]
+        try:
+            for parameter, value in [
+                ("AppRotateFiles", 1),
+                ("AppRotateOnline", 1),
+                ("AppRotateBytes", rotate_bytes),
+                ("AppRotateSeconds", rotate_seconds),
+            ]:
+                result = self._run_nssm(["set", service_name, parameter, str(value)])
+                if result.returncode != 0:
+                    return False, f"Failed to set {parameter}: {result.stderr.strip()}"
+
+            return True, f"Log rotation configured for {service_name}"
+
+        except Exception as e:
+            return False, f"Rotation error: {str(e)}"
+
     def _run_nssm(self, args: List[str]) -> subprocess.CompletedProcess:
         """Run NSSM command."""
         cmd = [str(self.nssm_path)] + args
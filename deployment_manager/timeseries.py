@@ -0,0 +1,416 @@
+"""Ring-buffer time series of host and service metrics in a memory-mapped file."""
+
+import json
+import math
+import mmap
+import os
+import struct
+import threading
+import time
+from array import array
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+MAGIC = b"WSTS"
+STORE_VERSION = 1
+PAGE_SIZE = 4096
+_PREAMBLE = struct.Struct("<4sII")  # magic, version, header length
+
+NAN = float("nan")
+
+
+@dataclass(frozen=True)
+class Tier:
+    """One resolution: ``capacity`` slots of ``resolution`` seconds each.
+
+    Every slot is ``fields`` float64 values, the first being the slot's
+    bucket number (``ts // resolution``) so stale slots are recognised.
+    """
+
+    resolution: int
+    capacity: int
+    fields: int
+
+    @property
+    def span(self) -> int:
+        """Seconds of history kept."""
+        return self.resolution * self.capacity
+
+    @property
+    def nbytes(self) -> int:
+        return self.capacity * self.fields * 8
+
+
+# Raw samples (bucket, value) for an hour; 1-minute and 1-hour aggregates
+# (bucket, sum, count, min, max) for a day and 30 days
+TIERS = (Tier(1, 3600, 2), Tier(60, 1440, 5), Tier(3600, 720, 5))
+
+# Bytes per series, whatever the sample rate or uptime:
+# 3600*16 + 1440*40 + 720*40 = 144,000 (about 141 KB)
+SERIES_BYTES = sum(tier.nbytes for tier in TIERS)
+
+
+@dataclass
+class Window:
+    """Points of one series between two times, oldest first.
+
+    Sequences are NumPy arrays when NumPy is installed, lists otherwise.
+    For the raw tier ``mean``, ``minimum`` and ``maximum`` are the samples
+    themselves and every ``count`` is 1.
+    """
+
+    series: str
+    resolution: int
+    timestamps: Sequence[float]  # Start of each slot
+    mean: Sequence[float]
+    minimum: Sequence[float]
+    maximum: Sequence[float]
+    count: Sequence[float]
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+
+@dataclass
+class Summary:
+    """Aggregate of one series over a window."""
+
+    series: str
+    resolution: int
+    samples: int  # Raw samples behind the aggregate
+    mean: Optional[float] = None
+    minimum: Optional[float] = None
+    maximum: Optional[float] = None
+    last: Optional[float] = None  # Mean of the newest slot
+    last_ts: Optional[float] = None
+
+
+class MetricsStore:
+    """Fixed-size history of named series in one memory-mapped file.
+
+    Each series gets one ring buffer per tier, laid out back to back after
+    a page-aligned JSON header, so the file (and resident memory at most)
+    is ``len(series) * SERIES_BYTES`` plus the header however long the
+    process runs. A sample updates its 1 s slot and folds into the current
+    1 min and 1 h slots, so coarser tiers need no separate downsampling
+    pass. Reopening a file with the same tiers keeps the history of every
+    series still listed; series that are new start empty.
+
+    Writes land in the shared mapping; ``flush()`` (also on ``close()``)
+    pushes them to disk. Only one process should record at a time.
+    """
+
+    def __init__(
+        self, path: Path, series: Sequence[str], tiers: Sequence[Tier] = TIERS
+    ):
+        """Open or create the store.
+
+        Args:
+            path: Store file (e.g. ``logs/metrics.tsdb``)
+            series: Series names, e.g. "nginx.cpu"
+            tiers: Resolutions, finest first
+        """
+        self.path = path
+        self.series = list(dict.fromkeys(series))
+        self.tiers = tuple(tiers)
+        self.series_bytes = sum(tier.nbytes for tier in self.tiers)
+        self._lock = threading.Lock()
+        self._header = json.dumps(
+            {
+                "version": STORE_VERSION,
+                "tiers": [[t.resolution, t.capacity, t.fields] for t in self.tiers],
+                "series": self.series,
+            }
+        ).encode()
+        self._data_offset = _page_align(_PREAMBLE.size + len(self._header))
+
+        # Offset (in float64s) of each series' ring buffer in each tier
+        self._offsets: Dict[str, List[int]] = {}
+        position = 0
+        for name in self.series:
+            self._offsets[name] = []
+            for tier in self.tiers:
+                self._offsets[name].append(position)
+                position += tier.capacity * tier.fields
+
+        self._open()
+
+    @property
+    def size(self) -> int:
+        """File size in bytes (header included)."""
+        return self._data_offset + len(self.series) * self.series_bytes
+
+    def _open(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        existing = _read_header(self.path)
+        if existing is None or existing[0] != self._header_dict():
+            old = None
+            if existing is not None and existing[0]["tiers"] == (
+                self._header_dict()["tiers"]
+            ):
+                old = existing
+            self._create(old)
+        self._file = open(self.path, "r+b")
+        self._mmap = mmap.mmap(self._file.fileno(), 0)
+        self._view = memoryview(self._mmap)[self._data_offset :].cast("d")
+
+    def _header_dict(self) -> dict:
+        return json.loads(self._header)
+
+    def _create(self, old: Optional[Tuple[dict, int]]):
+        """Write a fresh file, copying series kept from an older layout."""
+        temp = self.path.with_name(self.path.name + ".tmp")
+        blank = array("d", [NAN]) * (self.series_bytes // 8)
+        with open(temp, "wb") as f:
+            f.write(_PREAMBLE.pack(MAGIC, STORE_VERSION, len(self._header)))
+            f.write(self._header)
+            f.write(b"\0" * (self._data_offset - f.tell()))
+            previous = {}
+            if old is not None:
+                header, data_offset = old
+                previous = {name: i for i, name in enumerate(header["series"])}
+            source = open(self.path, "rb") if previous else None
+            try:
+                for name in self.series:
+                    if name in previous:
+                        source.seek(data_offset + previous[name] * self.series_bytes)
+                        f.write(source.read(self.series_bytes))
+                    else:
+                        blank.tofile(f)
+            finally:
+                if source is not None:
+                    source.close()
+        os.replace(temp, self.path)
+
+    def record(self, values: Dict[str, Optional[float]], ts: Optional[float] = None):
+        """Store one sample of several series (None or NaN: no sample).
+
+        Args:
+            values: Series name -> value; unknown names are ignored
+            ts: Unix time of the sample (default: now)
+        """
+        ts = time.time() if ts is None else ts
+        view = self._view
+        with self._lock:
+            for name, value in values.items():
+                offsets = self._offsets.get(name)
+                if offsets is None:
+                    continue
+                missing = value is None or math.isnan(value)
+                value = NAN if missing else float(value)
+                for tier, offset in zip(self.tiers, offsets):
+                    bucket = float(ts // tier.resolution)
+                    i = offset + int(bucket % tier.capacity) * tier.fields
+                    if tier.fields == 2:
+                        view[i] = bucket
+                        view[i + 1] = value
+                    elif view[i] != bucket:
+                        # First sample of this slot's period: overwrite the old one
+                        view[i] = bucket
+                        if missing:
+                            view[i + 1], view[i + 2] = 0.0, 0.0
+                            view[i + 3] = view[i + 4] = NAN
+                        else:
+                            view[i + 1], view[i + 2] = value, 1.0
+                            view[i + 3] = view[i + 4] = value
+                    elif not missing:
+                        view[i + 1] += value
+                        view[i + 2] += 1.0
+                        if not view[i + 3] <= value:  # Also replaces NaN
+                            view[i + 3] = value
+                        if not view[i + 4] >= value:
+                            view[i + 4] = value
+
+    def tier_for(self, start: float, now: Optional[float] = None) -> Tier:
+        """Finest tier whose history still reaches back to ``start``."""
+        now = time.time() if now is None else now
+        for tier in self.tiers:
+            if now - start <= tier.span:
+                return tier
+        return self.tiers[-1]
+
+    def window(
+        self,
+        series: str,
+        start: float,
+        end: Optional[float] = None,
+        tier: Optional[Tier] = None,
+    ) -> Window:
+        """Points of a series from ``start`` to ``end`` (default: now).
+
+        Args:
+            series: Series name
+            start: Unix time of the oldest point
+            end: Unix time of the newest point
+            tier: Resolution to read (default: ``tier_for(start)``)
+        """
+        end = time.time() if end is None else end
+        tier = tier or self.tier_for(start, end)
+        offset = self._offsets[series][self.tiers.index(tier)]
+        first, last = start // tier.resolution, end // tier.resolution
+        length = tier.capacity * tier.fields
+
+        with self._lock:
+            if numpy is not None:
+                block = numpy.frombuffer(
+                    self._mmap,
+                    dtype=numpy.float64,
+                    count=length,
+                    offset=self._data_offset + offset * 8,
+                ).reshape(tier.capacity, tier.fields)
+                keep = (block[:, 0] >= first) & (block[:, 0] <= last)
+                if tier.fields == 2:
+                    keep &= ~numpy.isnan(block[:, 1])
+                else:
+                    keep &= block[:, 2] > 0
+                rows = block[keep]  # A copy; the mapping is released below
+                del block
+                rows = rows[numpy.argsort(rows[:, 0], kind="stable")]
+                timestamps = rows[:, 0] * tier.resolution
+                if tier.fields == 2:
+                    values = rows[:, 1]
+                    return Window(
+                        series,
+                        tier.resolution,
+                        timestamps,
+                        values,
+                        values,
+                        values,
+                        numpy.ones(len(values)),
+                    )
+                return Window(
+                    series,
+                    tier.resolution,
+                    timestamps,
+                    rows[:, 1] / rows[:, 2],
+                    rows[:, 3],
+                    rows[:, 4],
+                    rows[:, 2],
+                )
+
+            block = self._view[offset : offset + length]
+            columns = [block[k :: tier.fields].tolist() for k in range(tier.fields)]
+            del block
+        rows = sorted(
+            row
+            for row in zip(*columns)
+            if first <= row[0] <= last
+            and (row[1] == row[1] if tier.fields == 2 else row[2] > 0)
+        )
+        timestamps = [row[0] * tier.resolution for row in rows]
+        if tier.fields == 2:
+            values = [row[1] for row in rows]
+            return Window(
+                series,
+                tier.resolution,
+                timestamps,
+                values,
+                values,
+                values,
+                [1.0] * len(rows),
+            )
+        return Window(
+            series,
+            tier.resolution,
+            timestamps,
+            [row[1] / row[2] for row in rows],
+            [row[3] for row in rows],
+            [row[4] for row in rows],
+            [row[2] for row in rows],
+        )
+
+    def summary(
+        self,
+        series: str,
+        start: float,
+        end: Optional[float] = None,
+        tier: Optional[Tier] = None,
+    ) -> Summary:
+        """Sample-weighted mean, min, max and latest value over a window."""
+        window = self.window(series, start, end, tier)
+        result = Summary(series, window.resolution, 0)
+        if not len(window):
+            return result
+        if numpy is not None:
+            counts = window.count
+            result.samples = int(counts.sum())
+            result.mean = float((window.mean * counts).sum() / counts.sum())
+            result.minimum = float(window.minimum.min())
+            result.maximum = float(window.maximum.max())
+        else:
+            counts = window.count
+            result.samples = int(sum(counts))
+            result.mean = sum(m * c for m, c in zip(window.mean, counts)) / sum(counts)
+            result.minimum = min(window.minimum)
+            result.maximum = max(window.maximum)
+        result.last = float(window.mean[-1])
+        result.last_ts = float(window.timestamps[-1])
+        return result
+
+    def flush(self):
+        """Write dirty pages to disk."""
+        with self._lock:
+            self._mmap.flush()
+
+    def close(self):
+        if self._mmap.closed:
+            return
+        self.flush()
+        self._view.release()
+        self._mmap.close()
+        self._file.close()
+
+    def __enter__(self) -> "MetricsStore":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _page_align(size: int) -> int:
+    return -(-size // PAGE_SIZE) * PAGE_SIZE
+
+
+def _read_header(path: Path) -> Optional[Tuple[dict, int]]:
+    """(header, data offset) of an existing store; None if absent or unreadable."""
+    try:
+        with open(path, "rb") as f:
+            magic, version, length = _PREAMBLE.unpack(f.read(_PREAMBLE.size))
+            if magic != MAGIC or version != STORE_VERSION:
+                return None
+            header = json.loads(f.read(length))
+            data_offset = _page_align(_PREAMBLE.size + length)
+            tiers = header["tiers"]
+            series_bytes = sum(c * fields * 8 for _, c, fields in tiers)
+            if f.seek(0, os.SEEK_END) < data_offset + len(header["series"]) * (
+                series_bytes
+            ):
+                return None  # Truncated
+            return header, data_offset
+    except (OSError, ValueError, KeyError, TypeError, struct.error):
+        return None
+
+
+def sparkline(values: Sequence[float], width: int = 30) -> str:
+    """Values averaged into ``width`` bins and drawn with block characters."""
+    values = [v for v in values if v == v]
+    if not values:
+        return ""
+    bins = min(width, len(values))
+    means = []
+    for b in range(bins):
+        chunk = values[b * len(values) // bins : (b + 1) * len(values) // bins]
+        means.append(sum(chunk) / len(chunk))
+    low, high = min(means), max(means)
+    blocks = "▁▂▃▄▅▆▇█"
+    if high == low:
+        return blocks[0] * bins
+    return "".join(
+        blocks[round((m - low) / (high - low) * (len(blocks) - 1))] for m in means
+    )
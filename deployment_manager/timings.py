@@ -0,0 +1,310 @@
+"""Timing history of manager operations in SQLite, with regression detection."""
+
+import atexit
+import queue
+import socket
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+HISTORY_VERSION = 1
+
+# Rows older than this are deleted when a writer starts
+RETENTION_DAYS = 365
+
+# The writer commits once this many records are queued, or after FLUSH_SECONDS
+BATCH_SIZE = 100
+FLUSH_SECONDS = 1.0
+
+# Regression defaults: recent p50 must exceed the baseline p50 by this
+# fraction and by MIN_DELTA seconds, with MIN_SAMPLES in each window
+REGRESSION_THRESHOLD = 0.25
+MIN_DELTA = 0.05
+MIN_SAMPLES = 5
+
+PERIOD_FORMATS = {"day": "%Y-%m-%d", "week": "%G-W%V", "month": "%Y-%m"}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS timings (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    operation TEXT NOT NULL,
+    subject TEXT NOT NULL DEFAULT '',
+    duration REAL NOT NULL,
+    success INTEGER NOT NULL,
+    host TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS timings_operation ON timings (operation, subject, ts);
+CREATE INDEX IF NOT EXISTS timings_ts ON timings (ts);
+"""
+
+_STOP = object()
+
+Sample = Tuple[str, str, float, float, bool]  # operation, subject, ts, duration, ok
+
+
+@dataclass
+class OperationStats:
+    """Percentiles of one operation (over one period, if grouped)."""
+
+    operation: str
+    subject: str
+    period: str  # Empty when not grouped
+    count: int
+    failures: int
+    p50: Optional[float] = None  # Seconds, successful runs only
+    p95: Optional[float] = None
+    max: Optional[float] = None
+
+
+@dataclass
+class Regression:
+    """An operation whose recent median is slower than its baseline."""
+
+    operation: str
+    subject: str
+    baseline_p50: float
+    recent_p50: float
+    baseline_count: int
+    recent_count: int
+
+    @property
+    def change(self) -> float:
+        """Relative slowdown, e.g. 0.4 for 40% slower."""
+        return self.recent_p50 / self.baseline_p50 - 1 if self.baseline_p50 else 0.0
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    """Nearest-rank percentile (q in 0..1) of sorted values."""
+    if not values:
+        return None
+    index = min(len(values) - 1, max(0, round(q * (len(values) - 1))))
+    return values[index]
+
+
+def _connect(path: Path) -> sqlite3.Connection:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.executescript(SCHEMA)
+    db.execute(f"PRAGMA user_version={HISTORY_VERSION}")
+    return db
+
+
+class TimingHistory:
+    """Durations of checks, service operations and deploy stages (``timings.db``).
+
+    ``record()`` only puts the sample on a queue; a background thread
+    writes queued samples in batches, one transaction each, so recording
+    never waits on the disk or on another process holding the database.
+    Pending samples are flushed when the process exits.
+    """
+
+    def __init__(self, path: Path, host: Optional[str] = None):
+        """Initialize history.
+
+        Args:
+            path: SQLite database file (created on first write)
+            host: Recorded with each sample (default: this machine's name)
+        """
+        self.path = path
+        self.host = host or socket.gethostname()
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._writer: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+
+    def record(self, operation: str, subject: str, duration: float, success: bool):
+        """Queue one sample (usable as a ServiceManager listener)."""
+        self._queue.put(
+            (time.time(), operation, subject, duration, int(success), self.host)
+        )
+        if self._writer is None:
+            with self._lock:
+                if self._writer is None:
+                    self._writer = threading.Thread(
+                        target=self._write_loop, name="timing-history", daemon=True
+                    )
+                    self._writer.start()
+                    atexit.register(self.flush)
+
+    def flush(self, timeout: float = 10.0):
+        """Write everything queued so far and stop the writer."""
+        with self._lock:
+            writer, self._writer = self._writer, None
+        if writer is not None:
+            self._queue.put(_STOP)
+            writer.join(timeout)
+
+    def _write_loop(self):
+        try:
+            db = _connect(self.path)
+            cutoff = time.time() - RETENTION_DAYS * 86400
+            with db:
+                db.execute("DELETE FROM timings WHERE ts < ?", (cutoff,))
+        except sqlite3.Error:
+            db = None
+        stopping = False
+        while not stopping:
+            batch = [self._queue.get()]
+            if batch[0] is _STOP:
+                break
+            deadline = time.monotonic() + FLUSH_SECONDS
+            while len(batch) < BATCH_SIZE:
+                try:
+                    item = self._queue.get(
+                        timeout=max(0.0, deadline - time.monotonic())
+                    )
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            if db is None:
+                continue  # Unwritable: drop samples rather than block
+            try:
+                with db:
+                    db.executemany(
+                        "INSERT INTO timings (ts, operation, subject, duration,"
+                        " success, host) VALUES (?, ?, ?, ?, ?, ?)",
+                        batch,
+                    )
+            except sqlite3.Error:
+                pass  # Timing history is best effort
+        if db is not None:
+            db.close()
+
+    def close(self):
+        """Flush pending samples and close the query connection."""
+        self.flush()
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def samples(
+        self,
+        since: float,
+        until: Optional[float] = None,
+        operation: Optional[str] = None,
+    ) -> List[Sample]:
+        """Samples between two timestamps, oldest first.
+
+        Args:
+            since: Unix time of the oldest sample
+            until: Unix time samples must be before (default: now)
+            operation: Only this operation
+        """
+        if not self.path.exists():
+            return []
+        query = (
+            "SELECT operation, subject, ts, duration, success FROM timings"
+            " WHERE ts >= ?"
+        )
+        params: list = [since]
+        if until is not None:
+            query += " AND ts < ?"
+            params.append(until)
+        if operation is not None:
+            query += " AND operation = ?"
+            params.append(operation)
+        query += " ORDER BY ts"
+        with self._lock:
+            if self._db is None:
+                self._db = _connect(self.path)
+            rows = self._db.execute(query, params).fetchall()
+        return [(op, subject, ts, d, bool(ok)) for op, subject, ts, d, ok in rows]
+
+    def stats(
+        self,
+        since: float,
+        operation: Optional[str] = None,
+        period: Optional[str] = None,
+    ) -> List[OperationStats]:
+        """Percentiles per operation and subject, optionally per period.
+
+        Args:
+            since: Unix time of the oldest sample
+            operation: Only this operation
+            period: "day", "week" or "month" to group by (None: whole range)
+        """
+        return summarize(self.samples(since, operation=operation), period)
+
+    def regressions(
+        self,
+        baseline_since: float,
+        recent_since: float,
+        threshold: float = REGRESSION_THRESHOLD,
+        min_samples: int = MIN_SAMPLES,
+        min_delta: float = MIN_DELTA,
+    ) -> List[Regression]:
+        """Operations whose recent p50 exceeds their baseline p50.
+
+        The baseline is ``baseline_since`` up to ``recent_since``; the
+        recent window runs from there to now. Only successful runs count.
+
+        Args:
+            baseline_since: Unix time the baseline window starts
+            recent_since: Unix time the recent window starts
+            threshold: Relative slowdown to flag (0.25: 25% slower)
+            min_samples: Successful runs needed in each window
+            min_delta: Seconds the medians must also differ by (ignores jitter
+                of operations that take milliseconds)
+        """
+        windows: Dict[Tuple[str, str], Tuple[List[float], List[float]]] = {}
+        for op, subject, ts, duration, ok in self.samples(baseline_since):
+            if ok:
+                baseline, recent = windows.setdefault((op, subject), ([], []))
+                (recent if ts >= recent_since else baseline).append(duration)
+
+        found = []
+        for (op, subject), (baseline, recent) in sorted(windows.items()):
+            if len(baseline) < min_samples or len(recent) < min_samples:
+                continue
+            before = percentile(sorted(baseline), 0.5)
+            after = percentile(sorted(recent), 0.5)
+            if after > before * (1 + threshold) and after - before >= min_delta:
+                found.append(
+                    Regression(op, subject, before, after, len(baseline), len(recent))
+                )
+        found.sort(key=lambda r: r.change, reverse=True)
+        return found
+
+
+def summarize(
+    samples: List[Sample], period: Optional[str] = None
+) -> List[OperationStats]:
+    """Group samples by operation, subject (and period) into percentiles."""
+    groups: Dict[Tuple[str, str, str], Tuple[List[float], List[int]]] = {}
+    for op, subject, ts, duration, ok in samples:
+        label = (
+            datetime.fromtimestamp(ts).strftime(PERIOD_FORMATS[period])
+            if period
+            else ""
+        )
+        durations, failures = groups.setdefault((op, subject, label), ([], [0]))
+        if ok:
+            durations.append(duration)
+        else:
+            failures[0] += 1
+
+    stats = []
+    for (op, subject, label), (durations, failures) in sorted(groups.items()):
+        durations.sort()
+        stats.append(
+            OperationStats(
+                op,
+                subject,
+                label,
+                count=len(durations) + failures[0],
+                failures=failures[0],
+                p50=percentile(durations, 0.5),
+                p95=percentile(durations, 0.95),
+                max=durations[-1] if durations else None,
+            )
+        )
+    return stats
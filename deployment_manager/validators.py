@@ -4,11 +4,17 @@ import subprocess
 import socket
 import psutil
 import os
+import time
 from pathlib import Path
 from typing import Dict, List, Tuple
 from dataclasses import dataclass
 from enum import Enum
 
+try:
+    from .optimize import LaravelOptimizer
+except ImportError:
+    from optimize import LaravelOptimizer
+
 
 class ValidationLevel(Enum):
     """Validation check severity levels."""
@@ -28,42 +34,56 @@ class ValidationResult:
     passed: bool
     message: str
     recommendation: str = ""
+    duration: float = 0.0  # Seconds spent running the check
 
 
 class SystemValidator:
     """Validates system readiness for deployment."""
 
-    def __init__(self, project_root: Path):
+    def __init__(self, project_root: Path, backend_dir: str = "apps/woosoo-nexus"):
         """Initialize validator."""
         self.project_root = project_root
+        self.backend_dir = backend_dir
         self.results: List[ValidationResult] = []
 
     def run_all_checks(self) -> List[ValidationResult]:
         """Run all validation checks."""
         self.results = []
 
-        # Level 0: Critical
-        self.check_admin_privileges()
-        self.check_disk_space()
-        self.check_node_js()
-        self.check_php()
-        self.check_composer()
-        self.check_config_file()
-
-        # Level 1: High
-        self.check_php_extensions()
-        self.check_mysql()
-        self.check_file_permissions()
-
-        # Level 2: Medium
-        self.check_flutter()
-        self.check_existing_services()
-
-        # Level 3: Low
-        self.check_system_info()
+        checks = [
+            # Level 0: Critical
+            self.check_admin_privileges,
+            self.check_disk_space,
+            self.check_node_js,
+            self.check_php,
+            self.check_composer,
+            self.check_config_file,
+            # Level 1: High
+            self.check_php_extensions,
+            self.check_mysql,
+            self.check_file_permissions,
+            self.check_laravel_caches,
+            # Level 2: Medium
+            self.check_flutter,
+            self.check_existing_services,
+            # Level 3: Low
+            self.check_system_info,
+        ]
+
+        for check in checks:
+            self._run_timed(check)
 
         return self.results
 
+    def _run_timed(self, check):
+        """Run a check and record its duration on the results it added."""
+        first = len(self.results)
+        started = time.perf_counter()
+        check()
+        elapsed = time.perf_counter() - started
+        for result in self.results[first:]:
+            result.duration = elapsed
+
     def _add_result(
         self,
         name: str,
@@ -364,6 +384,46 @@ class SystemValidator:
                 "Check folder permissions or run as administrator",
             )
 
+    def check_laravel_caches(self):
+        """Check the backend's production caches exist and are not stale."""
+        backend = self.project_root / self.backend_dir
+        if not (backend / "artisan").exists():
+            return
+
+        statuses = LaravelOptimizer(backend).status()
+        stale = [s for s in statuses if s.stale]
+        missing = [
+            s.name
+            for s in statuses
+            if not s.exists and (s.name != "views" or s.source_mtime is not None)
+        ]
+        if stale:
+            self._add_result(
+                "Laravel Caches",
+                ValidationLevel.HIGH,
+                False,
+                "Stale: "
+                + ", ".join(
+                    f"{s.newest_source} is newer than {s.output}" for s in stale
+                ),
+                "Run: python deployment_manager\\main.py optimize",
+            )
+        elif missing:
+            self._add_result(
+                "Laravel Caches",
+                ValidationLevel.MEDIUM,
+                False,
+                f"Not cached: {', '.join(missing)}",
+                "Run: python deployment_manager\\main.py optimize",
+            )
+        else:
+            self._add_result(
+                "Laravel Caches",
+                ValidationLevel.HIGH,
+                True,
+                "Classmap, config, route, view and event caches are current",
+            )
+
     def check_flutter(self):
         """Check Flutter SDK (optional)."""
         try:
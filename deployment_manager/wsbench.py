@@ -0,0 +1,562 @@
+"""Reverb (Pusher protocol) WebSocket fan-out benchmark and stand-in server."""
+
+import asyncio
+import base64
+import hashlib
+import hmac
+import http.client
+import json
+import os
+import ssl
+import struct
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+try:
+    from .latency import LatencySketch
+    from .loadgen import PERCENTILES
+    from .readiness import unverified_context
+except ImportError:
+    from latency import LatencySketch
+    from loadgen import PERCENTILES
+    from readiness import unverified_context
+
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+OP_CONTINUATION, OP_TEXT, OP_CLOSE, OP_PING, OP_PONG = 0x0, 0x1, 0x8, 0x9, 0xA
+
+# Event name and channel prefix used for the benchmark broadcasts
+EVENT_NAME = "bench"
+CHANNEL_PREFIX = "bench-"
+
+# Pusher's HTTP API accepts at most this many channels per event
+MAX_CHANNELS_PER_EVENT = 100
+
+# Seconds to wait for a connect/subscribe, and for deliveries after the last send
+TIMEOUT = 10.0
+
+
+class ProtocolError(Exception):
+    """The server broke the WebSocket or Pusher protocol."""
+
+
+def _frame(opcode: int, payload: bytes, mask: bool) -> bytes:
+    """Encode one final frame (clients must mask, servers must not)."""
+    head = bytes([0x80 | opcode])
+    length = len(payload)
+    bit = 0x80 if mask else 0
+    if length < 126:
+        head += bytes([bit | length])
+    elif length < 1 << 16:
+        head += bytes([bit | 126]) + struct.pack("!H", length)
+    else:
+        head += bytes([bit | 127]) + struct.pack("!Q", length)
+    if not mask:
+        return head + payload
+    key = os.urandom(4)
+    return head + key + bytes(b ^ key[i % 4] for i, b in enumerate(payload))
+
+
+async def _read_message(reader: asyncio.StreamReader) -> Tuple[int, bytes]:
+    """Read one message (joining fragments): (opcode, payload)."""
+    message_opcode, parts = None, []
+    while True:
+        first, second = await reader.readexactly(2)
+        opcode, length = first & 0x0F, second & 0x7F
+        if length == 126:
+            (length,) = struct.unpack("!H", await reader.readexactly(2))
+        elif length == 127:
+            (length,) = struct.unpack("!Q", await reader.readexactly(8))
+        key = await reader.readexactly(4) if second & 0x80 else None
+        payload = await reader.readexactly(length)
+        if key:
+            payload = bytes(b ^ key[i % 4] for i, b in enumerate(payload))
+        if opcode >= 0x8:
+            return opcode, payload  # Control frames are never fragmented
+        if opcode != OP_CONTINUATION:
+            message_opcode = opcode
+        parts.append(payload)
+        if first & 0x80:
+            return message_opcode, b"".join(parts)
+
+
+def _accept_key(key: str) -> str:
+    return base64.b64encode(hashlib.sha1((key + WS_GUID).encode()).digest()).decode()
+
+
+async def _read_head(reader: asyncio.StreamReader) -> Tuple[str, Dict[str, str]]:
+    """An HTTP request/status line and its headers (names lowercased)."""
+    lines = (await reader.readuntil(b"\r\n\r\n")).decode("latin-1").split("\r\n")
+    headers = {}
+    for line in lines[1:]:
+        if ":" in line:
+            name, value = line.split(":", 1)
+            headers[name.strip().lower()] = value.strip()
+    return lines[0], headers
+
+
+def sign_events_request(
+    app_id: str, key: str, secret: str, body: bytes, timestamp: Optional[int] = None
+) -> str:
+    """Query string authenticating a POST to ``/apps/<id>/events`` (Pusher auth v1.0)."""
+    params = {
+        "auth_key": key,
+        "auth_timestamp": str(timestamp or int(time.time())),
+        "auth_version": "1.0",
+        "body_md5": hashlib.md5(body).hexdigest(),
+    }
+    query = "&".join(f"{k}={params[k]}" for k in sorted(params))
+    to_sign = f"POST\n/apps/{app_id}/events\n{query}"
+    signature = hmac.new(secret.encode(), to_sign.encode(), hashlib.sha256)
+    return f"{query}&auth_signature={signature.hexdigest()}"
+
+
+@dataclass
+class WsTarget:
+    """Reverb's address and the app credentials."""
+
+    host: str
+    port: int
+    app_id: str
+    app_key: str
+    app_secret: str
+    tls: bool = False
+
+    @classmethod
+    def from_url(cls, url: str, app_id: str, key: str, secret: str) -> "WsTarget":
+        parts = urlsplit(url)
+        if parts.scheme not in ("ws", "wss") or not parts.hostname:
+            raise ValueError(f"Not a ws(s) URL: {url}")
+        tls = parts.scheme == "wss"
+        port = parts.port or (443 if tls else 80)
+        return cls(parts.hostname, port, app_id, key, secret, tls)
+
+    @property
+    def url(self) -> str:
+        return f"{'wss' if self.tls else 'ws'}://{self.host}:{self.port}"
+
+
+@dataclass
+class WsBenchResult:
+    """Outcome of a fan-out run."""
+
+    target: str
+    connections: int  # Attempted
+    channels: int
+    messages: int  # Broadcasts sent per channel
+    connected: int = 0
+    subscribed: int = 0
+    errors: Dict[str, int] = field(default_factory=dict)
+    sent: int = 0  # Broadcasts accepted by the events API
+    expected: int = 0  # Deliveries due: subscribers x broadcasts on their channel
+    delivered: int = 0
+    elapsed: float = 0.0
+    connect: LatencySketch = field(default_factory=LatencySketch)  # ms
+    subscribe: LatencySketch = field(default_factory=LatencySketch)
+    delivery: LatencySketch = field(default_factory=LatencySketch)
+
+    @property
+    def delivery_rate(self) -> float:
+        return self.delivered / self.expected if self.expected else 0.0
+
+    def error(self, kind: str):
+        self.errors[kind] = self.errors.get(kind, 0) + 1
+
+    def to_dict(self) -> dict:
+        """JSON form, for saving and comparing runs."""
+
+        def summary(sketch: LatencySketch) -> dict:
+            data = {f"p{q * 100:g}": _round(sketch.quantile(q)) for q in PERCENTILES}
+            data.update(max=_round(sketch.max), count=sketch.count)
+            return data
+
+        return {
+            "target": self.target,
+            "connections": self.connections,
+            "channels": self.channels,
+            "messages": self.messages,
+            "connected": self.connected,
+            "subscribed": self.subscribed,
+            "errors": self.errors,
+            "sent": self.sent,
+            "expected": self.expected,
+            "delivered": self.delivered,
+            "delivery_rate": round(self.delivery_rate, 6),
+            "elapsed": round(self.elapsed, 3),
+            "connect_ms": summary(self.connect),
+            "subscribe_ms": summary(self.subscribe),
+            "delivery_ms": summary(self.delivery),
+        }
+
+
+def _round(value: Optional[float]) -> Optional[float]:
+    return round(value, 3) if value is not None else None
+
+
+class _PusherClient:
+    """One subscriber connection."""
+
+    def __init__(self, target: WsTarget, context: Optional[ssl.SSLContext]):
+        self.target = target
+        self.context = context
+        self.reader: Optional[asyncio.StreamReader] = None
+        self.writer: Optional[asyncio.StreamWriter] = None
+
+    async def connect(self):
+        """WebSocket handshake, then wait for pusher:connection_established."""
+        self.reader, self.writer = await asyncio.open_connection(
+            self.target.host,
+            self.target.port,
+            ssl=self.context,
+            server_hostname=self.target.host if self.context else None,
+        )
+        key = base64.b64encode(os.urandom(16)).decode()
+        path = f"/app/{self.target.app_key}?protocol=7&client=woosoo-bench&version=1.0"
+        self.writer.write(
+            (
+                f"GET {path} HTTP/1.1\r\n"
+                f"Host: {self.target.host}:{self.target.port}\r\n"
+                "Upgrade: websocket\r\n"
+                "Connection: Upgrade\r\n"
+                f"Sec-WebSocket-Key: {key}\r\n"
+                "Sec-WebSocket-Version: 13\r\n"
+                "\r\n"
+            ).encode("ascii")
+        )
+        status, headers = await _read_head(self.reader)
+        if " 101 " not in f"{status} ":
+            raise ProtocolError(f"Handshake refused: {status}")
+        if headers.get("sec-websocket-accept") != _accept_key(key):
+            raise ProtocolError("Bad Sec-WebSocket-Accept")
+        event = await self.receive()
+        if event.get("event") != "pusher:connection_established":
+            raise ProtocolError(f"Expected connection_established, got {event}")
+
+    async def send(self, event: dict):
+        self.writer.write(_frame(OP_TEXT, json.dumps(event).encode(), mask=True))
+        await self.writer.drain()
+
+    async def receive(self) -> dict:
+        """Next Pusher event; answers pings on the way."""
+        while True:
+            opcode, payload = await _read_message(self.reader)
+            if opcode == OP_PING:
+                self.writer.write(_frame(OP_PONG, payload, mask=True))
+                continue
+            if opcode == OP_CLOSE:
+                raise ProtocolError("Server closed the connection")
+            if opcode != OP_TEXT:
+                continue
+            event = json.loads(payload)
+            if event.get("event") == "pusher:ping":
+                await self.send({"event": "pusher:pong", "data": {}})
+                continue
+            if event.get("event") == "pusher:error":
+                raise ProtocolError(f"pusher:error {event.get('data')}")
+            return event
+
+    async def subscribe(self, channel: str):
+        await self.send({"event": "pusher:subscribe", "data": {"channel": channel}})
+        while True:
+            event = await self.receive()
+            if (
+                event.get("event") == "pusher_internal:subscription_succeeded"
+                and event.get("channel") == channel
+            ):
+                return
+
+    def close(self):
+        if self.writer is not None:
+            try:
+                self.writer.write(_frame(OP_CLOSE, struct.pack("!H", 1000), True))
+            except (OSError, RuntimeError):
+                pass
+            self.writer.close()
+
+
+def _trigger(target: WsTarget, channels: List[str], data: str, timeout: float):
+    """POST one event to the HTTP events API (blocking; run in a thread)."""
+    body = json.dumps({"name": EVENT_NAME, "channels": channels, "data": data})
+    body = body.encode()
+    query = sign_events_request(target.app_id, target.app_key, target.app_secret, body)
+    if target.tls:
+        connection = http.client.HTTPSConnection(
+            target.host, target.port, timeout=timeout, context=unverified_context()
+        )
+    else:
+        connection = http.client.HTTPConnection(
+            target.host, target.port, timeout=timeout
+        )
+    try:
+        connection.request(
+            "POST",
+            f"/apps/{target.app_id}/events?{query}",
+            body,
+            {"Content-Type": "application/json"},
+        )
+        response = connection.getresponse()
+        text = response.read().decode("utf-8", "replace")
+    finally:
+        connection.close()
+    if response.status != 200:
+        raise ProtocolError(f"Events API returned {response.status}: {text[:200]}")
+
+
+async def run_fanout(
+    target: WsTarget,
+    connections: int = 100,
+    channels: int = 1,
+    messages: int = 20,
+    interval: float = 0.5,
+    connect_concurrency: int = 50,
+    timeout: float = TIMEOUT,
+) -> WsBenchResult:
+    """Connect subscribers, broadcast through the events API, time every delivery.
+
+    Clients connect ``connect_concurrency`` at a time and are spread
+    round-robin over ``channels`` public channels. Once all have connected
+    (or failed), one event per ``interval`` is triggered on every channel;
+    each carries a sequence number, and its delivery latency on every
+    subscriber counts from just before the triggering POST.
+
+    Args:
+        target: Reverb address and app credentials
+        connections: Subscriber connections to open
+        channels: Channels to spread them over
+        messages: Broadcasts to send (each to every channel)
+        interval: Seconds between broadcasts
+        connect_concurrency: Connection attempts in flight at once
+        timeout: Seconds per connect/subscribe, and for the last deliveries
+    """
+    result = WsBenchResult(target.url, connections, channels, messages)
+    context = unverified_context() if target.tls else None
+    names = [f"{CHANNEL_PREFIX}{i}" for i in range(channels)]
+    subscribers = {name: 0 for name in names}
+    sent_at: Dict[int, float] = {}
+    gate = asyncio.Semaphore(connect_concurrency)
+    ready = asyncio.Event()
+    pending = [connections]
+    clients: List[_PusherClient] = []
+    started = time.perf_counter()
+
+    def settled():
+        pending[0] -= 1
+        if pending[0] == 0:
+            ready.set()
+
+    async def subscriber(index: int):
+        client = _PusherClient(target, context)
+        clients.append(client)
+        channel = names[index % channels]
+        try:
+            async with gate:
+                began = time.perf_counter()
+                await asyncio.wait_for(client.connect(), timeout)
+                connected = time.perf_counter()
+                result.connected += 1
+                result.connect.add((connected - began) * 1000)
+                await asyncio.wait_for(client.subscribe(channel), timeout)
+                result.subscribe.add((time.perf_counter() - connected) * 1000)
+                result.subscribed += 1
+                subscribers[channel] += 1
+        except asyncio.TimeoutError:
+            result.error("timeout")
+            settled()
+            return
+        except (OSError, asyncio.IncompleteReadError, ProtocolError, ValueError) as e:
+            result.error(type(e).__name__)
+            settled()
+            return
+        settled()
+        try:
+            while True:
+                event = await client.receive()
+                if event.get("event") != EVENT_NAME:
+                    continue
+                received = time.perf_counter()
+                sequence = json.loads(event.get("data") or "{}").get("seq")
+                if sequence in sent_at:
+                    result.delivery.add((received - sent_at[sequence]) * 1000)
+                    result.delivered += 1
+        except (
+            OSError,
+            asyncio.IncompleteReadError,
+            ProtocolError,
+            ValueError,
+            asyncio.CancelledError,
+        ):
+            return
+
+    tasks = [asyncio.ensure_future(subscriber(i)) for i in range(connections)]
+    await ready.wait()
+
+    loop = asyncio.get_running_loop()
+    active = [name for name in names if subscribers[name]]
+    for sequence in range(messages if active else 0):
+        sent_at[sequence] = time.perf_counter()
+        data = json.dumps({"seq": sequence})
+        try:
+            for i in range(0, len(active), MAX_CHANNELS_PER_EVENT):
+                batch = active[i : i + MAX_CHANNELS_PER_EVENT]
+                await loop.run_in_executor(None, _trigger, target, batch, data, timeout)
+            result.sent += 1
+            result.expected += sum(subscribers[name] for name in active)
+        except (OSError, http.client.HTTPException, ProtocolError) as e:
+            result.error(f"trigger: {e}")
+        if sequence < messages - 1:
+            await asyncio.sleep(interval)
+
+    deadline = time.perf_counter() + timeout
+    while result.delivered < result.expected and time.perf_counter() < deadline:
+        await asyncio.sleep(0.05)
+    result.elapsed = time.perf_counter() - started
+
+    for client in clients:
+        client.close()
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    return result
+
+
+class StubReverb:
+    """In-process stand-in for Reverb: Pusher WebSockets plus the events API.
+
+    Enough of the protocol for ``run_fanout``: connection_established,
+    public channel subscriptions, pings, and signed ``POST
+    /apps/<id>/events`` broadcasts. Used by ``bench ws --stub`` and tests.
+    """
+
+    def __init__(
+        self,
+        app_id: str = "bench",
+        key: str = "bench-key",
+        secret: str = "bench-secret",
+    ):
+        self.app_id = app_id
+        self.key = key
+        self.secret = secret
+        self.channels: Dict[str, Set[asyncio.StreamWriter]] = {}
+        self.broadcasts = 0
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._sockets = 0
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> int:
+        """Listen (port 0: any free one); returns the port."""
+        self._server = await asyncio.start_server(
+            self._handle, host, port, backlog=1024
+        )
+        return self._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            for members in self.channels.values():
+                for writer in members:
+                    writer.close()
+            await self._server.wait_closed()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            request, headers = await _read_head(reader)
+            method, target = request.split(" ")[:2]
+            if headers.get("upgrade", "").lower() == "websocket":
+                await self._websocket(reader, writer, target, headers)
+            elif method == "POST":
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+                status, text = self._events(target, body)
+                writer.write(
+                    (
+                        f"HTTP/1.1 {status}\r\nContent-Type: application/json\r\n"
+                        f"Content-Length: {len(text)}\r\nConnection: close\r\n\r\n"
+                        f"{text}"
+                    ).encode()
+                )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            for members in self.channels.values():
+                members.discard(writer)
+            writer.close()
+
+    async def _websocket(self, reader, writer, target: str, headers: Dict[str, str]):
+        if urlsplit(target).path != f"/app/{self.key}":
+            writer.write(b"HTTP/1.1 404 Not Found\r\nContent-Length: 0\r\n\r\n")
+            return
+        writer.write(
+            (
+                "HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\n"
+                "Connection: Upgrade\r\n"
+                f"Sec-WebSocket-Accept: {_accept_key(headers['sec-websocket-key'])}"
+                "\r\n\r\n"
+            ).encode()
+        )
+        self._sockets += 1
+        socket_id = f"{self._sockets}.{id(writer) % 1000000}"
+
+        def send(event: dict):
+            writer.write(_frame(OP_TEXT, json.dumps(event).encode(), mask=False))
+
+        send(
+            {
+                "event": "pusher:connection_established",
+                "data": json.dumps({"socket_id": socket_id, "activity_timeout": 30}),
+            }
+        )
+        while True:
+            opcode, payload = await _read_message(reader)
+            if opcode == OP_CLOSE:
+                return
+            if opcode == OP_PING:
+                writer.write(_frame(OP_PONG, payload, mask=False))
+                continue
+            event = json.loads(payload)
+            name = event.get("event")
+            if name == "pusher:ping":
+                send({"event": "pusher:pong", "data": {}})
+            elif name == "pusher:subscribe":
+                channel = event["data"]["channel"]
+                self.channels.setdefault(channel, set()).add(writer)
+                send(
+                    {
+                        "event": "pusher_internal:subscription_succeeded",
+                        "channel": channel,
+                        "data": "{}",
+                    }
+                )
+            await writer.drain()
+
+    def _events(self, target: str, body: bytes) -> Tuple[str, str]:
+        parts = urlsplit(target)
+        if parts.path != f"/apps/{self.app_id}/events":
+            return "404 Not Found", "{}"
+        query = dict(parse_qsl(parts.query))
+        expected = dict(
+            parse_qsl(
+                sign_events_request(
+                    self.app_id,
+                    self.key,
+                    self.secret,
+                    body,
+                    int(query.get("auth_timestamp", 0)),
+                )
+            )
+        )
+        if query.get("auth_signature") != expected["auth_signature"]:
+            return "401 Unauthorized", '{"error":"Invalid signature"}'
+        event = json.loads(body)
+        for channel in event["channels"]:
+            message = _frame(
+                OP_TEXT,
+                json.dumps(
+                    {"event": event["name"], "channel": channel, "data": event["data"]}
+                ).encode(),
+                mask=False,
+            )
+            for writer in list(self.channels.get(channel, ())):
+                writer.write(message)
+        self.broadcasts += 1
+        return "200 OK", "{}"
@@ -0,0 +1,77 @@
+"""Stand-in for mysqldump and mysql when testing database backups.
+
+    python mysql_stub.py dump [mysqldump options] DATABASE
+    python mysql_stub.py restore [mysql options] DATABASE
+
+``dump`` writes deterministic synthetic SQL for DATABASE to stdout
+(``STUB_DUMP_MB`` megabytes, default 8). ``restore`` reads SQL from stdin
+and, when ``STUB_RESTORE_OUT`` is set, writes "<sha256> <bytes>" of what it
+received there. ``STUB_FAIL=1`` makes either mode fail like the real tool.
+Point ``MYSQLDUMP_PATH`` / ``MYSQL_PATH`` at the .cmd wrappers next to this
+file to use it from the CLI.
+"""
+
+import hashlib
+import os
+import random
+import sys
+
+ROWS_PER_INSERT = 200
+
+
+def dump(database: str, size: int):
+    out = sys.stdout.buffer
+    rng = random.Random(database)
+    header = (
+        f"-- Stub dump of `{database}`\n"
+        "SET NAMES utf8mb4;\n"
+        "DROP TABLE IF EXISTS `orders`;\n"
+        "CREATE TABLE `orders` (`id` bigint PRIMARY KEY, `table_no` int,"
+        " `total` decimal(10,2), `note` varchar(255));\n"
+    ).encode()
+    out.write(header)
+    written, row = len(header), 0
+    while written < size:
+        values = []
+        for _ in range(ROWS_PER_INSERT):
+            row += 1
+            note = "".join(rng.choices("abcdefghijklmnopqrstuvwxyz ", k=40))
+            values.append(
+                f"({row},{rng.randint(1, 60)},{rng.randint(100, 99999) / 100:.2f},"
+                f"'{note}')"
+            )
+        statement = f"INSERT INTO `orders` VALUES {','.join(values)};\n".encode()
+        out.write(statement)
+        written += len(statement)
+    out.flush()
+
+
+def restore():
+    digest = hashlib.sha256()
+    received = 0
+    for block in iter(lambda: sys.stdin.buffer.read(1024 * 1024), b""):
+        digest.update(block)
+        received += len(block)
+    report = os.environ.get("STUB_RESTORE_OUT")
+    if report:
+        with open(report, "w", encoding="utf-8") as f:
+            f.write(f"{digest.hexdigest()} {received}\n")
+
+
+def main(argv):
+    mode, database = argv[1], argv[-1]
+    if os.environ.get("STUB_FAIL") == "1":
+        sys.stderr.write(f"ERROR 1045 (28000): Access denied for '{database}'\n")
+        return 2
+    if mode == "dump":
+        dump(database, int(float(os.environ.get("STUB_DUMP_MB", "8")) * 1024**2))
+    elif mode == "restore":
+        restore()
+    else:
+        sys.stderr.write(f"Unknown mode: {mode}\n")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
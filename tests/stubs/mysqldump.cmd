@@ -0,0 +1 @@
+@python "%~dp0mysql_stub.py" dump %*
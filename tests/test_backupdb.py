@@ -0,0 +1,78 @@
+"""Streaming database dumps through the backup store, with a stub mysql."""
+
+import hashlib
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from deployment_manager.backupdb import (
+    DatabaseTarget,
+    dump_databases,
+    restore_databases,
+)
+from deployment_manager.backupstore import BackupStore
+
+STUB = Path(__file__).parent / "stubs" / "mysql_stub.py"
+
+
+def stub_tool(directory: Path, mode: str) -> str:
+    """Executable running the stub in ``mode`` (mysqldump or mysql contract)."""
+    if os.name == "nt":
+        path = directory / f"{mode}.cmd"
+        path.write_text(f'@"{sys.executable}" "{STUB}" {mode} %*\r\n')
+    else:
+        path = directory / mode
+        path.write_text(f'#!/bin/sh\nexec "{sys.executable}" "{STUB}" {mode} "$@"\n')
+        path.chmod(0o755)
+    return str(path)
+
+
+@pytest.fixture
+def tools(tmp_path, monkeypatch):
+    monkeypatch.setenv("STUB_DUMP_MB", "6")
+    return stub_tool(tmp_path, "dump"), stub_tool(tmp_path, "restore")
+
+
+def test_dump_store_restore_round_trip(tmp_path, tools, monkeypatch):
+    dump_tool, restore_tool = tools
+    store = BackupStore(tmp_path / "backups", workers=2)
+    target = DatabaseTarget("woosoo_api", "root", "secret")
+    expected = hashlib.sha256(
+        subprocess.run(
+            [sys.executable, str(STUB), "dump", target.name],
+            capture_output=True,
+            check=True,
+        ).stdout
+    ).hexdigest()
+
+    (dumped,) = dump_databases(store.chunks, dump_tool, [target])
+    assert dumped.error is None
+    assert dumped.bytes >= 6 * 1024**2
+    assert dumped.entry.sha256 == expected
+    assert len(dumped.entry.chunks) > 1
+    assert dumped.mb_per_second > 0
+
+    project = tmp_path / "project"
+    project.mkdir()
+    snapshot = store.create_snapshot(project, [], databases=[dumped.entry])
+    (entry,) = store.database_entries(snapshot.snapshot_id)
+
+    received = tmp_path / "received.txt"
+    monkeypatch.setenv("STUB_RESTORE_OUT", str(received))
+    (restored,) = restore_databases(store.chunks, restore_tool, [(target, entry)])
+    assert restored.error is None
+    assert restored.bytes == dumped.bytes
+    assert restored.mb_per_second > 0
+    assert received.read_text().split() == [expected, str(dumped.bytes)]
+
+
+def test_failing_tool_reports_its_stderr(tmp_path, tools, monkeypatch):
+    dump_tool, _ = tools
+    monkeypatch.setenv("STUB_FAIL", "1")
+    store = BackupStore(tmp_path / "backups")
+    (result,) = dump_databases(store.chunks, dump_tool, [DatabaseTarget("db", "u")])
+    assert result.entry is None
+    assert "Access denied" in result.error
@@ -0,0 +1,88 @@
+"""Incremental restore of backup snapshots."""
+
+import pytest
+
+from deployment_manager.backuprestore import (
+    apply_restore,
+    is_protected,
+    plan_restore,
+    verify_chunks,
+)
+from deployment_manager.backupstore import BackupStore
+
+ROOT = "apps/woosoo-nexus"
+
+
+@pytest.fixture
+def project(tmp_path):
+    root = tmp_path / "project"
+    app = root / ROOT
+    (app / "app").mkdir(parents=True)
+    (app / "storage" / "app").mkdir(parents=True)
+    (app / "app" / "Kernel.php").write_text("kernel v1")
+    (app / "routes.php").write_text("routes v1")
+    (app / ".env").write_text("APP_KEY=one")
+    return root
+
+
+def snapshot(tmp_path, project) -> tuple:
+    store = BackupStore(tmp_path / "backups", workers=2)
+    report = store.create_snapshot(project, [ROOT], excludes=[])
+    return store, report.snapshot_id
+
+
+def restore(store, snapshot_id, project, delete=False):
+    plan = plan_restore(store, snapshot_id, project, [], delete=delete)
+    assert verify_chunks(store, plan.writes) == []
+    report = apply_restore(store, plan, project)
+    assert report.errors == []
+    return plan, report
+
+
+def test_restore_rewrites_changed_files_and_keeps_new_ones(tmp_path, project):
+    store, snapshot_id = snapshot(tmp_path, project)
+    app = project / ROOT
+    (app / "app" / "Kernel.php").write_text("kernel v2 (broken)")
+    (app / "routes.php").unlink()
+    (app / "storage" / "app" / "upload.jpg").write_bytes(b"user upload")
+    (app / "app" / "New.php").write_text("added since")
+
+    plan, report = restore(store, snapshot_id, project)
+
+    assert [e.path for e in plan.update] == [f"{ROOT}/app/Kernel.php"]
+    assert [e.path for e in plan.create] == [f"{ROOT}/routes.php"]
+    assert plan.delete == []
+    assert (app / "app" / "Kernel.php").read_text() == "kernel v1"
+    assert (app / "routes.php").read_text() == "routes v1"
+    assert (app / "storage" / "app" / "upload.jpg").read_bytes() == b"user upload"
+    assert (app / "app" / "New.php").exists()
+
+
+def test_delete_removes_new_files_but_not_user_data(tmp_path, project):
+    store, snapshot_id = snapshot(tmp_path, project)
+    app = project / ROOT
+    (app / "storage" / "app" / "upload.jpg").write_bytes(b"user upload")
+    (app / ".env.backup").write_text("APP_KEY=two")
+    (app / "app" / "New.php").write_text("added since")
+
+    plan, report = restore(store, snapshot_id, project, delete=True)
+
+    assert plan.delete == [f"{ROOT}/app/New.php"]
+    assert not (app / "app" / "New.php").exists()
+    assert (app / "storage" / "app" / "upload.jpg").exists()
+    assert (app / ".env.backup").exists()
+    assert report.deleted == 1
+
+
+def test_unchanged_tree_needs_no_writes(tmp_path, project):
+    store, snapshot_id = snapshot(tmp_path, project)
+    plan = plan_restore(store, snapshot_id, project, [])
+    assert plan.writes == [] and plan.delete == [] and plan.kept == []
+    assert plan.unchanged == 3
+
+
+def test_protected_paths():
+    assert is_protected("apps/x/storage/app/public/a.png")
+    assert is_protected("apps/x/.env")
+    assert is_protected("apps/x/.env.production")
+    assert not is_protected("apps/x/app/storage.php")
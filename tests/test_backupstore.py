@@ -0,0 +1,83 @@
+"""Deduplicated snapshots, retention and chunk garbage collection."""
+
+import hashlib
+import os
+import time
+from datetime import datetime, timedelta, timezone
+
+from deployment_manager.backupstore import BackupStore
+
+ROOT = "apps/woosoo-nexus"
+
+
+def make_tree(root):
+    app = root / ROOT
+    (app / "app").mkdir(parents=True)
+    (app / "app" / "Kernel.php").write_text("kernel" * 1000)
+    (app / "composer.json").write_text('{"name": "woosoo/nexus"}')
+    return app
+
+
+def age(path, seconds):
+    past = time.time() - seconds
+    os.utime(path, (past, past))
+
+
+def test_second_snapshot_stores_only_changes(tmp_path):
+    project = tmp_path / "project"
+    app = make_tree(project)
+    store = BackupStore(tmp_path / "backups", workers=2)
+    first = store.create_snapshot(project, [ROOT], excludes=[])
+    assert first.files == 2 and first.new_chunks == 2
+
+    second = store.create_snapshot(project, [ROOT], excludes=[])
+    assert second.new_chunks == 0 and second.unchanged == 2
+
+    (app / "composer.json").write_text('{"name": "woosoo/nexus", "v": 2}')
+    third = store.create_snapshot(project, [ROOT], excludes=[])
+    assert third.new_chunks == 1 and third.hashed == 1
+    assert [e.snapshot_id for e in store.list_snapshots()] == [
+        third.snapshot_id,
+        second.snapshot_id,
+        first.snapshot_id,
+    ]
+
+
+def test_deduplicated_chunk_survives_garbage_collection(tmp_path):
+    store = BackupStore(tmp_path / "backups")
+    data = b"chunk reused by a snapshot still being written"
+    digest = hashlib.sha256(data).hexdigest()
+    store.chunks.put(digest, data)
+    # Orphaned long ago (its snapshot was removed), past the grace period
+    age(store.chunks.path_for(digest), 7200)
+
+    # A new snapshot reuses it but is not catalogued yet
+    assert store.chunks.put(digest, data) == 0
+    report = store.cleanup(datetime.now(), keep_minimum=0, grace_seconds=3600)
+    assert report.chunks_deleted == 0
+    assert store.chunks.get(digest, verify=True) == data
+
+
+def test_unreferenced_old_chunks_are_collected(tmp_path):
+    store = BackupStore(tmp_path / "backups")
+    data = b"orphan"
+    digest = hashlib.sha256(data).hexdigest()
+    store.chunks.put(digest, data)
+    age(store.chunks.path_for(digest), 7200)
+
+    dry = store.cleanup(datetime.now(), dry_run=True, grace_seconds=3600)
+    assert dry.chunks_deleted == 1 and store.chunks.has(digest)
+    store.cleanup(datetime.now(), grace_seconds=3600)
+    assert not store.chunks.has(digest)
+
+
+def test_cleanup_compares_times_across_offsets(tmp_path):
+    project = tmp_path / "project"
+    make_tree(project)
+    store = BackupStore(tmp_path / "backups")
+    kept = store.create_snapshot(project, [ROOT], excludes=[])
+    # The same instant in a zone behind UTC sorts first as text
+    cutoff = datetime.now(timezone(timedelta(hours=-8))) + timedelta(seconds=5)
+    report = store.cleanup(cutoff, keep_minimum=0)
+    assert report.removed == [kept.snapshot_id]
+    assert store.list_snapshots() == []
@@ -0,0 +1,52 @@
+"""Build cache hits, restores and failed builds."""
+
+import pytest
+
+from deployment_manager.buildcache import BuildCache, read_marker
+
+
+def install(directory, contents, fail=False):
+    def build():
+        directory.mkdir(parents=True, exist_ok=True)
+        (directory / "autoload.php").write_text(contents)
+        if fail:
+            raise RuntimeError("composer install failed")
+
+    return build
+
+
+def test_unchanged_key_skips_the_build(tmp_path):
+    cache = BuildCache(tmp_path / "cache")
+    vendor = tmp_path / "app" / "vendor"
+    assert (
+        cache.ensure("app", "dependencies", vendor, "k1", install(vendor, "1")).outcome
+        == "miss"
+    )
+    result = cache.ensure("app", "dependencies", vendor, "k1", install(vendor, "x"))
+    assert result.outcome == "hit"
+    assert (vendor / "autoload.php").read_text() == "1"
+
+
+def test_previous_key_is_restored_from_cache(tmp_path):
+    cache = BuildCache(tmp_path / "cache")
+    vendor = tmp_path / "app" / "vendor"
+    cache.ensure("app", "dependencies", vendor, "k1", install(vendor, "1"))
+    cache.ensure("app", "dependencies", vendor, "k2", install(vendor, "2"))
+    result = cache.ensure("app", "dependencies", vendor, "k1", install(vendor, "x"))
+    assert result.outcome == "restored"
+    assert (vendor / "autoload.php").read_text() == "1"
+    assert read_marker(vendor) == "k1"
+
+
+def test_failed_build_then_rollback_reinstalls(tmp_path):
+    cache = BuildCache(tmp_path / "cache")
+    vendor = tmp_path / "app" / "vendor"
+    cache.ensure("app", "dependencies", vendor, "k1", install(vendor, "1"))
+    with pytest.raises(RuntimeError):
+        cache.ensure("app", "dependencies", vendor, "k2", install(vendor, "half", True))
+    # The half-written directory must not pass for either key
+    assert read_marker(vendor) is None
+
+    result = cache.ensure("app", "dependencies", vendor, "k1", install(vendor, "x"))
+    assert result.outcome == "restored"
+    assert (vendor / "autoload.php").read_text() == "1"
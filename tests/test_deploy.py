@@ -0,0 +1,132 @@
+"""Tests for the deploy stage scheduler."""
+
+import sys
+import threading
+import time
+
+import pytest
+
+from deployment_manager.deploy import (
+    Pipeline,
+    Stage,
+    StageFailed,
+    StageSkipped,
+    StageStatus,
+)
+
+
+def noop(context):
+    pass
+
+
+def quiet(name, line):
+    pass
+
+
+class Tracker:
+    """Records how many stages ran at once."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.current = 0
+        self.peak = 0
+
+    def action(self, context):
+        with self.lock:
+            self.current += 1
+            self.peak = max(self.peak, self.current)
+        time.sleep(0.2)
+        with self.lock:
+            self.current -= 1
+
+
+def test_cycle_is_rejected():
+    stages = [
+        Stage("a", noop, needs=["c"]),
+        Stage("b", noop, needs=["a"]),
+        Stage("c", noop, needs=["b"]),
+    ]
+    with pytest.raises(ValueError, match="cycle"):
+        Pipeline(stages, quiet)
+
+
+def test_unknown_dependency_is_rejected():
+    with pytest.raises(ValueError, match="Unknown stage 'missing'"):
+        Pipeline([Stage("a", noop, needs=["missing"])], quiet)
+
+
+def test_dependencies_run_first():
+    finished = []
+    stages = [
+        Stage("migrate", lambda c: finished.append("migrate"), needs=["install"]),
+        Stage("install", lambda c: finished.append("install")),
+    ]
+    results = Pipeline(stages, quiet).run()
+    assert finished == ["install", "migrate"]
+    assert all(r.status == StageStatus.OK for r in results.values())
+
+
+def test_cpu_limit_serialises_stages():
+    tracker = Tracker()
+    stages = [Stage(name, tracker.action, cpus=2) for name in "abc"]
+    Pipeline(stages, quiet, cpu_limit=3).run()
+    assert tracker.peak == 1
+
+    tracker = Tracker()
+    stages = [Stage(name, tracker.action, cpus=1) for name in "abc"]
+    Pipeline(stages, quiet, cpu_limit=3).run()
+    assert tracker.peak == 3
+
+
+def test_memory_limit_runs_oversized_stage_alone():
+    tracker = Tracker()
+    stages = [
+        Stage("small", tracker.action, memory_mb=1),
+        Stage("huge", tracker.action, memory_mb=10**9),
+    ]
+    results = Pipeline(stages, quiet, cpu_limit=8).run()
+    assert tracker.peak == 1
+    assert all(r.status == StageStatus.OK for r in results.values())
+
+
+def test_first_failure_kills_running_stages():
+    def slow(context):
+        command = [sys.executable, "-c", "import time; time.sleep(60)"]
+        context.run(command, cwd=".")
+
+    def bad(context):
+        time.sleep(0.5)
+        raise StageFailed("composer exited with 1")
+
+    stages = [
+        Stage("slow", slow),
+        Stage("bad", bad),
+        Stage("after", noop, needs=["bad"]),
+    ]
+    started = time.perf_counter()
+    results = Pipeline(stages, quiet, cpu_limit=8).run()
+
+    assert time.perf_counter() - started < 30
+    assert results["bad"].status == StageStatus.FAILED
+    assert results["bad"].error == "composer exited with 1"
+    assert results["slow"].status == StageStatus.CANCELLED
+    assert results["after"].status == StageStatus.CANCELLED
+    assert not results["after"].started
+
+
+def test_skipped_stage_satisfies_dependents():
+    def nothing_to_do(context):
+        raise StageSkipped("no PWA directory")
+
+    stages = [
+        Stage("pwa", nothing_to_do),
+        Stage("compress", noop, needs=["pwa"]),
+        Stage("migrate", noop),
+        Stage("optimize", noop, needs=["migrate"]),
+    ]
+    results = Pipeline(stages, quiet).run(skip={"migrate"})
+    assert results["pwa"].status == StageStatus.SKIPPED
+    assert results["pwa"].error == "no PWA directory"
+    assert results["compress"].status == StageStatus.OK
+    assert results["migrate"].status == StageStatus.SKIPPED
+    assert results["optimize"].status == StageStatus.OK
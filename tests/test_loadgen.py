@@ -0,0 +1,36 @@
+"""bench http load generator against its in-process stub server."""
+
+import asyncio
+
+from deployment_manager.loadgen import StubServer, Target, run_load
+
+
+def test_run_load_against_stub():
+    async def run():
+        server = StubServer()
+        port = await server.start()
+        try:
+            target = Target.from_url(f"http://127.0.0.1:{port}/api/health")
+            return await run_load(target, concurrency=4, duration=1.0)
+        finally:
+            await server.stop()
+
+    result = asyncio.run(run())
+    assert result.requests > 0
+    assert result.errors == 0
+    assert result.statuses == {200: result.requests}
+
+
+def test_run_load_counts_server_errors():
+    async def run():
+        server = StubServer(body=b"down", status=503)
+        port = await server.start()
+        try:
+            target = Target.from_url(f"http://127.0.0.1:{port}/")
+            return await run_load(target, concurrency=2, duration=0.5, rate=50)
+        finally:
+            await server.stop()
+
+    result = asyncio.run(run())
+    assert result.requests > 0
+    assert result.errors == result.requests
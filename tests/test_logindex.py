@@ -0,0 +1,60 @@
+"""Tests for the sparse log timestamp index."""
+
+from deployment_manager.logindex import LogIndex
+
+
+def write_log(path, first, count, mode="w"):
+    """Write ``count`` one-second-apart lines starting at minute offset ``first``."""
+    with open(path, mode, encoding="utf-8", newline="\n") as f:
+        for i in range(first, first + count):
+            f.write(f"2026-02-15 12:{i // 60:02d}:{i % 60:02d}.000: request {i}\n")
+            if i % 7 == 0:
+                f.write("  at App\\Http\\Kernel->handle()\n")
+
+
+def lines_from(path, offset):
+    with open(path, "rb") as f:
+        f.seek(offset)
+        return f.read().decode("utf-8").splitlines()
+
+
+def test_find_start_skips_only_older_lines(tmp_path):
+    log = tmp_path / "app.log"
+    write_log(log, 0, 2000)
+    index = LogIndex(log, spacing=1024)
+    since = "2026-02-15 12:20:00.000"
+
+    start = index.find_start(since)
+    assert start > 0
+    with open(log, "rb") as f:
+        skipped = f.read(start).decode("utf-8").splitlines()
+    assert all(line[:23] < since for line in skipped if line.startswith("2026"))
+    assert "2026-02-15 12:20:00.000: request 1200" in lines_from(log, start)
+    assert (log.parent / "app.log.idx").exists()
+
+
+def test_index_is_extended_as_the_log_grows(tmp_path):
+    log = tmp_path / "app.log"
+    write_log(log, 0, 500)
+    index = LogIndex(log, spacing=1024)
+    index.update()
+    entries = len(index.keys)
+
+    write_log(log, 500, 500, mode="a")
+    reloaded = LogIndex(log, spacing=1024)
+    assert reloaded.update() > 0
+    assert reloaded.keys[:entries] == index.keys
+    assert reloaded.keys == sorted(reloaded.keys)
+
+
+def test_rotated_log_rebuilds_the_index(tmp_path):
+    log = tmp_path / "app.log"
+    write_log(log, 0, 1000)
+    LogIndex(log, spacing=1024).update()
+
+    # NSSM rotated the log: a new, smaller file with later lines
+    write_log(log, 1500, 100)
+    index = LogIndex(log, spacing=1024)
+    index.update()
+    assert index.keys[0] >= "2026-02-15 12:25:00.000"
+    assert index.find_start("2026-02-15 12:00:00.000") == 0
@@ -0,0 +1,50 @@
+"""Tests for the timestamp-merged log stream."""
+
+from datetime import datetime
+
+from deployment_manager.logmerge import (
+    format_key,
+    merge_logs,
+    parse_time_spec,
+    timestamp_key,
+)
+
+
+def test_keys_are_padded_to_milliseconds():
+    assert timestamp_key("2026-02-15 12:00:00: up") == "2026-02-15 12:00:00.000"
+    assert timestamp_key("2026-02-15T12:00:00.5: up") == "2026-02-15 12:00:00.500"
+    assert timestamp_key("2026-02-15 12:00:00.123456: up") == "2026-02-15 12:00:00.123"
+    assert timestamp_key("Stack trace:") is None
+    assert format_key(datetime(2026, 2, 15, 12)) == "2026-02-15 12:00:00.000"
+
+
+def test_since_keeps_lines_without_milliseconds(tmp_path):
+    log = tmp_path / "app.log"
+    log.write_text(
+        "2026-02-15 11:59:59: before\n"
+        "2026-02-15 12:00:00: on the second\n"
+        "  continuation\n"
+        "2026-02-15 12:00:00.250: later\n",
+        encoding="utf-8",
+    )
+    now = datetime(2026, 2, 15, 18)
+    since = format_key(parse_time_spec("12:00", now))
+
+    lines = [line for _, _, line in merge_logs({"app": log}, since)]
+    assert lines == [
+        "2026-02-15 12:00:00: on the second",
+        "  continuation",
+        "2026-02-15 12:00:00.250: later",
+    ]
+
+
+def test_merge_interleaves_sources_in_time_order(tmp_path):
+    api = tmp_path / "api.log"
+    web = tmp_path / "web.log"
+    api.write_text("2026-02-15 12:00:01: a1\n2026-02-15 12:00:03: a2\n")
+    web.write_text("2026-02-15 12:00:02.000: w1\n2026-02-15 12:00:04: w2\n")
+
+    merged = [
+        (label, line[-2:]) for _, label, line in merge_logs({"api": api, "web": web})
+    ]
+    assert merged == [("api", "a1"), ("web", "w1"), ("api", "a2"), ("web", "w2")]
@@ -0,0 +1,107 @@
+"""Tests for the parallel log search."""
+
+import gzip
+import re
+
+from deployment_manager import logsearch
+from deployment_manager.logsearch import (
+    SearchStats,
+    build_tasks,
+    required_literal,
+    search_logs,
+    search_task,
+)
+
+
+def write_log(path, first, count):
+    """One line per second from minute offset ``first``; every 5th line fails."""
+    with open(path, "w", encoding="utf-8", newline="\n") as f:
+        for i in range(first, first + count):
+            status = "ERROR order" if i % 5 == 0 else "INFO request"
+            f.write(f"2026-02-15 12:{i // 60:02d}:{i % 60:02d}: {status} {i}\n")
+            if i % 5 == 0:
+                f.write(f"  PaymentTimeout for order {i}\n")
+
+
+def expected(path, pattern):
+    """What a plain line-by-line scan finds, with inherited timestamps."""
+    found = []
+    key = ""
+    for line in path.read_text(encoding="utf-8").splitlines():
+        match = re.match(r"^(\S+ \d\d:\d\d:\d\d)", line)
+        if match:
+            key = match.group(1) + ".000"
+        if re.search(pattern, line):
+            found.append((key, line))
+    return found
+
+
+def test_required_literal():
+    assert required_literal(r"OrderFailed: \d+") == "OrderFailed: "
+    assert required_literal(r"Payment(Timeout|Declined)") == "Payment"
+    assert required_literal(r"\d+") is None
+    assert required_literal(r"(?i)timeout") is None
+
+
+def test_split_tasks_find_the_same_lines_as_a_scan(tmp_path, monkeypatch):
+    log = tmp_path / "app.log"
+    write_log(log, 0, 3000)
+    monkeypatch.setattr(logsearch, "TASK_BYTES", 10_000)
+    monkeypatch.setattr(logsearch, "CHUNK_BYTES", 4096)
+
+    service = tmp_path / "logs" / "api"
+    service.mkdir(parents=True)
+    log.rename(service / "output.log")
+    log = service / "output.log"
+
+    tasks = build_tasks(tmp_path / "logs")
+    assert len(tasks) > 5
+
+    found = []
+    for task in tasks:
+        _, matches, _, error = search_task(task, "PaymentTimeout", False, None)
+        assert error is None
+        found.extend(matches)
+    # Continuation lines keep the timestamp of the line they belong to,
+    # even when a task starts right before them
+    assert found == expected(log, "PaymentTimeout")
+
+
+def test_search_merges_services_in_time_order(tmp_path):
+    logs = tmp_path / "logs"
+    (logs / "api").mkdir(parents=True)
+    (logs / "queue").mkdir(parents=True)
+    write_log(logs / "api" / "output.log", 30, 30)
+    write_log(logs / "queue" / "output.log", 0, 45)
+
+    # A compressed segment rotated before the live queue log began
+    rotated = logs / "queue" / "output-20260215T115959.000.log"
+    write_log(rotated, 0, 10)
+    rotated.write_bytes(
+        gzip.compress(
+            rotated.read_bytes().replace(b"2026-02-15 12:", b"2026-02-15 11:")
+        )
+    )
+    rotated.rename(rotated.with_name(rotated.name + ".gz"))
+
+    stats = SearchStats()
+    results = list(
+        search_logs(build_tasks(logs), r"ERROR order", workers=2, stats=stats)
+    )
+    keys = [key for key, _, _ in results]
+    assert keys == sorted(keys)
+    assert keys[0].startswith("2026-02-15 11:")
+    assert {label for _, label, _ in results} == {"api", "queue"}
+    assert stats.matches == len(results) == 2 + 6 + 9
+    assert stats.files == 3 and not stats.errors
+
+
+def test_max_matches_stops_early(tmp_path):
+    service = tmp_path / "logs" / "api"
+    service.mkdir(parents=True)
+    write_log(service / "output.log", 0, 100)
+
+    results = list(
+        search_logs(build_tasks(tmp_path / "logs"), "error", True, 3, workers=1)
+    )
+    assert [line.split()[-1] for _, _, line in results] == ["0", "5", "10"]
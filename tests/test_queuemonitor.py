@@ -0,0 +1,143 @@
+"""Queue backlog counts and the autoscaler's hysteresis and cooldowns."""
+
+import sqlite3
+
+import pytest
+
+from deployment_manager.queuemonitor import (
+    Autoscaler,
+    ConnectionPool,
+    QueueCounts,
+    QueueMonitor,
+    QueueSnapshot,
+    ScalingPolicy,
+    SQLiteBackend,
+)
+
+NOW = 1_700_000_000
+
+
+@pytest.fixture
+def jobs_db(tmp_path):
+    """SQLite copy of Laravel's jobs and failed_jobs tables."""
+    path = tmp_path / "jobs.sqlite"
+    db = sqlite3.connect(path)
+    db.executescript("""
+        CREATE TABLE jobs (
+            id INTEGER PRIMARY KEY, queue TEXT, payload TEXT, attempts INTEGER,
+            reserved_at INTEGER, available_at INTEGER, created_at INTEGER
+        );
+        CREATE TABLE failed_jobs (
+            id INTEGER PRIMARY KEY, uuid TEXT, connection TEXT, queue TEXT,
+            payload TEXT, exception TEXT, failed_at TEXT
+        );
+        """)
+    rows = [
+        ("default", None, NOW - 45),  # Due, waiting 45s
+        ("default", None, NOW - 5),  # Due
+        ("default", NOW - 2, NOW - 10),  # Reserved by a worker
+        ("default", None, NOW + 60),  # Delayed
+        ("mail", None, NOW),  # Due just now
+    ]
+    db.executemany(
+        "INSERT INTO jobs (queue, payload, attempts, reserved_at, available_at,"
+        " created_at) VALUES (?, '{}', 0, ?, ?, 0)",
+        rows,
+    )
+    db.execute(
+        "INSERT INTO failed_jobs (uuid, connection, queue, payload, exception,"
+        " failed_at) VALUES ('u1', 'database', 'default', '{}', 'boom', '')"
+    )
+    db.commit()
+    db.close()
+    return path
+
+
+def test_snapshot_counts_per_queue(jobs_db):
+    pool = ConnectionPool(SQLiteBackend(jobs_db))
+    try:
+        snapshot = QueueMonitor(pool).snapshot(now=NOW)
+    finally:
+        pool.close()
+
+    default, mail = snapshot.queues
+    assert (default.queue, default.pending, default.reserved, default.delayed) == (
+        "default",
+        2,
+        1,
+        1,
+    )
+    assert default.oldest_age == 45
+    assert (mail.queue, mail.pending, mail.oldest_age) == ("mail", 1, 0)
+    assert snapshot.pending == 3
+    assert snapshot.oldest_age == 45
+    assert snapshot.failed == 1
+
+
+def backlog(pending: int, age: float = 0.0) -> QueueSnapshot:
+    return QueueSnapshot(0, [QueueCounts("default", pending, oldest_age=age)])
+
+
+def policy(**overrides) -> ScalingPolicy:
+    return ScalingPolicy(
+        **{
+            "min_workers": 1,
+            "max_workers": 3,
+            "jobs_per_worker": 20,
+            "up_samples": 2,
+            "down_samples": 3,
+            "up_cooldown": 60,
+            "down_cooldown": 300,
+            **overrides,
+        }
+    )
+
+
+def test_scale_up_needs_consecutive_high_samples():
+    autoscaler = Autoscaler(policy())
+    first = autoscaler.decide(backlog(50), workers=1, now=0)
+    assert (first.action, first.state) == ("hold", "high")
+    # A dip back into the steady band resets the streak
+    autoscaler.decide(backlog(15), workers=1, now=5)
+    assert autoscaler.decide(backlog(50), workers=1, now=10).action == "hold"
+    second = autoscaler.decide(backlog(50), workers=1, now=15)
+    assert (second.action, second.target) == ("up", 3)  # ceil(50 / 20)
+
+
+def test_steady_band_holds_between_thresholds():
+    autoscaler = Autoscaler(policy())
+    # 3 workers: high above 60 pending, low at or below 20 * 2 * 0.25 = 10
+    for t in range(0, 100, 5):
+        decision = autoscaler.decide(backlog(30), workers=3, now=t)
+        assert (decision.action, decision.state) == ("hold", "steady")
+
+
+def test_cooldowns_follow_a_change():
+    autoscaler = Autoscaler(policy(max_workers=4))
+    autoscaler.decide(backlog(30), workers=1, now=0)
+    assert autoscaler.decide(backlog(30), workers=1, now=5).target == 2
+    # Still over capacity, but within the 60s up cooldown
+    for t in (10, 15, 60):
+        assert autoscaler.decide(backlog(70), workers=2, now=t).action == "hold"
+    assert autoscaler.decide(backlog(70), workers=2, now=65).target == 4
+
+    # Idle: down_samples low samples are not enough inside the down cooldown
+    for t in (100, 200, 300):
+        assert autoscaler.decide(backlog(0), workers=4, now=t).action == "hold"
+    down = autoscaler.decide(backlog(0), workers=4, now=365)
+    assert (down.action, down.target) == ("down", 3)  # One worker at a time
+
+
+def test_old_job_scales_up_despite_small_backlog():
+    autoscaler = Autoscaler(policy(max_wait=30))
+    autoscaler.decide(backlog(2, age=40), workers=1, now=0)
+    decision = autoscaler.decide(backlog(2, age=45), workers=1, now=5)
+    assert (decision.action, decision.target) == ("up", 2)
+
+
+def test_bounds_correction_does_not_start_a_cooldown():
+    autoscaler = Autoscaler(policy(min_workers=2))
+    fixed = autoscaler.decide(backlog(0), workers=0, now=0)
+    assert (fixed.state, fixed.target) == ("bounds", 2)
+    autoscaler.decide(backlog(100), workers=2, now=1)
+    assert autoscaler.decide(backlog(100), workers=2, now=2).target == 3
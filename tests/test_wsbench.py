@@ -0,0 +1,40 @@
+"""bench ws fan-out against the in-process Reverb stub."""
+
+import asyncio
+
+from deployment_manager.wsbench import StubReverb, WsTarget, run_fanout
+
+
+def fanout(secret=None, **options):
+    async def run():
+        reverb = StubReverb()
+        port = await reverb.start()
+        try:
+            target = WsTarget(
+                "127.0.0.1",
+                port,
+                reverb.app_id,
+                reverb.key,
+                secret or reverb.secret,
+                tls=False,
+            )
+            return await run_fanout(target, timeout=5, **options)
+        finally:
+            await reverb.stop()
+
+    return asyncio.run(run())
+
+
+def test_every_subscriber_receives_every_broadcast():
+    result = fanout(connections=20, channels=2, messages=5, interval=0.2)
+    assert result.connected == 20
+    assert result.subscribed == 20
+    assert result.expected == 20 * 5
+    assert result.delivered == result.expected
+    assert not result.errors
+
+
+def test_bad_secret_is_rejected():
+    result = fanout(secret="wrong", connections=2, messages=1, interval=0.1)
+    assert result.delivered == 0
+    assert result.errors